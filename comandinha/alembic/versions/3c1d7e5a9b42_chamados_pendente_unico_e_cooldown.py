@@ -0,0 +1,64 @@
+"""chamados: pendente unico por mesa/motivo e estado do cooldown
+
+Revision ID: 3c1d7e5a9b42
+Revises: 9fae3bb0d29a
+Create Date: 2026-10-19 10:12:03.481220
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c1d7e5a9b42'
+down_revision: Union[str, None] = '9fae3bb0d29a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # pendentes duplicados (gerados pela corrida antiga) impediriam o índice:
+    # fica o mais antigo de cada (mesa, motivo), os demais viram cancelados
+    op.execute("""
+        UPDATE chamadas_garcom
+           SET status = 3, cancelado_em = criado_em
+         WHERE status = 1
+           AND id NOT IN (
+               SELECT min(id) FROM chamadas_garcom WHERE status = 1 GROUP BY mesa_uuid, motivo
+           )
+    """)
+    op.create_index(
+        'ux_chamadas_pendente_mesa_motivo', 'chamadas_garcom', ['mesa_uuid', 'motivo'],
+        unique=True,
+        postgresql_where=sa.text('status = 1'),
+        sqlite_where=sa.text('status = 1'),
+    )
+
+    op.create_table('chamadas_cooldown_mesa',
+    sa.Column('mesa_uuid', sa.String(length=36), nullable=False),
+    sa.Column('motivo', sa.Integer(), nullable=False),
+    sa.Column('t_ref', sa.DateTime(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['mesa_uuid'], ['mesa.uuid'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('mesa_uuid')
+    )
+    # estado inicial: último evento do par assistência/urgente de cada mesa
+    op.execute("""
+        INSERT INTO chamadas_cooldown_mesa (mesa_uuid, motivo, t_ref)
+        SELECT c.mesa_uuid, c.motivo, coalesce(c.atendido_em, c.cancelado_em, c.criado_em)
+          FROM chamadas_garcom c
+         WHERE c.id = (
+               SELECT c2.id FROM chamadas_garcom c2
+                WHERE c2.mesa_uuid = c.mesa_uuid AND c2.motivo IN (1, 3)
+                ORDER BY coalesce(c2.atendido_em, c2.cancelado_em, c2.criado_em) DESC, c2.id DESC
+                LIMIT 1
+         )
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('chamadas_cooldown_mesa')
+    op.drop_index('ux_chamadas_pendente_mesa_motivo', table_name='chamadas_garcom')
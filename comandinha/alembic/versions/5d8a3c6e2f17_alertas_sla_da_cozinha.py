@@ -0,0 +1,43 @@
+"""alertas do SLA da cozinha no banco
+
+Revision ID: 5d8a3c6e2f17
+Revises: 7b2e4f9c1d30
+Create Date: 2026-10-19 18:05:47.302915
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d8a3c6e2f17'
+down_revision: Union[str, None] = '7b2e4f9c1d30'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('alertas_sla',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('restaurante_id', sa.Integer(), nullable=False),
+    sa.Column('pedido_id', sa.Integer(), nullable=False),
+    sa.Column('mesa_id', sa.Integer(), nullable=False),
+    sa.Column('tipo', sa.String(length=10), nullable=False),
+    sa.Column('estimativa_entrega', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('status', sa.Integer(), nullable=False),
+    sa.Column('criado_em', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('atendido_em', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['restaurante_id'], ['restaurantes.id'], name='fk_alertas_sla_restaurante'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('pedido_id', 'tipo', 'estimativa_entrega', name='ux_alertas_sla_pedido_tipo_prazo')
+    )
+    op.create_index('ix_alertas_sla_restaurante_id', 'alertas_sla', ['restaurante_id', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_alertas_sla_restaurante_id', table_name='alertas_sla')
+    op.drop_table('alertas_sla')
@@ -0,0 +1,97 @@
+"""restaurante_id (tenant) em mesa, categoria, produto, pedido e chamadas_garcom
+
+Revision ID: 7b2e4f9c1d30
+Revises: 3c1d7e5a9b42
+Create Date: 2026-10-19 16:40:12.118734
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7b2e4f9c1d30'
+down_revision: Union[str, None] = '3c1d7e5a9b42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_TABELAS = ('mesa', 'categoria', 'produto', 'pedido', 'chamadas_garcom')
+
+# índices compostos começando pelo tenant (mesmos nomes dos modelos)
+_INDICES = (
+    ('ix_mesa_restaurante_status', 'mesa', ['restaurante_id', 'status_id']),
+    ('ix_categoria_restaurante_ordem', 'categoria', ['restaurante_id', 'ordem']),
+    ('ix_produto_restaurante_categoria', 'produto', ['restaurante_id', 'categoria_id']),
+    ('ix_pedido_restaurante_status_timestamp', 'pedido', ['restaurante_id', 'status_id', 'timestamp']),
+    ('ix_chamadas_restaurante_status_criado', 'chamadas_garcom', ['restaurante_id', 'status', 'criado_em']),
+    # itens carregados por pedido_id (selectinload): sem ele, cada listagem de
+    # um restaurante varre os itens de todos
+    ('ix_item_pedido_pedido_id', 'item_pedido', ['pedido_id']),
+)
+
+
+def _criar_indice_pendentes() -> None:
+    op.create_index(
+        'ux_chamadas_pendente_mesa_motivo', 'chamadas_garcom', ['mesa_uuid', 'motivo'],
+        unique=True,
+        postgresql_where=sa.text('status = 1'),
+        sqlite_where=sa.text('status = 1'),
+    )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # instalação de um restaurante só: tudo o que existe passa a ser do
+    # primeiro admin cadastrado. Dados sem nenhum admin ganham um restaurante
+    # sem login (senha '!' não confere com hash nenhum) para o NOT NULL valer.
+    op.execute("""
+        INSERT INTO restaurantes (nome, email, senha_hash)
+        SELECT 'Restaurante', 'restaurante@comandinha.local', '!'
+         WHERE NOT EXISTS (SELECT 1 FROM restaurantes)
+           AND (EXISTS (SELECT 1 FROM mesa) OR EXISTS (SELECT 1 FROM categoria))
+    """)
+    for tabela in _TABELAS:
+        op.add_column(tabela, sa.Column('restaurante_id', sa.Integer(), nullable=True))
+
+    op.execute("UPDATE mesa SET restaurante_id = (SELECT min(id) FROM restaurantes)")
+    op.execute("UPDATE categoria SET restaurante_id = (SELECT min(id) FROM restaurantes)")
+    # os demais herdam de quem já tem o tenant (mesmo resultado hoje, e
+    # correto se a migração rodar sobre dados já separados à mão)
+    op.execute("""
+        UPDATE produto SET restaurante_id =
+            (SELECT c.restaurante_id FROM categoria c WHERE c.id = produto.categoria_id)
+    """)
+    op.execute("""
+        UPDATE pedido SET restaurante_id =
+            (SELECT m.restaurante_id FROM mesa m WHERE m.id = pedido.mesa_id)
+    """)
+    op.execute("""
+        UPDATE chamadas_garcom SET restaurante_id =
+            (SELECT m.restaurante_id FROM mesa m WHERE m.uuid = chamadas_garcom.mesa_uuid)
+    """)
+
+    # batch: no SQLite, NOT NULL e FK exigem recriar a tabela — e a cópia
+    # perderia o WHERE do índice parcial dos pendentes, que é refeito depois
+    op.drop_index('ux_chamadas_pendente_mesa_motivo', table_name='chamadas_garcom')
+    for tabela in _TABELAS:
+        with op.batch_alter_table(tabela) as batch:
+            batch.alter_column('restaurante_id', existing_type=sa.Integer(), nullable=False)
+            batch.create_foreign_key(f'fk_{tabela}_restaurante', 'restaurantes', ['restaurante_id'], ['id'])
+    _criar_indice_pendentes()
+
+    for nome, tabela, colunas in _INDICES:
+        op.create_index(nome, tabela, colunas, unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for nome, tabela, _ in reversed(_INDICES):
+        op.drop_index(nome, table_name=tabela)
+    op.drop_index('ux_chamadas_pendente_mesa_motivo', table_name='chamadas_garcom')
+    for tabela in reversed(_TABELAS):
+        with op.batch_alter_table(tabela) as batch:
+            batch.drop_constraint(f'fk_{tabela}_restaurante', type_='foreignkey')
+            batch.drop_column('restaurante_id')
+    _criar_indice_pendentes()
@@ -0,0 +1,52 @@
+"""indices da busca de produtos no Postgres (tsvector + trigramas)
+
+Revision ID: e4a9b1c7d352
+Revises: 5d8a3c6e2f17
+Create Date: 2026-10-19 18:42:10.573204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4a9b1c7d352'
+down_revision: Union[str, None] = '5d8a3c6e2f17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# mesma expressão de src.common.busca._DOC_POSTGRES: o planejador só usa o
+# índice de expressão quando a consulta repete a expressão indexada
+_DOC = (
+    "to_tsvector('portuguese', f_unaccent(coalesce(nome, '') || ' ' || "
+    "coalesce(restricoes::text, '') || ' ' || coalesce(descricao, '')))"
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # só Postgres (BUSCA_BACKEND=postgres); o SQLite usa o índice em memória
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.execute("CREATE EXTENSION IF NOT EXISTS unaccent")
+    # unaccent(text) é STABLE (depende do search_path); com o dicionário
+    # explícito o resultado é fixo e pode ser declarado IMMUTABLE
+    op.execute("""
+        CREATE OR REPLACE FUNCTION f_unaccent(text) RETURNS text
+        LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+        AS $$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$
+    """)
+    op.execute("DROP INDEX IF EXISTS ix_produto_nome_trgm")    # versão antiga, sobre nome cru
+    op.execute(f"CREATE INDEX ix_produto_busca_doc ON produto USING gin ({_DOC})")
+    op.execute("CREATE INDEX ix_produto_nome_trgm ON produto USING gin (f_unaccent(lower(nome)) gin_trgm_ops)")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute("DROP INDEX IF EXISTS ix_produto_nome_trgm")
+    op.execute("DROP INDEX IF EXISTS ix_produto_busca_doc")
+    op.execute("DROP FUNCTION IF EXISTS f_unaccent(text)")
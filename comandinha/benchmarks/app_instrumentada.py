@@ -0,0 +1,20 @@
+# benchmarks/app_instrumentada.py
+"""
+App real envolvida pelo contador de SQL, para rodar o benchmark sobre HTTP:
+
+    DATABASE_URL=sqlite:///./bench.db uvicorn benchmarks.app_instrumentada:app --port 4000
+    python -m benchmarks.executar --db sqlite:///./bench.db --url http://127.0.0.1:4000
+
+O limite de taxa (src.common.limite_taxa) fica desligado por padrão aqui: a
+carga sai toda de um IP e de poucas mesas. LIMITE_TAXA=1 para medi-lo.
+"""
+import os
+
+os.environ.setdefault("LIMITE_TAXA", "0")
+
+from benchmarks.medicao import ContadorSQLMiddleware, instalar_contador_sql
+from server import app as _app
+from src.infra.sqlalchemy.config.database import engine
+
+instalar_contador_sql(engine)
+app = ContadorSQLMiddleware(_app)
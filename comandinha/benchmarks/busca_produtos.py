@@ -0,0 +1,57 @@
+# benchmarks/busca_produtos.py
+"""
+Latência do índice de busca em memória (src.common.busca) sobre um catálogo sintético.
+
+    python -m benchmarks.busca_produtos [--produtos 3000] [--repeticoes 500]
+
+Meta: consultas abaixo de 1 ms (mediana) para alguns milhares de produtos.
+"""
+import argparse
+import random
+import statistics
+import time
+
+from src.common.busca import IndiceBusca
+
+PALAVRAS = [
+    "frango", "carne", "peixe", "arroz", "feijão", "salada", "queijo", "molho", "batata",
+    "bacon", "limão", "tomate", "cebola", "alho", "picanha", "costela", "camarão", "lula",
+    "polvo", "massa", "parmegiana", "grelhado", "assado", "frito", "empanado", "caseiro",
+]
+RESTRICOES = ["sem lactose", "sem glúten", "vegano", "vegetariano"]
+CONSULTAS = ["frango", "fran", "frnago", "sem lactose", "camarao alho", "feijao tropeiro", "xyz"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do índice de busca de produtos")
+    parser.add_argument("--produtos", type=int, default=3000)
+    parser.add_argument("--repeticoes", type=int, default=500)
+    parser.add_argument("--semente", type=int, default=1)
+    args = parser.parse_args()
+
+    rnd = random.Random(args.semente)
+    indice = IndiceBusca()
+    t0 = time.perf_counter()
+    for i in range(args.produtos):
+        indice.adicionar(i, {
+            "nome": [" ".join(rnd.sample(PALAVRAS, 2)) + f" {i}"],
+            "restricoes": rnd.sample(RESTRICOES, rnd.randint(0, 2)),
+            "descricao": [" ".join(rnd.sample(PALAVRAS, 6))],
+        }, {"disponivel": i % 10 != 0})
+    construcao_ms = (time.perf_counter() - t0) * 1000.0
+
+    print(f"{args.produtos} produtos, índice construído em {construcao_ms:.1f} ms")
+    print(f"{'consulta':<20}{'resultados':>11}{'p50 ms':>9}{'p99 ms':>9}")
+    for consulta in CONSULTAS:
+        amostras = []
+        for _ in range(args.repeticoes):
+            t = time.perf_counter()
+            res = indice.buscar(consulta, 20)
+            amostras.append((time.perf_counter() - t) * 1000.0)
+        amostras.sort()
+        p99 = amostras[min(len(amostras) - 1, int(len(amostras) * 0.99))]
+        print(f"{consulta:<20}{len(res):>11}{statistics.median(amostras):>9.3f}{p99:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+# benchmarks/cenarios.py
+"""
+Cenários de carga. Cada cenário é uma função (sessao, ctx, rng) que dispara
+uma "visita" realista (uma ou mais requisições) contra a API.
+"""
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+from benchmarks.medicao import CABECALHO_SQL, Coletor
+
+
+@dataclass
+class Contexto:
+    mesas: List[Tuple[int, str]]            # (id, uuid)
+    produtos: List[int]                     # somente disponíveis
+    categorias: List[int]
+    admin_headers: Dict[str, str] = field(default_factory=dict)
+
+
+def carregar_contexto(engine) -> Contexto:
+    """Lê ids do banco semeado e emite um token de admin para as rotas protegidas."""
+    from sqlalchemy import text
+    from src.infra.providers.token_provider import TokenProvider
+    from benchmarks.semear import ADMIN_EMAIL
+
+    with engine.connect() as conn:
+        mesas = [tuple(r) for r in conn.execute(text("SELECT id, uuid FROM mesa WHERE ativo = :a"), {"a": True})]
+        produtos = [r[0] for r in conn.execute(text("SELECT id FROM produto WHERE disponivel = :d"), {"d": True})]
+        categorias = [r[0] for r in conn.execute(text("SELECT id FROM categoria"))]
+        admin_id = conn.execute(
+            text("SELECT id FROM restaurantes WHERE email = :e"), {"e": ADMIN_EMAIL}
+        ).scalar()
+
+    if not (mesas and produtos and categorias and admin_id):
+        raise SystemExit("Banco sem dados de benchmark. Rode antes: python -m benchmarks.semear")
+
+    token = TokenProvider.criar_access_token({"sub": str(admin_id), "role": "admin"})
+    return Contexto(
+        mesas=mesas,
+        produtos=produtos,
+        categorias=categorias,
+        admin_headers={"Authorization": f"Bearer {token}"},
+    )
+
+
+class Sessao:
+    """Envolve o cliente HTTP e registra cada requisição no coletor."""
+
+    def __init__(self, cliente, coletor: Coletor, cenario: str):
+        self.cliente = cliente
+        self.coletor = coletor
+        self.cenario = cenario
+
+    def req(self, rotulo: str, metodo: str, url: str, esperado=(200,), **kwargs):
+        t0 = time.perf_counter()
+        resp = self.cliente.request(metodo, url, **kwargs)
+        ms = (time.perf_counter() - t0) * 1000.0
+        sql = resp.headers.get(CABECALHO_SQL)
+        self.coletor.registrar(
+            self.cenario, rotulo, ms, int(sql) if sql is not None else None,
+            resp.status_code in esperado,
+        )
+        return resp
+
+
+# ---------------- cenários ----------------
+
+def navegacao_cardapio(s: Sessao, ctx: Contexto, rng) -> None:
+    s.req("GET /categorias", "GET", "/categorias")
+    s.req("GET /produtos", "GET", "/produtos")
+    cat = rng.choice(ctx.categorias)
+    s.req("GET /categorias/{id}/produtos", "GET", f"/categorias/{cat}/produtos")
+    s.req("GET /produtos/recomendados", "GET", "/produtos/recomendados")
+    s.req("GET /produtos/{id}", "GET", f"/produtos/{rng.choice(ctx.produtos)}")
+    _, mesa_uuid = rng.choice(ctx.mesas)
+    s.req("GET /mesas/uuid/{uuid}", "GET", f"/mesas/uuid/{mesa_uuid}")
+
+
+def _novo_pedido(s: Sessao, ctx: Contexto, rng, mesa_uuid: str):
+    itens = [
+        {"produtoId": pid, "quantidade": rng.randint(1, 3)}
+        for pid in rng.sample(ctx.produtos, rng.randint(1, 4))
+    ]
+    return s.req(
+        "POST /pedidos", "POST", "/pedidos", esperado=(201,),
+        json={"uuid": mesa_uuid, "itens": itens, "observacoesGerais": None},
+    )
+
+
+def rajada_pedidos(s: Sessao, ctx: Contexto, rng) -> None:
+    _, mesa_uuid = rng.choice(ctx.mesas)
+    _novo_pedido(s, ctx, rng, mesa_uuid)
+
+
+def polling_cozinha(s: Sessao, ctx: Contexto, rng) -> None:
+    resp = s.req("GET /pedidos/producao", "GET", "/pedidos/producao")
+    pedidos = resp.json() if resp.status_code == 200 else []
+    if pedidos:
+        alvo = rng.choice(pedidos)
+        proximo = 2 if alvo["status"] == "pendente" else 3
+        s.req(
+            "PATCH /pedidos/{id}/status", "PATCH", f"/pedidos/{alvo['pedidoId']}/status",
+            json={"status_id": proximo}, headers=ctx.admin_headers,
+        )
+
+
+def chamadas_garcom(s: Sessao, ctx: Contexto, rng) -> None:
+    _, mesa_uuid = rng.choice(ctx.mesas)
+    # 409 (duplicado) e 429 (cooldown) são respostas de regra de negócio, não falhas
+    resp = s.req(
+        "POST /chamadas", "POST", "/chamadas", esperado=(201, 409, 429),
+        json={"mesa_uuid": mesa_uuid, "motivo": rng.choice([1, 2, 3])},
+    )
+    s.req("GET /mesas/uuid/{uuid}/chamadas", "GET", f"/mesas/uuid/{mesa_uuid}/chamadas")
+    if resp.status_code == 201:
+        chamado_id = resp.json()["id"]
+        if rng.random() < 0.5:
+            s.req(
+                "PATCH /chamadas/{id}/atender", "PATCH", f"/chamadas/{chamado_id}/atender",
+                headers=ctx.admin_headers,
+            )
+        else:
+            s.req(
+                "PATCH /chamadas/{id}/cancelar", "PATCH", f"/chamadas/{chamado_id}/cancelar",
+                json={"mesa_uuid": mesa_uuid},
+            )
+    s.req("GET /chamadas/pendentes", "GET", "/chamadas/pendentes", headers=ctx.admin_headers)
+
+
+def fechamento_conta(s: Sessao, ctx: Contexto, rng) -> None:
+    mesa_id, mesa_uuid = rng.choice(ctx.mesas)
+    _novo_pedido(s, ctx, rng, mesa_uuid)
+    s.req("GET /mesas/{id}/pedidos", "GET", f"/mesas/{mesa_id}/pedidos")
+    # tela do cliente: pedidos abertos, conta e chamados da ocupação, da memória
+    s.req("GET /mesas/uuid/{uuid}/sessao", "GET", f"/mesas/uuid/{mesa_uuid}/sessao")
+    # 400 = outra thread já fechou a mesa entre o pedido e o encerramento
+    s.req(
+        "POST /mesas/{id}/encerrar", "POST", f"/mesas/{mesa_id}/encerrar", esperado=(200, 400),
+        json={"metodo_pagamento": rng.choice(["pix", "credito", "dinheiro"])},
+        headers=ctx.admin_headers,
+    )
+
+
+CENARIOS: Dict[str, Callable[[Sessao, Contexto, object], None]] = {
+    "navegacao_cardapio": navegacao_cardapio,
+    "rajada_pedidos": rajada_pedidos,
+    "polling_cozinha": polling_cozinha,
+    "chamadas_garcom": chamadas_garcom,
+    "fechamento_conta": fechamento_conta,
+}
+
+
+def selecionar(nomes: Optional[List[str]]) -> Dict[str, Callable]:
+    if not nomes:
+        return dict(CENARIOS)
+    desconhecidos = [n for n in nomes if n not in CENARIOS]
+    if desconhecidos:
+        raise SystemExit(f"Cenários desconhecidos: {', '.join(desconhecidos)}")
+    return {n: CENARIOS[n] for n in nomes}
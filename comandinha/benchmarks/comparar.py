@@ -0,0 +1,81 @@
+# benchmarks/comparar.py
+"""
+Compara um relatório de benchmark com a baseline e sai com código 1 se houver regressão.
+
+    python -m benchmarks.comparar benchmarks/baselines/pequeno_sqlite.json bench_atual.json
+
+Regras (por cenário e por rota):
+  - throughput caiu mais que --tolerancia (relativa)
+  - p95/p99 subiram mais que --tolerancia (relativa) E mais que --folga-ms (absoluta)
+  - statements SQL por requisição subiram mais que --folga-sql
+  - surgiram erros onde a baseline não tinha
+"""
+import argparse
+import json
+import sys
+from typing import List
+
+
+def _comparar_bloco(nome: str, base: dict, atual: dict, tol: float, folga_ms: float, folga_sql: float) -> List[str]:
+    problemas = []
+
+    if base.get("throughput_rps") and atual.get("throughput_rps", 0) < base["throughput_rps"] * (1 - tol):
+        problemas.append(
+            f"{nome}: throughput {atual['throughput_rps']:.1f} < {base['throughput_rps']:.1f} rps"
+        )
+
+    for chave in ("p95_ms", "p99_ms"):
+        b, a = base.get(chave, 0.0), atual.get(chave, 0.0)
+        if a > b * (1 + tol) and (a - b) > folga_ms:
+            problemas.append(f"{nome}: {chave} {a:.2f} > {b:.2f} ms")
+
+    b_sql, a_sql = base.get("sql_por_req"), atual.get("sql_por_req")
+    if b_sql is not None and a_sql is not None and a_sql - b_sql > folga_sql:
+        problemas.append(f"{nome}: sql_por_req {a_sql:.2f} > {b_sql:.2f}")
+
+    if atual.get("erros", 0) > 0 and base.get("erros", 0) == 0:
+        problemas.append(f"{nome}: {atual['erros']} erros (baseline sem erros)")
+
+    return problemas
+
+
+def comparar(base: dict, atual: dict, tol: float = 0.15, folga_ms: float = 2.0, folga_sql: float = 0.5) -> List[str]:
+    problemas = []
+    for cenario, b in base["cenarios"].items():
+        a = atual["cenarios"].get(cenario)
+        if a is None:
+            problemas.append(f"{cenario}: ausente no relatório atual")
+            continue
+        problemas += _comparar_bloco(cenario, b, a, tol, folga_ms, folga_sql)
+        for rota, br in b.get("rotas", {}).items():
+            ar = a.get("rotas", {}).get(rota)
+            if ar is not None:
+                problemas += _comparar_bloco(f"{cenario} [{rota}]", br, ar, tol, folga_ms, folga_sql)
+    return problemas
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara relatório de benchmark com a baseline")
+    parser.add_argument("baseline")
+    parser.add_argument("atual")
+    parser.add_argument("--tolerancia", type=float, default=0.15, help="regressão relativa aceita (0.15 = 15%%)")
+    parser.add_argument("--folga-ms", type=float, default=2.0, help="aumento absoluto de latência ignorado")
+    parser.add_argument("--folga-sql", type=float, default=0.5, help="aumento de statements/req ignorado")
+    args = parser.parse_args()
+
+    with open(args.baseline, encoding="utf-8") as f:
+        base = json.load(f)
+    with open(args.atual, encoding="utf-8") as f:
+        atual = json.load(f)
+
+    problemas = comparar(base, atual, args.tolerancia, args.folga_ms, args.folga_sql)
+    if problemas:
+        print("REGRESSÕES:")
+        for p in problemas:
+            print(f"  - {p}")
+        sys.exit(1)
+    print("OK: nenhuma regressão em relação à baseline")
+
+
+if __name__ == "__main__":
+    main()
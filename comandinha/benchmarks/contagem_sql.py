@@ -0,0 +1,163 @@
+# benchmarks/contagem_sql.py
+"""
+Contagem de statements SQL e commits por endpoint de escrita.
+
+    python -m benchmarks.contagem_sql                # confere contra o orçamento
+    python -m benchmarks.contagem_sql --atualizar    # regrava o orçamento
+    python -m benchmarks.contagem_sql --comparar benchmarks/baselines/escritas_sql.json
+
+Roda o app real (TestClient, SQLite temporário) com o contador de
+benchmarks.medicao e compara cada endpoint com benchmarks/orcamento_sql.json.
+Sai com código 1 se algum endpoint passar do orçamento — serve de teste de
+regressão para N+1, refreshes desnecessários e commits a mais.
+
+Cobre todos os endpoints de escrita. benchmarks/baselines/escritas_sql.json
+guarda a contagem de antes/depois de tirar os refreshes pós-commit
+(expire_on_commit=False e UPDATE ... RETURNING); `--comparar` mostra a coluna
+"antes" desse arquivo (ou de um orçamento antigo) ao lado da medida atual.
+
+Efeitos adiados (src.common.efeitos) rodam fora da requisição e não entram
+na contagem.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+ORCAMENTO = os.path.join(os.path.dirname(__file__), "orcamento_sql.json")
+
+
+def _medir(cliente, metodo: str, url: str, esperado: int, **kw):
+    from benchmarks.medicao import CABECALHO_COMMITS, CABECALHO_SQL
+
+    resp = cliente.request(metodo, url, **kw)
+    if resp.status_code != esperado:
+        raise SystemExit(f"{metodo} {url}: esperado {esperado}, veio {resp.status_code}: {resp.text}")
+    medida = {"sql": int(resp.headers[CABECALHO_SQL]), "commits": int(resp.headers[CABECALHO_COMMITS])}
+    return medida, (resp.json() if resp.content else None)
+
+
+def medir_endpoints() -> dict:
+    db_path = os.path.join(tempfile.mkdtemp(), "contagem.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    os.environ.setdefault("LIMITE_TAXA", "0")
+    os.environ["RUN_DDL_ON_STARTUP"] = "1"
+
+    from fastapi.testclient import TestClient
+
+    from benchmarks.medicao import ContadorSQLMiddleware, instalar_contador_sql
+    from server import app as _app
+    from src.common.efeitos import pipeline
+    from src.infra.sqlalchemy.config.database import engine
+
+    instalar_contador_sql(engine)
+    medidas = {}
+    with TestClient(ContadorSQLMiddleware(_app)) as c:
+        # ---------- cadastro (admin) ----------
+        medidas["POST /auth/register"], _ = _medir(
+            c, "POST", "/auth/register", 201,
+            json={"nome": "Bench", "email": "contagem@comandinha.com.br", "senha": "123456"})
+        token = c.post("/auth/login", json={"email": "contagem@comandinha.com.br", "senha": "123456"}).json()["access_token"]
+        H = {"Authorization": f"Bearer {token}"}
+
+        medidas["POST /categorias"], cat = _medir(
+            c, "POST", "/categorias", 201, json={"nome": "Pratos", "ordem": 1}, headers=H)
+        medidas["PUT /categorias/{id}"], _ = _medir(
+            c, "PUT", f"/categorias/{cat['id']}", 200, json={"nome": "Pratos", "descricao": "Da casa", "ordem": 1}, headers=H)
+        medidas["PATCH /categorias/{id}"], _ = _medir(
+            c, "PATCH", f"/categorias/{cat['id']}", 200, json={"ordem": 2}, headers=H)
+
+        prods = []
+        for i in range(3):
+            medidas["POST /produtos"], prod = _medir(
+                c, "POST", "/produtos", 201, json={"nome": f"Prato {i}", "preco": 10 + i, "categoriaId": cat["id"]}, headers=H)
+            prods.append(prod)
+        medidas["PUT /produtos/{id}"], _ = _medir(
+            c, "PUT", f"/produtos/{prods[0]['id']}", 200,
+            json={"nome": "Prato 0", "preco": 12, "categoriaId": cat["id"]}, headers=H)
+        medidas["PATCH /produtos/{id}"], _ = _medir(
+            c, "PATCH", f"/produtos/{prods[0]['id']}", 200, json={"preco": 11}, headers=H)
+
+        medidas["POST /mesas"], mesa = _medir(c, "POST", "/mesas", 201, json={"nome": "Mesa 1"}, headers=H)
+        uuid = mesa["uuid"]
+        itens = [{"produtoId": p["id"], "quantidade": 2} for p in prods]
+
+        # ---------- operação do salão ----------
+        medidas["POST /pedidos (3 itens)"], pedido = _medir(
+            c, "POST", "/pedidos", 201, json={"uuid": uuid, "itens": itens})
+        pipeline.drenar()
+        medidas["PATCH /pedidos/{id}/status"], _ = _medir(
+            c, "PATCH", f"/pedidos/{pedido['pedidoId']}/status", 200, json={"status_id": 2}, headers=H)
+
+        medidas["POST /chamadas"], chamado = _medir(
+            c, "POST", "/chamadas", 201, json={"mesa_uuid": uuid, "motivo": 1})
+        medidas["PATCH /chamadas/{id}/atender"], _ = _medir(
+            c, "PATCH", f"/chamadas/{chamado['id']}/atender", 200, headers=H)
+        _, chamado = _medir(c, "POST", "/chamadas", 201, json={"mesa_uuid": uuid, "motivo": 2})
+        medidas["PATCH /chamadas/{id}/cancelar"], _ = _medir(
+            c, "PATCH", f"/chamadas/{chamado['id']}/cancelar", 200, json={"mesa_uuid": uuid})
+
+        medidas["POST /mesas/{id}/encerrar"], _ = _medir(
+            c, "POST", f"/mesas/{mesa['id']}/encerrar", 200, json={"metodo_pagamento": "pix"}, headers=H)
+        medidas["POST /mesas/{id}/status"], _ = _medir(
+            c, "POST", f"/mesas/{mesa['id']}/status", 200, json={"status_id": 4}, headers=H)
+
+        # operações em massa: o custo não deve crescer com o número de linhas
+        medidas["PATCH /produtos/bulk (3 ids)"], _ = _medir(
+            c, "PATCH", "/produtos/bulk", 200,
+            json={"ids": [p["id"] for p in prods], "ajustePrecoPercentual": 10, "disponivel": True}, headers=H)
+        medidas["POST /mesas/bulk (20 mesas)"], mesas = _medir(
+            c, "POST", "/mesas/bulk", 201, json={"quantidade": 20, "prefixo": "Varanda"}, headers=H)
+
+        # ---------- remoções ----------
+        _, pedido = _medir(c, "POST", "/pedidos", 201, json={"uuid": mesas[0]["uuid"], "itens": itens})
+        pipeline.drenar()
+        medidas["DELETE /pedidos/{id}"], _ = _medir(c, "DELETE", f"/pedidos/{pedido['pedidoId']}", 204, headers=H)
+        c.post("/pedidos", json={"uuid": mesas[0]["uuid"], "itens": itens})
+        pipeline.drenar()
+        medidas["DELETE /pedidos (limpar)"], _ = _medir(c, "DELETE", "/pedidos", 200, headers=H)
+        medidas["DELETE /mesas/{id}"], _ = _medir(c, "DELETE", f"/mesas/{mesas[1]['id']}", 204, headers=H)
+        medidas["DELETE /produtos/{id}"], _ = _medir(c, "DELETE", f"/produtos/{prods[2]['id']}", 204, headers=H)
+        vazia = c.post("/categorias", json={"nome": "Vazia", "ordem": 9}, headers=H).json()
+        medidas["DELETE /categorias/{id}"], _ = _medir(c, "DELETE", f"/categorias/{vazia['id']}", 204, headers=H)
+    return medidas
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Statements SQL/commits por endpoint de escrita")
+    parser.add_argument("--orcamento", default=ORCAMENTO)
+    parser.add_argument("--atualizar", action="store_true", help="regrava o orçamento com os valores medidos")
+    parser.add_argument("--comparar", help="JSON com medidas anteriores (formato do orçamento ou {endpoint: {antes: ...}})")
+    args = parser.parse_args()
+
+    medidas = medir_endpoints()
+
+    if args.atualizar or not os.path.exists(args.orcamento):
+        with open(args.orcamento, "w", encoding="utf-8") as f:
+            json.dump(medidas, f, indent=2, ensure_ascii=False, sort_keys=True)
+            f.write("\n")
+        print(f"orçamento gravado em {args.orcamento}")
+
+    with open(args.orcamento, encoding="utf-8") as f:
+        orcamento = json.load(f)
+
+    anteriores = {}
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            anteriores = {nome: m.get("antes", m) for nome, m in json.load(f).items()}
+
+    estouros = 0
+    print(f"{'endpoint':<32}{'sql':>6}{'orç.':>6}{'commits':>9}{'orç.':>6}" + (f"{'antes':>8}" if anteriores else ""))
+    for nome, m in medidas.items():
+        limite = orcamento.get(nome, {})
+        ok = m["sql"] <= limite.get("sql", m["sql"]) and m["commits"] <= limite.get("commits", m["commits"])
+        estouros += not ok
+        antes = anteriores.get(nome, {}).get("sql", "-") if anteriores else ""
+        print(f"{nome:<32}{m['sql']:>6}{limite.get('sql', '-'):>6}{m['commits']:>9}{limite.get('commits', '-'):>6}"
+              f"{antes:>8}{'' if ok else '  <-- ESTOUROU'}")
+    sys.exit(1 if estouros else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+# benchmarks/escala_tenants.py
+"""
+Latência das consultas de um restaurante conforme o número de restaurantes cresce.
+
+    python -m benchmarks.escala_tenants [--passos 1,10,50,100,300] [--amostras 20]
+    python -m benchmarks.escala_tenants --sem-indices      # referência sem os índices compostos
+
+Para cada passo semeia restaurantes novos até o total do passo (cada um com o
+mesmo cardápio, mesas, histórico de pedidos e chamados) e mede, em restaurantes
+sorteados, as leituras com escopo de tenant dos repositórios — as mesmas que as
+rotas fazem. Com os índices (restaurante_id, ...) o p50/p95 fica plano: cada
+consulta lê só as linhas do próprio restaurante. Com --sem-indices as consultas
+varrem as tabelas e crescem com o total de restaurantes.
+
+--explicar imprime o plano (EXPLAIN QUERY PLAN / EXPLAIN) de cada consulta no último passo.
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+import uuid as uuidlib
+from datetime import timedelta
+
+from benchmarks.medicao import percentil
+
+POR_RESTAURANTE = {"categorias": 6, "produtos": 60, "mesas": 20, "pedidos": 300, "abertos": 8, "chamados": 40}
+PENDENTES = 3   # chamados ainda pendentes por restaurante (mesas distintas: índice único parcial)
+INDICES = (
+    "ix_mesa_restaurante_status",
+    "ix_categoria_restaurante_ordem",
+    "ix_produto_restaurante_categoria",
+    "ix_pedido_restaurante_status_timestamp",
+    "ix_chamadas_restaurante_status_criado",
+    "ix_item_pedido_pedido_id",
+)
+
+
+class Semeador:
+    """Insere restaurantes completos com ids explícitos, continuando de onde parou."""
+
+    def __init__(self, engine, rng: random.Random):
+        from src.infra.sqlalchemy.config.database import Base
+        from src.common.tz import now_sp
+
+        self.engine = engine
+        self.rng = rng
+        self.t = Base.metadata.tables
+        self.agora = now_sp()
+        self.restaurantes = 0
+        self._ids = dict.fromkeys(("categoria", "produto", "mesa", "pedido", "item_pedido", "chamadas_garcom"), 0)
+
+    def _proximos(self, tabela: str, n: int) -> range:
+        inicio = self._ids[tabela] + 1
+        self._ids[tabela] += n
+        return range(inicio, inicio + n)
+
+    def ate(self, total: int) -> None:
+        with self.engine.begin() as conn:
+            while self.restaurantes < total:
+                self.restaurantes += 1
+                self._restaurante(conn, self.restaurantes)
+
+    def _restaurante(self, conn, rid: int) -> None:
+        cfg, rng, t, agora = POR_RESTAURANTE, self.rng, self.t, self.agora
+        conn.execute(t["restaurantes"].insert(), [{
+            "id": rid, "nome": f"Restaurante {rid}", "email": f"r{rid}@bench.local", "senha_hash": "x",
+        }])
+
+        categorias = list(self._proximos("categoria", cfg["categorias"]))
+        conn.execute(t["categoria"].insert(), [
+            {"id": c, "nome": f"Categoria {c}", "descricao": None, "ordem": i, "ativa": True, "restaurante_id": rid}
+            for i, c in enumerate(categorias)
+        ])
+
+        produtos = [{
+            "id": p, "nome": f"Produto {p}", "descricao": "prato da casa", "preco": round(rng.uniform(8, 120), 2),
+            "popular": rng.random() < 0.1, "tempo_preparo_minutos": 15, "restricoes": [], "adicionais": [],
+            "disponivel": True, "categoria_id": rng.choice(categorias), "restaurante_id": rid,
+        } for p in self._proximos("produto", cfg["produtos"])]
+        conn.execute(t["produto"].insert(), produtos)
+
+        mesas = [{
+            "id": m, "uuid": str(uuidlib.UUID(int=rng.getrandbits(128))), "nome": f"Mesa {m}",
+            "ativo": True, "status_id": 1, "restaurante_id": rid, "created_at": agora, "updated_at": agora,
+        } for m in self._proximos("mesa", cfg["mesas"])]
+        conn.execute(t["mesa"].insert(), mesas)
+
+        pedidos, itens = [], []
+        n_pedidos = cfg["pedidos"] + cfg["abertos"]
+        for i, pid in enumerate(self._proximos("pedido", n_pedidos)):
+            aberto = i >= cfg["pedidos"]
+            ts = agora - timedelta(minutes=rng.randint(1, 30) if aberto else rng.randint(60, 90 * 24 * 60))
+            prod = rng.choice(produtos)
+            item_id = self._proximos("item_pedido", 1)[0]
+            itens.append({
+                "id": item_id, "pedido_id": pid, "produto_id": prod["id"], "quantidade": 1,
+                "preco_unitario": prod["preco"], "observacoes": None, "subtotal": prod["preco"],
+            })
+            status_id = rng.choice((1, 2)) if aberto else 4
+            pedidos.append({
+                "id": pid, "mesa_id": rng.choice(mesas)["id"], "timestamp": ts, "atualizado_em": ts,
+                "estimativa_entrega": ts + timedelta(minutes=15), "status_id": status_id,
+                "status": {1: "confirmado", 2: "preparando", 4: "concluido"}[status_id],
+                "observacoes_gerais": None, "valor_total": prod["preco"], "restaurante_id": rid,
+            })
+        conn.execute(t["pedido"].insert(), pedidos)
+        conn.execute(t["item_pedido"].insert(), itens)
+
+        chamados = []
+        for i, cid in enumerate(self._proximos("chamadas_garcom", cfg["chamados"])):
+            pendente = i < PENDENTES
+            criado = agora - timedelta(minutes=rng.randint(1, 10) if pendente else rng.randint(60, 90 * 24 * 60))
+            chamados.append({
+                "id": cid, "mesa_uuid": mesas[i]["uuid"] if pendente else rng.choice(mesas)["uuid"],
+                "motivo": 1 if pendente else rng.choice((1, 2, 3)), "detalhes": None,
+                "status": 1 if pendente else 2, "criado_em": criado,
+                "atendido_em": None if pendente else criado + timedelta(minutes=3),
+                "cancelado_em": None, "atendido_por": None if pendente else "1", "restaurante_id": rid,
+            })
+        conn.execute(t["chamadas_garcom"].insert(), chamados)
+
+
+def _consultas():
+    from src.infra.sqlalchemy.repositorios.repositorio_categoria import CategoriaRepositorio
+    from src.infra.sqlalchemy.repositorios.repositorio_chamado import RepositorioChamado
+    from src.infra.sqlalchemy.repositorios.repositorio_mesa import MesaRepositorio
+    from src.infra.sqlalchemy.repositorios.repositorio_pedido import RepositorioPedido
+    from src.infra.sqlalchemy.repositorios.repositorio_produto import RepositorioProduto
+
+    return {
+        "categorias": lambda db, r: CategoriaRepositorio(db, r).listar(),
+        "produtos": lambda db, r: RepositorioProduto(db, r).listar_com_categorias(),
+        "mesas": lambda db, r: MesaRepositorio(db, r).listar_mesas(),
+        "producao": lambda db, r: RepositorioPedido(db, r).listar_para_producao(),
+        "nao_concluidos": lambda db, r: RepositorioPedido(db, r).listar_nao_concluidos(),
+        "chamados_pendentes": lambda db, r: RepositorioChamado(db, r).listar_pendentes(),
+    }
+
+
+def medir(SessionLocal, consultas: dict, restaurantes: list, repeticoes: int) -> dict:
+    """p50/p95 (ms) por consulta; uma sessão nova por chamada, como numa requisição."""
+    resultado = {}
+    for nome, consulta in consultas.items():
+        amostras = []
+        for _ in range(repeticoes):
+            for r in restaurantes:
+                with SessionLocal() as db:
+                    t0 = time.perf_counter()
+                    linhas = consulta(db, r)
+                    amostras.append((time.perf_counter() - t0) * 1000.0)
+                if not linhas and nome != "mesas":
+                    raise SystemExit(f"{nome}: restaurante {r} sem linhas (semeadura incompleta?)")
+        resultado[nome] = {"p50_ms": percentil(amostras, 50), "p95_ms": percentil(amostras, 95)}
+    return resultado
+
+
+def explicar(engine, consultas: dict, SessionLocal, restaurante_id: int) -> None:
+    from sqlalchemy import event, text
+
+    capturados = []
+
+    def _capturar(conn, cursor, statement, parameters, context, executemany):
+        capturados.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", _capturar)
+    try:
+        for consulta in consultas.values():
+            with SessionLocal() as db:
+                consulta(db, restaurante_id)
+    finally:
+        event.remove(engine, "before_cursor_execute", _capturar)
+
+    prefixo = "EXPLAIN QUERY PLAN " if engine.dialect.name == "sqlite" else "EXPLAIN "
+    with engine.connect() as conn:
+        for statement, parametros in capturados:
+            print(" ".join(statement.split())[:110])
+            for linha in conn.exec_driver_sql(prefixo + statement, parametros):
+                print("    ", linha[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latência por restaurante x número de restaurantes")
+    parser.add_argument("--db", help="URL do banco (padrão: SQLite temporário; o schema é recriado)")
+    parser.add_argument("--passos", default="1,10,50,100,300", help="totais de restaurantes, crescentes")
+    parser.add_argument("--amostras", type=int, default=20, help="restaurantes sorteados por passo")
+    parser.add_argument("--repeticoes", type=int, default=10)
+    parser.add_argument("--semente", type=int, default=7)
+    parser.add_argument("--sem-indices", action="store_true", help="remove os índices compostos por tenant")
+    parser.add_argument("--explicar", action="store_true", help="plano das consultas no último passo")
+    parser.add_argument("--saida", help="grava o resultado em JSON")
+    args = parser.parse_args()
+
+    url = args.db or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'tenants.db')}"
+    # database.py cria o engine no import a partir de DATABASE_URL
+    os.environ["DATABASE_URL"] = url
+    from sqlalchemy import text
+    from src.infra.sqlalchemy.config.database import Base, SessionLocal, engine
+    from src.infra.sqlalchemy import models  # noqa: F401  (registra as tabelas)
+
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    if args.sem_indices:
+        with engine.begin() as conn:
+            for nome in INDICES:
+                conn.execute(text(f"DROP INDEX IF EXISTS {nome}"))
+
+    passos = sorted({int(p) for p in args.passos.split(",")})
+    rng = random.Random(args.semente)
+    semeador = Semeador(engine, rng)
+    consultas = _consultas()
+
+    print(f"{url}  índices compostos: {'não' if args.sem_indices else 'sim'}")
+    print(f"{'restaurantes':>12} {'pedidos':>9} {'semear s':>9}  " + "  ".join(f"{n:>20}" for n in consultas))
+    print(f"{'':>12} {'':>9} {'':>9}  " + "  ".join(f"{'p50 / p95 ms':>20}" for _ in consultas))
+    resultados = []
+    for total in passos:
+        t0 = time.perf_counter()
+        semeador.ate(total)
+        if engine.dialect.name == "sqlite":
+            with engine.begin() as conn:
+                conn.execute(text("ANALYZE"))
+        semear_s = time.perf_counter() - t0
+
+        amostra = rng.sample(range(1, total + 1), min(args.amostras, total))
+        medidas = medir(SessionLocal, consultas, amostra, args.repeticoes)
+        pedidos = total * (POR_RESTAURANTE["pedidos"] + POR_RESTAURANTE["abertos"])
+        resultados.append({"restaurantes": total, "pedidos": pedidos, "consultas": medidas})
+        print(f"{total:>12} {pedidos:>9} {semear_s:>9.1f}  " + "  ".join(
+            f"{m['p50_ms']:>9.3f} / {m['p95_ms']:<8.3f}" for m in medidas.values()
+        ))
+
+    primeiro, ultimo = resultados[0]["consultas"], resultados[-1]["consultas"]
+    print(f"\np50 com {passos[-1]} restaurantes / p50 com {passos[0]}:")
+    for nome in consultas:
+        print(f"  {nome:<20} {ultimo[nome]['p50_ms'] / max(primeiro[nome]['p50_ms'], 1e-9):6.2f}x")
+
+    if args.explicar:
+        print()
+        explicar(engine, consultas, SessionLocal, passos[-1])
+
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            json.dump({"db": url, "indices": not args.sem_indices, "passos": resultados}, f, indent=2)
+        print(f"\n[escala_tenants] resultado em {args.saida}")
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
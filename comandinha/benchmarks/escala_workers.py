@@ -0,0 +1,112 @@
+# benchmarks/escala_workers.py
+"""
+Escalabilidade do runner de produção: throughput com 1..N workers Gunicorn.
+
+    python -m benchmarks.escala_workers --db sqlite:///./bench.db --perfil pequeno --max-workers 4
+
+Para cada N sobe `gunicorn -c gunicorn.conf.py benchmarks.app_instrumentada:app`
+com WEB_CONCURRENCY=N numa porta livre, roda os cenários via HTTP com
+concorrência proporcional a N e registra throughput/latências.
+Padrão: só navegação de cardápio (leitura); no SQLite cenários de escrita
+serializam no lock do arquivo e não dizem nada sobre os workers.
+"""
+import argparse
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+
+
+def _porta_livre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _esperar_saude(url: str, timeout: float = 30.0) -> None:
+    limite = time.monotonic() + timeout
+    while time.monotonic() < limite:
+        try:
+            with urllib.request.urlopen(f"{url}/health", timeout=1.0) as resp:
+                if resp.status == 200:
+                    return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise SystemExit(f"servidor em {url} não respondeu em {timeout:.0f}s")
+
+
+def _subir_gunicorn(db_url: str, workers: int, porta: int) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "DATABASE_URL": db_url,
+        "WEB_CONCURRENCY": str(workers),
+        "PORT": str(porta),
+        "GUNICORN_LOGLEVEL": "warning",
+        "GUNICORN_MAX_REQUESTS": "0",  # sem reciclagem durante a medição
+    }
+    return subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "benchmarks.app_instrumentada:app"],
+        cwd=RAIZ, env=env,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput x número de workers")
+    parser.add_argument("--db", default=os.getenv("DATABASE_URL") or "sqlite:///./bench.db")
+    parser.add_argument("--perfil", default=None, help="recria e semeia o banco antes (pequeno|realista)")
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--cenario", action="append", dest="cenarios")
+    parser.add_argument("--iteracoes", type=int, default=200, help="visitas por cenário e por worker")
+    parser.add_argument("--concorrencia-por-worker", type=int, default=4)
+    parser.add_argument("--saida", default=None)
+    args = parser.parse_args()
+
+    if args.perfil:
+        from benchmarks.semear import semear
+        semear(args.db, args.perfil)
+
+    from benchmarks.executar import executar
+
+    cenarios = args.cenarios or ["navegacao_cardapio"]
+    resultados = []
+    for n in range(1, args.max_workers + 1):
+        porta = _porta_livre()
+        url = f"http://127.0.0.1:{porta}"
+        proc = _subir_gunicorn(args.db, n, porta)
+        try:
+            _esperar_saude(url)
+            rel = executar(
+                args.db, url=url, cenarios=cenarios,
+                iteracoes=args.iteracoes * n, concorrencia=args.concorrencia_por_worker * n,
+            )
+        finally:
+            proc.send_signal(signal.SIGTERM)
+            proc.wait(timeout=60)
+
+        for nome, r in rel["cenarios"].items():
+            resultados.append({"workers": n, "cenario": nome, **{k: r[k] for k in (
+                "requisicoes", "erros", "throughput_rps", "p50_ms", "p95_ms", "p99_ms")}})
+
+    base = {r["cenario"]: r["throughput_rps"] for r in resultados if r["workers"] == 1}
+    print(f"{'workers':>8} {'cenário':<22}{'rps':>10}{'escala':>8}{'p95':>9}{'erros':>7}")
+    for r in resultados:
+        escala = r["throughput_rps"] / base[r["cenario"]] if base.get(r["cenario"]) else 0.0
+        r["escala"] = round(escala, 2)
+        print(f"{r['workers']:>8} {r['cenario']:<22}{r['throughput_rps']:>10.1f}"
+              f"{escala:>7.2f}x{r['p95_ms']:>9.2f}{r['erros']:>7}")
+
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            json.dump({"nucleos": os.cpu_count(), "resultados": resultados}, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+# benchmarks/executar.py
+"""
+Executa os cenários de carga contra a API e grava um relatório JSON.
+
+In-process (TestClient, com contagem de SQL por requisição):
+    python -m benchmarks.executar --db sqlite:///./bench.db --perfil pequeno --saida bench_atual.json
+
+--perfil recria e semeia o banco antes da rodada (rodadas reprodutíveis); sem ele,
+o banco existente é usado como está (ex.: semeado antes com benchmarks.semear).
+
+Sobre HTTP (uvicorn local, ver benchmarks/app_instrumentada.py):
+    python -m benchmarks.executar --db sqlite:///./bench.db --url http://127.0.0.1:4000
+
+Comparação com a baseline:
+    python -m benchmarks.comparar benchmarks/baselines/pequeno_sqlite.json bench_atual.json
+"""
+import argparse
+import http.client
+import json
+import os
+import platform
+import random
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+
+from benchmarks.cenarios import Sessao, carregar_contexto, selecionar
+from benchmarks.medicao import Coletor
+
+_json_dumps = json.dumps
+
+
+def _cliente_inprocess():
+    # database.py lê DATABASE_URL no import: o ambiente já precisa estar pronto aqui
+    from fastapi.testclient import TestClient
+    from benchmarks.app_instrumentada import app
+    # 500 entra no relatório como erro, em vez de derrubar a thread do cenário
+    return TestClient(app, raise_server_exceptions=False)
+
+
+class _RespostaHTTP:
+    def __init__(self, status_code: int, headers: dict, corpo: bytes):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = corpo
+
+    def json(self):
+        return json.loads(self.content) if self.content else None
+
+
+class ClienteHTTP:
+    """
+    Cliente HTTP/1.1 keep-alive mínimo (stdlib), uma conexão por thread.
+    Evita depender da combinação httpx/httpcore/h11 instalada.
+    """
+
+    def __init__(self, base_url: str, timeout: float = 30.0):
+        alvo = urlsplit(base_url)
+        self._host, self._porta = alvo.hostname, alvo.port or 80
+        self._timeout = timeout
+        self._local = threading.local()
+
+    def _conexao(self) -> http.client.HTTPConnection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = http.client.HTTPConnection(self._host, self._porta, timeout=self._timeout)
+            self._local.conn = conn
+        return conn
+
+    def request(self, metodo: str, url: str, json=None, headers=None):
+        corpo = None
+        cabecalhos = dict(headers or {})
+        if json is not None:
+            corpo = _json_dumps(json).encode()
+            cabecalhos["Content-Type"] = "application/json"
+        for tentativa in (1, 2):
+            conn = self._conexao()
+            try:
+                conn.request(metodo, url, body=corpo, headers=cabecalhos)
+                resp = conn.getresponse()
+                dados = resp.read()
+                return _RespostaHTTP(resp.status, {k.lower(): v for k, v in resp.getheaders()}, dados)
+            except (http.client.HTTPException, ConnectionError):
+                # keep-alive encerrado pelo servidor: reabre uma vez
+                conn.close()
+                self._local.conn = None
+                if tentativa == 2:
+                    raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+
+
+def rodar_cenario(nome, fn, cliente, ctx, coletor, iteracoes, concorrencia, semente):
+    """Divide as iterações entre N threads; cada thread tem seu próprio RNG determinístico."""
+    def worker(indice: int, quantidade: int):
+        rng = random.Random(semente * 1000 + indice)
+        sessao = Sessao(cliente, coletor, nome)
+        for _ in range(quantidade):
+            fn(sessao, ctx, rng)
+
+    base, resto = divmod(iteracoes, concorrencia)
+    threads = [
+        threading.Thread(target=worker, args=(i, base + (1 if i < resto else 0)), daemon=True)
+        for i in range(concorrencia)
+    ]
+    t0 = time.perf_counter()
+    for th in threads:
+        th.start()
+    for th in threads:
+        th.join()
+    coletor.registrar_duracao(nome, time.perf_counter() - t0)
+
+
+def executar(db_url, url=None, cenarios=None, iteracoes=200, concorrencia=4, semente=1,
+             aquecimento=10, perfil=None):
+    os.environ["DATABASE_URL"] = db_url
+    if perfil:
+        from benchmarks.semear import semear
+        semear(db_url, perfil)
+    from src.infra.sqlalchemy.config.database import engine
+
+    ctx = carregar_contexto(engine)
+    selecionados = selecionar(cenarios)
+    coletor = Coletor()
+
+    cliente = ClienteHTTP(url) if url else _cliente_inprocess()
+    with cliente:
+        # aquecimento: caches de import/plano/pool fora da medição
+        descarte = Coletor()
+        for nome, fn in selecionados.items():
+            rodar_cenario(nome, fn, cliente, ctx, descarte, aquecimento, 1, semente + 99)
+
+        for nome, fn in selecionados.items():
+            rodar_cenario(nome, fn, cliente, ctx, coletor, iteracoes, concorrencia, semente)
+
+    return {
+        "meta": {
+            "modo": "http" if url else "inprocess",
+            "perfil": perfil,
+            "banco": engine.dialect.name,
+            "iteracoes": iteracoes,
+            "concorrencia": concorrencia,
+            "semente": semente,
+            "python": platform.python_version(),
+            "plataforma": platform.platform(),
+            "gerado_em": datetime.now(timezone.utc).isoformat(),
+        },
+        "cenarios": coletor.relatorio(),
+    }
+
+
+def imprimir(relatorio: dict) -> None:
+    print(f"{'cenário':<22}{'req':>7}{'erros':>7}{'rps':>10}{'p50':>9}{'p95':>9}{'p99':>9}{'sql/req':>9}")
+    for nome, r in relatorio["cenarios"].items():
+        sql = "-" if r["sql_por_req"] is None else f"{r['sql_por_req']:.1f}"
+        print(
+            f"{nome:<22}{r['requisicoes']:>7}{r['erros']:>7}{r['throughput_rps']:>10.1f}"
+            f"{r['p50_ms']:>9.2f}{r['p95_ms']:>9.2f}{r['p99_ms']:>9.2f}{sql:>9}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de carga da API Comandinha")
+    parser.add_argument("--db", default=os.getenv("DATABASE_URL") or "sqlite:///./bench.db")
+    parser.add_argument("--perfil", default=None, help="recria e semeia o banco antes (pequeno|realista)")
+    parser.add_argument("--url", default=None, help="base URL de um uvicorn local (padrão: in-process)")
+    parser.add_argument("--cenario", action="append", dest="cenarios", help="repetível; padrão: todos")
+    parser.add_argument("--iteracoes", type=int, default=200, help="visitas por cenário")
+    parser.add_argument("--concorrencia", type=int, default=4)
+    parser.add_argument("--semente", type=int, default=1)
+    parser.add_argument("--saida", default=None, help="arquivo JSON de saída")
+    args = parser.parse_args()
+
+    relatorio = executar(
+        args.db, url=args.url, cenarios=args.cenarios,
+        iteracoes=args.iteracoes, concorrencia=args.concorrencia, semente=args.semente,
+        perfil=args.perfil,
+    )
+    imprimir(relatorio)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            json.dump(relatorio, f, indent=2, ensure_ascii=False)
+        print(f"[executar] relatório salvo em {args.saida}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
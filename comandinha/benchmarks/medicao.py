@@ -0,0 +1,142 @@
+# benchmarks/medicao.py
+"""
+Instrumentação usada pelos benchmarks:
+  - contagem de statements SQL por requisição (listener no engine + middleware ASGI)
+  - agregação de latências (p50/p95/p99) e throughput por cenário/rota
+"""
+import contextvars
+import math
+import threading
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+from sqlalchemy import event
+
+# Cabeçalhos em que o middleware devolve quantos statements/commits a requisição executou
+CABECALHO_SQL = "x-bench-sql"
+CABECALHO_COMMITS = "x-bench-commits"
+
+# Caixa mutável por requisição ([statements, commits]): o threadpool do anyio
+# copia o contexto, então a lista é compartilhada entre o middleware e o endpoint síncrono.
+_contador_sql: contextvars.ContextVar[Optional[List[int]]] = contextvars.ContextVar(
+    "bench_contador_sql", default=None
+)
+
+_instalados: set = set()
+
+
+def instalar_contador_sql(engine) -> None:
+    """Registra (uma única vez por engine) os listeners que contam statements e commits."""
+    if id(engine) in _instalados:
+        return
+    _instalados.add(id(engine))
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _contar(conn, cursor, statement, parameters, context, executemany):
+        caixa = _contador_sql.get()
+        if caixa is not None:
+            caixa[0] += 1
+
+    @event.listens_for(engine, "commit")
+    def _contar_commit(conn):
+        caixa = _contador_sql.get()
+        if caixa is not None:
+            caixa[1] += 1
+
+
+class ContadorSQLMiddleware:
+    """
+    Middleware ASGI puro: abre uma caixa de contagem por requisição e
+    devolve os totais nos cabeçalhos X-Bench-SQL e X-Bench-Commits (incluem o
+    commit do get_uow, que roda antes do envio da resposta).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        caixa = [0, 0]
+        token = _contador_sql.set(caixa)
+
+        async def _send(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((CABECALHO_SQL.encode(), str(caixa[0]).encode()))
+                headers.append((CABECALHO_COMMITS.encode(), str(caixa[1]).encode()))
+                message["headers"] = headers
+            await send(message)
+
+        try:
+            await self.app(scope, receive, _send)
+        finally:
+            _contador_sql.reset(token)
+
+
+def percentil(valores: List[float], p: float) -> float:
+    """Percentil por nearest-rank (valores não precisam estar ordenados)."""
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    k = max(0, math.ceil(p / 100.0 * len(ordenados)) - 1)
+    return ordenados[k]
+
+
+class Coletor:
+    """Acumula amostras (latência, statements, status) por cenário e rótulo de rota."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._amostras: Dict[str, Dict[str, list]] = defaultdict(lambda: defaultdict(list))
+        self._erros: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self._duracao: Dict[str, float] = {}
+
+    def registrar(self, cenario: str, rotulo: str, ms: float, sql: Optional[int], ok: bool):
+        with self._lock:
+            self._amostras[cenario][rotulo].append((ms, sql))
+            if not ok:
+                self._erros[cenario][rotulo] += 1
+
+    def registrar_duracao(self, cenario: str, segundos: float):
+        self._duracao[cenario] = segundos
+
+    @staticmethod
+    def _resumo(amostras: list, erros: int, segundos: float) -> dict:
+        lat = [ms for ms, _ in amostras]
+        sqls = [s for _, s in amostras if s is not None]
+        return {
+            "requisicoes": len(amostras),
+            "erros": erros,
+            "throughput_rps": round(len(amostras) / segundos, 2) if segundos else 0.0,
+            "p50_ms": round(percentil(lat, 50), 3),
+            "p95_ms": round(percentil(lat, 95), 3),
+            "p99_ms": round(percentil(lat, 99), 3),
+            "sql_por_req": round(sum(sqls) / len(sqls), 2) if sqls else None,
+            "sql_max": max(sqls) if sqls else None,
+        }
+
+    def geral(self) -> dict:
+        """Todas as amostras juntas, sem separar por cenário (janela do soak)."""
+        with self._lock:
+            todas = [a for rotulos in self._amostras.values() for lista in rotulos.values() for a in lista]
+            erros = sum(sum(e.values()) for e in self._erros.values())
+        return self._resumo(todas, erros, 0.0)
+
+    def relatorio(self) -> dict:
+        saida = {}
+        for cenario, rotulos in self._amostras.items():
+            segundos = self._duracao.get(cenario, 0.0)
+            todas = [a for lista in rotulos.values() for a in lista]
+            erros_cenario = sum(self._erros[cenario].values())
+            saida[cenario] = {
+                **self._resumo(todas, erros_cenario, segundos),
+                "duracao_s": round(segundos, 3),
+                "rotas": {
+                    rotulo: self._resumo(lista, self._erros[cenario][rotulo], segundos)
+                    for rotulo, lista in sorted(rotulos.items())
+                },
+            }
+        return saida
@@ -0,0 +1,187 @@
+# benchmarks/semear.py
+"""
+Popula um banco (SQLite ou Postgres local) com volumes realistas para os benchmarks.
+
+Uso:
+    python -m benchmarks.semear --db sqlite:///./bench.db --perfil realista
+
+Perfis:
+    pequeno   -> 30 mesas,  300 produtos,   5.000 pedidos históricos (rodadas rápidas/CI)
+    realista  -> 300 mesas, 3.000 produtos, 100.000 pedidos históricos
+"""
+import argparse
+import os
+import random
+import uuid as uuidlib
+from datetime import timedelta
+
+PERFIS = {
+    "pequeno":  {"categorias": 8,  "produtos": 300,  "mesas": 30,  "pedidos": 5_000,   "chamados": 1_000},
+    "realista": {"categorias": 12, "produtos": 3000, "mesas": 300, "pedidos": 100_000, "chamados": 20_000},
+}
+
+RESTRICOES = ["vegetariano", "vegano", "sem gluten", "sem lactose", "picante", "contem nozes"]
+PALAVRAS = [
+    "frango", "carne", "peixe", "camarão", "queijo", "tomate", "batata", "arroz",
+    "feijão", "salada", "molho", "limão", "alho", "cebola", "pão", "massa",
+]
+LOTE = 5000
+SEMENTE = 42
+
+ADMIN_EMAIL = "bench@comandinha.local"
+RESTAURANTE_ID = 1   # tenant de tudo o que é semeado (o admin de bench)
+
+
+def _preparar_ambiente(url: str) -> None:
+    # database.py cria o engine no import a partir de DATABASE_URL
+    os.environ.setdefault("DATABASE_URL", url)
+
+
+def _lotes(linhas, tamanho=LOTE):
+    for i in range(0, len(linhas), tamanho):
+        yield linhas[i:i + tamanho]
+
+
+def semear(url: str, perfil: str = "pequeno", recriar: bool = True) -> dict:
+    """Cria o schema e insere os dados do perfil. Retorna as contagens inseridas."""
+    _preparar_ambiente(url)
+    from sqlalchemy import create_engine
+    from src.infra.sqlalchemy.config.database import Base, _normalize_db_url
+    from src.infra.sqlalchemy import models  # noqa: F401  (registra as tabelas)
+    from src.common.tz import now_sp
+
+    cfg = PERFIS[perfil]
+    rng = random.Random(SEMENTE)
+    engine = create_engine(_normalize_db_url(url), future=True)
+
+    if recriar:
+        Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+
+    t = Base.metadata.tables
+    agora = now_sp()
+
+    with engine.begin() as conn:
+        conn.execute(t["restaurantes"].insert(), [{
+            "id": RESTAURANTE_ID, "nome": "Bench", "email": ADMIN_EMAIL, "senha_hash": "x",
+        }])
+
+        conn.execute(t["categoria"].insert(), [
+            {"id": i, "nome": f"Categoria {i}", "descricao": None, "ordem": i, "ativa": True,
+             "restaurante_id": RESTAURANTE_ID}
+            for i in range(1, cfg["categorias"] + 1)
+        ])
+
+        produtos = []
+        for i in range(1, cfg["produtos"] + 1):
+            nome = " ".join(rng.sample(PALAVRAS, 2)).capitalize()
+            produtos.append({
+                "id": i,
+                "nome": f"{nome} {i}",
+                "descricao": " ".join(rng.sample(PALAVRAS, 6)),
+                "preco": round(rng.uniform(8, 120), 2),
+                "popular": rng.random() < 0.05,
+                "tempo_preparo_minutos": rng.choice([5, 10, 15, 20, 30]),
+                "restricoes": rng.sample(RESTRICOES, rng.randint(0, 3)),
+                "adicionais": [
+                    {"id": f"a{j}", "nome": f"Adicional {j}", "preco": float(j * 2)}
+                    for j in range(rng.randint(0, 3))
+                ],
+                "disponivel": rng.random() > 0.05,
+                "categoria_id": rng.randint(1, cfg["categorias"]),
+                "restaurante_id": RESTAURANTE_ID,
+            })
+        for lote in _lotes(produtos):
+            conn.execute(t["produto"].insert(), lote)
+
+        mesas = [{
+            "id": i,
+            "uuid": str(uuidlib.UUID(int=rng.getrandbits(128))),
+            "nome": f"Mesa {i}",
+            "ativo": True,
+            "status_id": 1,
+            "restaurante_id": RESTAURANTE_ID,
+            "created_at": agora,
+            "updated_at": agora,
+        } for i in range(1, cfg["mesas"] + 1)]
+        conn.execute(t["mesa"].insert(), mesas)
+
+        # Histórico: pedidos concluídos espalhados pelos últimos 180 dias
+        precos = {p["id"]: p["preco"] for p in produtos}
+        pedidos, itens = [], []
+        item_id = 1
+        for pid in range(1, cfg["pedidos"] + 1):
+            ts = agora - timedelta(minutes=rng.randint(60, 180 * 24 * 60))
+            total = 0.0
+            for _ in range(rng.randint(1, 4)):
+                prod = rng.randint(1, cfg["produtos"])
+                qtd = rng.randint(1, 3)
+                subtotal = precos[prod] * qtd
+                total += subtotal
+                itens.append({
+                    "id": item_id, "pedido_id": pid, "produto_id": prod, "quantidade": qtd,
+                    "preco_unitario": precos[prod], "observacoes": None, "subtotal": subtotal,
+                })
+                item_id += 1
+            pedidos.append({
+                "id": pid,
+                "mesa_id": rng.randint(1, cfg["mesas"]),
+                "timestamp": ts,
+                "atualizado_em": ts + timedelta(minutes=40),
+                "estimativa_entrega": ts + timedelta(minutes=15),
+                "status_id": 4,
+                "status": "concluido",
+                "observacoes_gerais": None,
+                "valor_total": total,
+                "restaurante_id": RESTAURANTE_ID,
+            })
+        for lote in _lotes(pedidos):
+            conn.execute(t["pedido"].insert(), lote)
+        for lote in _lotes(itens):
+            conn.execute(t["item_pedido"].insert(), lote)
+
+        chamados = []
+        for cid in range(1, cfg["chamados"] + 1):
+            criado = agora - timedelta(minutes=rng.randint(60, 180 * 24 * 60))
+            chamados.append({
+                "id": cid,
+                "mesa_uuid": mesas[rng.randrange(len(mesas))]["uuid"],
+                "motivo": rng.choice([1, 2, 3]),
+                "detalhes": None,
+                "status": 2,
+                "criado_em": criado,
+                "atendido_em": criado + timedelta(minutes=3),
+                "cancelado_em": None,
+                "atendido_por": "1",
+                "restaurante_id": RESTAURANTE_ID,
+            })
+        for lote in _lotes(chamados):
+            conn.execute(t["chamadas_garcom"].insert(), lote)
+
+    # Postgres: ajusta as sequences, já que inserimos ids explícitos
+    if engine.dialect.name == "postgresql":
+        from sqlalchemy import text
+        with engine.begin() as conn:
+            for tabela in ("restaurantes", "categoria", "produto", "mesa", "pedido", "item_pedido", "chamadas_garcom"):
+                conn.execute(text(
+                    f"SELECT setval(pg_get_serial_sequence('{tabela}', 'id'), "
+                    f"(SELECT COALESCE(MAX(id), 1) FROM {tabela}))"
+                ))
+
+    engine.dispose()
+    return {**cfg, "itens": item_id - 1}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Popula o banco de benchmark")
+    parser.add_argument("--db", default=os.getenv("DATABASE_URL") or "sqlite:///./bench.db")
+    parser.add_argument("--perfil", choices=sorted(PERFIS), default="pequeno")
+    parser.add_argument("--manter", action="store_true", help="não recria o schema (só insere)")
+    args = parser.parse_args()
+
+    contagens = semear(args.db, args.perfil, recriar=not args.manter)
+    print(f"[semear] {args.db} ({args.perfil}): {contagens}")
+
+
+if __name__ == "__main__":
+    main()
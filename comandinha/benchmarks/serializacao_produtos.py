@@ -0,0 +1,127 @@
+# benchmarks/serializacao_produtos.py
+"""
+Pipeline de resposta de /produtos com 500 produtos: caminho antigo x atual.
+
+    python -m benchmarks.serializacao_produtos [--produtos 500] [--repeticoes 200]
+
+antigo: model_validate + model_dump(by_alias) por item -> FastAPI valida de novo
+        contra o response_model -> JSONResponse (json da stdlib)
+atual : src.common.respostas.resposta_modelo (uma validação + dump_json em bytes)
+
+Mede só a serialização (objetos ORM já carregados) e a rota ponta a ponta
+(TestClient, SQLite temporário). Confere que os dois JSONs são idênticos.
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+
+
+def _cronometrar(fn, repeticoes: int) -> float:
+    amostras = []
+    for _ in range(repeticoes):
+        t0 = time.perf_counter()
+        fn()
+        amostras.append((time.perf_counter() - t0) * 1000.0)
+    return statistics.median(amostras)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de serialização de /produtos")
+    parser.add_argument("--produtos", type=int, default=500)
+    parser.add_argument("--repeticoes", type=int, default=200)
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(), "serializacao.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    os.environ.setdefault("LIMITE_TAXA", "0")
+
+    from typing import List
+    from fastapi import Depends, FastAPI
+    from fastapi.responses import JSONResponse
+    from fastapi.testclient import TestClient
+
+    from src.common.respostas import resposta_modelo, serializar
+    from src.infra.sqlalchemy.config.database import Base, SessionLocal, engine, get_db
+    from src.infra.sqlalchemy.models import Categoria, Produto, Restaurante
+    from src.infra.sqlalchemy.repositorios.repositorio_produto import RepositorioProduto
+    from src.schemas.produto import ProdutoDetalhado
+
+    Base.metadata.create_all(engine)
+    with SessionLocal() as db:
+        restaurante = Restaurante(nome="Bench", email="serializacao@comandinha.local", senha_hash="x")
+        db.add(restaurante)
+        db.flush()
+        cats = [
+            Categoria(nome=f"Categoria {i}", ordem=i, ativa=True, restaurante_id=restaurante.id)
+            for i in range(10)
+        ]
+        db.add_all(cats)
+        db.flush()
+        db.add_all([
+            Produto(
+                nome=f"Produto {i}", descricao="frango grelhado com molho da casa", preco=10.0 + i % 50,
+                popular=i % 7 == 0, tempo_preparo_minutos=15,
+                restricoes=["sem lactose", "sem gluten"][: i % 3],
+                adicionais=[{"id": f"a{j}", "nome": f"Adicional {j}", "preco": 2.5 * j} for j in range(i % 4)],
+                disponivel=True, categoria_id=cats[i % 10].id, restaurante_id=restaurante.id,
+            )
+            for i in range(args.produtos)
+        ])
+        db.commit()
+
+    tipo = List[ProdutoDetalhado]
+
+    # ---------------- só serialização ----------------
+    from pydantic import TypeAdapter
+    adaptador_fastapi = TypeAdapter(tipo)
+
+    def antigo(objs):
+        conteudo = [
+            ProdutoDetalhado.model_validate(o, from_attributes=True, by_name=True).model_dump(by_alias=True)
+            for o in objs
+        ]
+        # equivalente ao serialize_response do FastAPI (pydantic v2) + JSONResponse.render
+        validado = adaptador_fastapi.validate_python(conteudo)
+        jsonavel = adaptador_fastapi.dump_python(validado, mode="json", by_alias=True)
+        return JSONResponse(jsonavel).body
+
+    def atual(objs):
+        return serializar(tipo, objs)
+
+    with SessionLocal() as db:
+        objs = RepositorioProduto(db).listar_com_categorias()
+        assert json.loads(antigo(objs)) == json.loads(atual(objs)), "payloads divergentes"
+        ms_antigo = _cronometrar(lambda: antigo(objs), args.repeticoes)
+        ms_atual = _cronometrar(lambda: atual(objs), args.repeticoes)
+
+    # ---------------- rota ponta a ponta ----------------
+    app = FastAPI()
+
+    @app.get("/produtos_antigo", response_model=tipo)
+    def rota_antiga(db=Depends(get_db)):
+        return [
+            ProdutoDetalhado.model_validate(o, from_attributes=True, by_name=True).model_dump(by_alias=True)
+            for o in RepositorioProduto(db).listar_com_categorias()
+        ]
+
+    @app.get("/produtos_atual", response_model=tipo)
+    def rota_atual(db=Depends(get_db)):
+        return resposta_modelo(tipo, RepositorioProduto(db).listar_com_categorias())
+
+    with TestClient(app) as cliente:
+        assert cliente.get("/produtos_antigo").json() == cliente.get("/produtos_atual").json()
+        rep = max(20, args.repeticoes // 4)
+        e2e_antigo = _cronometrar(lambda: cliente.get("/produtos_antigo"), rep)
+        e2e_atual = _cronometrar(lambda: cliente.get("/produtos_atual"), rep)
+
+    print(f"/produtos com {args.produtos} produtos (mediana, ms)")
+    print(f"{'':<22}{'antigo':>10}{'atual':>10}{'ganho':>9}")
+    print(f"{'só serialização':<22}{ms_antigo:>10.2f}{ms_atual:>10.2f}{ms_antigo / ms_atual:>8.2f}x")
+    print(f"{'rota ponta a ponta':<22}{e2e_antigo:>10.2f}{e2e_atual:>10.2f}{e2e_antigo / e2e_atual:>8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
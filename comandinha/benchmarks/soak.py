@@ -0,0 +1,400 @@
+# benchmarks/soak.py
+"""
+Teste de resistência (soak): tráfego realista por horas e vigilância de
+vazamentos no processo da API.
+
+    python -m benchmarks.soak --db sqlite:///./bench.db --perfil pequeno --duracao 2h
+    python -m benchmarks.soak --duracao 10m --intervalo 15 --saida soak.json
+
+Roda in-process (TestClient da app instrumentada): as threads motoras
+sorteiam cenários de benchmarks.cenarios por peso, sem parar, enquanto a
+thread principal tira uma amostra a cada --intervalo segundos:
+
+  - memória: tracemalloc (atual) e RSS do processo;
+  - pool do engine: conexões em uso (checkedout) e overflow;
+  - sessões do SQLAlchemy vivas (após gc.collect), descritores de arquivo
+    e threads;
+  - latência p50/p95 e erros da janela (o coletor é trocado a cada amostra,
+    então o próprio harness não acumula memória).
+
+As amostras do --aquecimento ficam de fora (caches do cardápio, resolvedor,
+plano das consultas enchem no começo). Uma série é marcada como crescente
+quando o mínimo do último terço passa do máximo do primeiro terço (mais a
+folga da série) — crescimento monotônico, não ruído. No fim, o diff do
+tracemalloc entre a primeira amostra pós-aquecimento e a última lista os
+pontos de alocação que mais cresceram, com a pilha (--quadros).
+
+Sai com código 1 se alguma série cresceu. --quadros 0 desliga o tracemalloc
+(que custa CPU) e deixa só RSS, pool, sessões e descritores.
+
+Contra um servidor de verdade (--url), só RSS, descritores e threads do
+--pid são seguidos (ex.: o pid de um worker do gunicorn; lembre de
+GUNICORN_MAX_REQUESTS=0 para o worker não ser reciclado no meio).
+"""
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from benchmarks.cenarios import CENARIOS, Sessao, carregar_contexto
+from benchmarks.medicao import Coletor
+
+# visitas por cenário numa hora de salão: muita leitura, escrita constante
+PESOS_PADRAO = {
+    "navegacao_cardapio": 5,
+    "polling_cozinha": 3,
+    "rajada_pedidos": 2,
+    "chamadas_garcom": 2,
+    "fechamento_conta": 1,
+}
+
+# folga absoluta por série antes de chamar de crescimento
+FOLGAS = {
+    "tracemalloc_kb": 512,
+    "rss_kb": 4096,
+    "pool_em_uso": 0,
+    "sessoes_vivas": 0,
+    "descritores": 2,
+    "threads": 1,
+}
+
+# pontos de alocação fora do diff: o próprio harness e o tracemalloc
+_EXCLUIR = (tracemalloc.__file__, __file__, "<frozen importlib", "<unknown>")
+
+
+def segundos(texto: str) -> float:
+    """'90', '90s', '15m', '2h' -> segundos."""
+    texto = str(texto).strip().lower()
+    unidade = {"s": 1, "m": 60, "h": 3600}.get(texto[-1:])
+    return float(texto[:-1]) * unidade if unidade else float(texto)
+
+
+# ---------------- medidas do processo ----------------
+def _rss_kb(pid="self") -> Optional[int]:
+    try:
+        with open(f"/proc/{pid}/status", encoding="ascii") as f:
+            for linha in f:
+                if linha.startswith("VmRSS:"):
+                    return int(linha.split()[1])
+    except OSError:
+        pass
+    if pid == "self":
+        import resource  # fora do Linux: pico, não o atual (melhor que nada)
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return None
+
+
+def _descritores(pid="self") -> Optional[int]:
+    for caminho in (f"/proc/{pid}/fd", "/dev/fd"):
+        try:
+            return len(os.listdir(caminho))
+        except OSError:
+            continue
+    return None
+
+
+def _threads(pid="self") -> Optional[int]:
+    if pid == "self":
+        return threading.active_count()
+    try:
+        return len(os.listdir(f"/proc/{pid}/task"))
+    except OSError:
+        return None
+
+
+def _sessoes_vivas() -> int:
+    # registro fraco de todas as sessões do SQLAlchemy: com gc.collect antes,
+    # o que sobra está preso por alguma referência
+    from sqlalchemy.orm.session import _sessions
+
+    return len(_sessions)
+
+
+def crescente(serie: List[float], folga: float = 0.0) -> bool:
+    """Mínimo do último terço acima do máximo do primeiro terço (+ folga)."""
+    valores = [v for v in serie if v is not None]
+    if len(valores) < 6:
+        return False
+    terco = len(valores) // 3
+    return min(valores[-terco:]) > max(valores[:terco]) + folga
+
+
+def inclinacao_por_hora(tempos: List[float], serie: List[float]) -> float:
+    pares = [(t, v) for t, v in zip(tempos, serie) if v is not None]
+    if len(pares) < 2:
+        return 0.0
+    mt = sum(t for t, _ in pares) / len(pares)
+    mv = sum(v for _, v in pares) / len(pares)
+    den = sum((t - mt) ** 2 for t, _ in pares)
+    return sum((t - mt) * (v - mv) for t, v in pares) / den * 3600.0 if den else 0.0
+
+
+# ---------------- tráfego ----------------
+class Motor:
+    """Threads que disparam visitas sem parar até `parar`; o coletor é por janela."""
+
+    def __init__(self, cliente, ctx, pesos: Dict[str, int], concorrencia: int, semente: int):
+        self.cliente = cliente
+        self.ctx = ctx
+        self.nomes = list(pesos)
+        self.pesos = [pesos[n] for n in self.nomes]
+        self.concorrencia = concorrencia
+        self.semente = semente
+        self.coletor = Coletor()
+        self.visitas = 0
+        self.falhas = 0
+        self._parar = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def iniciar(self) -> None:
+        for i in range(self.concorrencia):
+            th = threading.Thread(target=self._laco, args=(i,), name=f"soak-{i}", daemon=True)
+            th.start()
+            self._threads.append(th)
+
+    def _laco(self, indice: int) -> None:
+        rng = random.Random(self.semente * 1000 + indice)
+        while not self._parar.is_set():
+            nome = rng.choices(self.nomes, self.pesos)[0]
+            try:
+                CENARIOS[nome](Sessao(self.cliente, self.coletor, nome), self.ctx, rng)
+            except Exception:
+                # exceção no cliente (ex.: conexão) conta e segue; 500 já vira erro no coletor
+                self.falhas += 1
+            self.visitas += 1
+
+    def trocar_janela(self) -> Coletor:
+        anterior, self.coletor = self.coletor, Coletor()
+        return anterior
+
+    def parar(self) -> None:
+        self._parar.set()
+        for th in self._threads:
+            th.join(timeout=30)
+
+
+def _resumo_janela(coletor: Coletor) -> dict:
+    r = coletor.geral()
+    return {k: r[k] for k in ("requisicoes", "erros", "p50_ms", "p95_ms")}
+
+
+# ---------------- amostragem ----------------
+def amostrar(inicio: float, engine=None, pid="self", motor: Optional[Motor] = None) -> dict:
+    if pid == "self":
+        gc.collect()
+    amostra = {
+        "t_s": round(time.monotonic() - inicio, 1),
+        "rss_kb": _rss_kb(pid),
+        "descritores": _descritores(pid),
+        "threads": _threads(pid),
+    }
+    if tracemalloc.is_tracing():
+        atual, pico = tracemalloc.get_traced_memory()
+        amostra["tracemalloc_kb"] = atual // 1024
+        amostra["tracemalloc_pico_kb"] = pico // 1024
+    if engine is not None:
+        pool = engine.pool
+        amostra["pool_em_uso"] = pool.checkedout() if hasattr(pool, "checkedout") else None
+        amostra["pool_overflow"] = pool.overflow() if hasattr(pool, "overflow") else None
+        amostra["sessoes_vivas"] = _sessoes_vivas()
+    if motor is not None:
+        amostra["visitas"] = motor.visitas
+        amostra.update(_resumo_janela(motor.trocar_janela()))
+    return amostra
+
+
+def diff_alocacoes(antes, depois, top: int = 15, quadros: int = 6) -> List[dict]:
+    # filtra as estatísticas, não os traces: filter_traces passa fnmatch em
+    # cada bloco vivo e leva minutos num processo aquecido
+    saida = []
+    for stat in depois.compare_to(antes, "traceback"):
+        # ordenado por |diff|: o que encolheu também aparece e é pulado
+        if len(saida) >= top:
+            break
+        if stat.size_diff <= 0 or stat.traceback[-1].filename.startswith(_EXCLUIR):
+            continue
+        saida.append({
+            "kb": round(stat.size_diff / 1024, 1),
+            "blocos": stat.count_diff,
+            "kb_total": round(stat.size / 1024, 1),
+            # do chamador mais recente para trás
+            "pilha": [f"{q.filename}:{q.lineno}" for q in reversed(stat.traceback)][:quadros],
+        })
+    return saida
+
+
+def analisar(amostras: List[dict]) -> dict:
+    tempos = [a["t_s"] for a in amostras]
+    series = {}
+    for chave, folga in FOLGAS.items():
+        serie = [a.get(chave) for a in amostras]
+        if all(v is None for v in serie):
+            continue
+        validos = [v for v in serie if v is not None]
+        series[chave] = {
+            "inicio": validos[0],
+            "fim": validos[-1],
+            "maximo": max(validos),
+            "por_hora": round(inclinacao_por_hora(tempos, serie), 1),
+            "crescente": crescente(serie, folga),
+        }
+    return series
+
+
+def soak(db_url: str, duracao: float, intervalo: float, aquecimento: float, concorrencia: int,
+         semente: int = 1, perfil: Optional[str] = None, pesos: Optional[Dict[str, int]] = None,
+         quadros: int = 8, url: Optional[str] = None, pid: Optional[int] = None, top: int = 15) -> dict:
+    os.environ["DATABASE_URL"] = db_url
+    if perfil:
+        from benchmarks.semear import semear
+        semear(db_url, perfil)
+    from src.infra.sqlalchemy.config.database import engine
+
+    ctx = carregar_contexto(engine)
+    if url:
+        from benchmarks.executar import ClienteHTTP
+        cliente, alvo, engine_app = ClienteHTTP(url), (pid or None), None
+    else:
+        from benchmarks.executar import _cliente_inprocess
+        cliente, alvo, engine_app = _cliente_inprocess(), "self", engine
+
+    amostras: List[dict] = []
+    base = ultimo = None
+    motor = Motor(cliente, ctx, pesos or PESOS_PADRAO, concorrencia, semente)
+    inicio = time.monotonic()
+    with cliente:
+        if quadros and not url:
+            # depois do import e do startup: só entra o que o tráfego aloca
+            tracemalloc.start(quadros)
+        motor.iniciar()
+        try:
+            time.sleep(aquecimento)
+            motor.trocar_janela()
+            if tracemalloc.is_tracing():
+                base = tracemalloc.take_snapshot()
+            while True:
+                if alvo is not None:
+                    a = amostrar(inicio, engine_app, alvo, motor)
+                else:
+                    a = {"t_s": round(time.monotonic() - inicio, 1), "visitas": motor.visitas,
+                         **_resumo_janela(motor.trocar_janela())}
+                if not amostras:
+                    # ponto de partida: a janela dela é só o fim do aquecimento
+                    for chave in ("requisicoes", "erros", "p50_ms", "p95_ms"):
+                        a.pop(chave, None)
+                amostras.append(a)
+                print(_linha(a), file=sys.stderr, flush=True)
+                restante = duracao - (time.monotonic() - inicio)
+                if restante <= 0:
+                    break
+                time.sleep(min(intervalo, restante))
+        except KeyboardInterrupt:
+            print("[soak] interrompido: relatório com as amostras até aqui", file=sys.stderr)
+        finally:
+            motor.parar()
+        if tracemalloc.is_tracing():
+            ultimo = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+
+    series = analisar(amostras)
+    return {
+        "meta": {
+            "modo": "http" if url else "inprocess",
+            "banco": engine.dialect.name,
+            "duracao_s": round(time.monotonic() - inicio, 1),
+            "intervalo_s": intervalo,
+            "aquecimento_s": aquecimento,
+            "concorrencia": concorrencia,
+            "pesos": pesos or PESOS_PADRAO,
+            "visitas": motor.visitas,
+            "falhas_cliente": motor.falhas,
+            "tracemalloc_quadros": quadros if base is not None else 0,
+            "gerado_em": datetime.now(timezone.utc).isoformat(),
+        },
+        "crescimento": sorted(k for k, s in series.items() if s["crescente"]),
+        "series": series,
+        "alocacoes": diff_alocacoes(base, ultimo, top) if base is not None and ultimo is not None else [],
+        "amostras": amostras,
+    }
+
+
+def _linha(a: dict) -> str:
+    partes = [f"t={a['t_s']:>7.0f}s", f"visitas={a.get('visitas', 0)}"]
+    for chave, rotulo in (("tracemalloc_kb", "py_kb"), ("rss_kb", "rss_kb"), ("pool_em_uso", "pool"),
+                          ("sessoes_vivas", "sessoes"), ("descritores", "fds"), ("threads", "threads"),
+                          ("p95_ms", "p95"), ("erros", "erros")):
+        if a.get(chave) is not None:
+            partes.append(f"{rotulo}={a[chave]}")
+    return "[soak] " + " ".join(partes)
+
+
+def imprimir(relatorio: dict) -> None:
+    print(f"{'série':<16}{'início':>12}{'fim':>12}{'máximo':>12}{'/hora':>12}  crescente")
+    for nome, s in relatorio["series"].items():
+        print(f"{nome:<16}{s['inicio']:>12}{s['fim']:>12}{s['maximo']:>12}{s['por_hora']:>12}"
+              f"  {'SIM' if s['crescente'] else '-'}")
+    if relatorio["alocacoes"]:
+        print("\nalocações que mais cresceram (tracemalloc, pós-aquecimento -> fim):")
+        for a in relatorio["alocacoes"]:
+            print(f"  +{a['kb']:.1f} KiB ({a['blocos']:+d} blocos, {a['kb_total']:.1f} KiB no total)")
+            for quadro in a["pilha"]:
+                print(f"      {quadro}")
+    if relatorio["crescimento"]:
+        print(f"\nCRESCIMENTO: {', '.join(relatorio['crescimento'])}")
+    else:
+        print("\nsem crescimento monotônico nas séries")
+
+
+def _pesos(valores: Optional[List[str]]) -> Optional[Dict[str, int]]:
+    if not valores:
+        return None
+    pesos = {}
+    for item in valores:
+        nome, _, peso = item.partition("=")
+        if nome not in CENARIOS:
+            raise SystemExit(f"Cenário desconhecido: {nome}")
+        pesos[nome] = int(peso or 1)
+    return pesos
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Soak test: memória, pool, sessões e descritores sob carga longa")
+    parser.add_argument("--db", default=os.getenv("DATABASE_URL") or "sqlite:///./bench.db")
+    parser.add_argument("--perfil", default=None, help="recria e semeia o banco antes (pequeno|realista)")
+    parser.add_argument("--duracao", default="1h", help="ex.: 600, 30m, 4h")
+    parser.add_argument("--intervalo", default="60", help="entre amostras (ex.: 60, 5m)")
+    parser.add_argument("--aquecimento", default="60", help="tráfego antes da primeira amostra")
+    parser.add_argument("--concorrencia", type=int, default=4)
+    parser.add_argument("--cenario", action="append", dest="pesos",
+                        help="nome[=peso], repetível; padrão: todos, pesos de um salão típico")
+    parser.add_argument("--quadros", type=int, default=8, help="profundidade de pilha do tracemalloc (0 desliga)")
+    parser.add_argument("--top", type=int, default=15, help="pontos de alocação no diff")
+    parser.add_argument("--url", default=None, help="servidor já de pé (só RSS/fds/threads do --pid)")
+    parser.add_argument("--pid", type=int, default=None, help="processo seguido com --url")
+    parser.add_argument("--semente", type=int, default=1)
+    parser.add_argument("--saida", default=None, help="arquivo JSON de saída")
+    args = parser.parse_args()
+
+    relatorio = soak(
+        args.db, duracao=segundos(args.duracao), intervalo=segundos(args.intervalo),
+        aquecimento=segundos(args.aquecimento), concorrencia=args.concorrencia, semente=args.semente,
+        perfil=args.perfil, pesos=_pesos(args.pesos), quadros=args.quadros, url=args.url,
+        pid=args.pid, top=args.top,
+    )
+    imprimir(relatorio)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            json.dump(relatorio, f, indent=2, ensure_ascii=False)
+        print(f"[soak] relatório salvo em {args.saida}", file=sys.stderr)
+    sys.exit(1 if relatorio["crescimento"] else 0)
+
+
+if __name__ == "__main__":
+    main()
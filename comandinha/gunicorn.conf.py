@@ -0,0 +1,53 @@
+# gunicorn.conf.py — runner de produção
+#
+#   gunicorn -c gunicorn.conf.py server:app
+#
+# - N workers Uvicorn (asyncio) derivados dos núcleos disponíveis (WEB_CONCURRENCY sobrescreve)
+# - preload_app: o mestre importa o app uma vez e os workers herdam os módulos via fork
+# - post_fork: cada worker descarta os pools de conexões herdados do mestre (primário e réplicas)
+# - max_requests (+ jitter): reciclagem periódica de workers, sem todos reiniciarem juntos
+# - reinício gradual: `kill -HUP <mestre>` troca os workers com graceful_timeout;
+#   para trocar um de cada vez, use `python tools/reinicio_gradual.py`
+import os
+
+
+def _nucleos() -> int:
+    # respeita cpuset/affinity do container (os.cpu_count() enxerga a máquina toda)
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Endpoints síncronos rodam no threadpool de cada worker; 1 processo por núcleo
+# já satura a CPU sem multiplicar conexões no banco.
+workers = int(os.getenv("WEB_CONCURRENCY", _nucleos()))
+
+preload_app = os.getenv("GUNICORN_PRELOAD", "1") == "1"
+
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "5000"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", str(max(1, max_requests // 10))))
+
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+
+pidfile = os.getenv("GUNICORN_PIDFILE") or None
+accesslog = os.getenv("GUNICORN_ACCESSLOG") or None
+errorlog = "-"
+loglevel = os.getenv("GUNICORN_LOGLEVEL", "info")
+
+
+def post_fork(server, worker):
+    # Com preload os engines (primário e réplicas de REPLICA_URLS) foram
+    # criados no mestre. close=False descarta o pool herdado sem fechar os
+    # sockets (que ainda pertencem ao mestre/irmãos): cada worker abre as
+    # próprias conexões sob demanda.
+    from src.infra.sqlalchemy.config.database import engine
+    from src.infra.sqlalchemy.config.replicas import roteador_leituras
+    for e in (engine, *roteador_leituras.engines()):
+        e.dispose(close=False)
+    server.log.info("worker %s: pools de conexões reiniciados após fork", worker.pid)
@@ -1,10 +1,27 @@
-import uvicorn
 import os
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from sqlalchemy.orm import configure_mappers
 
-from src.infra.sqlalchemy.config.database import engine, Base
+from src.infra.sqlalchemy.config.database import engine, Base, SessionLocal
+from src.infra.sqlalchemy.config.unidade_trabalho import instalar_apos_commit
+from src.common.respostas import RespostaPadrao
+from src.common.compressao import CompressaoMiddleware
+from src.common.cache_cardapio import instalar_invalidacao
+from src.common.efeitos import instalar_efeitos, pipeline as pipeline_efeitos
+from src.common.recomendacoes import motor_recomendacoes
+from src.common.limite_taxa import LimiteTaxaMiddleware
+from src.common.admissao import AdmissaoMiddleware, configurar_threads
+from src.common.rastreamento import RastreamentoMiddleware, instalar_sql
+from src.common.consultas_lentas import instalar_consultas_lentas
+from src.common.disjuntor import BancoIndisponivel, disjuntor_banco, responder_indisponivel
+from src.common.expiracao_mesas import expiracao_mesas
+from src.common.sla_cozinha import sla_cozinha
+from src.infra.sqlalchemy.repositorios.repositorio_chamado import verificar_cooldown_chamado
+from src.infra.sqlalchemy.config.replicas import AderenciaMiddleware, roteador_leituras
+
+# registra todos os modelos UMA vez (o pacote importa cada módulo de modelo)
+import src.infra.sqlalchemy.models  # noqa: F401
 
 # importa routers
 from src.routers.rotas_mesas import router as mesas_router
@@ -15,12 +32,35 @@ from src.routers.rotas_auth import router as auth_router
 from src.routers.rotas_admin import router as admin_router
 from src.routers.rotas_chamados import router as chamados_router
 
-# from src.routers.rotas_chamados import router as chamados_router  # opcional
-
 app = FastAPI(
     title="API Comandinha",
     description="Backend do Projeto Comandinha",
-    version="1.0.0"
+    version="1.0.0",
+    # orjson para tudo que passa pelo response_model; as rotas quentes já
+    # devolvem bytes prontos via src.common.respostas.resposta_modelo
+    default_response_class=RespostaPadrao,
+)
+
+# disjuntor do banco aberto: 503 rápido, ou a última cópia boa nas leituras
+# públicas (cardápio, categorias, mesa por UUID)
+app.add_exception_handler(BancoIndisponivel, responder_indisponivel)
+
+# admissão por classe de rota (pedidos > geral > cardápio > relatórios) na
+# frente do threadpool: o mais interno, para o 429 do limite de taxa sair
+# antes de ocupar vaga e o 503 de sobrecarga levar os headers de CORS
+app.add_middleware(AdmissaoMiddleware)
+
+# réplicas de leitura (REPLICA_URLS): depois de uma escrita bem-sucedida o
+# cliente lê do primário por REPLICA_ADERENCIA_S (memória + cookie); respostas
+# recusadas (429/503 da admissão e do limite de taxa) não marcam
+app.add_middleware(AderenciaMiddleware)
+
+# token bucket por mesa/IP nos endpoints públicos: o 429 sai antes de abrir
+# sessão; o cooldown dos chamados já conhecido em memória também.
+# Adicionado antes do CORS para ficar por dentro dele (429 com headers de CORS).
+app.add_middleware(
+    LimiteTaxaMiddleware,
+    verificacoes={("POST", "/chamadas"): verificar_cooldown_chamado},
 )
 
 # CORS — permitir apenas os domínios especificados
@@ -37,24 +77,69 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# gzip/brotli acima de COMPRESSAO_MIN_BYTES; payloads do cardápio já chegam
+# pré-comprimidos do cache e passam direto
+app.add_middleware(CompressaoMiddleware)
+
+# rastros (spans rota -> repositório -> SQL) das requisições amostradas;
+# o mais externo, para o span da requisição incluir fila de admissão e
+# compressão. RASTREAMENTO_AMOSTRAGEM=0 (padrão) deixa só a passagem direta.
+app.add_middleware(RastreamentoMiddleware)
+instalar_sql(engine)
+for engine_replica in roteador_leituras.engines():
+    instalar_sql(engine_replica)
+
+# statements acima de CONSULTA_LENTA_MS: impressão digital + EXPLAIN numa
+# thread à parte, para achar índice faltando (GET /admin/consultas-lentas);
+# nas réplicas também, com o EXPLAIN no banco onde a consulta rodou
+instalar_consultas_lentas(engine)
+for engine_replica in roteador_leituras.engines():
+    instalar_consultas_lentas(engine_replica)
+
+# commits que tocam Produto/Categoria geram nova versão do cache do cardápio
+instalar_invalidacao(SessionLocal)
+
+# o que só vale após o commit da transação externa (fila de efeitos, marcas do
+# limite de taxa, resolvedor e sessão das mesas, prazos de inatividade e do
+# SLA da cozinha); rollback, inclusive de savepoint, descarta o que agendou
+instalar_apos_commit(SessionLocal)
+
+# efeitos adiados (ex.: status da mesa após pedido) aplicados em background
+instalar_efeitos(SessionLocal)
+
 @app.on_event("startup")
 def on_startup():
-    # registra os modelos (como já está)
-    import src.infra.sqlalchemy.models.mesa  # noqa: F401
-    import src.infra.sqlalchemy.models.categoria  # noqa: F401
-    import src.infra.sqlalchemy.models.produto  # noqa: F401
-    import src.infra.sqlalchemy.models.pedido  # noqa: F401
-    import src.infra.sqlalchemy.models.chamado_garcom  # noqa: F401
+    # threadpool dos endpoints síncronos (a admissão divide estas threads)
+    configurar_threads()
 
     # Somente em desenvolvimento (ou quando explicitamente habilitado),
-    # criamos as tabelas automaticamente. Em produção, use Alembic.
+    # criamos as tabelas automaticamente. Em produção, use Alembic
+    # (tools/migrar.py, que pula o upgrade quando a revisão já confere).
     if os.getenv("RUN_DDL_ON_STARTUP") == "1":
-        from src.infra.sqlalchemy.config.database import engine, Base
         Base.metadata.create_all(bind=engine)
 
+    # job periódico das recomendações (um por worker; roda fora das requisições)
+    if os.getenv("RECOMENDACOES_JOB", "1") == "1":
+        motor_recomendacoes.iniciar(SessionLocal)
+
+    # agenda de expiração das mesas: remontada do banco (uma consulta) a cada boot
+    expiracao_mesas.iniciar(SessionLocal)
+
+    # SLA da cozinha: pedidos 1/2 voltam para a agenda (uma consulta)
+    sla_cozinha.iniciar(SessionLocal)
+
+@app.on_event("shutdown")
+def on_shutdown():
+    motor_recomendacoes.parar()
+    expiracao_mesas.parar()
+    sla_cozinha.parar()
+    # aplica o que ainda estiver na fila de efeitos antes de o worker sair
+    pipeline_efeitos.parar()
+
 @app.get("/health", tags=["health"])
 def health_check():
-    return {"status": "ok"}
+    # estado do disjuntor do banco neste worker (fechado | aberto | meio_aberto)
+    return {"status": "ok", "banco": disjuntor_banco.estado}
 
 # registra routers
 app.include_router(mesas_router)
@@ -65,8 +150,16 @@ app.include_router(auth_router)
 app.include_router(admin_router)
 app.include_router(chamados_router)
 
-# permite rodar com "python server.py"
+# Configura os mappers já no import: com preload (processo mestre importa o app
+# antes do fork), os workers herdam módulos e mappers prontos via copy-on-write,
+# em vez de cada um pagar essa configuração na primeira requisição.
+configure_mappers()
+
+# permite rodar com "python server.py" (desenvolvimento, com reload).
+# Produção: gunicorn -c gunicorn.conf.py server:app (multi-worker, ver o arquivo)
 if __name__ == "__main__":
+    import uvicorn  # só aqui: evita ~100ms de import quando o app sobe por outro runner
+
     uvicorn.run(
         "server:app",
         host="0.0.0.0",
@@ -0,0 +1,265 @@
+# src/common/admissao.py
+"""
+Controle de admissão com classes de prioridade, na frente do threadpool.
+
+Todos os endpoints síncronos dividem o threadpool do anyio (40 threads por
+padrão). Sem controle, uma rajada de leituras do cardápio ocupa todas as
+threads e o POST /pedidos (ou o PATCH de status da cozinha) espera atrás
+dela. Aqui cada requisição é classificada por (método, path) antes do
+roteamento:
+
+    pedidos     (0)  POST /pedidos, PATCH /pedidos/{id}/status, chamados,
+                     encerrar mesa — escrita do salão e da cozinha
+    geral       (1)  o resto (admin, auth, leituras da cozinha)
+    cardapio    (2)  GET /produtos, /categorias, /mesas e /mesas/uuid/...
+    relatorios  (3)  histórico de chamados, cargas em massa, limpar pedidos
+
+Cada classe tem um limite de concorrência, uma fila com tamanho máximo e um
+tempo máximo de espera; a soma dos admitidos não passa de ADMISSAO_CAPACIDADE
+(por padrão, o tamanho do threadpool). Quando uma vaga abre, ela vai para a
+fila de maior prioridade que ainda cabe no próprio limite; quem chega não
+fura a fila de uma classe de prioridade igual ou maior.
+
+Recusa rápida, sem abrir sessão: fila cheia ou espera estourada devolvem 503
+(429 em `relatorios`) com Retry-After. /health e a documentação não passam
+pela admissão.
+
+Configuração:
+- ADMISSAO=0 desliga;
+- ADMISSAO_THREADS: tamanho do threadpool do anyio (aplicado no startup);
+- ADMISSAO_CAPACIDADE: total admitido ao mesmo tempo (padrão = threads);
+- ADMISSAO_<CLASSE>=limite:fila:espera_s sobrescreve uma classe
+  (ex.: ADMISSAO_CARDAPIO=16:50:1.5).
+
+Estado e métricas (em uso, fila, pico de fila, admitidas, recusadas,
+espera média) são por worker: GET /admin/admissao.
+"""
+import asyncio
+import json
+import logging
+import os
+import re
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+ADMISSAO = os.getenv("ADMISSAO", "1") == "1"
+ADMISSAO_THREADS = int(os.getenv("ADMISSAO_THREADS", "40"))
+ADMISSAO_CAPACIDADE = int(os.getenv("ADMISSAO_CAPACIDADE", "0")) or ADMISSAO_THREADS
+
+_ISENTOS = re.compile(r"^/(health|docs|redoc|openapi\.json)(/|$)")
+
+
+@dataclass
+class Classe:
+    nome: str
+    prioridade: int               # 0 = mais alta
+    limite: int                   # concorrência máxima da classe
+    fila_max: int
+    espera_max: float             # segundos na fila antes da recusa
+    status_recusa: int = 503
+    em_uso: int = 0
+    fila: "deque[asyncio.Future]" = field(default_factory=deque, repr=False)
+    estatisticas: Dict[str, float] = field(default_factory=lambda: {
+        "admitidas": 0, "enfileiradas": 0, "recusadas": 0, "expiradas": 0,
+        "espera_total_ms": 0.0, "fila_pico": 0,
+    })
+
+
+def _classe(nome, prioridade, limite, fila_max, espera_max, status_recusa=503) -> Classe:
+    # ADMISSAO_<NOME>=limite:fila:espera_s
+    bruto = os.getenv(f"ADMISSAO_{nome.upper()}", "")
+    if bruto:
+        try:
+            partes = bruto.split(":")
+            limite = int(partes[0])
+            fila_max = int(partes[1]) if len(partes) > 1 else fila_max
+            espera_max = float(partes[2]) if len(partes) > 2 else espera_max
+        except ValueError:
+            logger.warning("ADMISSAO_%s inválido (%r); usando o padrão", nome.upper(), bruto)
+    return Classe(nome, prioridade, limite, fila_max, espera_max, status_recusa)
+
+
+def classes_padrao(capacidade: int = ADMISSAO_CAPACIDADE) -> Tuple[Classe, ...]:
+    # pedidos pode usar tudo; as leituras deixam vagas livres para a escrita
+    return (
+        _classe("pedidos", 0, capacidade, 200, 10.0),
+        _classe("geral", 1, max(1, capacidade * 3 // 4), 100, 5.0),
+        _classe("cardapio", 2, max(1, capacidade * 3 // 5), 100, 2.0),
+        _classe("relatorios", 3, max(1, capacidade // 10), 8, 1.0, status_recusa=429),
+    )
+
+
+# (métodos, path) -> classe; a primeira regra que casar vale, senão "geral"
+REGRAS_PADRAO: Tuple[Tuple[Tuple[str, ...], "re.Pattern", str], ...] = tuple(
+    (tuple(metodos), re.compile(caminho), classe)
+    for metodos, caminho, classe in (
+        (("POST",), r"^/pedidos/?$", "pedidos"),
+        (("PATCH",), r"^/pedidos/\d+/status/?$", "pedidos"),
+        (("POST",), r"^/chamadas/?$", "pedidos"),
+        (("PATCH",), r"^/chamadas/\d+/(atender|cancelar)/?$", "pedidos"),
+        (("POST",), r"^/mesas/\d+/encerrar/?$", "pedidos"),
+        (("GET",), r"^/chamadas/historico/?$", "relatorios"),
+        (("POST",), r"^/(produtos|mesas)/bulk/?$", "relatorios"),
+        (("DELETE",), r"^/pedidos/?$", "relatorios"),
+        (("GET",), r"^/(produtos|categorias)(/|$)", "cardapio"),
+        (("GET",), r"^/mesas(/uuid/[^/]+(/.*)?)?/?$", "cardapio"),
+    )
+)
+
+
+def classificar_rota(metodo: str, caminho: str, regras=REGRAS_PADRAO) -> str:
+    """Nome da classe da rota (também usado para o statement_timeout, ver database.py)."""
+    for metodos, padrao, nome in regras:
+        if metodo in metodos and padrao.match(caminho):
+            return nome
+    return "geral"
+
+
+class ControleAdmissao:
+    """Vagas e filas por classe. Vive no event loop do worker (sem lock)."""
+
+    def __init__(self, classes: Sequence[Classe], capacidade: int = ADMISSAO_CAPACIDADE):
+        self.capacidade = capacidade
+        self.classes: Dict[str, Classe] = {c.nome: c for c in classes}
+        self._por_prioridade: List[Classe] = sorted(classes, key=lambda c: c.prioridade)
+        self.em_uso = 0
+
+    def _cabe(self, c: Classe) -> bool:
+        return c.em_uso < c.limite and self.em_uso < self.capacidade
+
+    def _ocupar(self, c: Classe) -> None:
+        c.em_uso += 1
+        self.em_uso += 1
+        c.estatisticas["admitidas"] += 1
+
+    def _fila_na_frente(self, c: Classe) -> bool:
+        # fila de quem está no próprio limite não segura as outras classes
+        return any(o.fila and o.em_uso < o.limite for o in self._por_prioridade if o.prioridade <= c.prioridade)
+
+    async def entrar(self, c: Classe) -> bool:
+        """True se admitida (chamar `sair` depois); False se recusada."""
+        if self._cabe(c) and not self._fila_na_frente(c):
+            self._ocupar(c)
+            return True
+        if c.espera_max <= 0 or len(c.fila) >= c.fila_max:
+            c.estatisticas["recusadas"] += 1
+            return False
+
+        fut = asyncio.get_running_loop().create_future()
+        c.fila.append(fut)
+        c.estatisticas["enfileiradas"] += 1
+        c.estatisticas["fila_pico"] = max(c.estatisticas["fila_pico"], len(c.fila))
+        inicio = asyncio.get_running_loop().time()
+        try:
+            # asyncio.wait não cancela o future: a vaga pode chegar junto com o timeout
+            await asyncio.wait((fut,), timeout=c.espera_max)
+        except asyncio.CancelledError:
+            # cliente desistiu; se a vaga já tinha sido entregue, devolve
+            if fut.done() and not fut.cancelled():
+                self.sair(c)
+            else:
+                self._retirar(c, fut)
+            raise
+        c.estatisticas["espera_total_ms"] += (asyncio.get_running_loop().time() - inicio) * 1000.0
+        if fut.done():
+            return True
+        self._retirar(c, fut)
+        c.estatisticas["expiradas"] += 1
+        return False
+
+    def _retirar(self, c: Classe, fut: asyncio.Future) -> None:
+        fut.cancel()
+        try:
+            c.fila.remove(fut)
+        except ValueError:
+            pass
+
+    def sair(self, c: Classe) -> None:
+        c.em_uso -= 1
+        self.em_uso -= 1
+        self._despachar()
+
+    def _despachar(self) -> None:
+        """Entrega as vagas livres, da classe de maior prioridade para a menor."""
+        for c in self._por_prioridade:
+            while c.fila and self._cabe(c):
+                fut = c.fila.popleft()
+                if fut.done():
+                    continue
+                self._ocupar(c)
+                fut.set_result(True)
+            if self.em_uso >= self.capacidade:
+                return
+
+    def metricas(self) -> dict:
+        classes = {}
+        for c in self._por_prioridade:
+            est = c.estatisticas
+            enfileiradas = est["enfileiradas"] or 1
+            classes[c.nome] = {
+                "prioridade": c.prioridade,
+                "limite": c.limite,
+                "em_uso": c.em_uso,
+                "fila": len(c.fila),
+                "fila_max": c.fila_max,
+                "espera_max_s": c.espera_max,
+                "fila_pico": est["fila_pico"],
+                "admitidas": est["admitidas"],
+                "enfileiradas": est["enfileiradas"],
+                "recusadas": est["recusadas"],
+                "expiradas": est["expiradas"],
+                "espera_media_ms": round(est["espera_total_ms"] / enfileiradas, 1),
+            }
+        return {"capacidade": self.capacidade, "em_uso": self.em_uso, "classes": classes}
+
+
+controle = ControleAdmissao(classes_padrao())
+
+
+def configurar_threads(total: int = ADMISSAO_THREADS) -> None:
+    """Tamanho do threadpool do anyio (endpoints síncronos). Chamar dentro do event loop."""
+    from anyio import to_thread
+
+    to_thread.current_default_thread_limiter().total_tokens = total
+
+
+class AdmissaoMiddleware:
+    """Middleware ASGI: classifica pela rota, espera a vaga ou recusa com 503/429."""
+
+    def __init__(self, app, controle_: Optional[ControleAdmissao] = None, regras=REGRAS_PADRAO, ativo: bool = ADMISSAO):
+        self.app = app
+        self.controle = controle_ or controle
+        self.regras = regras
+        self.ativo = ativo
+
+    def classificar(self, metodo: str, caminho: str) -> Classe:
+        return self.controle.classes[classificar_rota(metodo, caminho, self.regras)]
+
+    async def __call__(self, scope, receive, send):
+        if not self.ativo or scope["type"] != "http" or _ISENTOS.match(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
+        c = self.classificar(scope["method"], scope["path"])
+        if not await self.controle.entrar(c):
+            await _recusar(send, c)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controle.sair(c)
+
+
+async def _recusar(send, c: Classe) -> None:
+    corpo = json.dumps({"detail": "Servidor ocupado. Tente novamente em instantes."}, ensure_ascii=False).encode()
+    headers = [
+        (b"content-type", b"application/json"),
+        (b"content-length", str(len(corpo)).encode()),
+        (b"retry-after", b"1"),
+        (b"x-admissao-classe", c.nome.encode()),
+    ]
+    await send({"type": "http.response.start", "status": c.status_recusa, "headers": headers})
+    await send({"type": "http.response.body", "body": corpo})
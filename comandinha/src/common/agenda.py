@@ -0,0 +1,199 @@
+# src/common/agenda.py
+"""
+Agenda de prazos por chave: min-heap + uma thread que dorme até o próximo
+prazo (sem varredura periódica).
+
+    agenda = Agenda("expiracao_mesas", ao_vencer=expirar)   # expirar(lista de (chave, prazo))
+    agenda.agendar(mesa_id, prazo)          # O(log n); substitui o prazo anterior da chave
+    agenda.agendar(mesa_id, prazo, so_adiar=True)   # só se for mais tarde que o atual
+    agenda.cancelar(mesa_id)                # O(1): a entrada velha fica no heap e é ignorada
+    agenda.iniciar(); ...; agenda.parar()
+
+Prazos são epoch em segundos (`time.time()`), porque vêm de timestamps do
+banco. Nada sai antes do prazo: ao vencer o primeiro, a thread espera
+`janela` segundos para juntar os próximos e tira até `lote_max` chaves
+vencidas; `ao_vencer` roda na thread da agenda, fora do lock. Se falhar, as
+chaves do lote voltam para `agora + repetir_s` (a menos que tenham sido
+reagendadas no meio tempo).
+
+Remoção preguiçosa: cada chave guarda a sequência da sua entrada válida;
+entradas velhas são descartadas ao chegar ao topo, e o heap é compactado
+quando elas passam do dobro das válidas.
+"""
+import heapq
+import itertools
+import logging
+import threading
+import time
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+Vencido = Tuple[Hashable, float]
+
+
+class Agenda:
+    def __init__(
+        self,
+        nome: str,
+        ao_vencer: Callable[[List[Vencido]], None],
+        lote_max: int = 500,
+        janela: float = 1.0,
+        repetir_s: float = 30.0,
+        relogio: Callable[[], float] = time.time,
+    ):
+        self.nome = nome
+        self.ao_vencer = ao_vencer
+        self.lote_max = lote_max
+        self.janela = janela
+        self.repetir_s = repetir_s
+        self.relogio = relogio
+        self._heap: List[Tuple[float, int, Hashable]] = []
+        self._validas: Dict[Hashable, Tuple[float, int]] = {}   # chave -> (prazo, seq)
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._parando = False
+        self.estatisticas = {"agendados": 0, "cancelados": 0, "vencidos": 0, "lotes": 0, "falhas": 0}
+
+    def __len__(self) -> int:
+        return len(self._validas)
+
+    def __contains__(self, chave: Hashable) -> bool:
+        return chave in self._validas
+
+    # ---------- prazos ----------
+    def agendar(self, chave: Hashable, prazo: float, so_adiar: bool = False) -> None:
+        with self._cond:
+            atual = self._validas.get(chave)
+            if atual is not None and so_adiar and atual[0] >= prazo:
+                return
+            seq = next(self._seq)
+            self._validas[chave] = (prazo, seq)
+            heapq.heappush(self._heap, (prazo, seq, chave))
+            self.estatisticas["agendados"] += 1
+            self._compactar()
+            # só acorda a thread se o próximo prazo ficou mais cedo
+            if self._heap[0][1] == seq:
+                self._cond.notify()
+
+    def agendar_varios(self, prazos: Dict[Hashable, float]) -> None:
+        """Carga inicial: monta o heap de uma vez (O(n)) em vez de n inserções."""
+        with self._cond:
+            for chave, prazo in prazos.items():
+                self._validas[chave] = (prazo, next(self._seq))
+            self._heap = [(prazo, seq, chave) for chave, (prazo, seq) in self._validas.items()]
+            heapq.heapify(self._heap)
+            self.estatisticas["agendados"] += len(prazos)
+            self._cond.notify()
+
+    def cancelar(self, chave: Hashable) -> bool:
+        with self._cond:
+            if self._validas.pop(chave, None) is None:
+                return False
+            self.estatisticas["cancelados"] += 1
+            self._compactar()
+            return True
+
+    def prazo(self, chave: Hashable) -> Optional[float]:
+        with self._cond:
+            atual = self._validas.get(chave)
+            return atual[0] if atual else None
+
+    def proximo(self) -> Optional[float]:
+        with self._cond:
+            self._descartar_topo()
+            return self._heap[0][0] if self._heap else None
+
+    def limpar(self) -> None:
+        with self._cond:
+            self._heap.clear()
+            self._validas.clear()
+
+    def _descartar_topo(self) -> None:
+        while self._heap:
+            prazo, seq, chave = self._heap[0]
+            if self._validas.get(chave, (None, None))[1] == seq:
+                return
+            heapq.heappop(self._heap)
+
+    def _compactar(self) -> None:
+        if len(self._heap) > 2 * len(self._validas) + 64:
+            self._heap = [(prazo, seq, chave) for chave, (prazo, seq) in self._validas.items()]
+            heapq.heapify(self._heap)
+
+    def retirar_vencidos(self, agora: Optional[float] = None) -> List[Vencido]:
+        """Tira do heap até `lote_max` chaves com prazo <= agora."""
+        limite = self.relogio() if agora is None else agora
+        lote: List[Vencido] = []
+        with self._cond:
+            while len(lote) < self.lote_max:
+                self._descartar_topo()
+                if not self._heap or self._heap[0][0] > limite:
+                    break
+                prazo, _, chave = heapq.heappop(self._heap)
+                del self._validas[chave]
+                lote.append((chave, prazo))
+        return lote
+
+    # ---------- execução ----------
+    def processar(self, agora: Optional[float] = None) -> int:
+        """Aplica os vencidos agora, na thread de quem chama. Retorna quantos venceram."""
+        total = 0
+        while True:
+            lote = self.retirar_vencidos(agora)
+            if not lote:
+                return total
+            total += len(lote)
+            self._aplicar(lote)
+
+    def _aplicar(self, lote: List[Vencido]) -> None:
+        try:
+            self.ao_vencer(lote)
+            self.estatisticas["vencidos"] += len(lote)
+            self.estatisticas["lotes"] += 1
+        except Exception:
+            self.estatisticas["falhas"] += 1
+            logger.exception("agenda %s: falha ao processar %d prazo(s)", self.nome, len(lote))
+            novo = self.relogio() + self.repetir_s
+            with self._cond:
+                for chave, _ in lote:
+                    if chave not in self._validas:
+                        seq = next(self._seq)
+                        self._validas[chave] = (novo, seq)
+                        heapq.heappush(self._heap, (novo, seq, chave))
+
+    def _laco(self) -> None:
+        while True:
+            with self._cond:
+                while not self._parando:
+                    self._descartar_topo()
+                    espera = (self._heap[0][0] - self.relogio()) if self._heap else None
+                    if espera is not None and espera <= 0:
+                        break
+                    self._cond.wait(espera)
+                if self._parando:
+                    return
+                # janela curta para o lote juntar os prazos que vencem logo em seguida
+                if self.janela > 0:
+                    self._cond.wait(self.janela)
+                    if self._parando:
+                        return
+            self.processar()
+
+    def iniciar(self) -> None:
+        with self._cond:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._parando = False
+            self._thread = threading.Thread(target=self._laco, name=f"agenda-{self.nome}", daemon=True)
+            self._thread.start()
+
+    def parar(self, timeout: float = 5.0) -> None:
+        with self._cond:
+            self._parando = True
+            self._cond.notify_all()
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        self._thread = None
@@ -0,0 +1,364 @@
+# src/common/busca.py
+"""
+Busca de produtos no cardápio (GET /produtos/busca).
+
+Índice invertido em memória sobre nome, restrições e descrição:
+- texto normalizado sem acento e em minúsculas ("Feijão" == "feijao");
+- termo exato > prefixo ("fran" -> "frango") > aproximado por trigramas
+  (similaridade de Jaccard, como o pg_trgm: "frnago" -> "frango");
+- todos os termos da consulta precisam casar ("sem lactose").
+
+O índice acompanha o cardápio de forma incremental: após cada commit que
+altera produtos, `src.common.cache_cardapio` avisa quais ids mudaram e só
+esses são relidos na próxima busca (UPDATE em massa -> reconstrução total).
+Mudanças feitas em outro worker aparecem em até CARDAPIO_CACHE_TTL segundos.
+
+Catálogos grandes: BUSCA_BACKEND=postgres usa tsvector + pg_trgm no banco.
+A migração e4a9b1c7d352 cria as extensões (pg_trgm e unaccent são "trusted"
+desde o Postgres 13: basta ser dono do banco), o wrapper IMMUTABLE
+`f_unaccent` (o `unaccent` é STABLE e não entra em índice) e dois índices GIN
+de expressão:
+
+    ix_produto_busca_doc   to_tsvector('portuguese', f_unaccent(nome, restrições, descrição))
+    ix_produto_nome_trgm   f_unaccent(lower(nome)) gin_trgm_ops
+
+A consulta usa exatamente essas expressões; mudar uma delas sem mudar o
+índice volta a varrer a tabela (conferir com EXPLAIN).
+
+O índice em memória é um por restaurante (tenant); a busca no Postgres filtra
+por `restaurante_id`. Índice publicado não muda mais: a atualização incremental
+monta uma cópia e a troca, então as buscas rodam sem lock e em paralelo.
+"""
+import bisect
+import heapq
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import select, text
+from sqlalchemy.orm import Session, selectinload
+
+from src.common.cache_cardapio import CARDAPIO_CACHE_TTL, registrar_ouvinte
+
+BUSCA_BACKEND = os.getenv("BUSCA_BACKEND", "memoria")   # memoria | postgres
+
+LIMIAR_SIMILARIDADE = 0.25    # pg_trgm usa 0.3; um pouco abaixo para pegar letras trocadas
+PESO_PREFIXO = 0.8
+PESO_APROXIMADO = 0.6
+MAX_EXPANSOES = 20          # termos do vocabulário considerados por termo da consulta
+
+# peso de cada campo no ranking
+PESOS_CAMPOS = {"nome": 3.0, "restricoes": 2.0, "descricao": 1.0}
+
+STOPWORDS = frozenset({"a", "o", "as", "os", "de", "da", "do", "das", "dos", "e", "em", "na", "no", "nas", "nos", "ao", "com", "um", "uma"})
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def dobrar_acentos(texto: str) -> str:
+    decomposto = unicodedata.normalize("NFKD", texto or "")
+    return "".join(c for c in decomposto if not unicodedata.combining(c)).lower()
+
+
+def tokenizar(texto: str) -> List[str]:
+    return [t for t in _TOKEN.findall(dobrar_acentos(texto)) if t not in STOPWORDS]
+
+
+def trigramas(termo: str) -> Set[str]:
+    # mesmo preenchimento do pg_trgm: dois espaços antes, um depois
+    p = f"  {termo} "
+    return {p[i:i + 3] for i in range(len(p) - 2)}
+
+
+class IndiceBusca:
+    """
+    Índice invertido com vocabulário ordenado (prefixo) e trigramas (aproximado).
+    Não é thread-safe para escrita; depois de `congelar()` a busca só lê e pode
+    rodar em várias threads ao mesmo tempo.
+    """
+
+    def __init__(self):
+        self._postings: Dict[str, Dict[int, float]] = defaultdict(dict)   # termo -> {doc: peso}
+        self._termos_doc: Dict[int, Set[str]] = {}
+        self._trigramas: Dict[str, Set[str]] = defaultdict(set)          # trigrama -> termos
+        self._vocabulario: List[str] = []
+        self._vocabulario_sujo = False
+        self.meta: Dict[int, dict] = {}
+
+    def __len__(self) -> int:
+        return len(self._termos_doc)
+
+    def copia(self) -> "IndiceBusca":
+        novo = IndiceBusca()
+        novo._postings = defaultdict(dict, {t: dict(docs) for t, docs in self._postings.items()})
+        novo._termos_doc = {d: set(termos) for d, termos in self._termos_doc.items()}
+        novo._trigramas = defaultdict(set, {t: set(termos) for t, termos in self._trigramas.items()})
+        novo._vocabulario = list(self._vocabulario)
+        novo._vocabulario_sujo = self._vocabulario_sujo
+        novo.meta = dict(self.meta)
+        return novo
+
+    def congelar(self) -> "IndiceBusca":
+        """Ordena o vocabulário agora, para que `buscar` não escreva nada."""
+        if self._vocabulario_sujo:
+            self._vocabulario = sorted(self._postings)
+            self._vocabulario_sujo = False
+        return self
+
+    def adicionar(self, doc_id: int, campos: Dict[str, Iterable[str]], meta: Optional[dict] = None) -> None:
+        self.remover(doc_id)
+        pesos: Dict[str, float] = {}
+        for campo, valores in campos.items():
+            peso = PESOS_CAMPOS.get(campo, 1.0)
+            for valor in valores:
+                for termo in tokenizar(valor):
+                    pesos[termo] = max(pesos.get(termo, 0.0), peso)
+        for termo, peso in pesos.items():
+            if termo not in self._postings:
+                for tri in trigramas(termo):
+                    self._trigramas[tri].add(termo)
+                self._vocabulario_sujo = True
+            self._postings[termo][doc_id] = peso
+        self._termos_doc[doc_id] = set(pesos)
+        self.meta[doc_id] = meta or {}
+
+    def remover(self, doc_id: int) -> None:
+        for termo in self._termos_doc.pop(doc_id, ()):
+            docs = self._postings.get(termo)
+            if docs is None:
+                continue
+            docs.pop(doc_id, None)
+            if not docs:
+                del self._postings[termo]
+                for tri in trigramas(termo):
+                    self._trigramas[tri].discard(termo)
+                self._vocabulario_sujo = True
+        self.meta.pop(doc_id, None)
+
+    def _expandir(self, termo: str) -> Dict[str, float]:
+        """Termos do vocabulário que casam com `termo` e o peso de cada casamento."""
+        if self._vocabulario_sujo:
+            self._vocabulario = sorted(self._postings)
+            self._vocabulario_sujo = False
+
+        expansoes: Dict[str, float] = {}
+        if termo in self._postings:
+            expansoes[termo] = 1.0
+        if len(termo) >= 2:
+            i = bisect.bisect_left(self._vocabulario, termo)
+            while i < len(self._vocabulario) and len(expansoes) < MAX_EXPANSOES:
+                candidato = self._vocabulario[i]
+                if not candidato.startswith(termo):
+                    break
+                expansoes.setdefault(candidato, PESO_PREFIXO)
+                i += 1
+        if expansoes or len(termo) < 3:
+            return expansoes
+
+        tris = trigramas(termo)
+        comuns: Dict[str, int] = defaultdict(int)
+        for tri in tris:
+            for candidato in self._trigramas.get(tri, ()):
+                comuns[candidato] += 1
+        similares = []
+        for candidato, n in comuns.items():
+            sim = n / (len(tris) + len(trigramas(candidato)) - n)
+            if sim >= LIMIAR_SIMILARIDADE:
+                similares.append((sim, candidato))
+        for sim, candidato in sorted(similares, reverse=True)[:MAX_EXPANSOES]:
+            expansoes[candidato] = PESO_APROXIMADO * sim
+        return expansoes
+
+    def buscar(self, consulta: str, limite: int = 20, filtro=None) -> List[Tuple[int, float]]:
+        termos = tokenizar(consulta)
+        if not termos:
+            return []
+        pontuacao: Optional[Dict[int, float]] = None
+        for termo in dict.fromkeys(termos):
+            parcial: Dict[int, float] = {}
+            for casado, peso_casamento in self._expandir(termo).items():
+                for doc_id, peso_campo in self._postings.get(casado, {}).items():
+                    valor = peso_casamento * peso_campo
+                    if valor > parcial.get(doc_id, 0.0):
+                        parcial[doc_id] = valor
+            if pontuacao is None:
+                pontuacao = parcial
+            else:
+                # todos os termos precisam casar
+                pontuacao = {d: s + parcial[d] for d, s in pontuacao.items() if d in parcial}
+            if not pontuacao:
+                return []
+        itens = pontuacao.items()
+        if filtro is not None:
+            itens = [(d, s) for d, s in itens if filtro(self.meta.get(d, {}))]
+        return heapq.nsmallest(limite, itens, key=lambda x: (-x[1], x[0]))
+
+
+class _IndiceRestaurante:
+    """Estado de sincronização do índice de um restaurante."""
+
+    def __init__(self):
+        self.indice: Optional[IndiceBusca] = None     # publicado: congelado, nunca alterado
+        self.construido_em = 0.0
+        self.pendentes: Set[int] = set()
+        self.reconstruir = True
+        self.atualizando = False                      # uma thread monta a próxima versão
+
+
+class BuscaProdutos:
+    """
+    Mantém um `IndiceBusca` por restaurante sincronizado com o banco: a busca
+    de um restaurante só percorre o vocabulário dele, e a edição do cardápio
+    de um não reconstrói o índice dos outros.
+    """
+
+    def __init__(self, ttl: float = CARDAPIO_CACHE_TTL):
+        self.ttl = ttl
+        self._indices: Dict[Optional[int], _IndiceRestaurante] = {}
+        self._lock = threading.Lock()
+
+    def notificar(self, ids: Optional[Set[int]], restaurante_id: Optional[int] = None) -> None:
+        """Ouvinte do cache do cardápio (chamado após o commit)."""
+        with self._lock:
+            if restaurante_id is None:
+                # não se sabe de quem: todos (e o índice sem escopo) se refazem
+                for estado in self._indices.values():
+                    estado.reconstruir = True
+                return
+            for chave in (restaurante_id, None):
+                estado = self._indices.get(chave)
+                if estado is None:
+                    continue
+                if ids is None:
+                    estado.reconstruir = True
+                else:
+                    estado.pendentes |= ids
+
+    @staticmethod
+    def _campos(p) -> Dict[str, List[str]]:
+        return {
+            "nome": [p.nome or ""],
+            "restricoes": list(p.restricoes or []),
+            "descricao": [p.descricao or ""],
+        }
+
+    def _sincronizar(self, db: Session, restaurante_id: Optional[int] = None) -> IndiceBusca:
+        from src.infra.sqlalchemy.models.produto import Produto
+
+        def _do_restaurante(stmt):
+            return stmt if restaurante_id is None else stmt.where(Produto.restaurante_id == restaurante_id)
+
+        # o lock só protege o estado: leitura do banco e montagem ficam fora
+        # dele, numa thread por restaurante; as outras seguem buscando no
+        # índice publicado, que não muda
+        with self._lock:
+            estado = self._indices.setdefault(restaurante_id, _IndiceRestaurante())
+            expirado = time.monotonic() - estado.construido_em >= self.ttl
+            refazer = estado.indice is None or estado.reconstruir or expirado
+            if estado.atualizando:
+                if estado.indice is not None:
+                    return estado.indice
+                publicar = False      # primeira montagem em curso: monta uma só para esta busca
+            elif not refazer and not estado.pendentes:
+                return estado.indice
+            else:
+                publicar = True
+                estado.atualizando = True
+                ids, estado.pendentes = estado.pendentes, set()
+                if refazer:
+                    estado.reconstruir = False
+
+        if not publicar:
+            indice = IndiceBusca()
+            for p in db.scalars(_do_restaurante(select(Produto))):
+                indice.adicionar(p.id, self._campos(p), {"disponivel": p.disponivel})
+            return indice.congelar()
+
+        try:
+            if refazer:
+                indice = IndiceBusca()
+                for p in db.scalars(_do_restaurante(select(Produto))):
+                    indice.adicionar(p.id, self._campos(p), {"disponivel": p.disponivel})
+                # avisos que chegaram durante a montagem podem ser de commits que
+                # a leitura acima não viu: entram no índice novo antes da troca
+                with self._lock:
+                    ids, estado.pendentes = estado.pendentes, set()
+            else:
+                indice = estado.indice.copia()
+            if ids:
+                # populate_existing: na mesma sessão da montagem, o mapa de identidade
+                # devolveria o produto como foi lido antes do commit que avisou
+                stmt = _do_restaurante(select(Produto).where(Produto.id.in_(ids)))
+                relidos = list(db.scalars(stmt.execution_options(populate_existing=True)))
+                for p in relidos:
+                    indice.adicionar(p.id, self._campos(p), {"disponivel": p.disponivel})
+                for removido in ids - {p.id for p in relidos}:
+                    indice.remover(removido)
+            indice.congelar()
+        except BaseException:
+            with self._lock:
+                estado.atualizando = False
+                estado.reconstruir = estado.reconstruir or refazer
+                estado.pendentes |= ids
+            raise
+        with self._lock:
+            estado.indice, estado.atualizando = indice, False
+            if refazer:
+                estado.construido_em = time.monotonic()
+            return indice
+
+    def buscar_ids(self, db: Session, consulta: str, limite: int = 20, somente_disponiveis: bool = False,
+                   restaurante_id: Optional[int] = None) -> List[int]:
+        if BUSCA_BACKEND == "postgres":
+            return _buscar_ids_postgres(db, consulta, limite, somente_disponiveis, restaurante_id)
+        filtro = (lambda meta: meta.get("disponivel", True)) if somente_disponiveis else None
+        indice = self._sincronizar(db, restaurante_id)
+        return [doc_id for doc_id, _ in indice.buscar(consulta, limite, filtro)]
+
+    def buscar(self, db: Session, consulta: str, limite: int = 20, somente_disponiveis: bool = False,
+               restaurante_id: Optional[int] = None) -> list:
+        """Produtos (com categoria carregada) na ordem do ranking."""
+        from src.infra.sqlalchemy.models.produto import Produto
+
+        ids = self.buscar_ids(db, consulta, limite, somente_disponiveis, restaurante_id)
+        if not ids:
+            return []
+        stmt = select(Produto).where(Produto.id.in_(ids)).options(selectinload(Produto.categoria))
+        por_id = {p.id: p for p in db.scalars(stmt)}
+        return [por_id[i] for i in ids if i in por_id]
+
+
+# mesmas expressões dos índices da migração e4a9b1c7d352
+_DOC_POSTGRES = (
+    "to_tsvector('portuguese', f_unaccent(coalesce(p.nome, '') || ' ' || "
+    "coalesce(p.restricoes::text, '') || ' ' || coalesce(p.descricao, '')))"
+)
+_SQL_POSTGRES = text(f"""
+    SELECT p.id
+    FROM produto p
+    WHERE (NOT :somente_disponiveis OR p.disponivel)
+      AND (CAST(:restaurante_id AS integer) IS NULL OR p.restaurante_id = :restaurante_id)
+      AND ({_DOC_POSTGRES} @@ plainto_tsquery('portuguese', f_unaccent(:consulta))
+           OR f_unaccent(lower(p.nome)) % f_unaccent(lower(:consulta)))
+    ORDER BY ts_rank({_DOC_POSTGRES}, plainto_tsquery('portuguese', f_unaccent(:consulta))) DESC,
+             similarity(f_unaccent(lower(p.nome)), f_unaccent(lower(:consulta))) DESC,
+             p.id
+    LIMIT :limite
+""")
+
+
+def _buscar_ids_postgres(db: Session, consulta: str, limite: int, somente_disponiveis: bool,
+                         restaurante_id: Optional[int] = None) -> List[int]:
+    params = {
+        "consulta": consulta, "limite": limite, "somente_disponiveis": somente_disponiveis,
+        "restaurante_id": restaurante_id,
+    }
+    return list(db.scalars(_SQL_POSTGRES, params))
+
+
+busca_produtos = BuscaProdutos()
+registrar_ouvinte(busca_produtos.notificar)
@@ -0,0 +1,226 @@
+# src/common/cache_cardapio.py
+"""
+Cache dos payloads públicos do cardápio (produtos, categorias, recomendados)
+e de estruturas derivadas dele (ver `CacheCardapio.derivado`).
+
+Cada payload é serializado uma vez por versão do cardápio e guarda as
+variantes comprimidas (gzip/br) geradas sob demanda — a compressão é paga
+uma vez por versão, não por requisição. Qualquer commit que toque em
+Produto/Categoria incrementa a versão (ver `instalar_invalidacao`).
+
+Versões, payloads e derivados são por restaurante (tenant): a edição do
+cardápio de um restaurante descarta só o que é dele — com centenas de
+restaurantes no mesmo processo, um admin editando o preço não esvazia o cache
+dos outros. `restaurante_id=None` é o cardápio sem escopo (scripts) e, na
+invalidação, "todos".
+
+Cache por processo: com vários workers, CARDAPIO_CACHE_TTL limita por quanto
+tempo um worker pode servir a versão anterior após uma edição feita em outro.
+"""
+import hashlib
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from fastapi import Request, Response
+from sqlalchemy import event, inspect
+
+from src.common.compressao import COMPRESSAO_MIN_BYTES, comprimir, escolher_codificacao
+from src.common.disjuntor import respostas_estaveis
+from src.common.respostas import MEDIA_JSON
+
+CARDAPIO_CACHE_TTL = float(os.getenv("CARDAPIO_CACHE_TTL", "30"))
+# teto de payloads guardados, somando todos os restaurantes (chaves incluem
+# filtros e a versão das recomendações)
+CARDAPIO_CACHE_MAX_CHAVES = int(os.getenv("CARDAPIO_CACHE_MAX_CHAVES", "512"))
+
+
+Versao = Tuple[int, int]      # (geral, do restaurante)
+
+
+@dataclass
+class Payload:
+    corpo: bytes
+    versao: Versao
+    etag: str
+    criado_em: float
+    variantes: Dict[str, bytes] = field(default_factory=dict)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def variante(self, codificacao: str) -> bytes:
+        comprimido = self.variantes.get(codificacao)
+        if comprimido is None:
+            with self._lock:
+                comprimido = self.variantes.get(codificacao)
+                if comprimido is None:
+                    comprimido = comprimir(self.corpo, codificacao, precomprimido=True)
+                    self.variantes[codificacao] = comprimido
+        return comprimido
+
+
+class CacheCardapio:
+    def __init__(self, ttl: float = CARDAPIO_CACHE_TTL):
+        self.ttl = ttl
+        self.versao = 1                                   # geral: muda em "invalidar todos"
+        self._versoes: Dict[Optional[int], int] = {}      # restaurante -> versão própria
+        self._payloads: Dict[Tuple[Optional[int], str], Payload] = {}
+        self._derivados: Dict[Tuple[Optional[int], str], Tuple[Versao, float, Any]] = {}
+        self._lock = threading.Lock()
+
+    def versao_de(self, restaurante_id: Optional[int] = None) -> Versao:
+        return self.versao, self._versoes.get(restaurante_id, 0)
+
+    def invalidar(self, restaurante_id: Optional[int] = None) -> Versao:
+        """
+        Nova versão do cardápio do restaurante: descarta os payloads e as
+        estruturas derivadas dele. Sem restaurante, de todos.
+        """
+        with self._lock:
+            if restaurante_id is None:
+                self.versao += 1
+                self._payloads.clear()
+                self._derivados.clear()
+            else:
+                self._versoes[restaurante_id] = self._versoes.get(restaurante_id, 0) + 1
+                for itens in (self._payloads, self._derivados):
+                    for chave in [c for c in itens if c[0] == restaurante_id]:
+                        del itens[chave]
+            return self.versao_de(restaurante_id)
+
+    def derivado(self, nome: str, construir: Callable[[], Any], restaurante_id: Optional[int] = None) -> Any:
+        """
+        Estrutura derivada do cardápio (ex.: bitsets de restrições), construída
+        uma vez por versão do cardápio do restaurante — mesma regra de
+        validade dos payloads.
+        """
+        agora = time.monotonic()
+        chave = (restaurante_id, nome)
+        versao = self.versao_de(restaurante_id)
+        atual = self._derivados.get(chave)
+        if atual is not None and atual[0] == versao and agora - atual[1] < self.ttl:
+            return atual[2]
+
+        valor = construir()
+        with self._lock:
+            if versao == self.versao_de(restaurante_id) and self.ttl > 0:
+                self._derivados[chave] = (versao, agora, valor)
+        return valor
+
+    def obter(self, chave: str, gerar: Callable[[], bytes], restaurante_id: Optional[int] = None) -> Payload:
+        agora = time.monotonic()
+        chave_cache = (restaurante_id, chave)
+        versao = self.versao_de(restaurante_id)
+        atual = self._payloads.get(chave_cache)
+        if atual is not None and atual.versao == versao and agora - atual.criado_em < self.ttl:
+            return atual
+
+        corpo = gerar()
+        # ETag pelo conteúdo, não pela versão: o contador de versões recomeça em
+        # cada worker/reinício, e o mesmo ETag em dois workers com corpos
+        # diferentes daria 304 para um cardápio (ou preço) velho
+        etag = f'"cardapio-{hashlib.blake2b(corpo, digest_size=12).hexdigest()}"'
+        novo = Payload(corpo=corpo, versao=versao, etag=etag, criado_em=agora)
+        with self._lock:
+            # se o cardápio mudou durante a geração, serve mas não guarda
+            if versao == self.versao_de(restaurante_id) and self.ttl > 0:
+                self._payloads.pop(chave_cache, None)
+                while len(self._payloads) >= CARDAPIO_CACHE_MAX_CHAVES:
+                    # dict mantém a ordem de inserção: descarta o mais antigo
+                    self._payloads.pop(next(iter(self._payloads)))
+                self._payloads[chave_cache] = novo
+        return novo
+
+
+cache_cardapio = CacheCardapio()
+
+
+def responder(request: Request, chave: str, gerar: Callable[[], bytes],
+              cache: Optional[CacheCardapio] = None, restaurante_id: Optional[int] = None) -> Response:
+    """
+    Resposta JSON de um payload cacheado: 304 se o ETag bater, variante
+    pré-comprimida se o cliente aceitar e o corpo passar do tamanho mínimo.
+    """
+    payload = (cache or cache_cardapio).obter(chave, gerar, restaurante_id)
+    # o restaurante pode vir no header (get_restaurante_publico): caches no
+    # caminho não podem servir o cardápio de um tenant a outro
+    headers = {"ETag": payload.etag, "Vary": "Accept-Encoding, X-Restaurante-Id"}
+    # última versão boa desta URL, servida se o banco cair (src.common.disjuntor)
+    respostas_estaveis.guardar(request, payload.corpo)
+
+    if request.headers.get("if-none-match") == payload.etag:
+        return Response(status_code=304, headers=headers)
+
+    codificacao = escolher_codificacao(request.headers.get("accept-encoding", ""))
+    if codificacao and len(payload.corpo) >= COMPRESSAO_MIN_BYTES:
+        headers["Content-Encoding"] = codificacao
+        return Response(payload.variante(codificacao), media_type=MEDIA_JSON, headers=headers)
+    return Response(payload.corpo, media_type=MEDIA_JSON, headers=headers)
+
+
+# ---------------- invalidação transacional ----------------
+
+# Consumidores incrementais (ex.: índice de busca): recebem, após o commit, os
+# ids de produtos alterados de um restaurante, ou None quando a mudança não é
+# rastreável por id (UPDATE/DELETE em massa); restaurante None = qualquer um
+_ouvintes: List[Callable[[Optional[Set[int]], Optional[int]], None]] = []
+
+
+def registrar_ouvinte(fn: Callable[[Optional[Set[int]], Optional[int]], None]) -> None:
+    _ouvintes.append(fn)
+
+
+def _restaurante_de(obj) -> Optional[int]:
+    # lido do estado carregado, sem SELECT (objeto apagado/expirado conta como "qualquer")
+    return inspect(obj).dict.get("restaurante_id")
+
+
+def _invalidar(cache: CacheCardapio, sujos: Set[Optional[int]],
+               produtos: Dict[Optional[int], Optional[Set[int]]]) -> None:
+    if None in sujos:
+        cache.invalidar()
+    else:
+        for restaurante_id in sujos:
+            cache.invalidar(restaurante_id)
+    for restaurante_id, ids in produtos.items():
+        for fn in _ouvintes:
+            fn(ids, restaurante_id)
+
+
+def instalar_invalidacao(session_factory, cache: Optional[CacheCardapio] = None) -> None:
+    """
+    Quando um flush ou UPDATE/DELETE em massa toca Produto/Categoria, agenda a
+    invalidação do cache para depois do commit (nunca antes: um leitor concorrente
+    regeraria o payload com os dados antigos). O restaurante vem da linha no
+    flush e, no DML em massa, do tenant fixado na sessão pelo repositório.
+    """
+    from src.infra.sqlalchemy.config.unidade_trabalho import apos_commit, restaurante_da_sessao
+    from src.infra.sqlalchemy.models.categoria import Categoria
+    from src.infra.sqlalchemy.models.produto import Produto
+
+    cache = cache or cache_cardapio
+    modelos = (Produto, Categoria)
+    mappers = {Produto.__mapper__, Categoria.__mapper__}
+
+    @event.listens_for(session_factory, "after_flush")
+    def _apos_flush(session, flush_context):
+        sujos: Set[Optional[int]] = set()
+        ids: Dict[Optional[int], Optional[Set[int]]] = {}
+        for obj in (*session.new, *session.dirty, *session.deleted):
+            if isinstance(obj, modelos):
+                restaurante_id = _restaurante_de(obj)
+                sujos.add(restaurante_id)
+                if isinstance(obj, Produto):
+                    ids.setdefault(restaurante_id, set()).add(obj.id)
+        if sujos:
+            apos_commit(session, _invalidar, cache, sujos, ids)
+
+    @event.listens_for(session_factory, "do_orm_execute")
+    def _apos_dml(orm_execute_state):
+        if (orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert) \
+                and orm_execute_state.bind_mapper in mappers:
+            session = orm_execute_state.session
+            restaurante_id = restaurante_da_sessao(session)
+            ids = {restaurante_id: None} if orm_execute_state.bind_mapper is Produto.__mapper__ else {}
+            apos_commit(session, _invalidar, cache, {restaurante_id}, ids)
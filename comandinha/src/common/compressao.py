@@ -0,0 +1,141 @@
+# src/common/compressao.py
+import gzip
+import os
+from typing import Optional
+
+from anyio import to_thread
+
+# Brotli é opcional: sem o pacote, negociamos só gzip
+try:
+    import brotli  # pip install Brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+COMPRESSAO_MIN_BYTES = int(os.getenv("COMPRESSAO_MIN_BYTES", "1024"))
+# acima disso o middleware comprime no threadpool do anyio, fora do event loop
+COMPRESSAO_THREAD_BYTES = int(os.getenv("COMPRESSAO_THREAD_BYTES", str(64 * 1024)))
+
+# Níveis para compressão por requisição (rápidos) e para payloads pré-comprimidos
+# do cache (pagos uma vez por versão do cardápio, então vale o nível máximo)
+GZIP_NIVEL_DINAMICO = 6
+BROTLI_QUALIDADE_DINAMICA = 5
+GZIP_NIVEL_PRECOMPRIMIDO = 9
+BROTLI_QUALIDADE_PRECOMPRIMIDA = 11
+
+_TIPOS_COMPRIMIVEIS = ("application/json", "text/", "application/javascript")
+
+
+def codificacoes_suportadas() -> tuple:
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def escolher_codificacao(accept_encoding: str) -> Optional[str]:
+    """
+    Escolhe br > gzip conforme o Accept-Encoding do cliente. q=0 recusa a
+    codificação; "*" só vale para as que o cliente não listou.
+    """
+    aceitas = {}
+    for parte in (accept_encoding or "").lower().split(","):
+        nome, *params = [p.strip() for p in parte.split(";")]
+        q = 1.0
+        for p in params:
+            if p.startswith("q="):
+                try:
+                    q = float(p[2:])
+                except ValueError:
+                    q = 0.0
+        if nome:
+            aceitas[nome] = q
+    for cod in codificacoes_suportadas():
+        if aceitas.get(cod, aceitas.get("*", 0.0)) > 0:
+            return cod
+    return None
+
+
+def comprimir(corpo: bytes, codificacao: str, precomprimido: bool = False) -> bytes:
+    if codificacao == "br":
+        q = BROTLI_QUALIDADE_PRECOMPRIMIDA if precomprimido else BROTLI_QUALIDADE_DINAMICA
+        return brotli.compress(corpo, quality=q)
+    nivel = GZIP_NIVEL_PRECOMPRIMIDO if precomprimido else GZIP_NIVEL_DINAMICO
+    return gzip.compress(corpo, compresslevel=nivel, mtime=0)
+
+
+class CompressaoMiddleware:
+    """
+    Middleware ASGI de compressão gzip/brotli com tamanho mínimo.
+
+    - Só comprime respostas de corpo único (as rotas do app não fazem streaming;
+      respostas em streaming passam sem compressão).
+    - Respeita respostas que já trazem Content-Encoding (ex.: payloads
+      pré-comprimidos do cache do cardápio).
+    - Corpos a partir de `thread_bytes` são comprimidos no threadpool: no
+      event loop, um JSON grande pararia todas as outras requisições.
+    """
+
+    def __init__(self, app, minimo_bytes: int = COMPRESSAO_MIN_BYTES,
+                 thread_bytes: int = COMPRESSAO_THREAD_BYTES):
+        self.app = app
+        self.minimo_bytes = minimo_bytes
+        self.thread_bytes = thread_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept = ""
+        for nome, valor in scope.get("headers", []):
+            if nome == b"accept-encoding":
+                accept = valor.decode("latin-1")
+                break
+        codificacao = escolher_codificacao(accept)
+        if codificacao is None:
+            await self.app(scope, receive, send)
+            return
+
+        inicio = None
+        repassar = False
+
+        async def _send(message):
+            nonlocal inicio, repassar
+            if message["type"] == "http.response.start":
+                inicio = message
+                return
+            if message["type"] != "http.response.body" or repassar:
+                await send(message)
+                return
+
+            corpo = message.get("body", b"")
+            mais = message.get("more_body", False)
+            headers = {k.lower(): v for k, v in inicio.get("headers", [])}
+            tipo = headers.get(b"content-type", b"").decode("latin-1")
+
+            if (
+                mais
+                or b"content-encoding" in headers
+                or len(corpo) < self.minimo_bytes
+                or not tipo.startswith(_TIPOS_COMPRIMIVEIS)
+            ):
+                repassar = True
+                await send(inicio)
+                await send(message)
+                return
+
+            if len(corpo) >= self.thread_bytes:
+                comprimido = await to_thread.run_sync(comprimir, corpo, codificacao)
+            else:
+                comprimido = comprimir(corpo, codificacao)
+            novos = [
+                (k, v) for k, v in inicio.get("headers", [])
+                if k.lower() not in (b"content-length", b"vary")
+            ]
+            vary = headers.get(b"vary")
+            novos += [
+                (b"content-encoding", codificacao.encode()),
+                (b"content-length", str(len(comprimido)).encode()),
+                (b"vary", (vary + b", Accept-Encoding") if vary else b"Accept-Encoding"),
+            ]
+            await send({**inicio, "headers": novos})
+            await send({"type": "http.response.body", "body": comprimido})
+
+        await self.app(scope, receive, _send)
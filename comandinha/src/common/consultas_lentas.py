@@ -0,0 +1,329 @@
+# src/common/consultas_lentas.py
+"""
+Captura automática do plano (EXPLAIN) das consultas lentas.
+
+Os eventos do engine cronometram cada statement. Passou de CONSULTA_LENTA_MS,
+o statement entra num registro por impressão digital (SQL com literais,
+placeholders e listas do IN normalizados): ocorrências, tempo total/máximo,
+últimos parâmetros. Na primeira vez — e de novo a cada
+CONSULTA_LENTA_REPLANO_S, para ver se um índice novo resolveu — uma thread
+própria roda o EXPLAIN numa conexão separada, fora da requisição:
+
+    SQLite    EXPLAIN QUERY PLAN <sql>
+    Postgres  EXPLAIN [(ANALYZE, BUFFERS)] <sql>
+
+ANALYZE (CONSULTA_LENTA_ANALYZE=1, só Postgres) executa a consulta de novo:
+vale só para SELECT e roda numa transação desfeita, com statement_timeout
+de CONSULTA_LENTA_EXPLAIN_TIMEOUT_MS. As varreduras sem índice do plano
+("SCAN mesas", "Seq Scan on pedidos") ficam em `varreduras` — é a pista de
+índice faltando sob tráfego real.
+
+Instalado no primário e em cada réplica de leitura: o EXPLAIN roda no banco
+onde a consulta foi lenta (o do último exemplo, em `banco`), porque réplica
+e primário podem ter estatísticas e planos diferentes.
+
+Registro limitado (CONSULTAS_LENTAS_MAX, sai a impressão lenta há mais
+tempo) e por worker: GET /admin/consultas-lentas. CONSULTA_LENTA_MS=0
+desliga; com ele ligado, o custo por statement é um perf_counter.
+"""
+import hashlib
+import logging
+import os
+import queue
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+CONSULTA_LENTA_MS = float(os.getenv("CONSULTA_LENTA_MS", "200"))
+CONSULTA_LENTA_ANALYZE = os.getenv("CONSULTA_LENTA_ANALYZE", "0") == "1"
+CONSULTA_LENTA_REPLANO_S = float(os.getenv("CONSULTA_LENTA_REPLANO_S", "600"))
+CONSULTA_LENTA_EXPLAIN_TIMEOUT_MS = int(os.getenv("CONSULTA_LENTA_EXPLAIN_TIMEOUT_MS", "5000"))
+CONSULTAS_LENTAS_MAX = int(os.getenv("CONSULTAS_LENTAS_MAX", "200"))
+
+_MAX_SQL = 4000             # caracteres do SQL guardados por impressão
+_MAX_PARAMETRO = 120        # repr de cada parâmetro
+_MAX_PARAMETROS = 30
+
+_CHAVE_INICIOS = "consultas_lentas_inicios"
+
+_RE_STRING = re.compile(r"'(?:[^']|'')*'")
+_RE_MARCADOR = re.compile(r"%\(\w+\)s|%s|\$\d+|:\w+|\?")
+_RE_NUMERO = re.compile(r"\b\d+(?:\.\d+)?\b")
+_RE_LISTA = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_RE_ESPACOS = re.compile(r"\s+")
+
+# só o que tem plano (DDL, PRAGMA, SET e afins ficam de fora)
+_VERBOS = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")
+
+_RE_VARREDURA_SQLITE = re.compile(r"^SCAN (?:TABLE )?(\w+)(?!.*\bUSING\b)")
+_RE_VARREDURA_PG = re.compile(r"Seq Scan on (\w+)")
+
+
+def normalizar(statement: str) -> str:
+    """SQL sem valores: `IN (?, ?, ?)` e `IN (?)` têm a mesma impressão."""
+    sql = _RE_STRING.sub("?", statement)
+    sql = _RE_MARCADOR.sub("?", sql)
+    sql = _RE_NUMERO.sub("?", sql)
+    sql = _RE_LISTA.sub("(?...)", sql)
+    return _RE_ESPACOS.sub(" ", sql).strip()
+
+
+def impressao_digital(sql_normalizado: str) -> str:
+    return hashlib.sha1(sql_normalizado.encode("utf-8")).hexdigest()[:16]
+
+
+def _parametros(parameters, executemany: bool):
+    if executemany and parameters:
+        parameters = parameters[0]
+    if isinstance(parameters, dict):
+        itens = list(parameters.items())[:_MAX_PARAMETROS]
+        return {k: repr(v)[:_MAX_PARAMETRO] for k, v in itens}
+    if isinstance(parameters, (list, tuple)):
+        return [repr(v)[:_MAX_PARAMETRO] for v in parameters[:_MAX_PARAMETROS]]
+    return None
+
+
+class ConsultasLentas:
+    def __init__(
+        self,
+        limite_ms: float = CONSULTA_LENTA_MS,
+        max_itens: int = CONSULTAS_LENTAS_MAX,
+        analyze: bool = CONSULTA_LENTA_ANALYZE,
+        replano_s: float = CONSULTA_LENTA_REPLANO_S,
+        relogio=time.time,
+    ):
+        self.limite_ms = limite_ms
+        self.max_itens = max_itens
+        self.analyze = analyze
+        self.replano_s = replano_s
+        self.relogio = relogio
+        self.engines: list = []
+        self._itens: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._fila: "queue.Queue[tuple]" = queue.Queue(64)
+        self._thread: Optional[threading.Thread] = None
+        self._local = threading.local()     # marca a thread do EXPLAIN
+        self.estatisticas = {"lentas": 0, "planos": 0, "falhas_plano": 0, "descartadas": 0}
+
+    @property
+    def ativo(self) -> bool:
+        return self.limite_ms > 0
+
+    # ---------------- eventos do engine ----------------
+    def instalar(self, engine) -> None:
+        if not self.ativo or engine in self.engines:
+            return
+        self.engines.append(engine)
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def _antes(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault(_CHAVE_INICIOS, []).append(time.perf_counter())
+
+        @event.listens_for(engine, "after_cursor_execute")
+        def _depois(conn, cursor, statement, parameters, context, executemany):
+            inicios = conn.info.get(_CHAVE_INICIOS)
+            if not inicios:
+                return
+            ms = (time.perf_counter() - inicios.pop()) * 1000.0
+            if (
+                ms >= self.limite_ms
+                and not getattr(self._local, "explicando", False)
+                and statement.lstrip()[:6].upper().startswith(_VERBOS)
+            ):
+                self.registrar(statement, parameters, ms, executemany, conn.engine)
+
+        @event.listens_for(engine, "handle_error")
+        def _erro(contexto):
+            inicios = contexto.connection.info.get(_CHAVE_INICIOS) if contexto.connection is not None else None
+            if inicios:
+                inicios.pop()
+
+    def registrar(self, statement: str, parameters, ms: float, executemany: bool = False, engine=None) -> None:
+        if engine is None and self.engines:
+            engine = self.engines[0]
+        sql = normalizar(statement)
+        chave = impressao_digital(sql)
+        agora = self.relogio()
+        with self._lock:
+            self.estatisticas["lentas"] += 1
+            item = self._itens.get(chave)
+            if item is None:
+                item = self._itens[chave] = {
+                    "impressao": chave,
+                    "sql": sql[:_MAX_SQL],
+                    "verbo": sql.split(" ", 1)[0].upper() if sql else "",
+                    "ocorrencias": 0,
+                    "total_ms": 0.0,
+                    "max_ms": 0.0,
+                    "primeira_em": agora,
+                    "plano": None,
+                    "plano_em": None,
+                    "plano_analyze": False,
+                    "plano_erro": None,
+                    "varreduras": [],
+                    "_pedido_em": None,
+                }
+            item["ocorrencias"] += 1
+            item["total_ms"] += ms
+            item["max_ms"] = max(item["max_ms"], ms)
+            item["ultimo_ms"] = ms
+            item["ultima_em"] = agora
+            item["parametros"] = _parametros(parameters, executemany)
+            item["banco"] = _nome_banco(engine)
+            item["_exemplo"] = (statement, parameters[0] if executemany and parameters else parameters, engine)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
+
+            # um EXPLAIN por impressão a cada replano_s (pendente conta como feito)
+            pedir = item["_pedido_em"] is None or agora - item["_pedido_em"] >= self.replano_s
+            if pedir:
+                item["_pedido_em"] = agora
+            exemplo = item["_exemplo"]
+        if pedir and exemplo[2] is not None:
+            self._enfileirar(chave, *exemplo)
+
+    # ---------------- EXPLAIN fora da requisição ----------------
+    def _enfileirar(self, chave: str, statement: str, parameters, engine) -> None:
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._laco, name="consultas-lentas", daemon=True)
+                    self._thread.start()
+        try:
+            self._fila.put_nowait((chave, statement, parameters, engine))
+        except queue.Full:
+            self.estatisticas["descartadas"] += 1
+            with self._lock:
+                if chave in self._itens:
+                    self._itens[chave]["_pedido_em"] = None
+
+    def _laco(self) -> None:
+        self._local.explicando = True
+        while True:
+            chave, statement, parameters, engine = self._fila.get()
+            self.explicar(chave, statement, parameters, engine=engine)
+
+    def explicar(self, chave: str, statement: str, parameters, analyze: Optional[bool] = None,
+                 engine=None) -> Optional[dict]:
+        """Roda o EXPLAIN (no `engine` da consulta) e guarda o plano na impressão (se ela ainda existir)."""
+        engine = engine if engine is not None else self.engines[0]
+        analyze = self.analyze if analyze is None else analyze
+        dialeto = engine.dialect.name
+        analyze = analyze and dialeto == "postgresql" and statement.lstrip()[:6].upper() == "SELECT"
+        anterior = getattr(self._local, "explicando", False)
+        self._local.explicando = True
+        inicio = time.perf_counter()
+        try:
+            plano = self._plano(engine, statement, parameters, analyze)
+            erro = None
+            self.estatisticas["planos"] += 1
+        except Exception as e:
+            plano, erro = None, f"{type(e).__name__}: {e}"[:500]
+            self.estatisticas["falhas_plano"] += 1
+            logger.warning("consultas lentas: EXPLAIN falhou (%s): %s", chave, erro)
+        finally:
+            self._local.explicando = anterior
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is None:
+                return None
+            item["plano"] = plano
+            item["plano_erro"] = erro
+            item["plano_em"] = self.relogio()
+            item["plano_ms"] = round((time.perf_counter() - inicio) * 1000.0, 2)
+            item["plano_analyze"] = analyze and plano is not None
+            item["varreduras"] = _varreduras(plano or [])
+            return self._publico(item, com_plano=True)
+
+    def _plano(self, engine, statement: str, parameters, analyze: bool) -> List[str]:
+        dialeto = engine.dialect.name
+        # conexão própria; sair do bloco sem commit desfaz (importa no ANALYZE)
+        with engine.connect() as conn:
+            if dialeto == "postgresql":
+                conn.exec_driver_sql(f"SET LOCAL statement_timeout = {CONSULTA_LENTA_EXPLAIN_TIMEOUT_MS}")
+                opcoes = "(ANALYZE, BUFFERS) " if analyze else ""
+                linhas = conn.exec_driver_sql(f"EXPLAIN {opcoes}{statement}", parameters or ()).fetchall()
+                return [l[0] for l in linhas]
+            if dialeto == "sqlite":
+                linhas = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters or ()).fetchall()
+                # (id, pai, _, detalhe) -> árvore indentada
+                nivel = {0: -1}
+                saida = []
+                for id_, pai, _, detalhe in linhas:
+                    nivel[id_] = nivel.get(pai, -1) + 1
+                    saida.append("  " * nivel[id_] + detalhe)
+                return saida
+            linhas = conn.exec_driver_sql(f"EXPLAIN {statement}", parameters or ()).fetchall()
+            return [" | ".join(str(c) for c in l) for l in linhas]
+
+    # ---------------- consulta (admin) ----------------
+    def _publico(self, item: dict, com_plano: bool = False) -> dict:
+        dados = {k: v for k, v in item.items() if not k.startswith("_")}
+        dados["total_ms"] = round(item["total_ms"], 2)
+        dados["max_ms"] = round(item["max_ms"], 2)
+        dados["ultimo_ms"] = round(item.get("ultimo_ms", 0.0), 2)
+        dados["media_ms"] = round(item["total_ms"] / item["ocorrencias"], 2)
+        dados["tem_plano"] = item["plano"] is not None
+        if not com_plano:
+            dados.pop("plano", None)
+            dados.pop("parametros", None)
+        return dados
+
+    def listar(self, ordenar: str = "total_ms", limite: int = 50) -> dict:
+        with self._lock:
+            itens = [self._publico(i) for i in self._itens.values()]
+            estatisticas = dict(self.estatisticas)
+        itens.sort(key=lambda i: i.get(ordenar) or 0, reverse=True)
+        return {
+            "limite_ms": self.limite_ms,
+            "analyze": self.analyze,
+            "impressoes": len(itens),
+            "estatisticas": estatisticas,
+            "consultas": itens[:limite],
+        }
+
+    def reexplicar(self, chave: str, analyze: Optional[bool] = None) -> Optional[dict]:
+        """EXPLAIN de novo com o último exemplo (ex.: depois de criar um índice)."""
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is None or item["_exemplo"][2] is None:
+                return None
+            statement, parameters, engine = item["_exemplo"]
+        return self.explicar(chave, statement, parameters, analyze=analyze, engine=engine)
+
+    def detalhe(self, chave: str) -> Optional[dict]:
+        with self._lock:
+            item = self._itens.get(chave)
+            return self._publico(item, com_plano=True) if item is not None else None
+
+    def limpar(self) -> None:
+        with self._lock:
+            self._itens.clear()
+
+
+def _nome_banco(engine) -> Optional[str]:
+    return engine.url.render_as_string(hide_password=True) if engine is not None else None
+
+
+def _varreduras(plano: List[str]) -> List[str]:
+    tabelas = []
+    for linha in plano:
+        linha = linha.strip().lstrip("->").strip()
+        m = _RE_VARREDURA_SQLITE.match(linha) or _RE_VARREDURA_PG.search(linha)
+        if m and m.group(1) != "CONSTANT" and m.group(1) not in tabelas:
+            tabelas.append(m.group(1))
+    return tabelas
+
+
+consultas_lentas = ConsultasLentas()
+
+
+def instalar_consultas_lentas(engine) -> None:
+    consultas_lentas.instalar(engine)
@@ -0,0 +1,187 @@
+# src/common/disjuntor.py
+"""
+Disjuntor (circuit breaker) do banco e respostas de reserva.
+
+Quando o Postgres engasga, cada requisição esperava o pool_timeout para
+falhar. O disjuntor conta falhas de banco seguidas (conexão, timeout do pool,
+statement_timeout) nas sessões abertas por `get_db`/`get_uow`:
+
+    fechado  -- DB_DISJUNTOR_FALHAS seguidas -->  aberto
+    aberto   -- DB_DISJUNTOR_ABERTO_S depois -->  meio-aberto (uma sonda)
+    sonda ok -> fechado;  sonda falhou -> aberto de novo
+
+Aberto, a sessão nem é criada: `BancoIndisponivel` vira 503 com Retry-After
+(`responder_indisponivel`). As leituras públicas (cardápio, categorias, mesa
+por UUID) guardam a última resposta boa por URL (`respostas_estaveis`) e,
+com o banco fora, o cliente recebe essa cópia marcada como desatualizada —
+dá para continuar vendo o cardápio durante o incidente.
+
+Estado por worker. DB_DISJUNTOR=0 desliga.
+"""
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional, Tuple
+
+import orjson
+from fastapi import Request, Response
+from sqlalchemy import exc
+
+logger = logging.getLogger(__name__)
+
+DB_DISJUNTOR = os.getenv("DB_DISJUNTOR", "1") == "1"
+DB_DISJUNTOR_FALHAS = int(os.getenv("DB_DISJUNTOR_FALHAS", "5"))
+DB_DISJUNTOR_ABERTO_S = float(os.getenv("DB_DISJUNTOR_ABERTO_S", "10"))
+DB_RESERVA_MAX = int(os.getenv("DB_RESERVA_MAX", "512"))
+
+# leituras públicas que podem sair da última cópia boa
+_ROTAS_RESERVA = re.compile(r"^/(produtos|categorias)(/|$)|^/mesas/uuid/[^/]+/?$")
+
+FECHADO, ABERTO, MEIO_ABERTO = "fechado", "aberto", "meio_aberto"
+
+
+class BancoIndisponivel(Exception):
+    def __init__(self, retry_after: float):
+        super().__init__("Banco de dados indisponível")
+        self.retry_after = retry_after
+
+
+def eh_falha_de_banco(erro: BaseException) -> bool:
+    """Erros que dizem respeito ao banco estar de pé, não à consulta em si."""
+    if isinstance(erro, (exc.OperationalError, exc.InterfaceError, exc.TimeoutError, exc.DisconnectionError)):
+        return True
+    return isinstance(erro, exc.DBAPIError) and erro.connection_invalidated
+
+
+class Disjuntor:
+    def __init__(
+        self,
+        nome: str,
+        falhas_para_abrir: int = DB_DISJUNTOR_FALHAS,
+        aberto_s: float = DB_DISJUNTOR_ABERTO_S,
+        ativo: bool = DB_DISJUNTOR,
+        relogio: Callable[[], float] = time.monotonic,
+    ):
+        self.nome = nome
+        self.falhas_para_abrir = falhas_para_abrir
+        self.aberto_s = aberto_s
+        self.ativo = ativo
+        self.relogio = relogio
+        self.estado = FECHADO
+        self._falhas = 0
+        self._aberto_ate = 0.0
+        self._sonda_desde: Optional[float] = None
+        self._lock = threading.Lock()
+        self.estatisticas = {"aberturas": 0, "recusadas": 0, "falhas": 0}
+
+    def permitir(self) -> bool:
+        """
+        Deixa passar ou levanta BancoIndisponivel. Retorna True quando a
+        requisição é a sonda do meio-aberto (deve confirmar o banco antes).
+        """
+        if not self.ativo:
+            return False
+        with self._lock:
+            if self.estado == FECHADO:
+                return False
+            agora = self.relogio()
+            if self.estado == ABERTO and agora >= self._aberto_ate:
+                self.estado = MEIO_ABERTO
+                self._sonda_desde = None
+            # sonda que não voltou (ex.: thread presa) é substituída após aberto_s
+            if self.estado == MEIO_ABERTO and (
+                self._sonda_desde is None or agora - self._sonda_desde > self.aberto_s
+            ):
+                self._sonda_desde = agora
+                return True
+            self.estatisticas["recusadas"] += 1
+            raise BancoIndisponivel(max(1.0, self._aberto_ate - agora))
+
+    def sucesso(self) -> None:
+        with self._lock:
+            self._falhas = 0
+            if self.estado != FECHADO:
+                self.estado, self._sonda_desde = FECHADO, None
+                logger.warning("disjuntor %s: fechado (banco respondeu)", self.nome)
+
+    def falha(self) -> None:
+        with self._lock:
+            self._falhas += 1
+            self.estatisticas["falhas"] += 1
+            if self.estado == MEIO_ABERTO or self._falhas >= self.falhas_para_abrir:
+                if self.estado != ABERTO:
+                    self.estatisticas["aberturas"] += 1
+                    logger.error("disjuntor %s: aberto por %.0fs após %d falha(s)", self.nome, self.aberto_s, self._falhas)
+                self.estado = ABERTO
+                self._aberto_ate = self.relogio() + self.aberto_s
+                self._sonda_desde = None
+
+    def liberar_sonda(self) -> None:
+        """Sonda terminou sem dizer nada sobre o banco: a próxima requisição sonda."""
+        with self._lock:
+            self._sonda_desde = None
+
+    def situacao(self) -> dict:
+        with self._lock:
+            return {"estado": self.estado, "falhas_seguidas": self._falhas, **self.estatisticas}
+
+
+disjuntor_banco = Disjuntor("banco")
+
+
+# ---------------- última resposta boa ----------------
+class RespostasEstaveis:
+    """Último corpo 200 por URL (e restaurante) das leituras públicas (LRU, limitado)."""
+
+    def __init__(self, max_itens: int = DB_RESERVA_MAX):
+        self.max_itens = max_itens
+        self._itens: "OrderedDict[str, Tuple[bytes, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def chave(request: Request) -> str:
+        consulta = "&".join(sorted(request.url.query.split("&"))) if request.url.query else ""
+        # o restaurante do cardápio também pode vir no header (ver get_restaurante_publico)
+        restaurante = request.headers.get("x-restaurante-id", "")
+        return f"{restaurante}:{request.url.path.rstrip('/')}?{consulta}"
+
+    def guardar(self, request: Request, corpo: bytes, media_type: str = "application/json") -> None:
+        chave = self.chave(request)
+        with self._lock:
+            atual = self._itens.get(chave)
+            if atual is not None and atual[0] is corpo:
+                return      # mesmo payload do cache: nada a fazer
+            self._itens[chave] = (corpo, media_type)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
+
+    def obter(self, request: Request) -> Optional[Tuple[bytes, str]]:
+        with self._lock:
+            return self._itens.get(self.chave(request))
+
+
+respostas_estaveis = RespostasEstaveis()
+
+
+def responder_indisponivel(request: Request, erro: BancoIndisponivel) -> Response:
+    """Exception handler do app: cópia desatualizada (leituras públicas) ou 503."""
+    retry = str(max(1, int(erro.retry_after + 0.999)))
+    if request.method == "GET" and _ROTAS_RESERVA.match(request.url.path):
+        copia = respostas_estaveis.obter(request)
+        if copia is not None:
+            corpo, media_type = copia
+            return Response(corpo, media_type=media_type, headers={
+                "Cache-Control": "no-store",
+                "Warning": '110 - "Response is Stale"',
+                "X-Resposta-Desatualizada": "1",
+            })
+    return Response(
+        orjson.dumps({"detail": "Banco de dados indisponível. Tente novamente em instantes."}),
+        status_code=503,
+        media_type="application/json",
+        headers={"Retry-After": retry},
+    )
@@ -0,0 +1,231 @@
+# src/common/efeitos.py
+"""
+Pipeline de efeitos colaterais (write-behind).
+
+Atualizações derivadas que não precisam estar na transação da requisição
+(status da mesa após um pedido, agregados, notificações) são publicadas como
+"efeitos". Cada efeito tem um nome, uma chave de coalescência e uma função
+que aplica um LOTE de cargas numa sessão:
+
+    registrar_efeito("mesa_em_uso", aplicar_mesas_em_uso)
+    publicar(db, "mesa_em_uso", chave=mesa.id, carga=mesa.id)
+
+Modos:
+- adiado (padrão): a carga fica na sessão e só entra na fila depois do commit
+  (rollback descarta). Uma thread em background junta o que chegou, coalesce
+  por (efeito, chave) — a última carga vence — e aplica cada efeito num lote,
+  com uma transação por rodada.
+- síncrono: aplicado na hora, na sessão (e transação) de quem publicou.
+  EFEITOS_SINCRONOS=mesa_em_uso,outro (ou "*") força o modo por efeito.
+
+Entrega: o que foi enfileirado é aplicado no shutdown do app (`parar`, também
+registrado no atexit). Falhas voltam para a fila até EFEITOS_MAX_TENTATIVAS.
+Os efeitos devem ser idempotentes e não depender da ordem de chegada.
+"""
+import atexit
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+EFEITOS_INTERVALO_MS = int(os.getenv("EFEITOS_INTERVALO_MS", "50"))
+EFEITOS_LOTE_MAX = int(os.getenv("EFEITOS_LOTE_MAX", "500"))
+EFEITOS_MAX_TENTATIVAS = int(os.getenv("EFEITOS_MAX_TENTATIVAS", "5"))
+_SINCRONOS = {n.strip() for n in os.getenv("EFEITOS_SINCRONOS", "").split(",") if n.strip()}
+
+SINCRONO = "sincrono"
+ADIADO = "adiado"
+
+
+@dataclass
+class Efeito:
+    nome: str
+    aplicar: Callable[[Any, List[Any]], None]   # (session, cargas) -> None
+    modo: str = ADIADO
+
+
+_efeitos: Dict[str, Efeito] = {}
+
+
+def registrar_efeito(nome: str, aplicar: Callable[[Any, List[Any]], None], modo: str = ADIADO) -> Efeito:
+    if "*" in _SINCRONOS or nome in _SINCRONOS:
+        modo = SINCRONO
+    efeito = Efeito(nome=nome, aplicar=aplicar, modo=modo)
+    _efeitos[nome] = efeito
+    return efeito
+
+
+class PipelineEfeitos:
+    def __init__(self):
+        self._session_factory = None
+        self._pendentes: Dict[Tuple[str, Hashable], Any] = {}
+        self._tentativas: Dict[Tuple[str, Hashable], int] = {}
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._parando = False
+        self._em_voo = 0          # lotes retirados da fila e ainda não aplicados
+        self.estatisticas = {"publicados": 0, "coalescidos": 0, "aplicados": 0, "lotes": 0, "falhas": 0, "descartados": 0}
+
+    def configurar(self, session_factory) -> None:
+        self._session_factory = session_factory
+
+    # ---------- fila ----------
+    def enfileirar(self, itens: List[Tuple[str, Hashable, Any]]) -> None:
+        with self._cond:
+            for nome, chave, carga in itens:
+                k = (nome, chave)
+                if k in self._pendentes:
+                    self.estatisticas["coalescidos"] += 1
+                self._pendentes[k] = carga
+                self.estatisticas["publicados"] += 1
+            self._garantir_thread()
+            self._cond.notify()
+
+    def _garantir_thread(self) -> None:
+        # criada sob demanda: com preload do gunicorn a thread não sobrevive ao
+        # fork, então cada worker sobe a sua na primeira publicação
+        if self._parando or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._thread = threading.Thread(target=self._laco, name="efeitos", daemon=True)
+        self._thread.start()
+
+    def _retirar(self) -> Dict[Tuple[str, Hashable], Any]:
+        lote = {}
+        for k in list(self._pendentes)[:EFEITOS_LOTE_MAX]:
+            lote[k] = self._pendentes.pop(k)
+        if lote:
+            self._em_voo += 1
+        return lote
+
+    def _laco(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pendentes and not self._parando:
+                    self._cond.wait()
+                if self._parando and not self._pendentes:
+                    return
+            # janela curta para juntar mais cargas na mesma rodada
+            time.sleep(EFEITOS_INTERVALO_MS / 1000.0)
+            with self._cond:
+                lote = self._retirar()
+            self._aplicar_lote(lote)
+
+    def _aplicar_lote(self, lote: Dict[Tuple[str, Hashable], Any]) -> None:
+        if not lote:
+            return
+        try:
+            self._aplicar_por_efeito(lote)
+        finally:
+            with self._cond:
+                self._em_voo -= 1
+                self._cond.notify_all()
+
+    def _aplicar_por_efeito(self, lote: Dict[Tuple[str, Hashable], Any]) -> None:
+        por_efeito: Dict[str, List[Tuple[Hashable, Any]]] = {}
+        for (nome, chave), carga in lote.items():
+            por_efeito.setdefault(nome, []).append((chave, carga))
+
+        for nome, itens in por_efeito.items():
+            efeito = _efeitos.get(nome)
+            if efeito is None:
+                logger.error("efeito %r não registrado; %d carga(s) descartada(s)", nome, len(itens))
+                self.estatisticas["descartados"] += len(itens)
+                continue
+            db = self._session_factory()
+            try:
+                efeito.aplicar(db, [carga for _, carga in itens])
+                db.commit()
+                self.estatisticas["aplicados"] += len(itens)
+                self.estatisticas["lotes"] += 1
+                with self._cond:
+                    for chave, _ in itens:
+                        self._tentativas.pop((nome, chave), None)
+            except Exception:
+                db.rollback()
+                self.estatisticas["falhas"] += 1
+                logger.exception("falha ao aplicar efeito %r (%d cargas)", nome, len(itens))
+                self._reenfileirar(nome, itens)
+            finally:
+                db.close()
+
+    def _reenfileirar(self, nome: str, itens: List[Tuple[Hashable, Any]]) -> None:
+        with self._cond:
+            for chave, carga in itens:
+                k = (nome, chave)
+                n = self._tentativas.get(k, 0) + 1
+                if n >= EFEITOS_MAX_TENTATIVAS:
+                    self._tentativas.pop(k, None)
+                    self.estatisticas["descartados"] += 1
+                    logger.error("efeito %r chave %r descartado após %d tentativas", nome, chave, n)
+                    continue
+                self._tentativas[k] = n
+                # carga mais nova publicada no meio tempo tem precedência
+                self._pendentes.setdefault(k, carga)
+
+    # ---------- controle ----------
+    def drenar(self, timeout: float = 5.0) -> bool:
+        """Aplica tudo o que está na fila (na thread de quem chama). Útil em scripts."""
+        limite = time.monotonic() + timeout
+        while time.monotonic() < limite:
+            with self._cond:
+                lote = self._retirar()
+                if not lote:
+                    if self._em_voo == 0:
+                        return True
+                    # a thread de background está aplicando um lote: espera terminar
+                    self._cond.wait(max(0.0, limite - time.monotonic()))
+                    continue
+            self._aplicar_lote(lote)
+        with self._cond:
+            return not self._pendentes and self._em_voo == 0
+
+    def parar(self, timeout: float = 10.0) -> None:
+        with self._cond:
+            self._parando = True
+            self._cond.notify_all()
+        thread = self._thread
+        if thread is not None and thread.is_alive():
+            thread.join(timeout)
+        self.drenar(timeout)
+        with self._cond:
+            # publicações posteriores (ex.: outro app no mesmo processo) sobem nova thread
+            self._parando = False
+            self._thread = None
+
+    def pendentes(self) -> int:
+        with self._cond:
+            return len(self._pendentes)
+
+
+pipeline = PipelineEfeitos()
+atexit.register(pipeline.parar)
+
+
+def publicar(db, nome: str, chave: Hashable, carga: Any = None) -> None:
+    """
+    Publica um efeito. Síncrono: aplicado agora na sessão `db` (o commit é de
+    quem publicou). Adiado: entra na fila depois do commit de `db`; sem sessão,
+    entra na fila direto.
+    """
+    efeito = _efeitos.get(nome)
+    if efeito is None:
+        raise KeyError(f"efeito não registrado: {nome}")
+    carga = chave if carga is None else carga
+
+    if efeito.modo == SINCRONO and db is not None:
+        efeito.aplicar(db, [carga])
+        return
+    if db is None:
+        pipeline.enfileirar([(nome, chave, carga)])
+        return
+    from src.infra.sqlalchemy.config.unidade_trabalho import apos_commit
+    apos_commit(db, pipeline.enfileirar, [(nome, chave, carga)])
+
+
+def instalar_efeitos(session_factory) -> None:
+    """Sessões de `session_factory` aplicam os lotes da fila."""
+    pipeline.configurar(session_factory)
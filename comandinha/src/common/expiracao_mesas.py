@@ -0,0 +1,165 @@
+# src/common/expiracao_mesas.py
+"""
+Expiração de mesas abandonadas: EM_USO (2) -> EXPIRADA (3).
+
+Cada mesa com atividade do cliente tem um prazo de inatividade numa agenda
+em memória (src.common.agenda): pedido criado ou chamado criado empurram o
+prazo para `agora + MESA_INATIVIDADE_MINUTOS`. Ao vencer, as mesas do lote
+são conferidas no banco e expiradas num UPDATE só — nada varre `mesa` ou
+`pedido` periodicamente.
+
+A conferência (uma consulta para o lote) lê a última atividade de cada mesa
+no banco — pedido/chamado criado por outro worker conta — e se ainda há
+pedido na cozinha (status 1/2). Mesa ainda ativa, ou com pedido não
+entregue, volta para a agenda com o prazo novo. Os pedidos abertos da mesa
+expirada não são tocados: a conta continua sendo fechada pelo admin, e um
+pedido novo leva a mesa de volta a EM_USO (efeito mesa_em_uso).
+
+Mesa liberada (conta encerrada, status alterado pelo admin) ou excluída sai
+da agenda. Eventos só valem após o commit (`unidade_trabalho.apos_commit`).
+
+Reinício: `iniciar(SessionLocal)` remonta o heap com UMA consulta (mesas
+EM_USO e a última atividade de cada uma) e sobe a thread da agenda.
+MESA_INATIVIDADE_MINUTOS=0 desliga.
+"""
+import logging
+import os
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import and_, func, select, update
+from sqlalchemy.orm import Session
+
+from src.common.agenda import Agenda, Vencido
+from src.common.resolvedor_mesas import resolvedor_mesas
+from src.common.tz import TZ
+
+logger = logging.getLogger(__name__)
+
+MESA_INATIVIDADE_MINUTOS = float(os.getenv("MESA_INATIVIDADE_MINUTOS", "120"))
+MESA_EXPIRACAO_LOTE = int(os.getenv("MESA_EXPIRACAO_LOTE", "200"))
+
+_EM_USO, _EXPIRADA = 2, 3
+
+
+def _epoch(dt: Optional[datetime]) -> Optional[float]:
+    if dt is None:
+        return None
+    if dt.tzinfo is None:       # SQLite devolve sem offset (gravado em America/Sao_Paulo)
+        dt = dt.replace(tzinfo=TZ)
+    return dt.timestamp()
+
+
+class ExpiracaoMesas:
+    def __init__(self, inatividade_min: float = MESA_INATIVIDADE_MINUTOS, lote_max: int = MESA_EXPIRACAO_LOTE):
+        self.inatividade_s = inatividade_min * 60.0
+        self.agenda = Agenda("expiracao_mesas", self._vencer, lote_max=lote_max)
+        self._session_factory = None
+        self.estatisticas = {"expiradas": 0, "reagendadas": 0}
+
+    @property
+    def ativa(self) -> bool:
+        return self.inatividade_s > 0
+
+    # ---------- eventos (chamados após o commit) ----------
+    def atividade(self, mesa_id: int, quando: Optional[float] = None) -> None:
+        if self.ativa:
+            quando = self.agenda.relogio() if quando is None else quando
+            self.agenda.agendar(mesa_id, quando + self.inatividade_s, so_adiar=True)
+
+    def liberar(self, mesa_id: int) -> None:
+        self.agenda.cancelar(mesa_id)
+
+    def apos_commit(self, db: Session, operacao: str, *args) -> None:
+        """Agenda `operacao` ("atividade" | "liberar") para o commit da sessão."""
+        from src.infra.sqlalchemy.config.unidade_trabalho import apos_commit
+        apos_commit(db, getattr(self, operacao), *args)
+
+    # ---------- banco ----------
+    @staticmethod
+    def _consulta_atividade(filtro):
+        """(mesa_id, última atividade, tem pedido na cozinha) — uma consulta, subconsultas por mesa."""
+        from src.infra.sqlalchemy.models.chamado_garcom import ChamadoGarcom
+        from src.infra.sqlalchemy.models.mesa import Mesa
+        from src.infra.sqlalchemy.models.pedido import Pedido
+
+        ultimo_pedido = select(func.max(Pedido.timestamp)).where(Pedido.mesa_id == Mesa.id).scalar_subquery()
+        ultimo_chamado = select(func.max(ChamadoGarcom.criado_em)).where(ChamadoGarcom.mesa_uuid == Mesa.uuid).scalar_subquery()
+        na_cozinha = select(Pedido.id).where(Pedido.mesa_id == Mesa.id, Pedido.status_id.in_((1, 2))).exists()
+        return select(Mesa.id, Mesa.updated_at, ultimo_pedido, ultimo_chamado, na_cozinha).where(filtro)
+
+    def _ultimas_atividades(self, db: Session, filtro) -> List[Tuple[int, float, bool]]:
+        resultado = []
+        for mesa_id, *momentos, cozinha in db.execute(self._consulta_atividade(filtro)):
+            ultima = max((t for t in map(_epoch, momentos) if t is not None), default=self.agenda.relogio())
+            resultado.append((mesa_id, ultima, bool(cozinha)))
+        return resultado
+
+    def reconstruir(self, db: Session) -> int:
+        """Heap a partir das mesas EM_USO (uma consulta). Retorna quantas entraram."""
+        from src.infra.sqlalchemy.models.mesa import Mesa
+
+        if not self.ativa:
+            return 0
+        prazos = {
+            mesa_id: ultima + self.inatividade_s
+            for mesa_id, ultima, _ in self._ultimas_atividades(db, Mesa.status_id == _EM_USO)
+        }
+        self.agenda.limpar()
+        self.agenda.agendar_varios(prazos)
+        return len(prazos)
+
+    def _vencer(self, lote: List[Vencido]) -> None:
+        from src.infra.sqlalchemy.models.mesa import Mesa
+
+        ids = [mesa_id for mesa_id, _ in lote]
+        agora = self.agenda.relogio()
+        with self._session_factory() as db:
+            expirar, reagendar = [], {}
+            # mesa que saiu de EM_USO no meio tempo (outro worker) só sai da agenda
+            filtro = and_(Mesa.id.in_(ids), Mesa.status_id == _EM_USO)
+            for mesa_id, ultima, cozinha in self._ultimas_atividades(db, filtro):
+                prazo = ultima + self.inatividade_s
+                if cozinha:
+                    # pedido ainda não entregue: a mesa espera a cozinha
+                    prazo = max(prazo, agora + self.inatividade_s)
+                if prazo > agora:
+                    reagendar[mesa_id] = prazo
+                else:
+                    expirar.append(mesa_id)
+
+            if expirar:
+                db.execute(
+                    update(Mesa)
+                    .where(Mesa.id.in_(expirar), Mesa.status_id == _EM_USO)
+                    .values(status_id=_EXPIRADA)
+                    .execution_options(synchronize_session=False)
+                )
+                resolvedor_mesas.apos_commit(db, "atualizar_status", expirar, _EXPIRADA)
+                db.commit()
+                logger.info("%d mesa(s) expirada(s) por inatividade", len(expirar))
+
+        for mesa_id, prazo in reagendar.items():
+            self.agenda.agendar(mesa_id, prazo, so_adiar=True)
+        self.estatisticas["expiradas"] += len(expirar)
+        self.estatisticas["reagendadas"] += len(reagendar)
+
+    # ---------- ciclo de vida ----------
+    def iniciar(self, session_factory) -> None:
+        self._session_factory = session_factory
+        if not self.ativa:
+            return
+        try:
+            with session_factory() as db:
+                n = self.reconstruir(db)
+            logger.info("expiração de mesas: %d mesa(s) em uso na agenda", n)
+        except Exception:
+            # sem a carga inicial, só as mesas com atividade nova entram na agenda
+            logger.exception("falha ao remontar a agenda de expiração de mesas")
+        self.agenda.iniciar()
+
+    def parar(self) -> None:
+        self.agenda.parar()
+
+
+expiracao_mesas = ExpiracaoMesas()
@@ -0,0 +1,323 @@
+# src/common/limite_taxa.py
+"""
+Limite de taxa (token bucket) para os endpoints públicos, sem autenticação.
+
+POST /pedidos, POST /chamadas e as leituras públicas só exigem conhecer o UUID
+de uma mesa. Cada regra tem um balde por chave — UUID da mesa ou IP do
+cliente — com `capacidade` fichas (rajada) reabastecidas a `por_minuto`.
+Sem ficha, a resposta é 429 com Retry-After. As regras por IP são avaliadas
+antes das por mesa, e só UUID bem formado vira chave de mesa: um cliente já
+barrado pelo IP não cria baldes com UUIDs inventados. Na memória, baldes e
+marcas são LRU limitados (_MAX_CHAVES_MEMORIA), com despejo O(1).
+
+O middleware roda antes do roteamento, então o 429 sai sem abrir sessão nem
+tocar no banco. O UUID da mesa vem do path (/mesas/uuid/{uuid}/...) ou do
+corpo JSON (`uuid` em /pedidos, `mesa_uuid` em /chamadas); o corpo lido é
+reentregue ao app.
+
+Estado:
+- memória do worker (padrão): cada worker tem seus baldes, então o limite
+  efetivo é por worker;
+- LIMITE_TAXA_REDIS_URL=redis://...: baldes compartilhados entre workers
+  (pip install redis). Se o Redis falhar, a requisição passa (fail-open).
+
+O mesmo backend guarda marcas curtas com TTL (`gravar`/`ler`), usadas pelo
+cooldown dos chamados (ver repositorio_chamado) para recusar toques repetidos
+antes de qualquer consulta.
+
+Configuração: LIMITE_TAXA=0 desliga; LIMITE_TAXA_FATOR multiplica capacidade
+e reabastecimento de todas as regras; LIMITE_TAXA_PROXY=1 usa o primeiro IP
+do X-Forwarded-For (só atrás de um proxy confiável).
+"""
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Redis é opcional: sem o pacote (ou sem URL), o estado fica na memória do worker
+try:
+    import redis  # pip install redis
+except ImportError:  # pragma: no cover
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+LIMITE_TAXA = os.getenv("LIMITE_TAXA", "1") == "1"
+LIMITE_TAXA_FATOR = float(os.getenv("LIMITE_TAXA_FATOR", "1"))
+LIMITE_TAXA_PROXY = os.getenv("LIMITE_TAXA_PROXY", "0") == "1"
+LIMITE_TAXA_REDIS_URL = os.getenv("LIMITE_TAXA_REDIS_URL", "")
+
+_MAX_CORPO = 64 * 1024            # corpo maior que isso não é inspecionado
+_MAX_CHAVES_MEMORIA = 100_000     # acima disso, sai o balde/marca usado há mais tempo (LRU)
+
+
+@dataclass(frozen=True)
+class Regra:
+    nome: str
+    metodos: Tuple[str, ...]
+    caminho: "re.Pattern"
+    por: str                  # "ip" | "mesa"
+    capacidade: float
+    por_minuto: float
+
+
+def _regra(nome, metodos, caminho, por, capacidade, por_minuto) -> Regra:
+    return Regra(nome, tuple(metodos), re.compile(caminho), por,
+                 capacidade * LIMITE_TAXA_FATOR, por_minuto * LIMITE_TAXA_FATOR)
+
+
+REGRAS_PADRAO: Tuple[Regra, ...] = (
+    _regra("pedidos_mesa", ["POST"], r"^/pedidos/?$", "mesa", 5, 10),
+    _regra("pedidos_ip", ["POST"], r"^/pedidos/?$", "ip", 20, 60),
+    _regra("chamadas_mesa", ["POST"], r"^/chamadas/?$", "mesa", 5, 6),
+    _regra("chamadas_ip", ["POST"], r"^/chamadas/?$", "ip", 20, 60),
+    _regra("cancelar_chamada_ip", ["PATCH"], r"^/chamadas/\d+/cancelar/?$", "ip", 20, 60),
+    # polling da tela da mesa
+    _regra("leitura_mesa", ["GET"], r"^/mesas/uuid/[^/]+", "mesa", 60, 300),
+    _regra("leitura_publica_ip", ["GET"], r"^/(produtos|categorias|mesas/uuid)(/|$)", "ip", 120, 600),
+)
+
+# onde está o UUID da mesa no corpo JSON, por rota
+CAMPOS_MESA_CORPO: Dict[str, str] = {"/pedidos": "uuid", "/chamadas": "mesa_uuid"}
+
+_MESA_NO_PATH = re.compile(r"^/mesas/uuid/([^/]+)")
+# só UUID canônico vira chave de balde: valores arbitrários no corpo/path não
+# criam chaves (mesa inexistente com formato válido ainda passa pelo IP antes)
+_UUID_MESA = re.compile(r"^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$")
+
+
+# ---------------------------------------------------------------- backends
+class BaldesMemoria:
+    """Baldes e marcas na memória do processo (thread-safe, LRU limitado a `max_chaves` cada)."""
+
+    def __init__(self, max_chaves: int = _MAX_CHAVES_MEMORIA):
+        self.max_chaves = max_chaves
+        self._baldes: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()   # chave -> (fichas, instante)
+        self._marcas: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()     # chave -> (valor, expira_em)
+        self._lock = threading.Lock()
+
+    def consumir(self, chave: str, capacidade: float, por_segundo: float, custo: float = 1.0) -> float:
+        """Retira `custo` fichas. Retorna 0 se passou, senão os segundos até haver fichas."""
+        agora = time.monotonic()
+        with self._lock:
+            fichas, antes = self._baldes.get(chave, (capacidade, agora))
+            fichas = min(capacidade, fichas + (agora - antes) * por_segundo)
+            if fichas >= custo:
+                self._baldes[chave] = (fichas - custo, agora)
+                espera = 0.0
+            else:
+                self._baldes[chave] = (fichas, agora)
+                espera = (custo - fichas) / por_segundo
+            self._baldes.move_to_end(chave)
+            # O(1) por chamada: sai o balde parado há mais tempo (o que mais
+            # provavelmente já estaria cheio de novo)
+            while len(self._baldes) > self.max_chaves:
+                self._baldes.popitem(last=False)
+            return espera
+
+    def gravar(self, chave: str, valor: str, ttl: float) -> None:
+        with self._lock:
+            self._marcas[chave] = (valor, time.monotonic() + ttl)
+            self._marcas.move_to_end(chave)
+            while len(self._marcas) > self.max_chaves:
+                self._marcas.popitem(last=False)
+
+    def ler(self, chave: str) -> Optional[str]:
+        with self._lock:
+            item = self._marcas.get(chave)
+            if item is None:
+                return None
+            if item[1] <= time.monotonic():
+                del self._marcas[chave]
+                return None
+            return item[0]
+
+
+_LUA_BALDE = """
+local cap = tonumber(ARGV[1])
+local taxa = tonumber(ARGV[2])
+local agora = tonumber(ARGV[3])
+local custo = tonumber(ARGV[4])
+local d = redis.call('HMGET', KEYS[1], 'f', 't')
+local fichas = tonumber(d[1]) or cap
+local antes = tonumber(d[2]) or agora
+fichas = math.min(cap, fichas + math.max(0, agora - antes) * taxa)
+local espera = 0
+if fichas >= custo then fichas = fichas - custo else espera = (custo - fichas) / taxa end
+redis.call('HSET', KEYS[1], 'f', tostring(fichas), 't', tostring(agora))
+redis.call('EXPIRE', KEYS[1], math.ceil(cap / taxa) + 1)
+return tostring(espera)
+"""
+
+
+class BaldesRedis:
+    """Mesmo contrato de BaldesMemoria, compartilhado entre workers via Redis."""
+
+    def __init__(self, url: str, prefixo: str = "comandinha:limite:"):
+        self._cliente = redis.Redis.from_url(url, socket_timeout=0.05, socket_connect_timeout=0.2)
+        self._balde = self._cliente.register_script(_LUA_BALDE)
+        self.prefixo = prefixo
+
+    def consumir(self, chave: str, capacidade: float, por_segundo: float, custo: float = 1.0) -> float:
+        try:
+            return float(self._balde(keys=[self.prefixo + chave], args=[capacidade, por_segundo, time.time(), custo]))
+        except redis.RedisError:
+            logger.warning("limite de taxa: Redis indisponível, liberando %s", chave)
+            return 0.0
+
+    def gravar(self, chave: str, valor: str, ttl: float) -> None:
+        try:
+            self._cliente.set(self.prefixo + chave, valor, px=max(1, int(ttl * 1000)))
+        except redis.RedisError:
+            logger.warning("limite de taxa: Redis indisponível, marca %s não gravada", chave)
+
+    def ler(self, chave: str) -> Optional[str]:
+        try:
+            valor = self._cliente.get(self.prefixo + chave)
+        except redis.RedisError:
+            return None
+        return valor.decode() if valor is not None else None
+
+
+def _criar_backend():
+    if LIMITE_TAXA_REDIS_URL:
+        if redis is None:
+            logger.warning("LIMITE_TAXA_REDIS_URL definido, mas o pacote redis não está instalado; usando memória")
+        else:
+            return BaldesRedis(LIMITE_TAXA_REDIS_URL)
+    return BaldesMemoria()
+
+
+baldes = _criar_backend()
+
+
+def gravar_apos_commit(db, chave: str, valor: str, ttl: float) -> None:
+    """Agenda uma marca para depois do commit da sessão (rollback descarta)."""
+    from src.infra.sqlalchemy.config.unidade_trabalho import apos_commit
+    apos_commit(db, baldes.gravar, chave, valor, ttl)
+
+
+# ---------------------------------------------------------------- middleware
+def _ip_cliente(scope, headers: Dict[bytes, bytes]) -> str:
+    if LIMITE_TAXA_PROXY and b"x-forwarded-for" in headers:
+        return headers[b"x-forwarded-for"].decode("latin-1").split(",")[0].strip()
+    cliente = scope.get("client")
+    return cliente[0] if cliente else "-"
+
+
+async def _ler_corpo(receive) -> Tuple[bytes, List[dict]]:
+    """Lê o corpo inteiro, guardando as mensagens para reentregá-las ao app."""
+    mensagens, partes = [], []
+    while True:
+        mensagem = await receive()
+        mensagens.append(mensagem)
+        if mensagem["type"] != "http.request":
+            break
+        partes.append(mensagem.get("body", b""))
+        if not mensagem.get("more_body", False):
+            break
+    return b"".join(partes), mensagens
+
+
+def _reentregar(mensagens: List[dict], receive):
+    fila = list(mensagens)
+
+    async def _receive():
+        if fila:
+            return fila.pop(0)
+        return await receive()
+
+    return _receive
+
+
+def _json(corpo: bytes) -> dict:
+    if not corpo or len(corpo) > _MAX_CORPO:
+        return {}
+    try:
+        dados = json.loads(corpo)
+    except ValueError:
+        return {}
+    return dados if isinstance(dados, dict) else {}
+
+
+class LimiteTaxaMiddleware:
+    """
+    Middleware ASGI: aplica as `regras` e, para rotas com corpo JSON, as
+    `verificacoes` extras — funções (corpo) -> mensagem de 429 ou None,
+    indexadas por (método, path).
+    """
+
+    def __init__(
+        self,
+        app,
+        regras: Sequence[Regra] = REGRAS_PADRAO,
+        verificacoes: Optional[Dict[Tuple[str, str], Callable[[dict], Optional[str]]]] = None,
+        backend=None,
+        ativo: bool = LIMITE_TAXA,
+    ):
+        self.app = app
+        self.regras = tuple(regras)
+        self.verificacoes = dict(verificacoes or {})
+        self.backend = backend or baldes
+        self.ativo = ativo
+
+    async def __call__(self, scope, receive, send):
+        if not self.ativo or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        metodo, caminho = scope["method"], scope["path"]
+        aplicaveis = [r for r in self.regras if metodo in r.metodos and r.caminho.match(caminho)]
+        verificar = self.verificacoes.get((metodo, caminho.rstrip("/") or "/"))
+        if not aplicaveis and verificar is None:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        ip = _ip_cliente(scope, headers)
+        mesa = None
+        corpo: dict = {}
+        m = _MESA_NO_PATH.match(caminho)
+        if m:
+            mesa = m.group(1)
+        elif caminho.rstrip("/") in CAMPOS_MESA_CORPO or verificar is not None:
+            bruto, mensagens = await _ler_corpo(receive)
+            receive = _reentregar(mensagens, receive)
+            corpo = _json(bruto)
+            campo = CAMPOS_MESA_CORPO.get(caminho.rstrip("/"))
+            if campo and isinstance(corpo.get(campo), str):
+                mesa = corpo[campo]
+        if mesa is not None and not _UUID_MESA.match(mesa):
+            mesa = None     # o app responde 404/422; não vira chave de balde
+
+        # IP primeiro: cliente já barrado pelo IP não cria nem gasta baldes de mesa
+        for regra in sorted(aplicaveis, key=lambda r: r.por != "ip"):
+            chave = ip if regra.por == "ip" else mesa
+            if not chave:
+                continue
+            espera = self.backend.consumir(f"{regra.nome}:{chave}", regra.capacidade, regra.por_minuto / 60.0)
+            if espera > 0:
+                await _responder_429(send, "Muitas requisições. Tente novamente em instantes.", espera)
+                return
+
+        if verificar is not None and corpo:
+            mensagem = verificar(corpo)
+            if mensagem:
+                await _responder_429(send, mensagem)
+                return
+
+        await self.app(scope, receive, send)
+
+
+async def _responder_429(send, detalhe: str, espera: Optional[float] = None) -> None:
+    corpo = json.dumps({"detail": detalhe}, ensure_ascii=False).encode()
+    headers = [(b"content-type", b"application/json"), (b"content-length", str(len(corpo)).encode())]
+    if espera is not None:
+        headers.append((b"retry-after", str(max(1, int(espera + 0.999))).encode()))
+    await send({"type": "http.response.start", "status": 429, "headers": headers})
+    await send({"type": "http.response.body", "body": corpo})
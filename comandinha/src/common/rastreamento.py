@@ -0,0 +1,411 @@
+# src/common/rastreamento.py
+"""
+Rastreamento local (spans) de rota -> repositório -> SQL.
+
+As métricas dizem qual rota é lenta; o rastro diz qual passo dentro dela.
+Cada requisição amostrada vira um rastro com spans aninhados:
+
+    HTTP POST /mesas/{mesa_id}/encerrar            (middleware)
+      rota encerrar_mesa_admin                     (RotaRastreada)
+        RepositorioPedido.fechar_conta             (@rastrear_classe)
+          sql SELECT / sql UPDATE ...              (eventos do engine)
+        MesaRepositorio.limpar_sessao_voltar_disponivel
+          ...
+
+O span atual fica num ContextVar; o threadpool do anyio copia o contexto,
+então os spans criados no endpoint síncrono (e no get_db) ficam pendurados
+no span da requisição. Sem amostragem, cada ponto custa uma leitura do
+ContextVar.
+
+Configuração:
+- RASTREAMENTO_AMOSTRAGEM: fração das requisições rastreadas (0 = desligado,
+  padrão);
+- RASTREAMENTO_PERMITIR_FORCAR=1: um `traceparent` W3C com flag 01 ou
+  `x-rastrear: 1` força o rastro. Desligado por padrão: são headers do
+  cliente, e qualquer um poderia mandar rastrear (e gravar) toda requisição.
+  Ligue só quando o proxy da frente remove esses headers de fora;
+- RASTREAMENTO_LENTOS_MS: além da amostra, exporta toda requisição mais lenta
+  que isso (rastreia todas e descarta as rápidas — custa mais CPU);
+- RASTREAMENTO_EXPORTADOR: "arquivo" (JSON por linha em RASTREAMENTO_ARQUIVO,
+  padrão rastros.jsonl, girado para rastros.jsonl.1 ao passar de
+  RASTREAMENTO_ARQUIVO_MAX_MB, padrão 50), "otlp" (OTLP/HTTP JSON em RASTREAMENTO_OTLP_URL,
+  padrão http://127.0.0.1:4318/v1/traces) ou "memoria" (últimos rastros).
+
+A exportação roda numa thread própria, fora da requisição; se a fila
+encher, o rastro é descartado. Para ver a cascata de um rastro gravado em
+arquivo: `python tools/rastros.py rastros.jsonl --rota encerrar`.
+"""
+import contextvars
+import functools
+import inspect
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+import urllib.request
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+RASTREAMENTO_AMOSTRAGEM = float(os.getenv("RASTREAMENTO_AMOSTRAGEM", "0"))
+RASTREAMENTO_LENTOS_MS = float(os.getenv("RASTREAMENTO_LENTOS_MS", "0"))
+RASTREAMENTO_EXPORTADOR = os.getenv("RASTREAMENTO_EXPORTADOR", "arquivo")
+RASTREAMENTO_ARQUIVO = os.getenv("RASTREAMENTO_ARQUIVO", "rastros.jsonl")
+RASTREAMENTO_ARQUIVO_MAX_MB = float(os.getenv("RASTREAMENTO_ARQUIVO_MAX_MB", "50"))
+RASTREAMENTO_PERMITIR_FORCAR = os.getenv("RASTREAMENTO_PERMITIR_FORCAR", "0") == "1"
+RASTREAMENTO_OTLP_URL = os.getenv("RASTREAMENTO_OTLP_URL", "http://127.0.0.1:4318/v1/traces")
+RASTREAMENTO_SERVICO = os.getenv("RASTREAMENTO_SERVICO", "comandinha")
+
+_MAX_SQL = 500              # caracteres do statement guardados no span
+_MAX_SPANS = 2000           # por rastro (loops de N+1 não explodem a memória)
+
+
+@dataclass
+class Span:
+    nome: str
+    tipo: str                       # http | rota | repositorio | sql | interno
+    trace_id: str
+    span_id: str
+    pai_id: Optional[str]
+    inicio_ns: int
+    fim_ns: int = 0
+    atributos: Dict[str, Any] = field(default_factory=dict)
+    erro: Optional[str] = None
+
+    def como_dict(self) -> dict:
+        return {
+            "nome": self.nome, "tipo": self.tipo, "span_id": self.span_id, "pai_id": self.pai_id,
+            "inicio_ns": self.inicio_ns, "fim_ns": self.fim_ns,
+            "duracao_ms": round((self.fim_ns - self.inicio_ns) / 1e6, 3),
+            "atributos": self.atributos, "erro": self.erro,
+        }
+
+
+@dataclass
+class Rastro:
+    trace_id: str
+    spans: List[Span] = field(default_factory=list)
+    descartados: int = 0
+
+    def novo_span(self, nome: str, tipo: str, pai: Optional[Span], **atributos) -> Span:
+        span = Span(nome, tipo, self.trace_id, os.urandom(8).hex(), pai.span_id if pai else None,
+                    time.time_ns(), atributos=atributos)
+        # list.append é atômico: threads do pool anexam no mesmo rastro
+        if len(self.spans) < _MAX_SPANS:
+            self.spans.append(span)
+        else:
+            self.descartados += 1
+        return span
+
+
+# (rastro, span atual) da requisição; None = não amostrada
+_contexto: contextvars.ContextVar[Optional[tuple]] = contextvars.ContextVar("rastreamento", default=None)
+
+
+def rastro_atual() -> Optional[Rastro]:
+    atual = _contexto.get()
+    return atual[0] if atual else None
+
+
+@contextmanager
+def span(nome: str, tipo: str = "interno", **atributos):
+    """Span filho do atual; sem rastro ativo, não faz nada."""
+    atual = _contexto.get()
+    if atual is None:
+        yield None
+        return
+    rastro, pai = atual
+    s = rastro.novo_span(nome, tipo, pai, **atributos)
+    token = _contexto.set((rastro, s))
+    try:
+        yield s
+    except BaseException as e:
+        s.erro = type(e).__name__
+        raise
+    finally:
+        s.fim_ns = time.time_ns()
+        _contexto.reset(token)
+
+
+def rastrear_funcao(fn, nome: Optional[str] = None, tipo: str = "interno"):
+    """Decora `fn` (síncrona ou async) com um span; preserva a assinatura (FastAPI lê `__wrapped__`)."""
+    nome = nome or fn.__qualname__
+
+    if inspect.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def _async(*args, **kwargs):
+            if _contexto.get() is None:
+                return await fn(*args, **kwargs)
+            with span(nome, tipo):
+                return await fn(*args, **kwargs)
+        return _async
+
+    @functools.wraps(fn)
+    def _sync(*args, **kwargs):
+        if _contexto.get() is None:
+            return fn(*args, **kwargs)
+        with span(nome, tipo):
+            return fn(*args, **kwargs)
+    return _sync
+
+
+def rastrear_classe(cls):
+    """Span em cada método público da classe (ex.: `RepositorioPedido.fechar_conta`)."""
+    for nome, valor in list(vars(cls).items()):
+        if nome.startswith("_") or not inspect.isfunction(valor):
+            continue        # staticmethod/classmethod/propriedades ficam como estão
+        setattr(cls, nome, rastrear_funcao(valor, f"{cls.__name__}.{nome}", "repositorio"))
+    return cls
+
+
+class RotaRastreada(APIRoute):
+    """route_class dos routers: span no handler da rota (nome da função)."""
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        # include_router recria a rota com o endpoint já decorado: não embrulha duas vezes
+        if not getattr(endpoint, "_rastreado", False):
+            endpoint = rastrear_funcao(endpoint, f"rota {endpoint.__name__}", "rota")
+            endpoint._rastreado = True
+        super().__init__(path, endpoint, **kwargs)
+
+
+# ---------------- SQL ----------------
+def instalar_sql(engine) -> None:
+    """Um span por statement executado dentro de um rastro."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _antes(conn, cursor, statement, parameters, context, executemany):
+        atual = _contexto.get()
+        if atual is None:
+            return
+        rastro, pai = atual
+        verbo = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "SQL"
+        s = rastro.novo_span(f"sql {verbo}", "sql", pai, statement=statement[:_MAX_SQL])
+        if executemany:
+            s.atributos["executemany"] = len(parameters)
+        conn.info.setdefault("rastreamento_spans", []).append(s)
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _depois(conn, cursor, statement, parameters, context, executemany):
+        pilha = conn.info.get("rastreamento_spans")
+        if pilha:
+            s = pilha.pop()
+            s.fim_ns = time.time_ns()
+            if cursor.rowcount is not None and cursor.rowcount >= 0:
+                s.atributos["linhas"] = cursor.rowcount
+
+    @event.listens_for(engine, "handle_error")
+    def _erro(contexto):
+        pilha = contexto.connection.info.get("rastreamento_spans") if contexto.connection is not None else None
+        if pilha:
+            s = pilha.pop()
+            s.fim_ns, s.erro = time.time_ns(), type(contexto.original_exception).__name__
+
+
+# ---------------- exportação ----------------
+def _otlp(rastros: List[Rastro]) -> bytes:
+    def _attr(chave, valor):
+        if isinstance(valor, bool):
+            return {"key": chave, "value": {"boolValue": valor}}
+        if isinstance(valor, int):
+            return {"key": chave, "value": {"intValue": str(valor)}}
+        if isinstance(valor, float):
+            return {"key": chave, "value": {"doubleValue": valor}}
+        return {"key": chave, "value": {"stringValue": str(valor)}}
+
+    spans = []
+    for r in rastros:
+        for s in r.spans:
+            spans.append({
+                "traceId": s.trace_id,
+                "spanId": s.span_id,
+                **({"parentSpanId": s.pai_id} if s.pai_id else {}),
+                "name": s.nome,
+                "kind": {"http": 2, "sql": 3}.get(s.tipo, 1),     # SERVER / CLIENT / INTERNAL
+                "startTimeUnixNano": str(s.inicio_ns),
+                "endTimeUnixNano": str(s.fim_ns or s.inicio_ns),
+                "attributes": [_attr("comandinha.tipo", s.tipo)] + [_attr(k, v) for k, v in s.atributos.items()],
+                "status": {"code": 2, "message": s.erro} if s.erro else {},
+            })
+    return json.dumps({"resourceSpans": [{
+        "resource": {"attributes": [_attr("service.name", RASTREAMENTO_SERVICO)]},
+        "scopeSpans": [{"scope": {"name": "src.common.rastreamento"}, "spans": spans}],
+    }]}).encode()
+
+
+class Exportador:
+    """Fila + thread: `exportar` nunca bloqueia a requisição."""
+
+    def __init__(self, destino: str = RASTREAMENTO_EXPORTADOR, arquivo: str = RASTREAMENTO_ARQUIVO,
+                 url: str = RASTREAMENTO_OTLP_URL, max_fila: int = 1000, guardar: int = 200,
+                 max_bytes: int = int(RASTREAMENTO_ARQUIVO_MAX_MB * 1024 * 1024)):
+        self.destino = destino
+        self.arquivo = arquivo
+        self.max_bytes = max_bytes
+        self.url = url
+        self.recentes: "deque[dict]" = deque(maxlen=guardar)
+        self._fila: "queue.Queue[Rastro]" = queue.Queue(max_fila)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.estatisticas = {"exportados": 0, "descartados": 0, "falhas": 0}
+
+    def exportar(self, rastro: Rastro) -> None:
+        if self._thread is None:
+            self._iniciar()
+        try:
+            self._fila.put_nowait(rastro)
+        except queue.Full:
+            self.estatisticas["descartados"] += 1
+
+    def _iniciar(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._laco, name="rastreamento", daemon=True)
+                self._thread.start()
+
+    def _laco(self) -> None:
+        while True:
+            lote = [self._fila.get()]
+            while len(lote) < 64:
+                try:
+                    lote.append(self._fila.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self.escrever(lote)
+                self.estatisticas["exportados"] += len(lote)
+            except Exception:
+                self.estatisticas["falhas"] += 1
+                logger.warning("rastreamento: falha ao exportar %d rastro(s)", len(lote), exc_info=True)
+
+    def escrever(self, lote: List[Rastro]) -> None:
+        if self.destino == "otlp":
+            req = urllib.request.Request(self.url, data=_otlp(lote), headers={"Content-Type": "application/json"})
+            urllib.request.urlopen(req, timeout=2).close()
+            return
+        linhas = []
+        for r in lote:
+            raiz = r.spans[0]
+            dados = {
+                "trace_id": r.trace_id,
+                "nome": raiz.nome,
+                "inicio_ns": raiz.inicio_ns,
+                "duracao_ms": round((raiz.fim_ns - raiz.inicio_ns) / 1e6, 3),
+                "spans_descartados": r.descartados,
+                "spans": [s.como_dict() for s in r.spans],
+            }
+            if self.destino == "memoria":
+                self.recentes.append(dados)
+            else:
+                linhas.append(json.dumps(dados, ensure_ascii=False, default=str))
+        if linhas:
+            self._girar()
+            with open(self.arquivo, "a", encoding="utf-8") as f:
+                f.write("\n".join(linhas) + "\n")
+
+    def _girar(self) -> None:
+        """Arquivo acima de max_bytes vira `<arquivo>.1` (o .1 anterior é descartado)."""
+        if self.max_bytes <= 0:
+            return
+        try:
+            if os.path.getsize(self.arquivo) < self.max_bytes:
+                return
+        except OSError:
+            return
+        os.replace(self.arquivo, self.arquivo + ".1")
+
+    def drenar(self, timeout: float = 5.0) -> None:
+        """Espera a fila esvaziar (testes/shutdown)."""
+        fim = time.monotonic() + timeout
+        while not self._fila.empty() and time.monotonic() < fim:
+            time.sleep(0.01)
+        time.sleep(0.02)
+
+
+exportador = Exportador()
+
+
+# ---------------- middleware ----------------
+def _traceparent(headers: Dict[bytes, bytes]):
+    """(trace_id, span pai, amostrado) de um `traceparent` W3C, ou None."""
+    bruto = headers.get(b"traceparent")
+    if not bruto:
+        return None
+    partes = bruto.decode("latin-1").strip().split("-")
+    if len(partes) != 4 or len(partes[1]) != 32 or len(partes[2]) != 16:
+        return None
+    return partes[1], partes[2], partes[3] == "01"
+
+
+class RastreamentoMiddleware:
+    """Middleware ASGI: abre o rastro da requisição (se amostrada) e exporta no fim."""
+
+    def __init__(self, app, amostragem: float = RASTREAMENTO_AMOSTRAGEM,
+                 lentos_ms: float = RASTREAMENTO_LENTOS_MS, exportador_: Optional[Exportador] = None,
+                 permitir_forcar: bool = RASTREAMENTO_PERMITIR_FORCAR):
+        self.app = app
+        self.amostragem = amostragem
+        self.lentos_ms = lentos_ms
+        self.permitir_forcar = permitir_forcar
+        self.exportador = exportador_ or exportador
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or (
+            self.amostragem <= 0 and self.lentos_ms <= 0 and not (self.permitir_forcar and _forcado(scope))
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        pai = _traceparent(headers)
+        forcado = self.permitir_forcar and ((pai is not None and pai[2]) or headers.get(b"x-rastrear") == b"1")
+        amostrado = forcado or random.random() < self.amostragem
+        if not amostrado and self.lentos_ms <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        rastro = Rastro(pai[0] if pai else os.urandom(16).hex())
+        raiz = rastro.novo_span(f"HTTP {scope['method']} {scope['path']}", "http", None,
+                                **{"http.method": scope["method"], "http.target": scope["path"]})
+        if pai:
+            raiz.pai_id = pai[1]
+        traceparent = f"00-{rastro.trace_id}-{raiz.span_id}-01".encode()
+
+        async def _send(mensagem):
+            if mensagem["type"] == "http.response.start":
+                raiz.atributos["http.status_code"] = mensagem["status"]
+                if amostrado:
+                    mensagem = {**mensagem, "headers": [*mensagem.get("headers", []), (b"traceparent", traceparent)]}
+            await send(mensagem)
+
+        token = _contexto.set((rastro, raiz))
+        try:
+            await self.app(scope, receive, _send)
+        except BaseException as e:
+            raiz.erro = type(e).__name__
+            raise
+        finally:
+            _contexto.reset(token)
+            raiz.fim_ns = time.time_ns()
+            rota = scope.get("route")
+            if rota is not None and getattr(rota, "path", None):
+                raiz.nome = f"HTTP {scope['method']} {rota.path}"
+                raiz.atributos["http.route"] = rota.path
+            if amostrado or (raiz.fim_ns - raiz.inicio_ns) / 1e6 >= self.lentos_ms:
+                self.exportador.exportar(rastro)
+
+
+def _forcado(scope) -> bool:
+    for chave, valor in scope.get("headers") or ():
+        if (chave == b"x-rastrear" and valor == b"1") or (chave == b"traceparent" and valor.endswith(b"-01")):
+            return True
+    return False
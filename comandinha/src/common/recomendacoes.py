@@ -0,0 +1,278 @@
+# src/common/recomendacoes.py
+"""
+Recomendações a partir do histórico de pedidos (GET /produtos/recomendados).
+
+- Popularidade com decaimento exponencial: cada unidade pedida vale
+  0.5 ** (idade / RECOMENDACOES_MEIA_VIDA_H), então o que vendeu nesta semana
+  pesa mais que o sucesso do mês passado.
+- "Pedidos juntos": para cada par de produtos no mesmo pedido, um peso de
+  co-ocorrência com o mesmo decaimento; cada produto guarda só os
+  RECOMENDACOES_TOP_K vizinhos mais fortes.
+
+Popularidade e ranking são por restaurante (o pedido diz de qual é): um
+restaurante pequeno não some do top dos grandes. Os pares já são naturalmente
+de um restaurante só (produtos do mesmo pedido).
+
+Um job periódico (thread, a cada RECOMENDACOES_INTERVALO_S) lê apenas os
+pedidos novos, acima da marca d'água (último pedido.id processado). Pedidos
+mais novos que RECOMENDACOES_ATRASO_S ficam para a rodada seguinte, para não
+pular pedidos cuja transação ainda não terminou.
+
+A resposta sai da memória: ranking nas tabelas acima e produtos do
+`catalogo_simples` (um ProdutoSimples por produto disponível, montado uma vez
+por versão do cardápio). Sem histórico ainda, completa com os produtos
+marcados como `popular` no admin (comportamento anterior).
+"""
+import heapq
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from src.common.cache_cardapio import cache_cardapio
+from src.common.tz import TZ, now_sp
+
+logger = logging.getLogger(__name__)
+
+RECOMENDACOES_MEIA_VIDA_H = float(os.getenv("RECOMENDACOES_MEIA_VIDA_H", "168"))   # 7 dias
+RECOMENDACOES_INTERVALO_S = float(os.getenv("RECOMENDACOES_INTERVALO_S", "60"))
+RECOMENDACOES_ATRASO_S = float(os.getenv("RECOMENDACOES_ATRASO_S", "5"))
+RECOMENDACOES_TOP_K = int(os.getenv("RECOMENDACOES_TOP_K", "10"))
+RECOMENDACOES_LOTE = int(os.getenv("RECOMENDACOES_LOTE", "2000"))
+
+_TOP_POPULARES = 100
+_PESO_MINIMO = 1e-4     # pares que decaíram abaixo disso são descartados
+
+
+def _epoch(dt) -> float:
+    if dt.tzinfo is None:
+        # SQLite devolve sem offset (gravado em America/Sao_Paulo)
+        dt = dt.replace(tzinfo=TZ)
+    return dt.timestamp()
+
+
+class MotorRecomendacoes:
+    def __init__(self, meia_vida_h: float = RECOMENDACOES_MEIA_VIDA_H, top_k: int = RECOMENDACOES_TOP_K):
+        self.meia_vida_s = meia_vida_h * 3600.0
+        self.top_k = top_k
+        self.marca_dagua = 0          # último pedido.id incorporado
+        self.versao = 0               # muda quando as tabelas mudam
+        self._versoes: Dict[Optional[int], int] = {}  # por restaurante (chave do cache de payload)
+
+        self._t_ref: Optional[float] = None          # instante a que os pesos se referem
+        # restaurante -> produto -> peso
+        self._popularidade: Dict[Optional[int], Dict[int, float]] = defaultdict(lambda: defaultdict(float))
+        self._pares: Dict[int, Dict[int, float]] = defaultdict(lambda: defaultdict(float))
+
+        # tabelas compactas consultadas pelas requisições (trocadas atomicamente)
+        self._populares: Dict[Optional[int], Tuple[int, ...]] = {}
+        self._vizinhos: Dict[int, Tuple[Tuple[int, float], ...]] = {}
+
+        self._lock = threading.Lock()           # serializa as atualizações
+        self._parar = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # ---------- incorporação ----------
+    def _decair_ate(self, agora: float) -> None:
+        if self._t_ref is None:
+            self._t_ref = agora
+            return
+        if agora <= self._t_ref:
+            return
+        fator = 0.5 ** ((agora - self._t_ref) / self.meia_vida_s)
+        self._t_ref = agora
+        if fator > 0.999:
+            return
+        for pesos in self._popularidade.values():
+            for pid in list(pesos):
+                pesos[pid] *= fator
+        for a in list(self._pares):
+            vizinhos = self._pares[a]
+            for b in list(vizinhos):
+                vizinhos[b] *= fator
+                if vizinhos[b] < _PESO_MINIMO:
+                    del vizinhos[b]
+            if not vizinhos:
+                del self._pares[a]
+
+    def versao_de(self, restaurante_id: Optional[int]) -> int:
+        return self._versoes.get(restaurante_id, 0)
+
+    def incorporar(
+        self,
+        pedidos: Iterable[Tuple[int, float, Sequence[Tuple[int, int]], Optional[int]]],
+        agora: Optional[float] = None,
+    ) -> int:
+        """
+        `pedidos`: (pedido_id, instante epoch, [(produto_id, quantidade), ...], restaurante_id).
+        Atualiza os pesos e reconstrói só as linhas de top-K e os rankings afetados.
+        """
+        agora = time.time() if agora is None else agora
+        with self._lock:
+            self._decair_ate(agora)
+            tocados = set()
+            restaurantes = set()
+            n = 0
+            for pedido_id, instante, itens, restaurante_id in pedidos:
+                peso = 0.5 ** (max(0.0, agora - instante) / self.meia_vida_s)
+                popularidade = self._popularidade[restaurante_id]
+                restaurantes.add(restaurante_id)
+                produtos = set()
+                for produto_id, quantidade in itens:
+                    popularidade[produto_id] += peso * max(1, quantidade or 1)
+                    produtos.add(produto_id)
+                for a in produtos:
+                    for b in produtos:
+                        if a != b:
+                            self._pares[a][b] += peso
+                tocados |= produtos
+                self.marca_dagua = max(self.marca_dagua, pedido_id)
+                n += 1
+            if not n:
+                return 0
+
+            populares = dict(self._populares)
+            for restaurante_id in restaurantes:
+                top = heapq.nlargest(_TOP_POPULARES, self._popularidade[restaurante_id].items(), key=lambda x: x[1])
+                populares[restaurante_id] = tuple(pid for pid, _ in top)
+                self._versoes[restaurante_id] = self._versoes.get(restaurante_id, 0) + 1
+            vizinhos = dict(self._vizinhos)
+            for a in tocados:
+                linha = heapq.nlargest(self.top_k, self._pares.get(a, {}).items(), key=lambda x: x[1])
+                vizinhos[a] = tuple(linha)
+            self._populares = populares
+            self._vizinhos = vizinhos
+            self.versao += 1
+            return n
+
+    def atualizar(self, db: Session) -> int:
+        """Incorpora os pedidos acima da marca d'água, em lotes. Retorna quantos pedidos entraram."""
+        from src.infra.sqlalchemy.models.item_pedido import ItemPedido
+        from src.infra.sqlalchemy.models.pedido import Pedido
+
+        limite_ts = now_sp().timestamp() - RECOMENDACOES_ATRASO_S
+        total = 0
+        while True:
+            linhas = db.execute(
+                select(Pedido.id, Pedido.timestamp, Pedido.restaurante_id)
+                .where(Pedido.id > self.marca_dagua)
+                .order_by(Pedido.id)
+                .limit(RECOMENDACOES_LOTE)
+            ).all()
+            # para no primeiro pedido recente demais: a marca d'água não pode passar dele
+            lote = []
+            for pid, ts, restaurante_id in linhas:
+                if _epoch(ts) > limite_ts:
+                    break
+                lote.append((pid, _epoch(ts), restaurante_id))
+            if not lote:
+                return total
+
+            itens: Dict[int, List[Tuple[int, int]]] = defaultdict(list)
+            for pedido_id, produto_id, quantidade in db.execute(
+                select(ItemPedido.pedido_id, ItemPedido.produto_id, ItemPedido.quantidade)
+                .where(ItemPedido.pedido_id.between(lote[0][0], lote[-1][0]))
+            ):
+                itens[pedido_id].append((produto_id, quantidade))
+
+            total += self.incorporar((pid, ts, itens.get(pid, ()), r) for pid, ts, r in lote)
+            if len(lote) < len(linhas) or len(linhas) < RECOMENDACOES_LOTE:
+                return total
+
+    # ---------- consulta ----------
+    def recomendar(
+        self,
+        limite: int,
+        carrinho: Sequence[int] = (),
+        permitido: Callable[[int], bool] = lambda _: True,
+        restaurante_id: Optional[int] = None,
+    ) -> List[int]:
+        populares, vizinhos = self._populares.get(restaurante_id, ()), self._vizinhos    # leitura sem lock
+        excluir = set(carrinho)
+        escolhidos: List[int] = []
+
+        if carrinho:
+            pontos: Dict[int, float] = defaultdict(float)
+            for pid in excluir:
+                for outro, peso in vizinhos.get(pid, ()):
+                    if outro not in excluir:
+                        pontos[outro] += peso
+            for pid, _ in sorted(pontos.items(), key=lambda x: (-x[1], x[0])):
+                if permitido(pid):
+                    escolhidos.append(pid)
+                    if len(escolhidos) >= limite:
+                        return escolhidos
+
+        for pid in populares:
+            if pid not in excluir and pid not in escolhidos and permitido(pid):
+                escolhidos.append(pid)
+                if len(escolhidos) >= limite:
+                    break
+        return escolhidos
+
+    # ---------- job periódico ----------
+    def iniciar(self, session_factory, intervalo: float = RECOMENDACOES_INTERVALO_S) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._parar.clear()
+
+        def _laco():
+            while True:
+                try:
+                    with session_factory() as db:
+                        self.atualizar(db)
+                except Exception:
+                    logger.exception("falha ao atualizar recomendações")
+                if self._parar.wait(intervalo):
+                    return
+
+        self._thread = threading.Thread(target=_laco, name="recomendacoes", daemon=True)
+        self._thread.start()
+
+    def parar(self, timeout: float = 5.0) -> None:
+        self._parar.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+
+motor_recomendacoes = MotorRecomendacoes()
+
+
+def catalogo_simples(db: Session, restaurante_id: Optional[int] = None) -> Dict[int, object]:
+    """{id: ProdutoSimples} dos produtos disponíveis do restaurante, uma vez por versão do cardápio."""
+    from src.infra.sqlalchemy.models.produto import Produto
+    from src.schemas.produto import ProdutoSimples
+
+    def construir():
+        stmt = select(Produto).where(Produto.disponivel == True).order_by(Produto.id)  # noqa: E712
+        if restaurante_id is not None:
+            stmt = stmt.where(Produto.restaurante_id == restaurante_id)
+        return {
+            p.id: ProdutoSimples.model_validate(p, from_attributes=True, by_name=True)
+            for p in db.scalars(stmt)
+        }
+
+    return cache_cardapio.derivado("produtos_simples", construir, restaurante_id)
+
+
+def produtos_recomendados(db: Session, limite: int, carrinho: Sequence[int] = (),
+                          restaurante_id: Optional[int] = None) -> list:
+    catalogo = catalogo_simples(db, restaurante_id)
+    ids = motor_recomendacoes.recomendar(
+        limite, carrinho, permitido=catalogo.__contains__, restaurante_id=restaurante_id
+    )
+    if len(ids) < limite:
+        # sem histórico suficiente: completa com os marcados como populares no admin
+        ja = set(ids) | set(carrinho)
+        for pid, p in catalogo.items():
+            if p.popular and pid not in ja:
+                ids.append(pid)
+                if len(ids) >= limite:
+                    break
+    return [catalogo[i] for i in ids]
@@ -0,0 +1,131 @@
+# src/common/resolvedor_mesas.py
+"""
+Resolução UUID da mesa -> (id, status_id, ativo, restaurante) para as rotas do
+cliente.
+
+Toda interação do cliente (POST /pedidos, POST /chamadas) começa resolvendo a
+mesa pelo UUID do QR code — é também dela que sai o restaurante (tenant)
+do pedido e do chamado. Este resolvedor guarda o resultado num LRU limitado
+(MESA_CACHE_MAX entradas), por processo, e só vai ao banco na primeira vez —
+e aí lê só essas colunas, não a entidade.
+
+Escrita: MesaRepositorio grava no resolvedor o que muda (criar_mesa,
+excluir_mesa, _set_status e o efeito de mesa em uso). As gravações feitas
+dentro de uma transação só valem depois do commit (rollback descarta), via
+`unidade_trabalho.apos_commit`.
+
+Mudanças feitas por outro worker chegam em até MESA_CACHE_TTL segundos (a
+entrada expira e é relida); por isso o pedido confere o status da mesa de novo
+dentro da própria transação (RepositorioPedido.criar_pedido). UUID desconhecido não é guardado: uma mesa criada
+em outro worker aparece na hora.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, NamedTuple, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+MESA_CACHE_MAX = int(os.getenv("MESA_CACHE_MAX", "5000"))
+MESA_CACHE_TTL = float(os.getenv("MESA_CACHE_TTL", "60"))
+
+
+class MesaResolvida(NamedTuple):
+    id: int
+    uuid: str
+    status_id: int
+    ativo: bool
+    restaurante_id: Optional[int] = None
+
+    @property
+    def desativada(self) -> bool:
+        return self.status_id == 4 or self.ativo is False
+
+
+class ResolvedorMesas:
+    def __init__(self, max_itens: int = MESA_CACHE_MAX, ttl: float = MESA_CACHE_TTL):
+        self.max_itens = max_itens
+        self.ttl = ttl
+        self._itens: "OrderedDict[str, tuple]" = OrderedDict()   # uuid -> (MesaResolvida, expira_em)
+        self._uuid_por_id: Dict[int, str] = {}
+        self._lock = threading.Lock()
+        self.estatisticas = {"acertos": 0, "faltas": 0}
+
+    def __len__(self) -> int:
+        return len(self._itens)
+
+    # ---------- leitura ----------
+    def resolver(self, db: Session, mesa_uuid: str) -> Optional[MesaResolvida]:
+        agora = time.monotonic()
+        with self._lock:
+            item = self._itens.get(mesa_uuid)
+            if item is not None and item[1] > agora:
+                self._itens.move_to_end(mesa_uuid)
+                self.estatisticas["acertos"] += 1
+                return item[0]
+            self.estatisticas["faltas"] += 1
+
+        from src.infra.sqlalchemy.models.mesa import Mesa
+
+        linha = db.execute(
+            select(Mesa.id, Mesa.uuid, Mesa.status_id, Mesa.ativo, Mesa.restaurante_id)
+            .where(Mesa.uuid == mesa_uuid)
+        ).first()
+        if linha is None:
+            self.remover(mesa_uuid)
+            return None
+        mesa = MesaResolvida(*linha)
+        self.gravar(mesa)
+        return mesa
+
+    # ---------- escrita ----------
+    def gravar(self, mesa: MesaResolvida) -> None:
+        with self._lock:
+            self._itens[mesa.uuid] = (mesa, time.monotonic() + self.ttl)
+            self._itens.move_to_end(mesa.uuid)
+            self._uuid_por_id[mesa.id] = mesa.uuid
+            while len(self._itens) > self.max_itens:
+                _, (antiga, _) = self._itens.popitem(last=False)
+                self._uuid_por_id.pop(antiga.id, None)
+
+    def remover(self, mesa_uuid: str) -> None:
+        with self._lock:
+            item = self._itens.pop(mesa_uuid, None)
+            if item is not None:
+                self._uuid_por_id.pop(item[0].id, None)
+
+    def remover_id(self, mesa_id: int) -> None:
+        """Mesa que o banco disse estar desativada ou excluída: a próxima resolução relê."""
+        with self._lock:
+            mesa_uuid = self._uuid_por_id.pop(mesa_id, None)
+            if mesa_uuid is not None:
+                self._itens.pop(mesa_uuid, None)
+
+    def atualizar_status(self, mesa_ids: Iterable[int], status_id: int) -> None:
+        """
+        UPDATE em massa por id (efeito de mesa em uso): ajusta as entradas já
+        conhecidas, sem derrubá-las — senão todo pedido faria a próxima
+        interação da mesa voltar ao banco. Desativadas não mudam.
+        """
+        with self._lock:
+            for mesa_id in mesa_ids:
+                mesa_uuid = self._uuid_por_id.get(mesa_id)
+                item = self._itens.get(mesa_uuid) if mesa_uuid else None
+                if item is not None and not item[0].desativada:
+                    self._itens[mesa_uuid] = (item[0]._replace(status_id=status_id), item[1])
+
+    def limpar(self) -> None:
+        with self._lock:
+            self._itens.clear()
+            self._uuid_por_id.clear()
+
+    # ---------- transação ----------
+    def apos_commit(self, db: Session, operacao: str, *args) -> None:
+        """Agenda `operacao` ("gravar" | "remover" | "atualizar_status") para o commit da sessão."""
+        from src.infra.sqlalchemy.config.unidade_trabalho import apos_commit
+        apos_commit(db, getattr(self, operacao), *args)
+
+
+resolvedor_mesas = ResolvedorMesas()
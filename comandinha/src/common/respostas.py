@@ -0,0 +1,38 @@
+# src/common/respostas.py
+from functools import lru_cache
+from typing import Any
+
+from fastapi import Response
+from fastapi.responses import ORJSONResponse
+from pydantic import TypeAdapter
+
+# Classe padrão do app (server.py): orjson em vez do json da stdlib
+RespostaPadrao = ORJSONResponse
+
+MEDIA_JSON = "application/json"
+
+
+@lru_cache(maxsize=None)
+def _adaptador(tipo: Any) -> TypeAdapter:
+    # TypeAdapter compila o validador/serializador do pydantic-core: cria uma vez por tipo
+    return TypeAdapter(tipo)
+
+
+def serializar(tipo: Any, dados: Any) -> bytes:
+    """
+    Valida `dados` (linhas ORM, dicts ou instâncias do schema) contra `tipo`
+    UMA vez e serializa direto para bytes JSON (com aliases).
+    Instâncias já do schema não são revalidadas.
+    """
+    adaptador = _adaptador(tipo)
+    obj = adaptador.validate_python(dados, from_attributes=True, by_name=True)
+    return adaptador.dump_json(obj, by_alias=True)
+
+
+def resposta_modelo(tipo: Any, dados: Any, status_code: int = 200) -> Response:
+    """
+    Substitui `Model.model_validate(...).model_dump(by_alias=True)` + validação do
+    response_model + encoder JSON: devolvendo um Response pronto, o FastAPI não
+    valida/codifica de novo. Mantenha o `response_model` na rota para o OpenAPI.
+    """
+    return Response(content=serializar(tipo, dados), status_code=status_code, media_type=MEDIA_JSON)
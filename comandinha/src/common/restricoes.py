@@ -0,0 +1,117 @@
+# src/common/restricoes.py
+"""
+Filtro de restrições alimentares (vegano, sem glúten, ...) por bitsets.
+
+`Produto.restricoes` é uma lista JSON, que o banco não filtra bem. A cada
+versão do cardápio de cada restaurante montamos, a partir só de (id, restricoes):
+- um bit por restrição conhecida (nomes normalizados: "Sem Glúten" == "sem gluten");
+- para cada restrição, um bitset (int do Python) com as POSIÇÕES dos produtos
+  que a têm.
+
+"vegano E sem gluten" vira um AND entre dois inteiros — feito em C, palavra a
+palavra, sem laço em Python por produto — e só as posições resultantes são
+convertidas em ids.
+
+Edições pelo admin (RepositorioProduto.criar/editar/editar_parcial, bulk) geram
+nova versão do cardápio no commit, e o índice é reconstruído na próxima leitura.
+"""
+import re
+import unicodedata
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from src.common.cache_cardapio import cache_cardapio
+
+_ESPACOS = re.compile(r"[\s_\-]+")
+
+
+def normalizar_restricao(nome: str) -> str:
+    decomposto = unicodedata.normalize("NFKD", nome or "")
+    sem_acento = "".join(c for c in decomposto if not unicodedata.combining(c))
+    return _ESPACOS.sub(" ", sem_acento).strip().lower()
+
+
+def separar_restricoes(valores: Optional[Iterable[str]]) -> List[str]:
+    """Aceita `?restricoes=vegano&restricoes=sem gluten` e `?restricoes=vegano,sem gluten`."""
+    saida = []
+    for valor in valores or ():
+        for parte in valor.split(","):
+            r = normalizar_restricao(parte)
+            if r and r not in saida:
+                saida.append(r)
+    return saida
+
+
+class IndiceRestricoes:
+    def __init__(self, produtos: Iterable[tuple]):
+        """`produtos`: pares (id, restricoes) em ordem estável (por id)."""
+        self.bits: Dict[str, int] = {}        # restrição -> número do bit
+        self.ids: List[int] = []              # posição -> id do produto
+        self._colunas: List[int] = []         # bit -> bitset de posições
+
+        for pos, (produto_id, restricoes) in enumerate(produtos):
+            for r in restricoes or ():
+                nome = normalizar_restricao(r)
+                if not nome:
+                    continue
+                bit = self.bits.get(nome)
+                if bit is None:
+                    bit = self.bits[nome] = len(self.bits)
+                    self._colunas.append(0)
+                self._colunas[bit] |= 1 << pos
+            self.ids.append(produto_id)
+
+    @classmethod
+    def construir(cls, db: Session, restaurante_id: Optional[int] = None) -> "IndiceRestricoes":
+        from src.infra.sqlalchemy.models.produto import Produto
+
+        stmt = select(Produto.id, Produto.restricoes).order_by(Produto.id)
+        if restaurante_id is not None:
+            stmt = stmt.where(Produto.restaurante_id == restaurante_id)
+        return cls(db.execute(stmt).all())
+
+    def conhecidas(self) -> List[str]:
+        return sorted(self.bits)
+
+    def chave(self, restricoes: Iterable[str]) -> str:
+        """
+        Chave de cache do filtro: nomes normalizados, sem repetição e em ordem
+        (a ordem e a grafia da URL não geram entradas novas). Restrição que
+        nenhum produto tem dá resultado vazio: todas caem numa chave só, e
+        texto arbitrário do cliente não enche o cache.
+        """
+        nomes = sorted({normalizar_restricao(r) for r in restricoes} - {""})
+        if any(n not in self.bits for n in nomes):
+            return "-"
+        # "," nunca sobra num nome (separar_restricoes divide nela)
+        return ",".join(nomes)
+
+    def filtrar(self, restricoes: Iterable[str]) -> List[int]:
+        """Ids (em ordem) dos produtos que têm TODAS as restrições pedidas."""
+        restricoes = list(restricoes)
+        if not restricoes:
+            return list(self.ids)
+        selecionados = -1    # todos os bits ligados
+        for r in restricoes:
+            bit = self.bits.get(normalizar_restricao(r))
+            if bit is None:
+                return []
+            selecionados &= self._colunas[bit]
+            if not selecionados:
+                return []
+
+        ids = []
+        while selecionados:
+            menor = selecionados & -selecionados
+            ids.append(self.ids[menor.bit_length() - 1])
+            selecionados ^= menor
+        return ids
+
+
+def indice_restricoes(db: Session, restaurante_id: Optional[int] = None) -> IndiceRestricoes:
+    """Índice da versão atual do cardápio do restaurante (construído uma vez por versão)."""
+    return cache_cardapio.derivado(
+        "restricoes", lambda: IndiceRestricoes.construir(db, restaurante_id), restaurante_id
+    )
@@ -0,0 +1,261 @@
+# src/common/sessao_mesa.py
+"""
+Read model da "sessão da mesa" (GET /mesas/uuid/{uuid}/sessao).
+
+A tela do cliente mostra os pedidos abertos da ocupação atual, seus itens, a
+conta e os chamados. Em vez de reler o histórico da mesa a cada polling, cada
+mesa tem um snapshot imutável em memória:
+
+- pedidos não concluídos (status_id != 4), com itens;
+- chamados pendentes e os criados desde o início da ocupação;
+- conta (soma de valorTotal) e uma versão, que vira o ETag.
+
+Escritas mantêm o snapshot de forma incremental, aplicadas só após o commit
+(`unidade_trabalho.apos_commit`; rollback descarta): pedido criado, status
+de pedido, chamado criado/atendido/cancelado. `limpar_sessao_voltar_disponivel`
+(conta encerrada) reinicia a sessão. Cada escrita gera um snapshot novo
+(copy-on-write): o leitor nunca vê metade de uma atualização.
+
+Sem snapshot (primeira leitura, após SESSAO_MESA_TTL, ou mudança não
+rastreada como remover pedido), a sessão é reconstruída do banco: pedidos
+abertos (itens e produtos via selectinload) e chamados. Se uma escrita chegar durante a reconstrução, o resultado é
+servido mas não guardado. Escritas de outro worker aparecem em até
+SESSAO_MESA_TTL segundos.
+"""
+import itertools
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field, replace
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import orjson
+from sqlalchemy import or_, select
+from sqlalchemy.orm import Session, selectinload
+
+from src.common.tz import TZ, now_sp
+
+SESSAO_MESA_TTL = float(os.getenv("SESSAO_MESA_TTL", "30"))
+SESSAO_MESA_MAX = int(os.getenv("SESSAO_MESA_MAX", "2000"))
+
+_STATUS_CONCLUIDO = 4
+
+# versões vêm de um contador do processo (nunca se repetem após reconstruir)
+# e o ETag leva um id da instância: ETag de outro worker/processo não gera 304
+_INSTANCIA = os.urandom(4).hex()
+_versoes = itertools.count(1)
+
+
+def _aware(dt: Optional[datetime]) -> Optional[datetime]:
+    # SQLite devolve sem offset (gravado em America/Sao_Paulo)
+    if dt is not None and dt.tzinfo is None:
+        return dt.replace(tzinfo=TZ)
+    return dt
+
+
+# ---------------- formatos (mesmo shape de GET /mesas/{id}/pedidos) ----------------
+def dict_item(produto, quantidade: int, observacoes: Optional[str]) -> dict:
+    return {
+        "produtoNome": produto.nome if produto else None,
+        "produtoDescricao": produto.descricao if produto else None,
+        "produtoAdicionais": produto.adicionais if produto else None,
+        "quantidade": quantidade,
+        "observacoes": observacoes,
+    }
+
+
+def dict_pedido(p, itens: Optional[List[dict]] = None) -> dict:
+    """`itens` já montados (criação do pedido) ou lidos de `p.itens` (carregados)."""
+    return {
+        "pedidoId": p.id,
+        "mesaId": p.mesa_id,
+        "timestamp": _aware(p.timestamp),
+        "status": p.status,
+        "observacoesGerais": p.observacoes_gerais,
+        "estimativaEntrega": _aware(p.estimativa_entrega),
+        "valorTotal": p.valor_total,
+        "statusId": p.status_id,
+        "itens": itens if itens is not None else [
+            dict_item(it.produto, it.quantidade, it.observacoes) for it in p.itens
+        ],
+    }
+
+
+def dict_chamado(ch) -> dict:
+    from src.infra.sqlalchemy.repositorios.repositorio_chamado import RepositorioChamado
+
+    d = RepositorioChamado.to_response_dict(ch)
+    for campo in ("criado_em", "atendido_em", "cancelado_em"):
+        d[campo] = _aware(d[campo])
+    return d
+
+
+# ---------------- snapshot ----------------
+@dataclass(frozen=True)
+class SessaoMesa:
+    mesa_id: int
+    uuid: str
+    inicio: Optional[datetime]
+    pedidos: Tuple[dict, ...] = ()
+    chamados: Tuple[dict, ...] = ()
+    versao: int = 0
+    expira_em: float = 0.0
+    _corpo: list = field(default_factory=list, compare=False, repr=False)   # JSON, montado uma vez
+
+    @property
+    def etag(self) -> str:
+        return f'"sessao-{_INSTANCIA}-{self.mesa_id}-{self.versao}"'
+
+    def corpo(self) -> bytes:
+        if not self._corpo:
+            total = sum(float(p.get("valorTotal") or 0.0) for p in self.pedidos)
+            self._corpo.append(orjson.dumps({
+                "mesaId": self.mesa_id,
+                "uuid": self.uuid,
+                "inicio": self.inicio,
+                "pedidos": list(self.pedidos),
+                "chamados": list(self.chamados),
+                "conta": {"total": round(total, 2), "pedidos": len(self.pedidos)},
+                "versao": self.versao,
+            }))
+        return self._corpo[0]
+
+    def com(self, **mudancas) -> "SessaoMesa":
+        return replace(self, versao=next(_versoes), _corpo=[], **mudancas)
+
+
+def _upsert(itens: Tuple[dict, ...], chave: str, novo: dict) -> Tuple[dict, ...]:
+    for i, atual in enumerate(itens):
+        if atual[chave] == novo[chave]:
+            return itens[:i] + (novo,) + itens[i + 1:]
+    return itens + (novo,)
+
+
+class ModeloSessoesMesa:
+    def __init__(self, ttl: float = SESSAO_MESA_TTL, max_mesas: int = SESSAO_MESA_MAX):
+        self.ttl = ttl
+        self.max_mesas = max_mesas
+        self._sessoes: "OrderedDict[int, SessaoMesa]" = OrderedDict()
+        self._inicios: Dict[int, datetime] = {}      # início conhecido da ocupação (reinício nesta instância)
+        self._geracao: Dict[int, int] = {}           # escritas por mesa (detecta corrida com a reconstrução)
+        self._lock = threading.Lock()
+
+    # ---------- leitura ----------
+    def obter(self, db: Session, mesa_id: int, mesa_uuid: str) -> SessaoMesa:
+        with self._lock:
+            sessao = self._sessoes.get(mesa_id)
+            if sessao is not None and sessao.expira_em > time.monotonic():
+                self._sessoes.move_to_end(mesa_id)
+                return sessao
+            geracao = self._geracao.get(mesa_id, 0)
+            inicio = self._inicios.get(mesa_id)
+
+        sessao = self._construir(db, mesa_id, mesa_uuid, inicio, next(_versoes))
+
+        with self._lock:
+            if self._geracao.get(mesa_id, 0) == geracao:
+                self._guardar(sessao)
+        return sessao
+
+    def _construir(self, db: Session, mesa_id: int, mesa_uuid: str, inicio: Optional[datetime], versao: int) -> SessaoMesa:
+        from src.infra.sqlalchemy.models.chamado_garcom import ChamadoGarcom
+        from src.infra.sqlalchemy.models.item_pedido import ItemPedido
+        from src.infra.sqlalchemy.models.pedido import Pedido
+
+        pedidos = db.scalars(
+            select(Pedido)
+            .where(Pedido.mesa_id == mesa_id, Pedido.status_id != _STATUS_CONCLUIDO)
+            .options(selectinload(Pedido.itens).selectinload(ItemPedido.produto))
+            .order_by(Pedido.timestamp, Pedido.id)
+        ).all()
+        if inicio is None and pedidos:
+            inicio = _aware(pedidos[0].timestamp)
+
+        filtro = ChamadoGarcom.status == 1
+        if inicio is not None:
+            filtro = or_(filtro, ChamadoGarcom.criado_em >= inicio)
+        chamados = db.scalars(
+            select(ChamadoGarcom)
+            .where(ChamadoGarcom.mesa_uuid == mesa_uuid, filtro)
+            .order_by(ChamadoGarcom.criado_em, ChamadoGarcom.id)
+        ).all()
+
+        return SessaoMesa(
+            mesa_id=mesa_id,
+            uuid=mesa_uuid,
+            inicio=inicio,
+            pedidos=tuple(dict_pedido(p) for p in pedidos),
+            chamados=tuple(dict_chamado(ch) for ch in chamados),
+            versao=versao,
+            expira_em=time.monotonic() + self.ttl,
+        )
+
+    def _guardar(self, sessao: SessaoMesa) -> None:
+        self._sessoes[sessao.mesa_id] = sessao
+        self._sessoes.move_to_end(sessao.mesa_id)
+        while len(self._sessoes) > self.max_mesas:
+            antiga, _ = self._sessoes.popitem(last=False)
+            self._inicios.pop(antiga, None)
+            self._geracao.pop(antiga, None)
+
+    # ---------- escrita (chamadas após o commit) ----------
+    def _alterar(self, mesa_id: int, fn) -> None:
+        with self._lock:
+            self._geracao[mesa_id] = self._geracao.get(mesa_id, 0) + 1
+            sessao = self._sessoes.get(mesa_id)
+            if sessao is not None:
+                self._sessoes[mesa_id] = fn(sessao)
+
+    def pedido(self, mesa_id: int, dados: dict) -> None:
+        def _fn(s: SessaoMesa) -> SessaoMesa:
+            if dados["statusId"] == _STATUS_CONCLUIDO:
+                return s.com(pedidos=tuple(p for p in s.pedidos if p["pedidoId"] != dados["pedidoId"]))
+            inicio = s.inicio or dados["timestamp"]
+            return s.com(pedidos=_upsert(s.pedidos, "pedidoId", dados), inicio=inicio)
+        self._alterar(mesa_id, _fn)
+
+    def status_pedido(self, mesa_id: int, pedido_id: int, status: str, status_id: int) -> None:
+        def _fn(s: SessaoMesa) -> SessaoMesa:
+            for p in s.pedidos:
+                if p["pedidoId"] == pedido_id:
+                    if status_id == _STATUS_CONCLUIDO:
+                        return s.com(pedidos=tuple(x for x in s.pedidos if x is not p))
+                    return s.com(pedidos=_upsert(s.pedidos, "pedidoId", {**p, "status": status, "statusId": status_id}))
+            return s
+        self._alterar(mesa_id, _fn)
+
+    def chamado(self, mesa_id: int, dados: dict) -> None:
+        self._alterar(mesa_id, lambda s: s.com(chamados=_upsert(s.chamados, "id", dados)))
+
+    def reiniciar(self, mesa_id: int) -> None:
+        """Conta encerrada: a próxima ocupação começa vazia, agora."""
+        agora = now_sp()
+        with self._lock:
+            self._inicios[mesa_id] = agora
+        self._alterar(mesa_id, lambda s: s.com(inicio=agora, pedidos=(), chamados=()))
+
+    def descartar(self, mesa_ids: Optional[Iterable[int]] = None) -> None:
+        """
+        Mudança não rastreada (remover pedido, limpeza): as mesas dadas são
+        relidas na próxima leitura. None = todas (limpeza sem restaurante).
+        """
+        with self._lock:
+            if mesa_ids is None:
+                for m in list(self._geracao):
+                    self._geracao[m] += 1
+                self._sessoes.clear()
+                return
+            for mesa_id in mesa_ids:
+                self._geracao[mesa_id] = self._geracao.get(mesa_id, 0) + 1
+                self._sessoes.pop(mesa_id, None)
+
+    # ---------- transação ----------
+    def apos_commit(self, db: Session, operacao: str, *args) -> None:
+        """Agenda `operacao` (nome de método deste modelo) para o commit da sessão."""
+        from src.infra.sqlalchemy.config.unidade_trabalho import apos_commit
+        apos_commit(db, getattr(self, operacao), *args)
+
+
+sessoes_mesa = ModeloSessoesMesa()
@@ -0,0 +1,374 @@
+# src/common/sla_cozinha.py
+"""
+Monitor de SLA da cozinha: alerta de pedido em risco / atrasado.
+
+Cada pedido aberto na cozinha (status 1/2) tem dois prazos numa agenda em
+memória (src.common.agenda), derivados de `estimativa_entrega`:
+
+- "risco":   SLA_RISCO_MINUTOS antes da estimativa;
+- "atraso":  a própria estimativa (+ SLA_TOLERANCIA_MINUTOS).
+
+Criar pedido ou mudar o status/estimativa reagenda os dois (O(log n));
+entregue (3), concluído (4) ou removido sai da agenda. Nada consulta o banco
+em intervalos: a thread dorme até o próximo prazo e o alerta sai quando ele
+vence. Na hora de disparar, o lote é conferido no banco numa consulta (status
+e estimativa atuais), o que cobre mudanças feitas por outro worker.
+
+Alertas vão para a tabela alertas_sla, no formato dos chamados de garçom
+(id, mesa, motivo, criado_em, status pendente/atendido), para o painel do
+admin (GET /admin/cozinha/sla, GET /admin/cozinha/alertas) e para quem
+assinar (`assinar(fn)`, chamada na thread da agenda). No banco, todo worker
+vê os mesmos alertas e ids (`desde`, `atender`) e um worker reciclado não
+perde os pendentes; o índice único por (pedido, tipo, prazo) faz o INSERT do
+segundo worker que acompanha o mesmo pedido não virar alerta repetido. Cada
+pedido e alerta leva o restaurante: o painel de um admin só vê os dele.
+
+Eventos só valem após o commit (`unidade_trabalho.apos_commit`). No boot,
+`iniciar(SessionLocal)` remonta a agenda com UMA consulta aos pedidos 1/2.
+Cada worker acompanha os pedidos que viu no boot e os criados nele.
+SLA_COZINHA=0 desliga.
+"""
+import logging
+import os
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from src.common.agenda import Agenda, Vencido
+from src.common.tz import TZ, now_sp, para_epoch
+
+logger = logging.getLogger(__name__)
+
+SLA_COZINHA = os.getenv("SLA_COZINHA", "1") == "1"
+SLA_RISCO_MINUTOS = float(os.getenv("SLA_RISCO_MINUTOS", "5"))
+SLA_TOLERANCIA_MINUTOS = float(os.getenv("SLA_TOLERANCIA_MINUTOS", "0"))
+SLA_ALERTAS_MAX = int(os.getenv("SLA_ALERTAS_MAX", "500"))     # por listagem do painel
+
+_NA_COZINHA = (1, 2)
+
+RISCO = "risco"
+ATRASO = "atraso"
+_MOTIVOS = {RISCO: "pedido em risco", ATRASO: "pedido atrasado"}
+_PENDENTE, _ATENDIDO = 1, 2
+_STATUS = {_PENDENTE: "pendente", _ATENDIDO: "atendido"}
+
+
+def _aware(dt: Optional[datetime]) -> Optional[datetime]:
+    # SQLite devolve sem offset (gravado em America/Sao_Paulo)
+    if dt is not None and dt.tzinfo is None:
+        return dt.replace(tzinfo=TZ)
+    return dt
+
+
+def _dict_alerta(a) -> dict:
+    return {
+        "id": a.id,
+        "tipo": a.tipo,
+        "motivo": _MOTIVOS[a.tipo],
+        "pedido_id": a.pedido_id,
+        "mesa_id": a.mesa_id,
+        "restaurante_id": a.restaurante_id,
+        "estimativa_entrega": _aware(a.estimativa_entrega),
+        "criado_em": _aware(a.criado_em),
+        "status": _STATUS[a.status],
+        "atendido_em": _aware(a.atendido_em),
+    }
+
+
+@dataclass
+class PedidoAcompanhado:
+    pedido_id: int
+    mesa_id: int
+    estimativa: float           # epoch
+    restaurante_id: int         # alertas_sla.restaurante_id é NOT NULL
+    nivel: str = "no_prazo"     # no_prazo | risco | atraso
+
+
+class MonitorSLA:
+    def __init__(
+        self,
+        risco_min: float = SLA_RISCO_MINUTOS,
+        tolerancia_min: float = SLA_TOLERANCIA_MINUTOS,
+        max_alertas: int = SLA_ALERTAS_MAX,
+        ativo: bool = SLA_COZINHA,
+    ):
+        self.risco_s = risco_min * 60.0
+        self.tolerancia_s = tolerancia_min * 60.0
+        self.ativo = ativo
+        # sem janela: o alerta sai no segundo em que o prazo vence
+        self.agenda = Agenda("sla_cozinha", self._vencer, janela=0.0)
+        self._pedidos: Dict[int, PedidoAcompanhado] = {}
+        self.max_alertas = max_alertas
+        self._assinantes: List[Callable[[dict], None]] = []
+        self._lock = threading.Lock()
+        self._session_factory = None
+        self.estatisticas = {"risco": 0, "atraso": 0, "descartados": 0, "repetidos": 0}
+
+    # ---------- eventos (chamados após o commit) ----------
+    def acompanhar(self, pedido_id: int, mesa_id: int, estimativa: Optional[float],
+                   restaurante_id: int) -> None:
+        """Pedido na cozinha: (re)agenda os prazos de risco e de atraso."""
+        if not self.ativo or estimativa is None:
+            return
+        with self._lock:
+            atual = self._pedidos.get(pedido_id)
+            if atual is not None and atual.estimativa == estimativa:
+                return          # só mudou de pendente para em preparo
+            self._pedidos[pedido_id] = PedidoAcompanhado(pedido_id, mesa_id, estimativa, restaurante_id)
+        self._agendar(pedido_id, estimativa)
+
+    def _agendar(self, pedido_id: int, estimativa: float) -> None:
+        atraso = estimativa + self.tolerancia_s
+        self.agenda.agendar((pedido_id, ATRASO), atraso)
+        if self.risco_s > 0 and self.agenda.relogio() < atraso:
+            self.agenda.agendar((pedido_id, RISCO), estimativa - self.risco_s)
+        else:
+            self.agenda.cancelar((pedido_id, RISCO))
+
+    def status(self, pedido_id: int, mesa_id: int, status_id: int, estimativa: Optional[float],
+               restaurante_id: int) -> None:
+        if status_id in _NA_COZINHA:
+            self.acompanhar(pedido_id, mesa_id, estimativa, restaurante_id)
+        else:
+            self.concluir([pedido_id])
+
+    def concluir(self, pedido_ids: Iterable[int]) -> None:
+        """Entregue, concluído ou removido: sai da agenda."""
+        with self._lock:
+            for pedido_id in pedido_ids:
+                self._pedidos.pop(pedido_id, None)
+                self.agenda.cancelar((pedido_id, RISCO))
+                self.agenda.cancelar((pedido_id, ATRASO))
+
+    def limpar(self, restaurante_id: Optional[int] = None) -> None:
+        """Tira todos os pedidos da agenda (ou só os do restaurante)."""
+        if restaurante_id is not None:
+            with self._lock:
+                ids = [p.pedido_id for p in self._pedidos.values() if p.restaurante_id == restaurante_id]
+            self.concluir(ids)
+            return
+        with self._lock:
+            self._pedidos.clear()
+            self.agenda.limpar()
+
+    def apos_commit(self, db: Session, operacao: str, *args) -> None:
+        """Agenda `operacao` ("acompanhar" | "status" | "concluir" | "limpar") para o commit."""
+        from src.infra.sqlalchemy.config.unidade_trabalho import apos_commit
+        apos_commit(db, getattr(self, operacao), *args)
+
+    # ---------- alertas ----------
+    def assinar(self, fn: Callable[[dict], None]) -> None:
+        self._assinantes.append(fn)
+
+    def _emitir(self, p: PedidoAcompanhado, nivel: str) -> None:
+        valores = {
+            "restaurante_id": p.restaurante_id,
+            "pedido_id": p.pedido_id,
+            "mesa_id": p.mesa_id,
+            "tipo": nivel,
+            # segundos inteiros: todo worker chega ao mesmo prazo (índice único)
+            "estimativa_entrega": datetime.fromtimestamp(round(p.estimativa), TZ),
+            "status": _PENDENTE,
+            "criado_em": now_sp(),
+            "atendido_em": None,
+        }
+        alerta = {**valores, "id": None}
+        if self._session_factory is not None:
+            try:
+                alerta["id"] = self._gravar(valores)
+            except Exception:
+                logger.exception("SLA cozinha: falha ao gravar alerta (pedido %d)", p.pedido_id)
+                return
+            if alerta["id"] is None:
+                self.estatisticas["repetidos"] += 1     # outro worker já emitiu
+                return
+        alerta.update(motivo=_MOTIVOS[nivel], status=_STATUS[_PENDENTE])
+        self.estatisticas[nivel] += 1
+        log = logger.warning if nivel == ATRASO else logger.info
+        log("SLA cozinha: %s (pedido %d, mesa %d)", alerta["motivo"], p.pedido_id, p.mesa_id)
+        for fn in self._assinantes:
+            try:
+                fn(alerta)
+            except Exception:
+                logger.exception("SLA cozinha: assinante falhou")
+
+    def _gravar(self, valores: dict) -> Optional[int]:
+        """INSERT do alerta; None se o mesmo (pedido, tipo, prazo) já existe."""
+        from src.infra.sqlalchemy.models.alerta_sla import AlertaSLA
+
+        with self._session_factory() as db:
+            t = AlertaSLA.__table__
+            insert_ = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}.get(db.get_bind().dialect.name)
+            if insert_ is None:
+                try:
+                    with db.begin():
+                        res = db.execute(t.insert().values(**valores))
+                except IntegrityError:
+                    return None
+                return res.inserted_primary_key[0]
+            with db.begin():
+                res = db.execute(insert_(t).values(**valores).on_conflict_do_nothing(
+                    index_elements=[t.c.pedido_id, t.c.tipo, t.c.estimativa_entrega],
+                ))
+            return res.inserted_primary_key[0] if res.rowcount else None
+
+    def alertas(self, db: Session, desde: int = 0, pendentes: bool = False,
+                restaurante_id: Optional[int] = None) -> List[dict]:
+        """Alertas com id > `desde` (o painel guarda o último id que viu), do restaurante se dado."""
+        from src.infra.sqlalchemy.models.alerta_sla import AlertaSLA
+
+        consulta = select(AlertaSLA).where(AlertaSLA.id > desde)
+        if pendentes:
+            consulta = consulta.where(AlertaSLA.status == _PENDENTE)
+        if restaurante_id is not None:
+            consulta = consulta.where(AlertaSLA.restaurante_id == restaurante_id)
+        # os mais recentes, em ordem de id
+        linhas = db.execute(consulta.order_by(AlertaSLA.id.desc()).limit(self.max_alertas)).scalars().all()
+        return [_dict_alerta(a) for a in reversed(linhas)]
+
+    def atender(self, db: Session, alerta_id: int, restaurante_id: Optional[int] = None) -> Optional[dict]:
+        from src.infra.sqlalchemy.config.unidade_trabalho import atualizar_retornando, confirmar
+        from src.infra.sqlalchemy.models.alerta_sla import AlertaSLA
+
+        condicoes = () if restaurante_id is None else (AlertaSLA.restaurante_id == restaurante_id,)
+        # UPDATE condicional: atender de novo não troca o atendido_em
+        alerta = atualizar_retornando(
+            db, AlertaSLA, alerta_id, {"status": _ATENDIDO, "atendido_em": now_sp()},
+            AlertaSLA.status == _PENDENTE, *condicoes,
+        )
+        if alerta is None:
+            alerta = db.get(AlertaSLA, alerta_id)
+            if alerta is None or (restaurante_id is not None and alerta.restaurante_id != restaurante_id):
+                return None
+        confirmar(db)
+        return _dict_alerta(alerta)
+
+    def painel(self, db: Session, restaurante_id: Optional[int] = None) -> dict:
+        from src.infra.sqlalchemy.models.alerta_sla import AlertaSLA
+
+        with self._lock:
+            pedidos = sorted(
+                (p for p in self._pedidos.values() if restaurante_id is None or p.restaurante_id == restaurante_id),
+                key=lambda p: p.estimativa,
+            )
+        pendentes = select(func.count()).select_from(AlertaSLA).where(AlertaSLA.status == _PENDENTE)
+        if restaurante_id is not None:
+            pendentes = pendentes.where(AlertaSLA.restaurante_id == restaurante_id)
+        agora = self.agenda.relogio()
+        proximo = self.agenda.proximo()
+
+        def _linha(p: PedidoAcompanhado) -> dict:
+            return {
+                "pedido_id": p.pedido_id,
+                "mesa_id": p.mesa_id,
+                "estimativa_entrega": datetime.fromtimestamp(p.estimativa, TZ),
+                "minutos_restantes": round((p.estimativa - agora) / 60.0, 1),
+            }
+
+        return {
+            "atrasados": [_linha(p) for p in pedidos if p.nivel == ATRASO],
+            "em_risco": [_linha(p) for p in pedidos if p.nivel == RISCO],
+            "na_cozinha": len(pedidos),
+            "proximo_prazo": datetime.fromtimestamp(proximo, TZ) if proximo else None,
+            "alertas_pendentes": db.execute(pendentes).scalar(),
+            "estatisticas": dict(self.estatisticas),
+        }
+
+    # ---------- banco ----------
+    def reconstruir(self, db: Session) -> int:
+        """Agenda a partir dos pedidos 1/2 (uma consulta). Retorna quantos entraram."""
+        from src.infra.sqlalchemy.models.pedido import Pedido
+
+        if not self.ativo:
+            return 0
+        linhas = db.execute(
+            select(Pedido.id, Pedido.mesa_id, Pedido.estimativa_entrega, Pedido.restaurante_id)
+            .where(Pedido.status_id.in_(_NA_COZINHA), Pedido.estimativa_entrega.isnot(None))
+        ).all()
+        agora = self.agenda.relogio()
+        prazos = {}
+        with self._lock:
+            self._pedidos.clear()
+            for pedido_id, mesa_id, estimativa, restaurante_id in linhas:
+                estimativa = para_epoch(estimativa)
+                self._pedidos[pedido_id] = PedidoAcompanhado(pedido_id, mesa_id, estimativa, restaurante_id)
+                atraso = estimativa + self.tolerancia_s
+                prazos[(pedido_id, ATRASO)] = atraso
+                if self.risco_s > 0 and agora < atraso:
+                    prazos[(pedido_id, RISCO)] = estimativa - self.risco_s
+        self.agenda.limpar()
+        self.agenda.agendar_varios(prazos)
+        return len(linhas)
+
+    def _conferir(self, pedido_ids: List[int]) -> Optional[Dict[int, tuple]]:
+        """(status_id, estimativa) atuais do lote; None sem banco (aplica o que está em memória)."""
+        from src.infra.sqlalchemy.models.pedido import Pedido
+
+        if self._session_factory is None:
+            return None
+        with self._session_factory() as db:
+            return {
+                pedido_id: (status_id, para_epoch(estimativa))
+                for pedido_id, status_id, estimativa in db.execute(
+                    select(Pedido.id, Pedido.status_id, Pedido.estimativa_entrega)
+                    .where(Pedido.id.in_(pedido_ids))
+                )
+            }
+
+    def _vencer(self, lote: List[Vencido]) -> None:
+        atuais = self._conferir(sorted({pedido_id for (pedido_id, _), _ in lote}))
+        agora = self.agenda.relogio()
+        emitir, sair, reagendar = [], [], {}
+        with self._lock:
+            for (pedido_id, nivel), _ in lote:
+                p = self._pedidos.get(pedido_id)
+                if p is None:
+                    continue
+                if atuais is not None:
+                    status_id, estimativa = atuais.get(pedido_id, (None, None))
+                    if status_id not in _NA_COZINHA or estimativa is None:
+                        # entregue/removido por outro worker
+                        sair.append(pedido_id)
+                        continue
+                    if estimativa != p.estimativa:
+                        p.estimativa, p.nivel = estimativa, "no_prazo"
+                        reagendar[pedido_id] = estimativa
+                        continue
+                if nivel == RISCO and (p.nivel == ATRASO or agora >= p.estimativa + self.tolerancia_s):
+                    continue    # o alerta de atraso já cobre
+                if p.nivel != nivel:
+                    p.nivel = nivel
+                    emitir.append((p, nivel))
+
+        if sair:
+            self.estatisticas["descartados"] += len(sair)
+            self.concluir(sair)
+        for pedido_id, estimativa in reagendar.items():
+            self._agendar(pedido_id, estimativa)
+        for p, nivel in emitir:
+            self._emitir(p, nivel)
+
+    # ---------- ciclo de vida ----------
+    def iniciar(self, session_factory) -> None:
+        self._session_factory = session_factory
+        if not self.ativo:
+            return
+        try:
+            with session_factory() as db:
+                n = self.reconstruir(db)
+            logger.info("SLA cozinha: %d pedido(s) na agenda", n)
+        except Exception:
+            logger.exception("falha ao remontar a agenda de SLA da cozinha")
+        self.agenda.iniciar()
+
+    def parar(self) -> None:
+        self.agenda.parar()
+
+
+sla_cozinha = MonitorSLA()
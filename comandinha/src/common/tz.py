@@ -20,3 +20,11 @@ except Exception:
 def now_sp() -> datetime:
     """Retorna datetime aware em America/Sao_Paulo."""
     return datetime.now(TZ)
+
+def para_epoch(dt):
+    """datetime do banco -> epoch; sem offset (SQLite) é horário de São Paulo."""
+    if dt is None:
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=TZ)
+    return dt.timestamp()
@@ -1,13 +1,40 @@
-from fastapi import Depends, HTTPException, Header, Security, status
+import os
+from typing import NamedTuple, Optional
+
+from fastapi import Depends, HTTPException, Header, Query, Security, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 
-from src.infra.sqlalchemy.config.database import get_db
+from src.infra.sqlalchemy.config.database import SessionLocal, get_db
+from src.infra.sqlalchemy.config.unidade_trabalho import fixar_restaurante
 from src.infra.sqlalchemy.models.mesa import Mesa
+from src.infra.sqlalchemy.models.restaurante import Restaurante
 from src.infra.sqlalchemy.repositorios.repositorio_restaurante import RepositorioRestaurante
 from src.infra.providers.token_provider import TokenProvider
+from src.common.resolvedor_mesas import resolvedor_mesas
 
 _bearer = HTTPBearer(auto_error=True)
+_bearer_opcional = HTTPBearer(auto_error=False)
+
+# restaurante das leituras públicas sem X-Restaurante-Id / ?restauranteId.
+# Sem RESTAURANTE_PADRAO é o primeiro restaurante cadastrado (min(id)): o mesmo
+# que recebeu os dados antigos na migração do tenant (instalação de um só).
+RESTAURANTE_PADRAO = int(os.getenv("RESTAURANTE_PADRAO", "0")) or None
+_padrao_resolvido: Optional[int] = None
+
+# e-mails (separados por vírgula) dos admins que operam a instalação: as
+# métricas de /admin/admissao, /admin/replicas e /admin/consultas-lentas são do
+# processo inteiro, de todos os restaurantes. Vazio = ninguém.
+ADMIN_OPERADORES = frozenset(
+    e.strip().lower() for e in os.getenv("ADMIN_OPERADORES", "").split(",") if e.strip()
+)
+
+# leitura de pedidos sem login e sem o UUID da mesa, como o app do cliente faz
+# hoje: o restaurante vem do header/query (get_restaurante_publico).
+# PEDIDOS_LEITURA_LEGADA=0 passa a exigir um dos dois — mudança incompatível,
+# para quando o app mandar o UUID da mesa.
+PEDIDOS_LEITURA_LEGADA = os.getenv("PEDIDOS_LEITURA_LEGADA", "1") == "1"
 
 
 def get_current_admin(
@@ -17,6 +44,9 @@ def get_current_admin(
     """
     Extrai 'Authorization: Bearer <jwt>' do header,
     valida o token e carrega o admin do banco.
+
+    O admin É o restaurante (tenant): as rotas protegidas passam `admin.id`
+    aos repositórios, que filtram e gravam só dentro dele.
     """
     token = cred.credentials
     sub = TokenProvider.verify_access_token(token)
@@ -30,9 +60,84 @@ def get_current_admin(
     if not admin:
         raise HTTPException(status.HTTP_401_UNAUTHORIZED, detail="Admin não encontrado")
 
+    fixar_restaurante(db, admin.id)
+    return admin
+
+
+def get_operador(admin: Restaurante = Depends(get_current_admin)):
+    """
+    Admin que também opera a instalação (e-mail em ADMIN_OPERADORES). O
+    cadastro de restaurante é público, então ser admin não basta para ver
+    dados de todos os tenants.
+    """
+    if admin.email.lower() not in ADMIN_OPERADORES:
+        raise HTTPException(status.HTTP_403_FORBIDDEN, detail="Acesso restrito à operação")
     return admin
 
 
+def restaurante_padrao() -> int:
+    """RESTAURANTE_PADRAO ou, sem ele, o menor id de restaurante (uma consulta por processo)."""
+    global _padrao_resolvido
+    if RESTAURANTE_PADRAO:
+        return RESTAURANTE_PADRAO
+    if _padrao_resolvido is None:
+        with SessionLocal() as db:
+            _padrao_resolvido = db.execute(select(func.min(Restaurante.id))).scalar()
+    # nenhum restaurante ainda: não há o que listar, e o próximo pedido tenta de novo
+    return _padrao_resolvido or 0
+
+
+def get_restaurante_publico(
+    x_restaurante_id: Optional[int] = Header(None, description="Restaurante do cardápio (tenant)"),
+    restaurante_id: Optional[int] = Query(None, alias="restauranteId", description="Alternativa ao header X-Restaurante-Id"),
+) -> int:
+    """
+    Restaurante das leituras públicas que não partem do UUID de uma mesa
+    (cardápio, categorias, lista de mesas): query > header > restaurante_padrao().
+    Só serve para dados que qualquer um pode ver; rotas do cliente com o UUID
+    da mesa tiram o restaurante da própria mesa, e as leituras de pedido usam
+    `get_escopo_pedidos`.
+    """
+    return restaurante_id or x_restaurante_id or restaurante_padrao()
+
+
+class EscopoPedidos(NamedTuple):
+    restaurante_id: int
+    mesa_id: Optional[int] = None     # leitura pelo UUID: só os pedidos desta mesa
+
+
+def get_escopo_pedidos(
+    cred: Optional[HTTPAuthorizationCredentials] = Security(_bearer_opcional),
+    x_mesa_uuid: Optional[str] = Header(None, description="UUID da mesa (QR code)"),
+    mesa_uuid: Optional[str] = Query(None, alias="mesaUuid", description="Alternativa ao header X-Mesa-Uuid"),
+    x_restaurante_id: Optional[int] = Header(None, description="Restaurante (leitura legada)"),
+    restaurante_id: Optional[int] = Query(None, alias="restauranteId", description="Alternativa ao header X-Restaurante-Id"),
+    db: Session = Depends(get_db),
+) -> EscopoPedidos:
+    """
+    De quem são os pedidos que uma leitura pública (GET /pedidos/producao,
+    /pedidos/{id}, /mesas/{mesa_id}/pedidos) pode ver:
+    - token de admin: os do restaurante dele;
+    - UUID da mesa (X-Mesa-Uuid ou ?mesaUuid): só os daquela mesa;
+    - nenhum dos dois: leitura legada (PEDIDOS_LEITURA_LEGADA).
+    Um Bearer que não é de admin (ex.: token da mesa) não derruba a leitura.
+    """
+    if cred is not None:
+        try:
+            return EscopoPedidos(get_current_admin(cred, db).id)
+        except HTTPException:
+            pass
+    uuid = mesa_uuid or x_mesa_uuid
+    if uuid:
+        mesa = resolvedor_mesas.resolver(db, uuid)
+        if mesa is None:
+            raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Mesa não encontrada")
+        return EscopoPedidos(mesa.restaurante_id, mesa.id)
+    if not PEDIDOS_LEITURA_LEGADA:
+        raise HTTPException(status.HTTP_401_UNAUTHORIZED, detail="Informe o UUID da mesa ou faça login")
+    return EscopoPedidos(get_restaurante_publico(x_restaurante_id, restaurante_id))
+
+
 def get_mesa_autenticada(
     authorization: str = Header(..., description="Bearer token da mesa"),
     db: Session = Depends(get_db),
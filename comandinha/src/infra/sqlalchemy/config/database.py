@@ -1,8 +1,14 @@
 import os
 import re
-from sqlalchemy import create_engine
+from contextlib import contextmanager
+
+from fastapi import Request
+from sqlalchemy import create_engine, event, text
 from sqlalchemy.orm import declarative_base, sessionmaker
 
+from src.common.admissao import classificar_rota
+from src.common.disjuntor import disjuntor_banco, eh_falha_de_banco
+
 Base = declarative_base()
 
 def _normalize_db_url(url: str) -> str:
@@ -25,19 +31,102 @@ def _normalize_db_url(url: str) -> str:
 
 DATABASE_URL = _normalize_db_url(os.getenv("DATABASE_URL", ""))
 
-engine = create_engine(
-    DATABASE_URL,
-    pool_pre_ping=True,
-    future=True,
-)
 
-SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False, future=True)
+def criar_engine(url: str):
+    """Engine com as opções do app (o primário e as réplicas, ver replicas.py)."""
+    # SQLite (dev/benchmarks): a sessão do get_db é aberta e fechada em threads
+    # diferentes do threadpool, então a checagem de thread do sqlite3 precisa sair.
+    connect_args = {"check_same_thread": False} if url.startswith("sqlite") else {}
+    opcoes_pool = {}
+
+    # Postgres fora do ar: falhar em segundos (e alimentar o disjuntor, ver
+    # src.common.disjuntor) em vez de cada requisição esperar 30s pelo pool
+    if url.startswith("postgresql"):
+        connect_args = {"connect_timeout": int(os.getenv("DB_CONNECT_TIMEOUT", "5"))}
+        opcoes_pool = {"pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "10"))}
+
+    return create_engine(
+        url,
+        pool_pre_ping=True,
+        future=True,
+        connect_args=connect_args,
+        **opcoes_pool,
+    )
+
+
+engine = criar_engine(DATABASE_URL)
+
+# expire_on_commit=False: depois do commit os objetos continuam com o que foi
+# gravado — as rotas montam a resposta sem refresh nem recarga por atributo
+# (sessões são por requisição, então não há risco de ler estado velho).
+SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False, expire_on_commit=False, future=True)
+
+# statement_timeout por classe de rota (as mesmas da admissão): leitura do
+# cardápio desiste cedo, relatório pode demorar mais. 0 = sem limite.
+# DB_STATEMENT_TIMEOUT_MS_<CLASSE> sobrescreve uma classe.
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "5000"))
+_TIMEOUTS_MS = {
+    classe: int(os.getenv(f"DB_STATEMENT_TIMEOUT_MS_{classe.upper()}", padrao))
+    for classe, padrao in (
+        ("pedidos", DB_STATEMENT_TIMEOUT_MS),
+        ("geral", DB_STATEMENT_TIMEOUT_MS),
+        ("cardapio", 2000),
+        ("relatorios", 15000),
+    )
+}
+
+_CHAVE_TIMEOUT = "statement_timeout_ms"
+_CHAVE_USOU_BANCO = "usou_banco"
 
-Base = declarative_base()
 
-def get_db():
-    db = SessionLocal()
+def statement_timeout_ms(metodo: str, caminho: str) -> int:
+    return _TIMEOUTS_MS.get(classificar_rota(metodo, caminho), DB_STATEMENT_TIMEOUT_MS)
+
+
+@event.listens_for(SessionLocal, "after_begin")
+def _inicio_transacao(session, transaction, connection):
+    session.info[_CHAVE_USOU_BANCO] = True
+    ms = session.info.get(_CHAVE_TIMEOUT)
+    # SET LOCAL vale só para esta transação: a conexão volta limpa ao pool
+    if ms and connection.dialect.name == "postgresql":
+        connection.exec_driver_sql(f"SET LOCAL statement_timeout = {int(ms)}")
+
+
+def abrir_sessao(request: Request = None, bind=None):
+    """SessionLocal com o statement_timeout da classe da rota; `bind` troca o engine (réplica)."""
+    db = SessionLocal() if bind is None else SessionLocal(bind=bind)
+    if request is not None:
+        db.info[_CHAVE_TIMEOUT] = statement_timeout_ms(request.method, request.url.path)
+    return db
+
+
+@contextmanager
+def sessao_vigiada(request: Request = None):
+    """
+    Sessão da requisição sob o disjuntor do banco: aberto, levanta
+    BancoIndisponivel sem criar sessão; falhas de banco abrem, e qualquer
+    uso bem-sucedido do banco fecha/zera a contagem.
+    """
+    sonda = disjuntor_banco.permitir()
+    db = abrir_sessao(request)
+    resultado = None
     try:
+        if sonda:
+            db.execute(text("SELECT 1"))
         yield db
+    except Exception as e:
+        resultado = eh_falha_de_banco(e)
+        raise
     finally:
+        if resultado:
+            disjuntor_banco.falha()
+        elif db.info.get(_CHAVE_USOU_BANCO):
+            disjuntor_banco.sucesso()
+        elif sonda:
+            disjuntor_banco.liberar_sonda()
         db.close()
+
+
+def get_db(request: Request):
+    with sessao_vigiada(request) as db:
+        yield db
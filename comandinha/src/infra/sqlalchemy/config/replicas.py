@@ -0,0 +1,278 @@
+# src/infra/sqlalchemy/config/replicas.py
+"""
+Réplicas de leitura.
+
+REPLICA_URLS=url1,url2 (mesmo formato do DATABASE_URL) liga o roteamento: as
+rotas marcadas como só leitura — as que pedem `get_db_leitura` no lugar do
+`get_db` — abrem a sessão numa réplica, em rodízio; todo o resto continua no
+primário. Sem REPLICA_URLS, `get_db_leitura` é o próprio `get_db`.
+
+Primário como reserva: a réplica que falha ao conectar (ou com erro de banco
+no meio da leitura) fica fora por REPLICA_PAUSA_S. Na conexão a requisição
+segue na próxima réplica ou no primário; o disjuntor do banco
+(src.common.disjuntor) é do primário e não conta as réplicas.
+
+Ler o que acabou de escrever: depois de uma escrita bem-sucedida (POST, PUT,
+PATCH ou DELETE com status < 400) as leituras do mesmo cliente vão ao
+primário por REPLICA_ADERENCIA_S. Cliente = header Authorization (admin,
+mesa) ou, sem ele, o IP. A marca fica na memória do worker e num cookie curto
+que os outros workers também respeitam (ver `AderenciaMiddleware`). Uma edição
+do cardápio neste processo leva as leituras do cardápio de todos ao primário
+pela mesma janela: o cache (src.common.cache_cardapio) acabou de mudar de
+versão e não pode ser refeito a partir de uma réplica atrasada.
+
+Sessão de réplica recusa escrita (RuntimeError): rota marcada por engano
+falha no primeiro INSERT/UPDATE em vez de gravar na réplica.
+
+Para testar local: dois SQLite, com tools/replica_sqlite.py copiando o
+primário para a réplica a cada poucos segundos (atraso de replicação
+simulado); ou dois Postgres locais com publicação/assinatura lógica.
+GET /admin/replicas mostra o roteamento deste worker.
+"""
+import hashlib
+import itertools
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+from fastapi import Request
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from starlette.datastructures import Headers
+
+from src.common.admissao import classificar_rota
+from src.common.cache_cardapio import registrar_ouvinte
+from src.common.disjuntor import eh_falha_de_banco
+from src.common.limite_taxa import LIMITE_TAXA_PROXY
+from src.infra.sqlalchemy.config.database import (
+    SessionLocal, _normalize_db_url, abrir_sessao, criar_engine, sessao_vigiada,
+)
+
+logger = logging.getLogger(__name__)
+
+REPLICA_URLS = [
+    url for url in (_normalize_db_url(u.strip()) for u in os.getenv("REPLICA_URLS", "").split(",")) if url
+]
+REPLICA_ADERENCIA_S = float(os.getenv("REPLICA_ADERENCIA_S", "5"))
+REPLICA_PAUSA_S = float(os.getenv("REPLICA_PAUSA_S", "30"))
+COOKIE_ADERENCIA = "comandinha_primario"
+
+_CHAVE_REPLICA = "replica"
+_METODOS_LEITURA = frozenset(("GET", "HEAD", "OPTIONS"))
+_MAX_CLIENTES = 50_000      # marcas de escrita guardadas; acima disso as vencidas saem
+
+
+@dataclass
+class Replica:
+    nome: str               # URL sem senha (logs e métricas)
+    engine: object
+    pausada_ate: float = 0.0
+    falhas: int = 0
+
+
+class RoteadorLeituras:
+    """Escolhe a réplica de cada leitura marcada, ou devolve None (= primário)."""
+
+    def __init__(self, urls: List[str], aderencia_s: float = REPLICA_ADERENCIA_S,
+                 pausa_s: float = REPLICA_PAUSA_S, relogio: Callable[[], float] = time.monotonic):
+        self.replicas = [self._replica(url) for url in urls]
+        self.aderencia_s = aderencia_s
+        self.pausa_s = pausa_s
+        self.relogio = relogio
+        self._rodizio = itertools.count()
+        self._escritas: Dict[str, float] = {}     # cliente -> primário até
+        self._cardapio_ate = 0.0
+        self._lock = threading.Lock()
+        self.contadores = {"replica": 0, "primario_aderencia": 0, "primario_cardapio": 0, "primario_reserva": 0}
+
+    @staticmethod
+    def _replica(url: str) -> Replica:
+        engine = criar_engine(url)
+        return Replica(engine.url.render_as_string(hide_password=True), engine)
+
+    @property
+    def ativo(self) -> bool:
+        return bool(self.replicas)
+
+    def engines(self) -> list:
+        return [r.engine for r in self.replicas]
+
+    # ---------- ler o que escreveu ----------
+    def marcar_escrita(self, cliente: str) -> None:
+        agora = self.relogio()
+        with self._lock:
+            if len(self._escritas) >= _MAX_CLIENTES:
+                self._escritas = {c: ate for c, ate in self._escritas.items() if ate > agora}
+            self._escritas[cliente] = agora + self.aderencia_s
+
+    def aderente(self, cliente: str) -> bool:
+        ate = self._escritas.get(cliente)
+        return ate is not None and ate > self.relogio()
+
+    def cardapio_alterado(self, ids=None, restaurante_id: Optional[int] = None) -> None:
+        """Ouvinte do cache do cardápio (após o commit de uma edição neste processo)."""
+        self._cardapio_ate = self.relogio() + self.aderencia_s
+
+    def cardapio_no_primario(self) -> bool:
+        return self._cardapio_ate > self.relogio()
+
+    # ---------- escolha da réplica ----------
+    def escolher(self) -> Optional[Replica]:
+        agora = self.relogio()
+        n = len(self.replicas)
+        inicio = next(self._rodizio)
+        for i in range(n):
+            replica = self.replicas[(inicio + i) % n]
+            if replica.pausada_ate <= agora:
+                return replica
+        return None
+
+    def falhou(self, replica: Replica, erro: BaseException) -> None:
+        replica.pausada_ate = self.relogio() + self.pausa_s
+        replica.falhas += 1
+        logger.warning("réplica %s fora por %.0fs: %s", replica.nome, self.pausa_s, erro)
+
+    def contar(self, destino: str) -> None:
+        with self._lock:
+            self.contadores[destino] += 1
+
+    def estatisticas(self) -> dict:
+        agora = self.relogio()
+        return {
+            "replicas": [
+                {"url": r.nome, "disponivel": r.pausada_ate <= agora, "falhas": r.falhas}
+                for r in self.replicas
+            ],
+            "aderencia_s": self.aderencia_s,
+            "clientes_no_primario": sum(1 for ate in list(self._escritas.values()) if ate > agora),
+            "cardapio_no_primario": self.cardapio_no_primario(),
+            "leituras": dict(self.contadores),
+        }
+
+
+roteador_leituras = RoteadorLeituras(REPLICA_URLS)
+if roteador_leituras.ativo:
+    registrar_ouvinte(roteador_leituras.cardapio_alterado)
+
+
+def chave_cliente(headers: Headers, cliente) -> str:
+    autorizacao = headers.get("authorization")
+    if autorizacao:
+        # o token não fica guardado, só um resumo dele
+        return "t:" + hashlib.blake2b(autorizacao.encode("latin-1"), digest_size=12).hexdigest()
+    if LIMITE_TAXA_PROXY and "x-forwarded-for" in headers:
+        return "ip:" + headers["x-forwarded-for"].split(",")[0].strip()
+    return "ip:" + (cliente[0] if cliente else "-")
+
+
+# ---------------------------------------------------------------- escrita em réplica
+@event.listens_for(SessionLocal, "before_flush")
+def _flush_em_replica(session, flush_context, instances):
+    if session.info.get(_CHAVE_REPLICA):
+        raise RuntimeError(f"escrita numa sessão de réplica ({session.info[_CHAVE_REPLICA]}): use get_db/get_uow")
+
+
+@event.listens_for(SessionLocal, "do_orm_execute")
+def _dml_em_replica(estado):
+    if estado.session.info.get(_CHAVE_REPLICA) and (estado.is_insert or estado.is_update or estado.is_delete):
+        raise RuntimeError(f"escrita numa sessão de réplica ({estado.session.info[_CHAVE_REPLICA]}): use get_db/get_uow")
+
+
+# ---------------------------------------------------------------- sessão
+def _abrir_replica(request: Request, roteador: RoteadorLeituras) -> Optional[Tuple[Session, Replica]]:
+    """Sessão já conectada numa réplica disponível, ou None quando a leitura vai ao primário."""
+    if COOKIE_ADERENCIA in request.cookies or roteador.aderente(chave_cliente(request.headers, request.client)):
+        roteador.contar("primario_aderencia")
+        return None
+    if roteador.cardapio_no_primario() and classificar_rota(request.method, request.url.path) == "cardapio":
+        roteador.contar("primario_cardapio")
+        return None
+
+    while (replica := roteador.escolher()) is not None:
+        db = abrir_sessao(request, bind=replica.engine)
+        db.info[_CHAVE_REPLICA] = replica.nome
+        try:
+            db.connection()     # conecta já: réplica fora cai no primário antes da rota começar
+        except Exception as e:
+            db.close()
+            if not eh_falha_de_banco(e):
+                raise
+            roteador.falhou(replica, e)
+            continue
+        roteador.contar("replica")
+        return db, replica
+
+    roteador.contar("primario_reserva")
+    return None
+
+
+@contextmanager
+def sessao_leitura(request: Request, roteador: RoteadorLeituras = roteador_leituras):
+    aberta = _abrir_replica(request, roteador) if roteador.ativo else None
+    if aberta is None:
+        with sessao_vigiada(request) as db:
+            yield db
+        return
+
+    db, replica = aberta
+    try:
+        yield db
+    except Exception as e:
+        if eh_falha_de_banco(e):
+            roteador.falhou(replica, e)
+        raise
+    finally:
+        db.close()
+
+
+def get_db_leitura(request: Request):
+    """
+    Dependência das rotas só de leitura (o marcador do roteamento): sessão
+    numa réplica quando houver uma disponível e o cliente não tiver escrito há
+    pouco; senão, a mesma sessão do `get_db`.
+    """
+    with sessao_leitura(request) as db:
+        yield db
+
+
+# ---------------------------------------------------------------- middleware
+class AderenciaMiddleware:
+    """
+    Marca o cliente depois de uma escrita bem-sucedida: memória do worker e
+    cookie `comandinha_primario` (Max-Age = REPLICA_ADERENCIA_S), para que as
+    leituras seguintes dele, em qualquer worker, vejam o que foi gravado.
+    Sem réplicas configuradas, só repassa.
+
+    O front fica em outro site (CORS com credenciais, ver server.py): cookie
+    Lax não iria nos fetch dele, por isso SameSite=None (que exige Secure) e
+    Partitioned, para valer também com cookies de terceiros bloqueados.
+    """
+
+    def __init__(self, app, roteador: RoteadorLeituras = roteador_leituras):
+        self.app = app
+        self.roteador = roteador
+        max_age = max(1, int(roteador.aderencia_s + 0.999))
+        self._cookie = (
+            f"{COOKIE_ADERENCIA}=1; Max-Age={max_age}; Path=/; HttpOnly; Secure; SameSite=None; Partitioned"
+        ).encode("latin-1")
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or not self.roteador.ativo
+            or scope["method"] in _METODOS_LEITURA
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        async def _send(mensagem):
+            if mensagem["type"] == "http.response.start" and mensagem["status"] < 400:
+                self.roteador.marcar_escrita(chave_cliente(Headers(scope=scope), scope.get("client")))
+                mensagem["headers"] = list(mensagem.get("headers", [])) + [(b"set-cookie", self._cookie)]
+            await send(mensagem)
+
+        await self.app(scope, receive, _send)
@@ -0,0 +1,164 @@
+# src/infra/sqlalchemy/config/unidade_trabalho.py
+"""
+Unidade de trabalho: uma transação por requisição.
+
+Rotas que usam `get_uow` recebem uma sessão marcada como unidade de trabalho;
+os repositórios, em vez de `commit()` + `refresh()`, chamam `confirmar(db)`,
+que dentro da unidade só faz `flush()` (ids e defaults já ficam disponíveis).
+O commit acontece UMA vez, ao final da rota; qualquer exceção (inclusive
+HTTPException) desfaz tudo — fechar a conta e liberar a mesa passam a ser
+atômicos.
+
+Fora da unidade (rotas ainda em `get_db`, scripts) `confirmar` faz o commit.
+Nos dois casos não há refresh: o SessionLocal não expira os objetos no
+commit (expire_on_commit=False), então o que foi gravado continua legível
+sem voltar ao banco. Defaults do servidor vêm no próprio INSERT
+(eager_defaults, RETURNING no Postgres) e atualizações que precisam da linha
+de volta usam `atualizar_retornando`.
+
+O que só pode acontecer depois do commit (caches em memória, agendas, fila
+de efeitos, marcas do limite de taxa) é agendado com `apos_commit(db, fn,
+*args)` e roda quando a transação externa confirma. Savepoint não conta: o
+release não dispara nada e o rollback de um `begin_nested` descarta só o que
+foi agendado dentro dele; o fim da transação externa sem commit descarta o
+resto (`instalar_apos_commit(SessionLocal)`).
+"""
+from typing import Callable, Optional
+
+from sqlalchemy import event, inspect, update
+from sqlalchemy.orm import Session, make_transient_to_detached
+from sqlalchemy.orm.attributes import set_committed_value
+
+from fastapi import Request
+
+from src.infra.sqlalchemy.config.database import sessao_vigiada
+
+_CHAVE_UOW = "unidade_de_trabalho"
+_CHAVE_RESTAURANTE = "restaurante_id"
+_CHAVE_APOS_COMMIT = "apos_commit"
+_CHAVE_SAVEPOINTS = "apos_commit_savepoints"   # savepoint -> tamanho da fila quando abriu
+
+
+def em_unidade_de_trabalho(db: Session) -> bool:
+    return bool(db.info.get(_CHAVE_UOW))
+
+
+def fixar_restaurante(db: Session, restaurante_id: Optional[int]) -> None:
+    """
+    Restaurante (tenant) em nome do qual a sessão escreve. Os repositórios
+    fixam o seu; quem observa UPDATE/DELETE em massa (ex.: a invalidação do
+    cache do cardápio) lê daqui, já que o statement não diz de quem é a linha.
+    """
+    if restaurante_id is not None:
+        db.info[_CHAVE_RESTAURANTE] = restaurante_id
+
+
+def restaurante_da_sessao(db: Session) -> Optional[int]:
+    """Tenant fixado na sessão; None = sem escopo (scripts, jobs)."""
+    return db.info.get(_CHAVE_RESTAURANTE)
+
+
+def confirmar(db: Session) -> None:
+    """Ponto de escrita dos repositórios (ver docstring do módulo)."""
+    if em_unidade_de_trabalho(db):
+        db.flush()
+        return
+    db.commit()
+
+
+def apos_commit(db: Session, fn: Callable, *args) -> None:
+    """Agenda `fn(*args)` para depois do commit da transação externa de `db`."""
+    db.info.setdefault(_CHAVE_APOS_COMMIT, []).append((fn, args))
+
+
+def instalar_apos_commit(session_factory) -> None:
+    """Liga a fila de `apos_commit` às transações das sessões de `session_factory`."""
+
+    @event.listens_for(session_factory, "after_transaction_create")
+    def _ao_abrir(session, transaction):
+        if transaction.nested:
+            session.info.setdefault(_CHAVE_SAVEPOINTS, {})[transaction] = \
+                len(session.info.get(_CHAVE_APOS_COMMIT, ()))
+
+    @event.listens_for(session_factory, "after_commit")
+    def _apos_commit(session):
+        # o release de um savepoint também dispara after_commit
+        if session.in_nested_transaction():
+            return
+        for fn, args in session.info.pop(_CHAVE_APOS_COMMIT, ()):
+            fn(*args)
+
+    @event.listens_for(session_factory, "after_rollback")
+    def _apos_rollback(session):
+        savepoint = session.get_nested_transaction()
+        if savepoint is None:
+            session.info.pop(_CHAVE_APOS_COMMIT, None)
+            return
+        tamanho = session.info.get(_CHAVE_SAVEPOINTS, {}).get(savepoint)
+        pendentes = session.info.get(_CHAVE_APOS_COMMIT)
+        if tamanho is not None and pendentes:
+            del pendentes[tamanho:]
+
+    @event.listens_for(session_factory, "after_transaction_end")
+    def _ao_fechar(session, transaction):
+        if transaction.nested:
+            session.info.get(_CHAVE_SAVEPOINTS, {}).pop(transaction, None)
+        elif transaction.parent is None:
+            # close() sem commit nem rollback também encerra a transação
+            session.info.pop(_CHAVE_APOS_COMMIT, None)
+
+
+def atualizar_retornando(db: Session, modelo, ident, valores: dict, *condicoes):
+    """
+    UPDATE da linha `ident` (PK) com `valores`, se `condicoes` baterem, e a
+    linha atualizada de volta como instância persistente de `modelo`.
+
+    No Postgres é uma ida ao banco (UPDATE ... RETURNING): a instância entra no
+    identity map sem SELECT. Sem RETURNING (SQLite no SQLAlchemy 1.4), UPDATE e
+    um SELECT pela PK. Retorna None se nenhuma linha foi alterada (não existe
+    ou `condicoes` não bateram); não faz commit — chame `confirmar` depois.
+    """
+    mapper = inspect(modelo)
+    tabela = mapper.local_table
+    stmt = (
+        update(modelo)
+        .where(mapper.primary_key[0] == ident, *condicoes)
+        .values(**valores)
+        .execution_options(synchronize_session=False)
+    )
+    if db.get_bind().dialect.full_returning:
+        linha = db.execute(stmt.returning(*tabela.c)).first()
+        if linha is None:
+            return None
+        obj = modelo(**{
+            mapper.get_property_by_column(coluna).key: valor
+            for coluna, valor in zip(tabela.c, linha)
+        })
+        make_transient_to_detached(obj)
+        # load=False: copia o estado para a instância já carregada (se houver), sem SELECT
+        return db.merge(obj, load=False)
+
+    if not db.execute(stmt).rowcount:
+        return None
+    obj = db.get(modelo, ident, populate_existing=True)
+    # o que foi gravado fica como foi passado (ex.: datetime com fuso, que o
+    # SQLite devolveria sem), igual ao caminho com RETURNING
+    for chave, valor in valores.items():
+        set_committed_value(obj, chave, valor)
+    return obj
+
+
+def get_uow(request: Request):
+    """
+    Dependência FastAPI: como o `get_db`, mas com commit único no fim da rota.
+    O código após o yield roda antes do envio da resposta, então uma falha
+    no commit vira 500 em vez de um 2xx de algo que não foi gravado.
+    """
+    with sessao_vigiada(request) as db:
+        db.info[_CHAVE_UOW] = True
+        try:
+            yield db
+            db.commit()
+        except BaseException:
+            db.rollback()
+            raise
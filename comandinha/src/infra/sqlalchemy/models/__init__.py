@@ -4,4 +4,5 @@ from .produto import Produto
 from .pedido import Pedido
 from .item_pedido import ItemPedido
 from .restaurante import Restaurante
-from .chamado_garcom import ChamadoGarcom
\ No newline at end of file
+from .chamado_garcom import ChamadoGarcom, CooldownChamadoMesa
+from .alerta_sla import AlertaSLA
\ No newline at end of file
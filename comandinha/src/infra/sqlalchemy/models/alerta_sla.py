@@ -0,0 +1,33 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index, UniqueConstraint
+from src.infra.sqlalchemy.config.database import Base
+from src.common.tz import now_sp
+
+# Tipo:   risco | atraso
+# Status: 1=pendente, 2=atendido
+
+class AlertaSLA(Base):
+    """
+    Alerta do SLA da cozinha (src.common.sla_cozinha). Fica no banco para que
+    todos os workers vejam os mesmos alertas, com os mesmos ids, e para que
+    sobrevivam ao reinício. Vários workers acompanham o mesmo pedido: o índice
+    único deixa um alerta só por (pedido, tipo, prazo).
+    """
+    __tablename__ = "alertas_sla"
+
+    id = Column(Integer, primary_key=True)
+    restaurante_id = Column(Integer, ForeignKey("restaurantes.id", name="fk_alertas_sla_restaurante"), nullable=False)
+    pedido_id = Column(Integer, nullable=False)        # sem FK: o alerta fica no histórico depois do pedido
+    mesa_id = Column(Integer, nullable=False)
+    tipo = Column(String(10), nullable=False)
+    estimativa_entrega = Column(DateTime(timezone=True), nullable=False)
+
+    status = Column(Integer, nullable=False, default=1)
+    criado_em = Column(DateTime(timezone=True), nullable=False, default=now_sp)
+    atendido_em = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        UniqueConstraint("pedido_id", "tipo", "estimativa_entrega", name="ux_alertas_sla_pedido_tipo_prazo"),
+    )
+
+# painel do admin: alertas do restaurante depois do último id visto
+Index("ix_alertas_sla_restaurante_id", AlertaSLA.restaurante_id, AlertaSLA.id)
@@ -1,7 +1,7 @@
 from sqlalchemy import Column, Integer, String, Boolean
 from src.infra.sqlalchemy.config.database import Base
 from sqlalchemy import (
-    Column, Integer, String, Float, Boolean, ForeignKey, JSON
+    Column, Integer, String, Float, Boolean, ForeignKey, JSON, Index
 )
 from sqlalchemy.orm import relationship
 
@@ -14,5 +14,8 @@ class Categoria(Base):
     imagem_url = Column(String, nullable=True)
     ordem = Column(Integer, nullable=True)
     ativa = Column(Boolean, default=True)
+    restaurante_id = Column(Integer, ForeignKey("restaurantes.id", name="fk_categoria_restaurante"), nullable=False)
 
     produtos = relationship("Produto", back_populates="categoria")
+
+Index("ix_categoria_restaurante_ordem", Categoria.restaurante_id, Categoria.ordem)
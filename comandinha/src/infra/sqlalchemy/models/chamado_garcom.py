@@ -16,6 +16,7 @@ class ChamadoGarcom(Base):
 
     id = Column(Integer, primary_key=True, index=True)                 # AUTOINCREMENT implícito
     mesa_uuid = Column(String(36), ForeignKey("mesa.uuid"), index=True, nullable=False)
+    restaurante_id = Column(Integer, ForeignKey("restaurantes.id", name="fk_chamadas_garcom_restaurante"), nullable=False)
 
     motivo = Column(Integer, nullable=False)                           # <-- agora INTEGER
     detalhes = Column(String, nullable=True)
@@ -27,7 +28,33 @@ class ChamadoGarcom(Base):
 
 
     atendido_por = Column(String(64), nullable=True)                   # id/uuid do admin (sem FK por ora)
-    mesa = relationship("Mesa", lazy="joined")
+    # carregada só se acessada: as rotas de chamado não usam a mesa, e o JOIN
+    # em todo db.get(ChamadoGarcom) era custo à toa
+    mesa = relationship("Mesa", back_populates="chamados", lazy="select")
 
 Index("ix_chamadas_status", ChamadoGarcom.status)
 Index("ix_chamadas_mesa_status", ChamadoGarcom.mesa_uuid, ChamadoGarcom.status)
+# pendentes / histórico do painel de um restaurante, por ordem de chegada
+Index("ix_chamadas_restaurante_status_criado", ChamadoGarcom.restaurante_id, ChamadoGarcom.status, ChamadoGarcom.criado_em)
+
+# no máximo UM pendente por (mesa, motivo) — garantido pelo banco, sem corrida
+Index(
+    "ux_chamadas_pendente_mesa_motivo",
+    ChamadoGarcom.mesa_uuid, ChamadoGarcom.motivo,
+    unique=True,
+    postgresql_where=ChamadoGarcom.status == 1,
+    sqlite_where=ChamadoGarcom.status == 1,
+)
+
+
+class CooldownChamadoMesa(Base):
+    """
+    Último evento do par assistência/urgente por mesa (criação, atendimento ou
+    cancelamento): motivo e instante. É o que o cooldown de 3 min consulta,
+    numa linha só, em vez de ordenar o histórico de chamados da mesa.
+    """
+    __tablename__ = "chamadas_cooldown_mesa"
+
+    mesa_uuid = Column(String(36), ForeignKey("mesa.uuid", ondelete="CASCADE"), primary_key=True)
+    motivo = Column(Integer, nullable=False)
+    t_ref = Column(DateTime(timezone=True), nullable=False)
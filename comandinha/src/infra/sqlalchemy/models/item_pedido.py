@@ -7,7 +7,8 @@ from src.infra.sqlalchemy.config.database import Base
 class ItemPedido(Base):
     __tablename__ = "item_pedido"
     id = Column(Integer, primary_key=True, index=True)
-    pedido_id = Column(Integer, ForeignKey("pedido.id"), nullable=False)
+    # índice: os itens são carregados por IN (pedido_ids) do restaurante, sem varrer os dos outros
+    pedido_id = Column(Integer, ForeignKey("pedido.id"), nullable=False, index=True)
     produto_id = Column(Integer, ForeignKey("produto.id"), nullable=False)
     quantidade = Column(Integer, nullable=False)
     preco_unitario = Column(Float, nullable=False)
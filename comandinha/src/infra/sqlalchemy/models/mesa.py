@@ -2,7 +2,7 @@
 
 from datetime import datetime, timezone
 import uuid
-from sqlalchemy import Column, Integer, String, Boolean, DateTime
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from src.infra.sqlalchemy.config.database import Base
 
@@ -16,6 +16,7 @@ class Mesa(Base):
     nome       = Column(String, nullable=False)
     ativo      = Column(Boolean, default=False)
     status_id  = Column(Integer, nullable=False, default=1)  # <— renomeada
+    restaurante_id = Column(Integer, ForeignKey("restaurantes.id", name="fk_mesa_restaurante"), nullable=False)
 
     # grava em America/Sao_Paulo (aware, com offset)
     created_at = Column(DateTime(timezone=True), nullable=False, default=now_sp)
@@ -23,3 +24,6 @@ class Mesa(Base):
 
     pedidos   = relationship("Pedido", back_populates="mesa")
     chamados  = relationship("ChamadoGarcom", back_populates="mesa", cascade="all, delete-orphan")
+
+# listagens do salão são sempre de um restaurante: o índice começa pelo tenant
+Index("ix_mesa_restaurante_status", Mesa.restaurante_id, Mesa.status_id)
@@ -1,6 +1,6 @@
 # src/infra/sqlalchemy/models/pedido.py
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Float, CheckConstraint
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Float, CheckConstraint, Index
 from sqlalchemy.orm import relationship, validates
 from datetime import datetime, timezone
 from src.infra.sqlalchemy.config.database import Base
@@ -23,6 +23,7 @@ class Pedido(Base):
 
     id = Column(Integer, primary_key=True)
     mesa_id = Column(Integer, ForeignKey("mesa.id"), nullable=False)
+    restaurante_id = Column(Integer, ForeignKey("restaurantes.id", name="fk_pedido_restaurante"), nullable=False)
 
     timestamp = Column(DateTime(timezone=True), default=now_sp, nullable=False)
     atualizado_em = Column(DateTime(timezone=True), nullable=True)
@@ -45,3 +46,7 @@ class Pedido(Base):
         return sid
 
     # ⚠️ Não tenha validador de 'status' que seta 'status_id' (evita recursão)
+
+
+# fila da cozinha e pedidos abertos do restaurante (status 1/2, != 4), por horário
+Index("ix_pedido_restaurante_status_timestamp", Pedido.restaurante_id, Pedido.status_id, Pedido.timestamp)
@@ -1,5 +1,5 @@
 from sqlalchemy import (
-    Column, Integer, String, Float, Boolean, ForeignKey, JSON, text
+    Column, Integer, String, Float, Boolean, ForeignKey, JSON, Index, text
 )
 from sqlalchemy.orm import relationship
 from src.infra.sqlalchemy.config.database import Base
@@ -31,6 +31,10 @@ class Produto(Base):
         ForeignKey("categoria.id", name="fk_produto_categoria"),
         nullable=False
     )
+    restaurante_id = Column(Integer, ForeignKey("restaurantes.id", name="fk_produto_restaurante"), nullable=False)
     # aqui deve ser 'produtos', pois em Categoria você tem:
     #   produtos = relationship("Produto", back_populates="categoria")
     categoria = relationship("Categoria", back_populates="produtos")
+
+# cardápio de um restaurante (inteiro ou de uma categoria)
+Index("ix_produto_restaurante_categoria", Produto.restaurante_id, Produto.categoria_id)
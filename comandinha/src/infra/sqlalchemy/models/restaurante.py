@@ -3,6 +3,8 @@ from src.infra.sqlalchemy.config.database import Base
 
 class Restaurante(Base):
     __tablename__ = "restaurantes"
+    # created_at volta no próprio INSERT (RETURNING no Postgres): sem refresh
+    __mapper_args__ = {"eager_defaults": True}
 
     id = Column(Integer, primary_key=True, autoincrement=True, index=True)
     nome = Column(String, nullable=False)
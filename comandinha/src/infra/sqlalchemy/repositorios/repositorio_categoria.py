@@ -1,11 +1,25 @@
-from sqlalchemy import select, update
+from typing import Optional
+
+from sqlalchemy import select
 from sqlalchemy.orm import Session, selectinload
 from src.infra.sqlalchemy.models.categoria import Categoria
+from src.infra.sqlalchemy.config.unidade_trabalho import atualizar_retornando, confirmar, fixar_restaurante
 from src.schemas.categoria import CategoriaCreate
 
 class CategoriaRepositorio:
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, restaurante_id: Optional[int] = None):
+        """`restaurante_id`: tenant das leituras e escritas (None = sem escopo, scripts)."""
         self.db = db
+        self.restaurante_id = restaurante_id
+        fixar_restaurante(db, restaurante_id)
+
+    def _do_restaurante(self, stmt):
+        if self.restaurante_id is None:
+            return stmt
+        return stmt.where(Categoria.restaurante_id == self.restaurante_id)
+
+    def _condicoes(self) -> tuple:
+        return () if self.restaurante_id is None else (Categoria.restaurante_id == self.restaurante_id,)
 
     def criar(self, dto: CategoriaCreate) -> Categoria:
         nova = Categoria(
@@ -13,14 +27,14 @@ class CategoriaRepositorio:
             descricao=dto.descricao,
             imagem_url=dto.imagem_url,
             ordem=dto.ordem,
+            restaurante_id=self.restaurante_id,
         )
         self.db.add(nova)
-        self.db.commit()
-        self.db.refresh(nova)
+        confirmar(self.db)
         return nova
 
     def listar(self, somente_ativas: bool = True):
-        stmt = select(Categoria)
+        stmt = self._do_restaurante(select(Categoria))
         if somente_ativas:
             stmt = stmt.where(Categoria.ativa == True)
         stmt = stmt.order_by(Categoria.ordem)
@@ -32,26 +46,38 @@ class CategoriaRepositorio:
             .where(Categoria.id == id)
             .options(selectinload(Categoria.produtos))
         )
-        return self.db.scalars(stmt).first()
+        return self.db.scalars(self._do_restaurante(stmt)).first()
+
+    def existe(self, id: int) -> bool:
+        """A categoria é deste restaurante? (só o id, sem carregar os produtos)"""
+        return self.db.execute(self._do_restaurante(select(Categoria.id).where(Categoria.id == id))).first() is not None
     
-    def editar(self, id: int, dto: CategoriaCreate) -> bool:
+    def editar(self, id: int, dto: CategoriaCreate) -> Categoria | None:
         data = {
             "nome": dto.nome,
             "descricao": dto.descricao,
             "imagem_url": dto.imagem_url,
             "ordem": dto.ordem,
         }
-        stmt = (
-            update(Categoria)
-            .where(Categoria.id == id)
-            .values(**data)
-        )
-        result = self.db.execute(stmt)
-        self.db.commit()
-        return result.rowcount > 0
+        return self.editar_parcial(id, data)
 
-    def remover(self, id: int) -> bool:
+    def editar_parcial(self, id: int, campos: dict) -> Categoria | None:
+        """UPDATE ... RETURNING: a categoria atualizada (None se não existe)."""
+        if not campos:
+            return self._obter(id)
+        obj = atualizar_retornando(self.db, Categoria, id, campos, *self._condicoes())
+        if obj is not None:
+            confirmar(self.db)
+        return obj
+
+    def _obter(self, id: int) -> Categoria | None:
         categoria = self.db.get(Categoria, id)
+        if categoria is None or (self.restaurante_id is not None and categoria.restaurante_id != self.restaurante_id):
+            return None
+        return categoria
+
+    def remover(self, id: int) -> bool:
+        categoria = self._obter(id)
         if not categoria:
             return False
         self.db.delete(categoria)
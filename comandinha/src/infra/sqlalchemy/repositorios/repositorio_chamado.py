@@ -4,10 +4,18 @@ from __future__ import annotations
 from datetime import datetime, timedelta, timezone
 from typing import Optional, List, Dict, Union
 
-from sqlalchemy.orm import Session
-from sqlalchemy import desc, func
+from sqlalchemy.orm import Session, make_transient_to_detached
+from sqlalchemy import desc, or_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
 
-from src.infra.sqlalchemy.models.chamado_garcom import ChamadoGarcom
+from src.infra.sqlalchemy.models.chamado_garcom import ChamadoGarcom, CooldownChamadoMesa
+from src.infra.sqlalchemy.config.unidade_trabalho import atualizar_retornando, confirmar, fixar_restaurante
+from src.common.rastreamento import rastrear_classe
+from src.common.limite_taxa import baldes, gravar_apos_commit
+from src.common.expiracao_mesas import expiracao_mesas
+from src.common.resolvedor_mesas import resolvedor_mesas
+from src.common.sessao_mesa import dict_chamado, sessoes_mesa
 
 # ------------------ Mapas de códigos <-> texto ------------------
 MOTIVO_CODE_TO_TEXT: Dict[int, str] = {1: "assistencia", 2: "fechar_conta", 3: "urgente"}
@@ -30,6 +38,7 @@ MOTIVO_URGENTE      = 3
 PAIR_COOLDOWN = {MOTIVO_ASSISTENCIA, MOTIVO_URGENTE}
 
 COOLDOWN = timedelta(minutes=3)
+MSG_COOLDOWN = "Aguarde 3 minutos para alternar entre assistência e urgência."
 
 from src.common.tz import now_sp, TZ
 
@@ -64,6 +73,49 @@ def _motivo_code(value: Union[int, str]) -> int:
     return MOTIVO_TEXT_TO_CODE[v]
 
 
+def _insert_com_conflito(db: Session):
+    """insert() com ON CONFLICT do dialeto (PostgreSQL/SQLite); None nos demais."""
+    return {"postgresql": postgresql.insert, "sqlite": sqlite.insert}.get(db.get_bind().dialect.name)
+
+
+# ------------------ Cooldown em memória ------------------
+# Último evento do par {1,3} por mesa ("motivo:epoch" do t_ref), gravado após
+# o commit no backend do limite de taxa, com TTL = COOLDOWN. Recusa a troca
+# assistência <-> urgência antes de abrir sessão (middleware) ou de consultar
+# o banco (criar). Sem marca (outro worker, reinício), vale a consulta.
+def _chave_cooldown(mesa_uuid: str) -> str:
+    return f"cooldown_chamado:{mesa_uuid}"
+
+def _marcar_cooldown(db: Session, mesa_uuid: str, motivo_code: int, t_ref: datetime) -> None:
+    if motivo_code in PAIR_COOLDOWN:
+        gravar_apos_commit(db, _chave_cooldown(mesa_uuid), f"{motivo_code}:{t_ref.timestamp()}",
+                           COOLDOWN.total_seconds())
+
+def cooldown_em_memoria(mesa_uuid: str, motivo_code: int) -> Optional[str]:
+    """Mensagem de 429 se a marca em memória já bloqueia este motivo; None se não sabe/libera."""
+    if motivo_code not in PAIR_COOLDOWN:
+        return None
+    marca = baldes.ler(_chave_cooldown(mesa_uuid))
+    if not marca:
+        return None
+    motivo_anterior, t_ref = marca.split(":", 1)
+    if int(motivo_anterior) != motivo_code and _now().timestamp() - float(t_ref) < COOLDOWN.total_seconds():
+        return MSG_COOLDOWN
+    return None
+
+def verificar_cooldown_chamado(corpo: dict) -> Optional[str]:
+    """Verificação do LimiteTaxaMiddleware para POST /chamadas (corpo JSON cru)."""
+    mesa_uuid, motivo = corpo.get("mesa_uuid"), corpo.get("motivo")
+    if not isinstance(mesa_uuid, str) or isinstance(motivo, bool):
+        return None
+    try:
+        motivo_code = _motivo_code(motivo)
+    except (ValueError, AttributeError):
+        return None      # a validação do schema responde
+    return cooldown_em_memoria(mesa_uuid, motivo_code)
+
+
+@rastrear_classe
 class RepositorioChamado:
     """
     Regras:
@@ -72,73 +124,152 @@ class RepositorioChamado:
         MESMO se o anterior ainda estiver pendente.
       - Sem cooldown envolvendo fechar_conta(2).
       - motivo/status são INTEGER no banco; resposta sai como string.
+
+    As duas primeiras regras valem no banco, sem SELECT antes do INSERT e sem
+    corrida entre toques simultâneos: índice único parcial (pendentes) e a
+    linha da mesa em chamadas_cooldown_mesa (último evento do par).
+
+    `restaurante_id`: tenant do painel do admin (pendentes, histórico,
+    atender); o chamado criado pela mesa é do restaurante da mesa.
     """
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, restaurante_id: Optional[int] = None):
         self.db = db
+        self.restaurante_id = restaurante_id
+        fixar_restaurante(db, restaurante_id)
+
+    def _condicoes(self) -> tuple:
+        if self.restaurante_id is None:
+            return ()
+        return (ChamadoGarcom.restaurante_id == self.restaurante_id,)
 
     # ------------------------ MESA ------------------------
     def criar(self, mesa_uuid: str, motivo: Union[int, str], detalhes: Optional[str]) -> ChamadoGarcom:
         motivo_code = _motivo_code(motivo)
 
-        # (1) BLOQUEAR DUPLICIDADE PENDENTE DO MESMO MOTIVO
-        pendente_mesmo_motivo = (
-            self.db.query(ChamadoGarcom)
-            .filter(
-                ChamadoGarcom.mesa_uuid == mesa_uuid,
-                ChamadoGarcom.motivo == motivo_code,
-                ChamadoGarcom.status == STATUS_PENDENTE,
-            )
-            .first()
-        )
-        if pendente_mesmo_motivo:
+        # (0) COOLDOWN CONHECIDO EM MEMÓRIA: recusa sem ir ao banco
+        mensagem = cooldown_em_memoria(mesa_uuid, motivo_code)
+        if mensagem:
+            raise TimeoutError(mensagem)
+
+        agora = _now()
+        restaurante_id = self.restaurante_id
+        if restaurante_id is None:
+            mesa = resolvedor_mesas.resolver(self.db, mesa_uuid)
+            restaurante_id = mesa.restaurante_id if mesa is not None else None
+
+        # (1) INSERT ÚNICO: o índice parcial ux_chamadas_pendente_mesa_motivo
+        #     recusa o segundo PENDENTE do mesmo motivo (ON CONFLICT DO NOTHING).
+        novo = self._inserir_pendente(mesa_uuid, motivo_code, detalhes, agora, restaurante_id)
+        if novo is None:
             raise ValueError("Já existe um chamado pendente deste mesmo motivo para esta mesa.")
 
-        # (2) COOLDOWN 3min ENTRE ASSISTÊNCIA <-> URGENTE, MESMO SE O ANTERIOR ESTIVER PENDENTE
-        #     Buscamos o ÚLTIMO chamado (pendente OU concluído) cujo motivo esteja no par {1,3}.
-        #     Se for do OUTRO motivo e t_ref < 3 min, bloqueia.
-        if motivo_code in PAIR_COOLDOWN:
-            ultimo_par = (
-                self.db.query(ChamadoGarcom)
-                .filter(
-                    ChamadoGarcom.mesa_uuid == mesa_uuid,
-                    ChamadoGarcom.motivo.in_(PAIR_COOLDOWN),
-                )
-                .order_by(
-                    func.coalesce(
-                        ChamadoGarcom.atendido_em,
-                        ChamadoGarcom.cancelado_em,
-                        ChamadoGarcom.criado_em
-                    ).desc()
-                )
-                .first()
-            )
-            if ultimo_par and ultimo_par.motivo in PAIR_COOLDOWN and ultimo_par.motivo != motivo_code:
-                t_ref = ultimo_par.atendido_em or ultimo_par.cancelado_em or ultimo_par.criado_em
-                if t_ref and (_now() - t_ref) < COOLDOWN:
-                    raise TimeoutError("Aguarde 3 minutos para alternar entre assistência e urgência.")
-
-        # (3) SE CHEGOU AQUI, PODE CRIAR
-        novo = ChamadoGarcom(
+        # (2) COOLDOWN 3min ENTRE ASSISTÊNCIA <-> URGENTE, MESMO SE O ANTERIOR ESTIVER PENDENTE:
+        #     upsert condicional na linha da mesa em chamadas_cooldown_mesa — só grava
+        #     (e libera) se o último evento do par for do MESMO motivo ou tiver mais de 3 min.
+        #     Falhou -> a exceção desfaz a transação inteira, inclusive o INSERT acima.
+        if motivo_code in PAIR_COOLDOWN and not self._gravar_evento_par(mesa_uuid, motivo_code, agora, respeitar_cooldown=True):
+            raise TimeoutError(MSG_COOLDOWN)
+
+        _marcar_cooldown(self.db, mesa_uuid, motivo_code, agora)   # vale após o commit
+        self._atualizar_sessao(novo, atividade=True)
+        confirmar(self.db)
+        return novo
+
+    def _atualizar_sessao(self, ch: ChamadoGarcom, atividade: bool = False) -> None:
+        """
+        Leva o chamado para a sessão da mesa (tela do cliente) após o commit.
+        `atividade`: chamado do cliente, renova o prazo de inatividade da mesa.
+        """
+        mesa = resolvedor_mesas.resolver(self.db, ch.mesa_uuid)
+        if mesa is not None:
+            sessoes_mesa.apos_commit(self.db, "chamado", mesa.id, dict_chamado(ch))
+            if atividade:
+                expiracao_mesas.apos_commit(self.db, "atividade", mesa.id, ch.criado_em.timestamp())
+
+    def _inserir_pendente(self, mesa_uuid: str, motivo_code: int, detalhes: Optional[str], agora: datetime,
+                          restaurante_id: Optional[int]) -> Optional[ChamadoGarcom]:
+        """Insere o chamado PENDENTE; None se já existe um pendente do mesmo motivo na mesa."""
+        valores = dict(
             mesa_uuid=mesa_uuid,
+            restaurante_id=restaurante_id,
             motivo=motivo_code,                           # INTEGER
             detalhes=(detalhes or "").strip() or None,
             status=STATUS_PENDENTE,                       # INTEGER (1)
+            criado_em=agora,
+        )
+        insert_ = _insert_com_conflito(self.db)
+        if insert_ is None:
+            # outros bancos: INSERT pelo ORM num savepoint e o índice decide
+            novo = ChamadoGarcom(**valores)
+            try:
+                with self.db.begin_nested():
+                    self.db.add(novo)
+            except IntegrityError:
+                return None
+            return novo
+
+        t = ChamadoGarcom.__table__
+        stmt = insert_(t).values(**valores).on_conflict_do_nothing(
+            index_elements=[t.c.mesa_uuid, t.c.motivo],
+            index_where=t.c.status == STATUS_PENDENTE,
         )
+        res = self.db.execute(stmt)
+        if not res.rowcount:
+            return None
+        # todas as colunas são conhecidas: entra no identity map sem SELECT
+        novo = ChamadoGarcom(
+            id=res.inserted_primary_key[0], atendido_em=None, cancelado_em=None, atendido_por=None, **valores
+        )
+        make_transient_to_detached(novo)
         self.db.add(novo)
-        self.db.commit()
-        self.db.refresh(novo)
         return novo
 
+    def _gravar_evento_par(self, mesa_uuid: str, motivo_code: int, t_ref: datetime, respeitar_cooldown: bool = False) -> bool:
+        """
+        Grava (motivo, t_ref) como último evento do par {1,3} da mesa. Com
+        `respeitar_cooldown`, só grava se o evento anterior for do mesmo motivo
+        ou mais velho que COOLDOWN; retorna se gravou.
+        """
+        t = CooldownChamadoMesa.__table__
+        insert_ = _insert_com_conflito(self.db)
+        if insert_ is None:
+            estado = self.db.get(CooldownChamadoMesa, mesa_uuid, with_for_update=True)
+            if estado is None:
+                self.db.add(CooldownChamadoMesa(mesa_uuid=mesa_uuid, motivo=motivo_code, t_ref=t_ref))
+                return True
+            anterior = estado.t_ref if estado.t_ref.tzinfo else estado.t_ref.replace(tzinfo=TZ)
+            if respeitar_cooldown and estado.motivo != motivo_code and t_ref - anterior < COOLDOWN:
+                return False
+            estado.motivo, estado.t_ref = motivo_code, t_ref
+            return True
+
+        stmt = insert_(t).values(mesa_uuid=mesa_uuid, motivo=motivo_code, t_ref=t_ref)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[t.c.mesa_uuid],
+            set_={"motivo": stmt.excluded.motivo, "t_ref": stmt.excluded.t_ref},
+            where=or_(t.c.motivo == stmt.excluded.motivo, t.c.t_ref <= t_ref - COOLDOWN) if respeitar_cooldown else None,
+        )
+        return self.db.execute(stmt).rowcount > 0
+
     def cancelar_da_mesa(self, chamado_id: int, mesa_uuid: str) -> ChamadoGarcom:
-        ch = self.db.get(ChamadoGarcom, chamado_id)
-        if not ch or ch.mesa_uuid != mesa_uuid:
-            raise LookupError("Chamado não encontrado para esta mesa.")
-        if ch.status != STATUS_PENDENTE:
+        # UPDATE condicional (da mesa e ainda pendente) que devolve a linha
+        ch = atualizar_retornando(
+            self.db, ChamadoGarcom, chamado_id,
+            {"status": STATUS_CANCELADA, "cancelado_em": _now()},
+            ChamadoGarcom.mesa_uuid == mesa_uuid,
+            ChamadoGarcom.status == STATUS_PENDENTE,
+        )
+        if ch is None:
+            # só no erro: distingue inexistente/de outra mesa de não pendente
+            atual = self.db.get(ChamadoGarcom, chamado_id)
+            if not atual or atual.mesa_uuid != mesa_uuid:
+                raise LookupError("Chamado não encontrado para esta mesa.")
             raise ValueError("Só é possível cancelar chamados pendentes.")
-        ch.status = STATUS_CANCELADA
-        ch.cancelado_em = _now()
-        self.db.commit()
-        self.db.refresh(ch)
+        if ch.motivo in PAIR_COOLDOWN:
+            self._gravar_evento_par(ch.mesa_uuid, ch.motivo, ch.cancelado_em)
+            _marcar_cooldown(self.db, ch.mesa_uuid, ch.motivo, ch.cancelado_em)
+        self._atualizar_sessao(ch)
+        confirmar(self.db)
         return ch
 
     def historico_da_mesa(self, mesa_uuid: str, limite: int = 50) -> List[ChamadoGarcom]:
@@ -154,22 +285,30 @@ class RepositorioChamado:
     def listar_pendentes(self) -> List[ChamadoGarcom]:
         return (
             self.db.query(ChamadoGarcom)
-            .filter(ChamadoGarcom.status == STATUS_PENDENTE)
+            .filter(ChamadoGarcom.status == STATUS_PENDENTE, *self._condicoes())
             .order_by(ChamadoGarcom.criado_em.asc())
             .all()
         )
 
     def atender(self, chamado_id: int, admin_ident: Union[str, int]) -> ChamadoGarcom:
-        ch = self.db.get(ChamadoGarcom, chamado_id)
-        if not ch:
-            raise LookupError("Chamado não encontrado.")
-        if ch.status != STATUS_PENDENTE:
+        # UPDATE condicional (ainda pendente) que devolve a linha: dois admins
+        # atendendo ao mesmo tempo não passam os dois
+        ch = atualizar_retornando(
+            self.db, ChamadoGarcom, chamado_id,
+            {"status": STATUS_ATENDIDA, "atendido_em": _now(), "atendido_por": str(admin_ident)},
+            ChamadoGarcom.status == STATUS_PENDENTE,
+            *self._condicoes(),
+        )
+        if ch is None:
+            atual = self.db.get(ChamadoGarcom, chamado_id)
+            if atual is None or (self.restaurante_id is not None and atual.restaurante_id != self.restaurante_id):
+                raise LookupError("Chamado não encontrado.")
             raise ValueError("Chamado não está pendente.")
-        ch.status = STATUS_ATENDIDA
-        ch.atendido_em = _now()
-        ch.atendido_por = str(admin_ident)
-        self.db.commit()
-        self.db.refresh(ch)
+        if ch.motivo in PAIR_COOLDOWN:
+            self._gravar_evento_par(ch.mesa_uuid, ch.motivo, ch.atendido_em)
+            _marcar_cooldown(self.db, ch.mesa_uuid, ch.motivo, ch.atendido_em)
+        self._atualizar_sessao(ch)
+        confirmar(self.db)
         return ch
 
     def historico(
@@ -179,7 +318,7 @@ class RepositorioChamado:
         limite: int = 100,
         mesa_uuid: Optional[str] = None,
     ) -> List[ChamadoGarcom]:
-        q = self.db.query(ChamadoGarcom)
+        q = self.db.query(ChamadoGarcom).filter(*self._condicoes())
         if mesa_uuid:
             q = q.filter(ChamadoGarcom.mesa_uuid == mesa_uuid)
         if desde:
@@ -1,11 +1,19 @@
 
 from __future__ import annotations
 from sqlalchemy.orm import Session
-from sqlalchemy import select, delete as sa_delete
+import uuid as uuidlib
+from sqlalchemy import select, update, insert, delete as sa_delete
 from fastapi import HTTPException, status
 from typing import Optional, List, Tuple
 from src.infra.sqlalchemy.models.mesa import Mesa
 from src.infra.sqlalchemy.models.pedido import Pedido as ModelPedido
+from src.common.rastreamento import rastrear_classe
+from src.common.efeitos import registrar_efeito
+from src.common.expiracao_mesas import expiracao_mesas
+from src.common.resolvedor_mesas import MesaResolvida, resolvedor_mesas
+from src.common.sessao_mesa import sessoes_mesa
+from src.infra.sqlalchemy.config.unidade_trabalho import confirmar, fixar_restaurante
+from src.common.tz import now_sp
 
 # 1=disponivel, 2=em_uso, 3=expirada, 4=desativada
 STATUS_MAP: dict[int, str] = {
@@ -15,11 +23,57 @@ STATUS_MAP: dict[int, str] = {
     4: "desativada",
 }
 
+EFEITO_MESA_EM_USO = "mesa_em_uso"
+
+
+def _aplicar_mesas_em_uso(db: Session, mesa_ids: List[int]) -> None:
+    """
+    Efeito adiado publicado por `RepositorioPedido.criar_pedido`: marca as mesas
+    do lote como EM_USO (2) num único UPDATE. Idempotente e seguro fora de ordem:
+    só muda mesas não desativadas que ainda têm pedido aberto (se a conta já foi
+    fechada antes do efeito chegar, a mesa continua disponível). O resolvedor
+    só recebe as mesas que o UPDATE mudou de fato.
+    """
+    tem_abertos = (
+        select(ModelPedido.id)
+        .where(ModelPedido.mesa_id == Mesa.id, ModelPedido.status_id != 4)
+        .exists()
+    )
+    condicoes = (Mesa.id.in_(mesa_ids), Mesa.status_id.notin_((2, 4)), tem_abertos)
+    stmt = update(Mesa).values(status_id=2).execution_options(synchronize_session=False)
+    if db.get_bind().dialect.full_returning:
+        alteradas = db.scalars(stmt.where(*condicoes).returning(Mesa.id)).all()
+    else:
+        # sem RETURNING (SQLite no SQLAlchemy 1.4): lê as que vão mudar e
+        # atualiza só essas; o SQLite tem um escritor por vez
+        alteradas = db.scalars(select(Mesa.id).where(*condicoes)).all()
+        if alteradas:
+            db.execute(stmt.where(Mesa.id.in_(alteradas), *condicoes[1:]))
+    if alteradas:
+        resolvedor_mesas.apos_commit(db, "atualizar_status", list(alteradas), 2)
+
+
+registrar_efeito(EFEITO_MESA_EM_USO, _aplicar_mesas_em_uso)
+
+
+@rastrear_classe
 class MesaRepositorio:
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, restaurante_id: Optional[int] = None):
+        """`restaurante_id`: tenant das leituras e escritas (None = sem escopo, scripts)."""
         self.db = db
+        self.restaurante_id = restaurante_id
+        fixar_restaurante(db, restaurante_id)
 
     # ---------- helpers ----------
+    @staticmethod
+    def _resolvida(m: Mesa) -> MesaResolvida:
+        return MesaResolvida(m.id, m.uuid, m.status_id, m.ativo, m.restaurante_id)
+
+    def _do_restaurante(self, stmt):
+        if self.restaurante_id is None:
+            return stmt
+        return stmt.where(Mesa.restaurante_id == self.restaurante_id)
+
     @staticmethod
     def _status_from_mesa(m: Mesa) -> Tuple[str, int]:
         """
@@ -43,29 +97,67 @@ class MesaRepositorio:
 
     # ---------- CRUD ----------
     def listar_mesas(self) -> List[Mesa]:
-        stmt = select(Mesa)
+        stmt = self._do_restaurante(select(Mesa))
         return self.db.scalars(stmt).all()
 
     def get_mesa_por_uuid(self, mesa_uuid: str) -> Optional[Mesa]:
-        stmt = select(Mesa).where(Mesa.uuid == mesa_uuid)
+        stmt = self._do_restaurante(select(Mesa).where(Mesa.uuid == mesa_uuid))
         return self.db.scalars(stmt).first()
 
+    def resolver_por_uuid(self, mesa_uuid: str) -> Optional[MesaResolvida]:
+        """(id, status_id, ativo, restaurante) da mesa, em geral sem ir ao banco (ver src.common.resolvedor_mesas)."""
+        mesa = resolvedor_mesas.resolver(self.db, mesa_uuid)
+        if mesa is not None and self.restaurante_id is not None and mesa.restaurante_id != self.restaurante_id:
+            return None
+        return mesa
+
     def get_mesa_por_id(self, mesa_id: int) -> Optional[Mesa]:
-        return self.db.get(Mesa, mesa_id)
+        mesa = self.db.get(Mesa, mesa_id)
+        if mesa is not None and self.restaurante_id is not None and mesa.restaurante_id != self.restaurante_id:
+            return None     # mesa de outro restaurante: para este, não existe
+        return mesa
 
     def criar_mesa(self, nome: str) -> Mesa:
-        mesa = Mesa(nome=nome, ativo=True)  # nasce ativa, sem token
+        mesa = Mesa(nome=nome, ativo=True, restaurante_id=self.restaurante_id)  # nasce ativa, sem token
         self.db.add(mesa)
-        self.db.commit()
-        self.db.refresh(mesa)
+        confirmar(self.db)   # id e defaults (python) já na instância
+        resolvedor_mesas.gravar(self._resolvida(mesa))
         return mesa
 
+    def criar_mesas(self, nomes: List[str]) -> list:
+        """
+        Cria várias mesas num único INSERT (RETURNING no Postgres; no SQLite,
+        executemany + um SELECT pelos uuids gerados). Retorna linhas
+        (id, uuid, nome, status_id, ativo) na mesma ordem de `nomes`.
+        """
+        agora = now_sp()
+        linhas = [
+            {"uuid": str(uuidlib.uuid4()), "nome": nome, "ativo": True, "status_id": 1,
+             "restaurante_id": self.restaurante_id, "created_at": agora, "updated_at": agora}
+            for nome in nomes
+        ]
+        colunas = (Mesa.id, Mesa.uuid, Mesa.nome, Mesa.status_id, Mesa.ativo)
+        uuids = [l["uuid"] for l in linhas]
+
+        if self.db.get_bind().dialect.full_returning:
+            criadas = self.db.execute(insert(Mesa).values(linhas).returning(*colunas)).all()
+        else:
+            self.db.execute(insert(Mesa), linhas)
+            criadas = self.db.execute(select(*colunas).where(Mesa.uuid.in_(uuids))).all()
+        confirmar(self.db)
+
+        por_uuid = {m.uuid: m for m in criadas}
+        return [por_uuid[u] for u in uuids]
+
     def excluir_mesa(self, mesa_id: int):
         m = self.get_mesa_por_id(mesa_id)
         if not m:
             raise HTTPException(status_code=404, detail="Mesa não encontrada")
+        resolvedor_mesas.apos_commit(self.db, "remover", m.uuid)
+        sessoes_mesa.apos_commit(self.db, "descartar", [m.id])
+        expiracao_mesas.apos_commit(self.db, "liberar", m.id)
         self.db.delete(m)
-        self.db.commit()
+        confirmar(self.db)
 
     # ---------- atualização de status ----------
     def _set_status(self, mesa: Mesa, status_id: int) -> Mesa:
@@ -74,8 +166,11 @@ class MesaRepositorio:
         mesa.status_id = status_id            # <— agora grava em status_id
         mesa.ativo = (status_id != 4)         # manter compatibilidade
         self.db.add(mesa)
-        self.db.commit()
-        self.db.refresh(mesa)
+        resolvedor_mesas.apos_commit(self.db, "gravar", self._resolvida(mesa))
+        if status_id != 2:
+            # disponível/desativada: não há ocupação para expirar
+            expiracao_mesas.apos_commit(self.db, "liberar", mesa.id)
+        confirmar(self.db)
         return mesa
 
     def alterar_status(self, mesa_id: int, status_id: int) -> Mesa:
@@ -92,4 +187,6 @@ class MesaRepositorio:
         mesa = self.get_mesa_por_id(mesa_id)
         if not mesa:
             raise HTTPException(status_code=404, detail="Mesa não encontrada")
+        # conta encerrada: a tela da próxima ocupação começa vazia
+        sessoes_mesa.apos_commit(self.db, "reiniciar", mesa_id)
         return self._set_status(mesa, 1)
@@ -5,7 +5,8 @@ from typing import Optional, List
 from typing import Optional, List, Union, Iterable
 from sqlalchemy import select, and_, or_
 
-from sqlalchemy import select, delete
+from sqlalchemy import select, delete, case
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session, selectinload
 
 from src.infra.sqlalchemy.models.pedido import Pedido
@@ -22,51 +23,87 @@ from src.infra.sqlalchemy.models import (
 )
 from src.schemas.pedidos import PedidoCreate
 
-from src.common.tz import now_sp, TZ
-
+from src.common.rastreamento import rastrear_classe
+from src.common.tz import now_sp, para_epoch, TZ
+from src.common.efeitos import publicar
+from src.common.expiracao_mesas import expiracao_mesas
+from src.common.resolvedor_mesas import resolvedor_mesas
+from src.common.sessao_mesa import dict_item, dict_pedido, sessoes_mesa
+from src.common.sla_cozinha import sla_cozinha
+from src.infra.sqlalchemy.config.unidade_trabalho import atualizar_retornando, confirmar, fixar_restaurante
+from src.infra.sqlalchemy.repositorios.repositorio_mesa import EFEITO_MESA_EM_USO
+
+@rastrear_classe
 class RepositorioPedido:
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, restaurante_id: Optional[int] = None):
+        """`restaurante_id`: tenant das leituras e escritas (None = sem escopo, scripts)."""
         self.db = db
+        self.restaurante_id = restaurante_id
+        fixar_restaurante(db, restaurante_id)
+
+    def _condicoes(self) -> tuple:
+        if self.restaurante_id is None:
+            return ()
+        return (model_pedido.Pedido.restaurante_id == self.restaurante_id,)
 
     def atualizar_status_id(self, pedido_id: int, status_id: int):
-        p = self.db.get(model_pedido.Pedido, pedido_id)
-        if not p:
-            raise HTTPException(status_code=404, detail="Pedido não encontrado")
         if status_id not in (1, 2, 3, 4):
             raise HTTPException(status_code=400, detail="status_id inválido (use 1..4)")
 
-        p.status_id = status_id            # sincroniza 'status' via @validates
-        p.atualizado_em = datetime.now(timezone.utc)
+        # status_id e o texto juntos (o @validates não roda num UPDATE direto)
+        p = atualizar_retornando(self.db, model_pedido.Pedido, pedido_id, {
+            "status_id": status_id,
+            "status": model_pedido.STATUS_ID_TO_TEXT[status_id],
+            "atualizado_em": datetime.now(timezone.utc),
+        }, *self._condicoes())
+        if not p:
+            raise HTTPException(status_code=404, detail="Pedido não encontrado")
 
-        self.db.add(p)
-        self.db.commit()
-        self.db.refresh(p)
+        sessoes_mesa.apos_commit(self.db, "status_pedido", p.mesa_id, p.id, p.status, p.status_id)
+        sla_cozinha.apos_commit(
+            self.db, "status", p.id, p.mesa_id, p.status_id, para_epoch(p.estimativa_entrega), p.restaurante_id
+        )
+        confirmar(self.db)
         return p
     
     def criar_pedido(self, mesa_id: int, dados: PedidoCreate):
-        from datetime import datetime, timedelta, timezone
-
         agora = now_sp()
-        Pedido.atualizado_em = now_sp()
         estimativa = agora + timedelta(minutes=15)
-
-
-        cabecalho = model_pedido.Pedido(
-            mesa_id=mesa_id,
-            status_id=1,                # pendente
-            timestamp=agora,
-            atualizado_em=agora,
-            estimativa_entrega=estimativa,
-            observacoes_gerais=dados.observacoesGerais,
-            valor_total=0.0,
+        # o pedido é do restaurante da mesa (as rotas já o conhecem pelo resolvedor)
+        restaurante_id = self.restaurante_id
+        if restaurante_id is None:
+            restaurante_id = self.db.scalar(select(Mesa.restaurante_id).where(Mesa.id == mesa_id))
+
+        # todos os produtos num SELECT só (o dict também os mantém vivos no
+        # identity map, que é fraco: item.produto não volta ao banco); produto
+        # de outro restaurante é "não encontrado". Cada linha traz também o
+        # status atual da mesa: o resolvedor de outro worker pode estar até
+        # MESA_CACHE_TTL atrasado, e mesa desativada ou excluída não recebe
+        # pedido (excluída terminaria em violação de FK no INSERT)
+        status_mesa = (
+            select(case((Mesa.ativo.is_(False), 4), else_=Mesa.status_id))
+            .where(Mesa.id == mesa_id)
+            .scalar_subquery()
         )
-
-        self.db.add(cabecalho)
-        self.db.flush()
+        ids = {i.produtoId for i in dados.itens}
+        linhas = self.db.execute(
+            select(model_produto.Produto, status_mesa).where(
+                model_produto.Produto.id.in_(ids),
+                model_produto.Produto.restaurante_id == restaurante_id,
+            )
+        ).all()
+        if linhas and linhas[0][1] in (None, 4):
+            resolvedor_mesas.remover_id(mesa_id)
+            if linhas[0][1] is None:
+                raise HTTPException(status_code=404, detail="Mesa não encontrada")
+            raise HTTPException(status_code=400, detail="Mesa desativada")
+        produtos = {p.id: p for p, _ in linhas}
 
         total = 0.0
+        itens = []
+        itens_sessao = []
         for i in dados.itens:
-            produto = self.db.get(model_produto.Produto, i.produtoId)
+            produto = produtos.get(i.produtoId)
             if not produto:
                 raise HTTPException(status_code=404, detail=f"Produto {i.produtoId} não encontrado")
 
@@ -74,42 +111,54 @@ class RepositorioPedido:
             subtotal = preco_unit * i.quantidade
             total += subtotal
 
-            item = model_item.ItemPedido(
-                pedido_id=cabecalho.id,
-                produto_id=produto.id,
+            itens.append(model_item.ItemPedido(
+                produto=produto,
                 quantidade=i.quantidade,
                 preco_unitario=preco_unit,
                 observacoes=i.observacoes,
                 subtotal=subtotal,
-            )
-            self.db.add(item)
-
-        cabecalho.valor_total = total
-        self.db.commit()
-
-        self.db.refresh(cabecalho)
-        for item in cabecalho.itens:
-            _ = item.produto.nome
-
-        # ✅ pós-criação: marcar mesa como EM_USO (2), se não estiver desativada (4)
-        mesa = self.db.get(Mesa, mesa_id)
-        if not mesa:
-            raise HTTPException(status_code=404, detail="Mesa não encontrada")
-        if getattr(mesa, "status_id", 1) != 4:
-            mesa.status_id = 2
-            self.db.add(mesa)
-            self.db.commit()
-            self.db.refresh(mesa)
+            ))
+            itens_sessao.append(dict_item(produto, i.quantidade, i.observacoes))
 
+        # cabeçalho já com o total e os itens: um INSERT do pedido e os dos
+        # itens no mesmo flush, sem UPDATE de valor_total nem recarga de `itens`
+        cabecalho = model_pedido.Pedido(
+            mesa_id=mesa_id,
+            restaurante_id=restaurante_id,
+            status_id=1,                # pendente
+            timestamp=agora,
+            atualizado_em=agora,
+            estimativa_entrega=estimativa,
+            observacoes_gerais=dados.observacoesGerais,
+            valor_total=total,
+            itens=itens,
+        )
+        self.db.add(cabecalho)
+        try:
+            self.db.flush()
+        except IntegrityError:
+            # mesa ou produto excluído entre o SELECT acima e o INSERT (FK)
+            resolvedor_mesas.remover_id(mesa_id)
+            raise HTTPException(status_code=409, detail="Mesa ou produto removido durante o pedido")
+
+        # sessão da mesa (tela do cliente) recebe o pedido pronto após o commit
+        sessoes_mesa.apos_commit(self.db, "pedido", mesa_id, dict_pedido(cabecalho, itens_sessao))
+
+        # pós-criação: mesa vira EM_USO (2) se não estiver desativada (4).
+        # Efeito adiado: aplicado em lote pela fila depois deste commit, em vez
+        # de uma segunda transação por pedido (ver src.common.efeitos)
+        publicar(self.db, EFEITO_MESA_EM_USO, chave=mesa_id)
+        # atividade do cliente: renova o prazo de inatividade da mesa
+        expiracao_mesas.apos_commit(self.db, "atividade", mesa_id, agora.timestamp())
+        # prazos de risco/atraso da cozinha contam a partir da estimativa
+        sla_cozinha.apos_commit(self.db, "acompanhar", cabecalho.id, mesa_id, estimativa.timestamp(), restaurante_id)
+        confirmar(self.db)
         return cabecalho
 
-
-
-
     def buscar_por_id(self, pedido_id: int):
         stmt = (
             select(model_pedido.Pedido)
-            .where(model_pedido.Pedido.id == pedido_id)
+            .where(model_pedido.Pedido.id == pedido_id, *self._condicoes())
             .options(
                 selectinload(model_pedido.Pedido.itens)
                 .selectinload(model_item.ItemPedido.produto)
@@ -118,17 +167,33 @@ class RepositorioPedido:
         return self.db.scalars(stmt).first()
 
     def remover(self, pedido_id: int) -> bool:
-        del_items = delete(model_item.ItemPedido).where(
-            model_item.ItemPedido.pedido_id == pedido_id
+        # itens só se o pedido for deste restaurante (subconsulta, sem SELECT antes)
+        do_restaurante = select(model_pedido.Pedido.id).where(
+            model_pedido.Pedido.id == pedido_id, *self._condicoes()
         )
+        del_items = delete(model_item.ItemPedido).where(
+            model_item.ItemPedido.pedido_id.in_(do_restaurante)
+        ).execution_options(synchronize_session=False)
         self.db.execute(del_items)
 
-        stmt = delete(model_pedido.Pedido).where(
-            model_pedido.Pedido.id == pedido_id
-        )
-        result = self.db.execute(stmt)
-        self.db.commit()
-        return result.rowcount > 0
+        mesa_ids = self._apagar_pedidos(model_pedido.Pedido.id == pedido_id, *self._condicoes())
+        if not mesa_ids:
+            return False
+        # só a sessão da mesa do pedido é relida; as das outras mesas seguem
+        sessoes_mesa.apos_commit(self.db, "descartar", mesa_ids)
+        sla_cozinha.apos_commit(self.db, "concluir", [pedido_id])
+        confirmar(self.db)
+        return True
+
+    def _apagar_pedidos(self, *condicoes) -> List[int]:
+        """DELETE dos pedidos que batem com `condicoes`; a mesa de cada um apagado."""
+        stmt = delete(model_pedido.Pedido).where(*condicoes)
+        if self.db.get_bind().dialect.full_returning:
+            return list(self.db.scalars(stmt.returning(model_pedido.Pedido.mesa_id)))
+        # sem RETURNING (SQLite no SQLAlchemy 1.4): as mesas antes, no mesmo filtro
+        mesa_ids = list(self.db.scalars(select(model_pedido.Pedido.mesa_id).where(*condicoes)))
+        self.db.execute(stmt)
+        return mesa_ids
 
     from typing import Union
 
@@ -140,7 +205,7 @@ class RepositorioPedido:
     ) -> List[Pedido]:
         q = (
             self.db.query(Pedido)
-            .filter(Pedido.mesa_id == mesa_id)
+            .filter(Pedido.mesa_id == mesa_id, *self._condicoes())
             .options(
                 selectinload(Pedido.itens).selectinload(ItemPedido.produto)
             )
@@ -179,7 +244,7 @@ class RepositorioPedido:
         """
         stmt = (
             select(model_pedido.Pedido)
-            .where(model_pedido.Pedido.status_id.in_([1, 2]))
+            .where(model_pedido.Pedido.status_id.in_([1, 2]), *self._condicoes())
             .options(
                 selectinload(model_pedido.Pedido.mesa),
                 selectinload(model_pedido.Pedido.itens)
@@ -193,7 +258,7 @@ class RepositorioPedido:
     # pega todos os pedidos abertos da mesa (qualquer status_id diferente de 4)
         pedidos_abertos = (
             self.db.query(Pedido)
-            .filter(Pedido.mesa_id == mesa_id, Pedido.status_id != 4)
+            .filter(Pedido.mesa_id == mesa_id, Pedido.status_id != 4, *self._condicoes())
             .all()
         )
 
@@ -210,7 +275,8 @@ class RepositorioPedido:
             p.atualizado_em = agora
             self.db.add(p)
 
-        self.db.commit()
+        sla_cozinha.apos_commit(self.db, "concluir", [p.id for p in pedidos_abertos])
+        confirmar(self.db)
         return pedidos_abertos, total
 
 
@@ -227,21 +293,41 @@ class RepositorioPedido:
         pedido.atualizado_em = datetime.now(timezone.utc)
 
         self.db.add(pedido)
-        self.db.commit()
-        self.db.refresh(pedido)
+        sessoes_mesa.apos_commit(self.db, "status_pedido", pedido.mesa_id, pedido.id, pedido.status, pedido.status_id)
+        sla_cozinha.apos_commit(
+            self.db, "status", pedido.id, pedido.mesa_id,
+            model_pedido.STATUS_TEXT_TO_ID.get(pedido.status, pedido.status_id),
+            para_epoch(pedido.estimativa_entrega),
+            pedido.restaurante_id,
+        )
+        confirmar(self.db)
         return pedido
 
     def listar_nao_concluidos(self):
         stmt = (
             select(model_pedido.Pedido)
-            .where(model_pedido.Pedido.status_id != 4)
+            .where(model_pedido.Pedido.status_id != 4, *self._condicoes())
             .order_by(model_pedido.Pedido.timestamp.desc())
+            .options(
+                selectinload(model_pedido.Pedido.mesa),
+                selectinload(model_pedido.Pedido.itens)
+                .selectinload(model_item.ItemPedido.produto)
+            )
         )
         return self.db.scalars(stmt).all()
     
     def limpar_todos(self) -> int:
+        """Apaga os pedidos do restaurante (ou todos, sem escopo)."""
         # 1º itens (FK), depois pedidos
-        self.db.execute(delete(model_item.ItemPedido))
-        result = self.db.execute(delete(model_pedido.Pedido))
-        self.db.commit()
-        return result.rowcount
\ No newline at end of file
+        if self.restaurante_id is None:
+            self.db.execute(delete(model_item.ItemPedido))
+        else:
+            self.db.execute(delete(model_item.ItemPedido).where(
+                model_item.ItemPedido.pedido_id.in_(select(model_pedido.Pedido.id).where(*self._condicoes()))
+            ).execution_options(synchronize_session=False))
+        mesa_ids = self._apagar_pedidos(*self._condicoes())
+        # sem escopo (scripts) relê todas as sessões; com restaurante, só as mesas dele
+        sessoes_mesa.apos_commit(self.db, "descartar", None if self.restaurante_id is None else set(mesa_ids))
+        sla_cozinha.apos_commit(self.db, "limpar", self.restaurante_id)
+        confirmar(self.db)
+        return len(mesa_ids)
\ No newline at end of file
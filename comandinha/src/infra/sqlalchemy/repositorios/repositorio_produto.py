@@ -1,19 +1,34 @@
-from sqlalchemy import select, update, delete
+from typing import Dict, List, Optional
+
+from sqlalchemy import select, update, delete, func, cast, Numeric
 from sqlalchemy.orm import Session, selectinload
 from src.infra.sqlalchemy.models import produto as model_produto
+from src.infra.sqlalchemy.config.unidade_trabalho import atualizar_retornando, confirmar, fixar_restaurante
 from src.schemas.produto import ProdutoCreate
 
 class RepositorioProduto:
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, restaurante_id: Optional[int] = None):
+        """`restaurante_id`: tenant das leituras e escritas (None = sem escopo, scripts)."""
         self.db = db
+        self.restaurante_id = restaurante_id
+        fixar_restaurante(db, restaurante_id)
+
+    def _do_restaurante(self, stmt):
+        if self.restaurante_id is None:
+            return stmt
+        return stmt.where(model_produto.Produto.restaurante_id == self.restaurante_id)
+
+    def _condicoes(self) -> tuple:
+        if self.restaurante_id is None:
+            return ()
+        return (model_produto.Produto.restaurante_id == self.restaurante_id,)
 
     def criar(self, dados: ProdutoCreate):
         # Usa model_dump sem alias para corresponder aos atributos do modelo SQLAlchemy
         data = dados.model_dump(by_alias=False)
-        obj = model_produto.Produto(**data)
+        obj = model_produto.Produto(**data, restaurante_id=self.restaurante_id)
         self.db.add(obj)
-        self.db.commit()
-        self.db.refresh(obj)
+        confirmar(self.db)
         return obj
 
     def listar_por_categoria(self, categoria_id: int):
@@ -22,14 +37,27 @@ class RepositorioProduto:
             .where(model_produto.Produto.categoria_id == categoria_id)
             .options(selectinload(model_produto.Produto.categoria))
         )
-        return self.db.scalars(stmt).all()
+        return self.db.scalars(self._do_restaurante(stmt)).all()
 
     def listar_com_categorias(self):
         stmt = (
             select(model_produto.Produto)
             .options(selectinload(model_produto.Produto.categoria))
         )
-        return self.db.scalars(stmt).all()
+        return self.db.scalars(self._do_restaurante(stmt)).all()
+
+    def listar_por_ids(self, ids: List[int], categoria_id: Optional[int] = None):
+        if not ids:
+            return []
+        stmt = (
+            select(model_produto.Produto)
+            .where(model_produto.Produto.id.in_(ids))
+            .order_by(model_produto.Produto.id)
+            .options(selectinload(model_produto.Produto.categoria))
+        )
+        if categoria_id is not None:
+            stmt = stmt.where(model_produto.Produto.categoria_id == categoria_id)
+        return self.db.scalars(self._do_restaurante(stmt)).all()
 
     def buscar_por_id(self, id: int):
         stmt = (
@@ -37,33 +65,26 @@ class RepositorioProduto:
             .where(model_produto.Produto.id == id)
             .options(selectinload(model_produto.Produto.categoria))
         )
-        return self.db.scalars(stmt).first()
+        return self.db.scalars(self._do_restaurante(stmt)).first()
 
     def editar(self, id: int, dados: ProdutoCreate):
         # Usa model_dump sem alias para corresponder aos atributos do modelo SQLAlchemy
-        data = dados.model_dump(by_alias=False)
-        stmt = (
-            update(model_produto.Produto)
-            .where(model_produto.Produto.id == id)
-            .values(**data)
-        )
-        result = self.db.execute(stmt)
-        self.db.commit()
-        return result.rowcount > 0
+        return self.editar_parcial(id, dados.model_dump(by_alias=False))
 
     def remover(self, id: int):
-        stmt = delete(model_produto.Produto).where(model_produto.Produto.id == id)
+        stmt = delete(model_produto.Produto).where(model_produto.Produto.id == id, *self._condicoes())
         result = self.db.execute(stmt)
         self.db.commit()
         return result.rowcount > 0
     
-    def editar_parcial(self, id: int, campos: dict) -> bool:
+    def editar_parcial(self, id: int, campos: dict):
+        """UPDATE ... RETURNING: o produto atualizado (None se não existe)."""
         if not campos:
-            return True
-        stmt = update(model_produto.Produto).where(model_produto.Produto.id == id).values(**campos)
-        result = self.db.execute(stmt)
-        self.db.commit()
-        return result.rowcount > 0
+            return self.buscar_por_id(id)
+        obj = atualizar_retornando(self.db, model_produto.Produto, id, campos, *self._condicoes())
+        if obj is not None:
+            confirmar(self.db)
+        return obj
 
     def listar_recomendados(self, limite: int):
         stmt = (
@@ -72,4 +93,48 @@ class RepositorioProduto:
             .limit(limite)
             .options(selectinload(model_produto.Produto.categoria))
         )
-        return self.db.scalars(stmt).all()
\ No newline at end of file
+        return self.db.scalars(self._do_restaurante(stmt)).all()
+
+    def editar_em_massa(
+        self,
+        ids: List[int],
+        disponivel: Optional[bool] = None,
+        ajuste_preco_percentual: Optional[float] = None,
+        categoria_id: Optional[int] = None,
+    ) -> Dict[int, tuple]:
+        """
+        Um único UPDATE para todos os `ids`. No Postgres as linhas alteradas
+        voltam no próprio UPDATE (RETURNING); no SQLite (sem RETURNING no
+        SQLAlchemy 1.4) um SELECT dos mesmos ids logo em seguida.
+        Retorna {id: (id, preco, disponivel, categoria_id)} das linhas existentes.
+        """
+        Produto = model_produto.Produto
+        colunas = (Produto.id, Produto.preco, Produto.disponivel, Produto.categoria_id)
+
+        valores = {}
+        if disponivel is not None:
+            valores["disponivel"] = disponivel
+        if ajuste_preco_percentual is not None:
+            fator = 1 + ajuste_preco_percentual / 100.0
+            # round(numeric, 2): o Postgres não tem round(double precision, int)
+            valores["preco"] = func.round(cast(Produto.preco * fator, Numeric), 2)
+        if categoria_id is not None:
+            valores["categoria_id"] = categoria_id
+
+        if not valores:
+            linhas = self.db.execute(self._do_restaurante(select(*colunas).where(Produto.id.in_(ids)))).all()
+            return {l.id: l for l in linhas}
+
+        stmt = (
+            update(Produto)
+            .where(Produto.id.in_(ids), *self._condicoes())
+            .values(**valores)
+            .execution_options(synchronize_session=False)
+        )
+        if self.db.get_bind().dialect.full_returning:
+            linhas = self.db.execute(stmt.returning(*colunas)).all()
+        else:
+            self.db.execute(stmt)
+            linhas = self.db.execute(self._do_restaurante(select(*colunas).where(Produto.id.in_(ids)))).all()
+        confirmar(self.db)
+        return {l.id: l for l in linhas}
@@ -24,5 +24,4 @@ class RepositorioRestaurante:
         except IntegrityError:
             self.db.rollback()
             raise
-        self.db.refresh(obj)
-        return obj
+        return obj   # created_at (default do servidor) já carregado: eager_defaults no modelo
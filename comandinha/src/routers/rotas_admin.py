@@ -1,10 +1,98 @@
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy.orm import Session
 from src.schemas.auth import AdminRead
-from src.dependencies import get_current_admin
+from src.infra.sqlalchemy.config.database import get_db
+from src.infra.sqlalchemy.config.unidade_trabalho import get_uow
+from src.dependencies import get_current_admin, get_operador
 from src.infra.sqlalchemy.models.restaurante import Restaurante
+from src.common.sla_cozinha import sla_cozinha
+from src.common.admissao import controle as controle_admissao
+from src.common.consultas_lentas import consultas_lentas
+from src.common.rastreamento import RotaRastreada
+from src.infra.sqlalchemy.config.replicas import roteador_leituras
 
-router = APIRouter(prefix="/admin", tags=["admin"])
+router = APIRouter(prefix="/admin", tags=["admin"], route_class=RotaRastreada)
 
 @router.get("/me", response_model=AdminRead, status_code=status.HTTP_200_OK)
 def admin_me(admin: Restaurante = Depends(get_current_admin)):
     return AdminRead.model_validate(admin, from_attributes=True)
+
+# ---------------- SLA da cozinha (src.common.sla_cozinha) ----------------
+
+@router.get("/cozinha/sla", status_code=status.HTTP_200_OK)
+def painel_sla_cozinha(
+    admin: Restaurante = Depends(get_current_admin),
+    db: Session = Depends(get_db),
+):
+    """Pedidos atrasados / em risco (da memória) e contadores; só os alertas pendentes vêm do banco."""
+    return sla_cozinha.painel(db, restaurante_id=admin.id)
+
+@router.get("/cozinha/alertas", status_code=status.HTTP_200_OK)
+def alertas_sla_cozinha(
+    desde: int = Query(0, ge=0, description="Só alertas com id maior (último id que o painel viu)"),
+    pendentes: bool = Query(False, description="Só os ainda não atendidos"),
+    admin: Restaurante = Depends(get_current_admin),
+    db: Session = Depends(get_db),
+):
+    return sla_cozinha.alertas(db, desde=desde, pendentes=pendentes, restaurante_id=admin.id)
+
+@router.patch("/cozinha/alertas/{alerta_id}/atender", status_code=status.HTTP_200_OK)
+def atender_alerta_sla(
+    alerta_id: int,
+    admin: Restaurante = Depends(get_current_admin),
+    db: Session = Depends(get_uow),
+):
+    alerta = sla_cozinha.atender(db, alerta_id, restaurante_id=admin.id)
+    if alerta is None:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Alerta não encontrado")
+    return alerta
+
+# ---------------- Admissão (src.common.admissao) ----------------
+
+@router.get("/admissao", status_code=status.HTTP_200_OK)
+def metricas_admissao(_: Restaurante = Depends(get_operador)):
+    """Vagas em uso e profundidade das filas por classe (deste worker)."""
+    return controle_admissao.metricas()
+
+# ---------------- Réplicas de leitura (src.infra.sqlalchemy.config.replicas) ----------------
+
+@router.get("/replicas", status_code=status.HTTP_200_OK)
+def metricas_replicas(_: Restaurante = Depends(get_operador)):
+    """Réplicas disponíveis e para onde foram as leituras marcadas (deste worker)."""
+    return roteador_leituras.estatisticas()
+
+# ---------------- Consultas lentas (src.common.consultas_lentas) ----------------
+
+@router.get("/consultas-lentas", status_code=status.HTTP_200_OK)
+def listar_consultas_lentas(
+    ordenar: str = Query("total_ms", pattern="^(total_ms|max_ms|media_ms|ocorrencias|ultima_em)$"),
+    limite: int = Query(50, ge=1, le=500),
+    _: Restaurante = Depends(get_operador),
+):
+    """Impressões digitais das consultas acima do limite (deste worker), sem o plano."""
+    return consultas_lentas.listar(ordenar=ordenar, limite=limite)
+
+@router.get("/consultas-lentas/{impressao}", status_code=status.HTTP_200_OK)
+def detalhe_consulta_lenta(impressao: str, _: Restaurante = Depends(get_operador)):
+    """SQL normalizado, últimos parâmetros e o plano capturado."""
+    consulta = consultas_lentas.detalhe(impressao)
+    if consulta is None:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Consulta não encontrada")
+    return consulta
+
+@router.post("/consultas-lentas/{impressao}/explicar", status_code=status.HTTP_200_OK)
+def reexplicar_consulta_lenta(
+    impressao: str,
+    analyze: bool = Query(None, description="EXPLAIN ANALYZE (só Postgres, só SELECT)"),
+    _: Restaurante = Depends(get_operador),
+):
+    """Captura o plano de novo agora (ex.: depois de criar um índice)."""
+    consulta = consultas_lentas.reexplicar(impressao, analyze=analyze)
+    if consulta is None:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Consulta não encontrada")
+    return consulta
+
+@router.delete("/consultas-lentas", status_code=status.HTTP_204_NO_CONTENT)
+def limpar_consultas_lentas(_: Restaurante = Depends(get_operador)):
+    consultas_lentas.limpar()
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
@@ -11,8 +11,9 @@ from src.schemas.auth import AdminRegisterRequest, AdminLoginRequest, AdminRead,
 from src.infra.providers.token_provider import TokenProvider, ACCESS_TOKEN_EXPIRE_MINUTES
 from src.dependencies import get_current_admin
 from src.infra.sqlalchemy.models.restaurante import Restaurante
+from src.common.rastreamento import RotaRastreada
 
-router = APIRouter(prefix="/auth", tags=["auth"])
+router = APIRouter(prefix="/auth", tags=["auth"], route_class=RotaRastreada)
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 
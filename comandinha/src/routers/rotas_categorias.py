@@ -1,21 +1,26 @@
-from fastapi import APIRouter, HTTPException, status, Depends, Query
+from fastapi import APIRouter, HTTPException, status, Depends, Query, Request
 from typing import List
 from sqlalchemy.orm import Session
 
 from src.infra.sqlalchemy.config.database import get_db
+from src.infra.sqlalchemy.config.replicas import get_db_leitura
 from src.infra.sqlalchemy.repositorios.repositorio_categoria import CategoriaRepositorio
 from src.infra.sqlalchemy.repositorios.repositorio_produto import RepositorioProduto
 
 from src.schemas.categoria import CategoriaCreate, CategoriaSimples, CategoriaUpdate
 from src.schemas.produto import ProdutoSimples
+from src.common.respostas import resposta_modelo, serializar
+from src.common.cache_cardapio import responder
 
 # proteção admin
-from src.dependencies import get_current_admin
+from src.dependencies import get_current_admin, get_restaurante_publico
 from src.infra.sqlalchemy.models.restaurante import Restaurante
+from src.common.rastreamento import RotaRastreada
 
 router = APIRouter(
     prefix="/categorias",
-    tags=["categorias"]
+    tags=["categorias"],
+    route_class=RotaRastreada,
 )
 
 # --------- ESCRITA (PROTEGIDA) ---------
@@ -28,12 +33,11 @@ router = APIRouter(
 def criar_categoria(
     categoria: CategoriaCreate,
     db: Session = Depends(get_db),
-    _: Restaurante = Depends(get_current_admin),  # requer admin
+    admin: Restaurante = Depends(get_current_admin),  # requer admin
 ):
-    repo = CategoriaRepositorio(db)
+    repo = CategoriaRepositorio(db, admin.id)
     obj = repo.criar(categoria)
-    schema = CategoriaSimples.model_validate(obj, from_attributes=True, by_name=True)
-    return schema.model_dump(by_alias=True)
+    return resposta_modelo(CategoriaSimples, obj, status_code=status.HTTP_201_CREATED)
 
 
 @router.put(
@@ -44,15 +48,13 @@ def atualizar_categoria(
     id: int,
     categoria: CategoriaCreate,
     db: Session = Depends(get_db),
-    _: Restaurante = Depends(get_current_admin),  # requer admin
+    admin: Restaurante = Depends(get_current_admin),  # requer admin
 ):
-    repo = CategoriaRepositorio(db)
-    updated = repo.editar(id, categoria)
-    if not updated:
+    repo = CategoriaRepositorio(db, admin.id)
+    obj = repo.editar(id, categoria)   # a linha atualizada volta no UPDATE
+    if not obj:
         raise HTTPException(status.HTTP_404_NOT_FOUND, f"Categoria {id} não encontrada")
-    obj = repo.buscar_por_id(id)
-    schema = CategoriaSimples.model_validate(obj, from_attributes=True, by_name=True)
-    return schema.model_dump(by_alias=True)
+    return resposta_modelo(CategoriaSimples, obj)
 
 
 @router.delete(
@@ -62,9 +64,9 @@ def atualizar_categoria(
 def remover_categoria(
     id: int,
     db: Session = Depends(get_db),
-    _: Restaurante = Depends(get_current_admin),  # requer admin
+    admin: Restaurante = Depends(get_current_admin),  # requer admin
 ):
-    repo = CategoriaRepositorio(db)
+    repo = CategoriaRepositorio(db, admin.id)
     ok = repo.remover(id)
     if not ok:
         raise HTTPException(status.HTTP_404_NOT_FOUND, f"Categoria {id} não encontrada")
@@ -77,16 +79,15 @@ def remover_categoria(
     response_model=List[CategoriaSimples]
 )
 def listar_categorias(
-    db: Session = Depends(get_db)
+    request: Request,
+    restaurante_id: int = Depends(get_restaurante_publico),
+    db: Session = Depends(get_db_leitura)
 ):
-    repo = CategoriaRepositorio(db)
-    objs = repo.listar()
-    return [
-        CategoriaSimples
-            .model_validate(o, from_attributes=True, by_name=True)
-            .model_dump(by_alias=True)
-        for o in objs
-    ]
+    def gerar():
+        objs = CategoriaRepositorio(db, restaurante_id).listar()
+        return serializar(List[CategoriaSimples], objs)
+
+    return responder(request, "categorias", gerar, restaurante_id=restaurante_id)
 
 
 @router.get(
@@ -95,14 +96,14 @@ def listar_categorias(
 )
 def exibir_categoria(
     id: int,
-    db: Session = Depends(get_db)
+    restaurante_id: int = Depends(get_restaurante_publico),
+    db: Session = Depends(get_db_leitura)
 ):
-    repo = CategoriaRepositorio(db)
+    repo = CategoriaRepositorio(db, restaurante_id)
     obj = repo.buscar_por_id(id)
     if not obj:
         raise HTTPException(status.HTTP_404_NOT_FOUND, f"Categoria {id} não encontrada")
-    schema = CategoriaSimples.model_validate(obj, from_attributes=True, by_name=True)
-    return schema.model_dump(by_alias=True)
+    return resposta_modelo(CategoriaSimples, obj)
 
 
 @router.get(
@@ -114,22 +115,17 @@ def listar_produtos_por_categoria(
     populares: bool = Query(False),
     pagina: int = Query(1, ge=1),
     limite: int = Query(20, ge=1, le=200),
-    db: Session = Depends(get_db)
+    restaurante_id: int = Depends(get_restaurante_publico),
+    db: Session = Depends(get_db_leitura)
 ):
-    repo_cat = CategoriaRepositorio(db)
+    repo_cat = CategoriaRepositorio(db, restaurante_id)
     categoria = repo_cat.buscar_por_id(categoriaId)
     if not categoria:
         raise HTTPException(status.HTTP_404_NOT_FOUND, f"Categoria {categoriaId} não encontrada")
 
-    repo_prod = RepositorioProduto(db)
+    repo_prod = RepositorioProduto(db, restaurante_id)
     produtos = repo_prod.listar_por_categoria(categoriaId)
-
-    return [
-        ProdutoSimples
-            .model_validate(p, from_attributes=True, by_name=True)
-            .model_dump(by_alias=True)
-        for p in produtos
-    ]
+    return resposta_modelo(List[ProdutoSimples], produtos)
 
 
 @router.patch("/{id}", response_model=CategoriaSimples)
@@ -137,18 +133,13 @@ def atualizar_categoria_parcial(
     id: int,
     patch: CategoriaUpdate,
     db: Session = Depends(get_db),
-    _: Restaurante = Depends(get_current_admin),
+    admin: Restaurante = Depends(get_current_admin),
 ):
-    repo = CategoriaRepositorio(db)
-    obj = repo.buscar_por_id(id)
-    if not obj:
-        raise HTTPException(status.HTTP_404_NOT_FOUND, f"Categoria {id} não encontrada")
+    repo = CategoriaRepositorio(db, admin.id)
 
     # >>> use by_alias=False para garantir 'imagem_url'
     data = patch.model_dump(exclude_unset=True, by_alias=False)
-    for k, v in data.items():
-        setattr(obj, k, v)
-
-    db.commit()
-    db.refresh(obj)
-    return CategoriaSimples.model_validate(obj, from_attributes=True, by_name=True).model_dump(by_alias=True)
\ No newline at end of file
+    obj = repo.editar_parcial(id, data)   # UPDATE ... RETURNING, sem SELECT antes
+    if not obj:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, f"Categoria {id} não encontrada")
+    return resposta_modelo(CategoriaSimples, obj)
\ No newline at end of file
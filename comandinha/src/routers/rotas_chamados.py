@@ -2,7 +2,10 @@ from fastapi import APIRouter, Depends, HTTPException, status, Path, Body
 from sqlalchemy.orm import Session
 from typing import List
 from src.infra.sqlalchemy.config.database import get_db
+from src.infra.sqlalchemy.config.replicas import get_db_leitura
+from src.infra.sqlalchemy.config.unidade_trabalho import get_uow
 from src.infra.sqlalchemy.repositorios.repositorio_chamado import RepositorioChamado
+from src.infra.sqlalchemy.repositorios.repositorio_mesa import MesaRepositorio
 from src.schemas.chamado import CriarChamadoMesaRequest, ChamadoResponse
 
 from typing import List, Optional, Union
@@ -13,15 +16,21 @@ from typing import List
 # >>> IMPORTS de auth/admin como em rotas_pedidos
 from src.infra.sqlalchemy.models.restaurante import Restaurante
 from src.dependencies import get_current_admin
+from src.common.respostas import resposta_modelo
+from src.common.rastreamento import RotaRastreada
 
-router = APIRouter(prefix="", tags=["chamadas"])
+router = APIRouter(prefix="", tags=["chamadas"], route_class=RotaRastreada)
 
 @router.post("/chamadas", response_model=ChamadoResponse, status_code=status.HTTP_201_CREATED)
-def criar_chamada_mesa(req: CriarChamadoMesaRequest, db: Session = Depends(get_db)):
-    repo = RepositorioChamado(db)
+def criar_chamada_mesa(req: CriarChamadoMesaRequest, db: Session = Depends(get_uow)):
+    # mesa conhecida sai do resolvedor em memória, sem consulta
+    mesa = MesaRepositorio(db).resolver_por_uuid(req.mesa_uuid)
+    if mesa is None:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Mesa não encontrada")
+    repo = RepositorioChamado(db, mesa.restaurante_id)   # o restaurante é o da mesa
     try:
         ch = repo.criar(req.mesa_uuid, req.motivo, req.detalhes)
-        return repo.to_response_dict(ch)
+        return resposta_modelo(ChamadoResponse, repo.to_response_dict(ch), status_code=status.HTTP_201_CREATED)
     except ValueError as e:
         raise HTTPException(status.HTTP_409_CONFLICT, detail=str(e))
     except TimeoutError as e:
@@ -36,12 +45,12 @@ def historico_chamadas_admin(
     mesa_uuid: Optional[str] = Query(None, description="Filtra por uma mesa específica (UUID)"),
     desde: Optional[datetime] = Query(None, description="ISO 8601. Ex: 2025-09-22T00:00:00"),
     admin: Restaurante = Depends(get_current_admin),   # exige bearer admin
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_db_leitura),
 ):
-    repo = RepositorioChamado(db)
+    repo = RepositorioChamado(db, admin.id)
     try:
         itens = repo.historico(desde=desde, status=status, mesa_uuid=mesa_uuid)  # <-- ver nota abaixo
-        return [repo.to_response_dict(ch) for ch in itens]
+        return resposta_modelo(List[ChamadoResponse], [repo.to_response_dict(ch) for ch in itens])
     except ValueError as e:
         # status inválido, etc.
         raise HTTPException(status.HTTP_400_BAD_REQUEST, detail=str(e))
@@ -50,7 +59,7 @@ def historico_chamadas_admin(
 def cancelar_chamada_mesa(
     chamado_id: int = Path(...),
     mesa_uuid: str = Body(..., embed=True),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_uow),
 ):
     repo = RepositorioChamado(db)
     try:
@@ -66,9 +75,9 @@ def cancelar_chamada_mesa(
 def atender_chamada_admin(
     chamado_id: int,
     admin: Restaurante = Depends(get_current_admin),  # <- exige bearer admin
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_uow),
 ):
-    repo = RepositorioChamado(db)
+    repo = RepositorioChamado(db, admin.id)
     try:
         # passa id/uuid do admin para registro
         admin_ident = getattr(admin, "uuid", None) or getattr(admin, "id", None) or "admin"
@@ -84,13 +93,13 @@ def listar_chamadas_pendentes(
     admin: Restaurante = Depends(get_current_admin),   # exige bearer admin
     db: Session = Depends(get_db),
 ):
-    repo = RepositorioChamado(db)
+    repo = RepositorioChamado(db, admin.id)
     itens = repo.listar_pendentes()
-    return [repo.to_response_dict(ch) for ch in itens]
+    return resposta_modelo(List[ChamadoResponse], [repo.to_response_dict(ch) for ch in itens])
 
 
 @router.get("/mesas/uuid/{mesa_uuid}/chamadas", response_model=List[ChamadoResponse])
-def historico_da_mesa(mesa_uuid: str, db: Session = Depends(get_db)):
+def historico_da_mesa(mesa_uuid: str, db: Session = Depends(get_db_leitura)):
     repo = RepositorioChamado(db)
     itens = repo.historico_da_mesa(mesa_uuid)
-    return [repo.to_response_dict(ch) for ch in itens]
\ No newline at end of file
+    return resposta_modelo(List[ChamadoResponse], [repo.to_response_dict(ch) for ch in itens])
\ No newline at end of file
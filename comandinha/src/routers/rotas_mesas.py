@@ -1,6 +1,6 @@
 from fastapi import (
     APIRouter, Depends, HTTPException, status, Response,
-    Path, Query, Body
+    Path, Query, Body, Request
 )
 from sqlalchemy.orm import Session
 from typing import Optional, List
@@ -8,19 +8,26 @@ from datetime import datetime, timezone
 
 from src.schemas.mesa import (
     MesaCriacaoRequest,
+    MesaBulkRequest,
     MesaCriacaoResponse,
     MesaListResponse,
     MesaFechamentoRequest,
 )
 from src.schemas.pedidos import PedidoResponse
 from src.infra.sqlalchemy.config.database import get_db
+from src.infra.sqlalchemy.config.replicas import get_db_leitura
+from src.infra.sqlalchemy.config.unidade_trabalho import get_uow
 from src.infra.sqlalchemy.repositorios.repositorio_mesa import MesaRepositorio
 from src.infra.sqlalchemy.repositorios.repositorio_pedido import RepositorioPedido
-from src.dependencies import get_current_admin
+from src.dependencies import EscopoPedidos, get_current_admin, get_escopo_pedidos, get_restaurante_publico
 from src.infra.sqlalchemy.models.restaurante import Restaurante
 from src.infra.sqlalchemy.models.pedido import Pedido as ModelPedido
+from src.common.respostas import MEDIA_JSON, resposta_modelo
+from src.common.sessao_mesa import sessoes_mesa, dict_pedido
+from src.common.disjuntor import respostas_estaveis
+from src.common.rastreamento import RotaRastreada
 
-router = APIRouter(prefix="/mesas", tags=["mesas"])
+router = APIRouter(prefix="/mesas", tags=["mesas"], route_class=RotaRastreada)
 
 # ---------------- Helpers ----------------
 
@@ -35,7 +42,7 @@ def _status_from_mesa(m) -> tuple[str, int]:
     Calcula e retorna (status_texto, status_id) a partir dos campos da mesa.
       - 1 = disponivel
       - 2 = em_uso
-      - 3 = expirada   (se houver regra temporal, aplique aqui)
+      - 3 = expirada   (inatividade, ver src.common.expiracao_mesas)
       - 4 = desativada (ativo == False)
     """
     # Se estiver inativa, força 4
@@ -64,8 +71,11 @@ def _iso8601(dt):
 # ---------------- Públicos ----------------
 
 @router.get("", response_model=List[MesaListResponse], status_code=status.HTTP_200_OK)
-def listar_mesas_publico(db: Session = Depends(get_db)):
-    repo = MesaRepositorio(db)
+def listar_mesas_publico(
+    restaurante_id: int = Depends(get_restaurante_publico),
+    db: Session = Depends(get_db_leitura),
+):
+    repo = MesaRepositorio(db, restaurante_id)
     mesas = repo.listar_mesas()  # ou como você já busca
     resp = []
     for m in mesas:
@@ -82,42 +92,75 @@ def listar_mesas_publico(db: Session = Depends(get_db)):
 
 
 @router.get("/uuid/{mesa_uuid}", response_model=MesaListResponse)
-def obter_mesa_por_uuid(mesa_uuid: str, db: Session = Depends(get_db)):
+def obter_mesa_por_uuid(mesa_uuid: str, request: Request, db: Session = Depends(get_db)):
     repo = MesaRepositorio(db)
     m = repo.get_mesa_por_uuid(mesa_uuid)
     if not m:
         raise HTTPException(status_code=404, detail="Mesa não encontrada")
     status_str, status_id = _status_from_mesa(m)
-    return {
+    resposta = resposta_modelo(MesaListResponse, {
         "id": m.id,
         "uuid": m.uuid,
         "nome": m.nome,
         "status": status_str,
         "status_id": status_id,
-    }
+    })
+    # cópia de reserva para quando o banco estiver fora (src.common.disjuntor)
+    respostas_estaveis.guardar(request, resposta.body)
+    return resposta
+
+@router.get("/uuid/{mesa_uuid}/sessao", status_code=status.HTTP_200_OK)
+def obter_sessao_da_mesa(mesa_uuid: str, request: Request, db: Session = Depends(get_db)):
+    """
+    Tela do cliente: pedidos abertos (com itens), conta e chamados da ocupação
+    atual, numa chamada. Servido da memória (src.common.sessao_mesa); ETag
+    pela versão da sessão, então o polling sem mudança recebe 304.
+    """
+    mesa = MesaRepositorio(db).resolver_por_uuid(mesa_uuid)
+    if not mesa:
+        raise HTTPException(status_code=404, detail="Mesa não encontrada")
+    sessao = sessoes_mesa.obter(db, mesa.id, mesa.uuid)
+    headers = {"ETag": sessao.etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == sessao.etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(sessao.corpo(), media_type=MEDIA_JSON, headers=headers)
 
 # ---------------- Admin ----------------
 
 @router.post("", response_model=MesaCriacaoResponse, status_code=status.HTTP_201_CREATED)
 def criar_mesa_endpoint(
     req: MesaCriacaoRequest,
-    _: Restaurante = Depends(get_current_admin),
+    admin: Restaurante = Depends(get_current_admin),
     db: Session = Depends(get_db)
 ):
-    repo = MesaRepositorio(db)
+    repo = MesaRepositorio(db, admin.id)
     mesa = repo.criar_mesa(req.nome)
     status_str, status_id = _status_from_mesa(mesa)
     return MesaCriacaoResponse(id=mesa.id, uuid=mesa.uuid, nome=mesa.nome).model_copy(
         update={"status": status_str, "status_id": status_id}
     )
 
+@router.post("/bulk", response_model=List[MesaCriacaoResponse], status_code=status.HTTP_201_CREATED)
+def criar_mesas_em_massa(
+    req: MesaBulkRequest,
+    admin: Restaurante = Depends(get_current_admin),
+    db: Session = Depends(get_uow)
+):
+    """Cria várias mesas num único INSERT e numa transação (ex.: {"quantidade": 50})."""
+    mesas = MesaRepositorio(db, admin.id).criar_mesas(req.lista_nomes())
+    resp = []
+    for m in mesas:
+        status_str, status_id = _status_from_mesa(m)
+        resp.append({"id": m.id, "uuid": m.uuid, "nome": m.nome, "status": status_str, "status_id": status_id})
+    return resposta_modelo(List[MesaCriacaoResponse], resp, status_code=status.HTTP_201_CREATED)
+
 @router.delete("/{mesa_id}", status_code=status.HTTP_204_NO_CONTENT)
 def excluir_mesa_endpoint(
     mesa_id: int = Path(...),
-    _: Restaurante = Depends(get_current_admin),
+    admin: Restaurante = Depends(get_current_admin),
     db: Session = Depends(get_db)
 ):
-    mrepo = MesaRepositorio(db)
+    mrepo = MesaRepositorio(db, admin.id)
     m = mrepo.get_mesa_por_id(mesa_id)
     if not m:
         raise HTTPException(status.HTTP_404_NOT_FOUND, "Mesa não encontrada")
@@ -133,7 +176,7 @@ def obter_mesa_admin(
     db: Session = Depends(get_db),
     admin = Depends(get_current_admin),  # se for protegido
 ):
-    repo = MesaRepositorio(db)
+    repo = MesaRepositorio(db, admin.id)
     m = repo.get_mesa_por_id(mesa_id)
     if not m:
         raise HTTPException(status_code=404, detail="Mesa não encontrada")
@@ -151,10 +194,10 @@ def obter_mesa_admin(
 @router.get("/{mesa_id}/status", status_code=status.HTTP_200_OK)
 def status_mesa_admin(
     mesa_id: int = Path(...),
-    _: Restaurante = Depends(get_current_admin),
+    admin: Restaurante = Depends(get_current_admin),
     db: Session = Depends(get_db)
 ):
-    m = MesaRepositorio(db).get_mesa_por_id(mesa_id)
+    m = MesaRepositorio(db, admin.id).get_mesa_por_id(mesa_id)
     if not m:
         raise HTTPException(status.HTTP_404_NOT_FOUND, "Mesa não encontrada")
     status_str, status_id = _status_from_mesa(m)
@@ -170,56 +213,15 @@ def listar_pedidos_da_mesa(
     mesa_id: int = Path(...),
     # opcional: você pode aceitar ?status=1&status=2 ou ?status=pendente&status=entregue
     status: Optional[List[str]] = Query(None, description="IDs (1..4) ou textos ('pendente','em preparo','entregue','concluido')"),
-    db: Session = Depends(get_db),
+    escopo: EscopoPedidos = Depends(get_escopo_pedidos),
+    db: Session = Depends(get_db_leitura),
 ):
-    repo = RepositorioPedido(db)
+    if escopo.mesa_id is not None and escopo.mesa_id != mesa_id:
+        return []
+    repo = RepositorioPedido(db, escopo.restaurante_id)
     pedidos = repo.listar_por_mesa(mesa_id=mesa_id, status=status)
-
-    # Garante acesso aos relacionamentos já carregados (eager) e monta a resposta rica
-    resposta = []
-    for p in pedidos:
-        # itens no mesmo shape de /pedidos/producao
-        itens = []
-        for it in p.itens:
-            prod = it.produto
-            itens.append({
-                "produtoNome": getattr(prod, "nome", None),
-                "produtoDescricao": getattr(prod, "descricao", None),
-                "produtoAdicionais": getattr(prod, "adicionais", None),
-                "quantidade": it.quantidade,
-                "observacoes": it.observacoes,
-            })
-
-        resposta.append({
-            "pedidoId": p.id,
-            "mesaId": p.mesa_id,
-            "timestamp": p.timestamp,
-            "status": p.status,
-            "observacoesGerais": p.observacoes_gerais,
-            "estimativaEntrega": p.estimativa_entrega,
-            "valorTotal": p.valor_total,
-            "statusId": p.status_id,
-            "itens": itens,
-        })
-
-
-    return [{
-        "pedidoId": p.id,
-        "mesaId": p.mesa_id,
-        "timestamp": p.timestamp,
-        "status": p.status,
-        "observacoesGerais": p.observacoes_gerais,
-        "estimativaEntrega": p.estimativa_entrega,
-        "valorTotal": p.valor_total,
-        "statusId": p.status_id,
-        "itens": [{
-            "produtoNome": it.produto.nome if it.produto else None,
-            "produtoDescricao": it.produto.descricao if it.produto else None,
-            "produtoAdicionais": it.produto.adicionais if it.produto else None,
-            "quantidade": it.quantidade,
-            "observacoes": it.observacoes,
-        } for it in p.itens]
-    } for p in pedidos]
+    # itens e produtos já vêm carregados (selectinload); mesmo shape da sessão da mesa
+    return [dict_pedido(p) for p in pedidos]
 
 
 
@@ -227,15 +229,15 @@ def listar_pedidos_da_mesa(
 def alterar_status_mesa_admin(
     mesa_id: int = Path(...),
     payload: dict = Body(...),
-    _: Restaurante = Depends(get_current_admin),
-    db: Session = Depends(get_db)
+    admin: Restaurante = Depends(get_current_admin),
+    db: Session = Depends(get_uow)
 ):
     try:
         status_id_in = int(payload.get("status_id", 0))
     except Exception:
         raise HTTPException(status.HTTP_400_BAD_REQUEST, "status_id inválido")
 
-    repo = MesaRepositorio(db)
+    repo = MesaRepositorio(db, admin.id)
     m = repo.alterar_status(mesa_id, status_id_in)
 
     status_str, status_id_calc = _status_from_mesa(m)
@@ -254,13 +256,17 @@ def alterar_status_mesa_admin(
 def encerrar_mesa_admin(
     mesa_id: int = Path(...),
     req: MesaFechamentoRequest = Body(...),
-    _: Restaurante = Depends(get_current_admin),
-    db: Session = Depends(get_db)
+    admin: Restaurante = Depends(get_current_admin),
+    db: Session = Depends(get_uow)
 ):
+    # fechar a conta e liberar a mesa na MESMA transação (get_uow): ou os
+    # dois acontecem, ou nenhum
+
     # precisa ter pedidos ATIVOS
     ativos = (
         db.query(ModelPedido)
         .filter(
+            ModelPedido.restaurante_id == admin.id,
             ModelPedido.mesa_id == mesa_id,
             ModelPedido.status_id != 4   # 4 = concluído/fechado
         )
@@ -271,10 +277,10 @@ def encerrar_mesa_admin(
 
     metodo = req.metodo_pagamento
 
-    repo_ped = RepositorioPedido(db)
+    repo_ped = RepositorioPedido(db, admin.id)
     pedidos, total = repo_ped.fechar_conta(mesa_id, metodo)   # agora soma só “abertos”
 
-    mrepo = MesaRepositorio(db)
+    mrepo = MesaRepositorio(db, admin.id)
     m = mrepo.limpar_sessao_voltar_disponivel(mesa_id)
 
     return {
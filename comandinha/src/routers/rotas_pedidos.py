@@ -3,6 +3,7 @@ from sqlalchemy.orm import Session
 from typing import List
 
 from src.infra.sqlalchemy.config.database import get_db
+from src.infra.sqlalchemy.config.unidade_trabalho import get_uow
 from src.infra.sqlalchemy.repositorios.repositorio_pedido import RepositorioPedido
 from src.infra.sqlalchemy.repositorios.repositorio_mesa import MesaRepositorio
 from src.schemas.pedidos import (
@@ -16,11 +17,14 @@ from src.schemas.pedidos import (
 
 from src.schemas.pedidos import PedidoStatusPatchRequest, PedidoStatusPatchResponse
 from src.infra.sqlalchemy.models.restaurante import Restaurante
-from src.dependencies import get_current_admin
+from src.dependencies import EscopoPedidos, get_current_admin, get_escopo_pedidos
+from src.common.respostas import resposta_modelo
+from src.common.rastreamento import RotaRastreada
 
 router = APIRouter(
     prefix="/pedidos",
-    tags=["pedidos"]
+    tags=["pedidos"],
+    route_class=RotaRastreada,
 )
 
 @router.get(
@@ -29,24 +33,18 @@ router = APIRouter(
     status_code=status.HTTP_200_OK
 )
 def listar_pedidos_nao_concluidos(
-    _: Restaurante = Depends(get_current_admin),
+    admin: Restaurante = Depends(get_current_admin),
     db: Session = Depends(get_db),
 ):
     """
     Lista todos os pedidos ainda não concluídos (admin),
     incluindo itens no mesmo formato de /pedidos/producao.
     """
-    repo = RepositorioPedido(db)
+    repo = RepositorioPedido(db, admin.id)
     pedidos = repo.listar_nao_concluidos()
 
     resposta: List[PedidoProducaoResponse] = []
-    for p in pedidos:
-        # Força carregamento das relações para evitar lazy-load fora da sessão
-        db.refresh(p)
-        _ = p.mesa.nome  # mesa
-        for item in p.itens:
-            _ = item.produto.nome  # produto
-
+    for p in pedidos:   # mesa, itens e produtos já vêm carregados (selectinload)
         resposta.append(PedidoProducaoResponse(
             pedidoId=p.id,
             mesaId=p.mesa.id,
@@ -66,7 +64,7 @@ def listar_pedidos_nao_concluidos(
                 for item in p.itens
             ],
         ))
-    return resposta
+    return resposta_modelo(List[PedidoProducaoResponse], resposta)
 
 @router.post(
     "",
@@ -75,28 +73,25 @@ def listar_pedidos_nao_concluidos(
 )
 def criar_pedido(
     pedido_create: PedidoCreate,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_uow),
 ):
     """
     Cria um pedido para a mesa identificada por UUID (cliente).
+    Uma transação só: o commit é feito pelo get_uow ao final.
     """
-    # Resolve mesa pelo UUID
+    # Resolve mesa pelo UUID (cache por processo, ver src.common.resolvedor_mesas)
     mrepo = MesaRepositorio(db)
-    mesa = mrepo.get_mesa_por_uuid(pedido_create.uuid)
+    mesa = mrepo.resolver_por_uuid(pedido_create.uuid)   # sem consulta quando já conhecida
     if not mesa:
         raise HTTPException(status_code=404, detail="Mesa não encontrada")
-    if getattr(mesa, "status_id", 1) == 4 or getattr(mesa, "ativo", True) is False:
+    if mesa.desativada:
         raise HTTPException(status_code=400, detail="Mesa desativada")
 
-    repo = RepositorioPedido(db)
-    pedido = repo.criar_pedido(mesa.id, pedido_create)
-
-    # Eager-load dos itens e nome do produto
-    db.refresh(pedido)
-    for item in pedido.itens:
-        _ = item.produto.nome
+    # o restaurante vem da própria mesa: o cliente não escolhe o tenant
+    repo = RepositorioPedido(db, mesa.restaurante_id)
+    pedido = repo.criar_pedido(mesa.id, pedido_create)   # itens e produtos já carregados
 
-    return PedidoResponse(
+    return resposta_modelo(PedidoResponse, PedidoResponse(
         pedidoId=pedido.id,
         timestamp=pedido.timestamp,
         status=pedido.status,
@@ -114,7 +109,7 @@ def criar_pedido(
         ],
         valorTotal=pedido.valor_total,
         estimativaEntrega=pedido.estimativa_entrega
-    )
+    ), status_code=status.HTTP_201_CREATED)
 
 @router.get(
     "/producao",
@@ -122,22 +117,19 @@ def criar_pedido(
     status_code=status.HTTP_200_OK
 )
 def listar_pedidos_producao(
+    escopo: EscopoPedidos = Depends(get_escopo_pedidos),
     db: Session = Depends(get_db),
 ):
     """
     Lista todos os pedidos em status 'confirmado' ou 'preparando' para a produção.
     """
-    repo = RepositorioPedido(db)
+    repo = RepositorioPedido(db, escopo.restaurante_id)
     pedidos = repo.listar_para_producao()
+    if escopo.mesa_id is not None:
+        pedidos = [p for p in pedidos if p.mesa_id == escopo.mesa_id]
 
     resposta: List[PedidoProducaoResponse] = []
-    for p in pedidos:
-        db.refresh(p)
-        # Eager-load mesa e itens
-        _ = p.mesa.nome
-        for item in p.itens:
-            _ = item.produto.nome
-
+    for p in pedidos:   # mesa, itens e produtos já vêm carregados (selectinload)
         resposta.append(PedidoProducaoResponse(
             pedidoId=p.id,
             mesaId=p.mesa.id,
@@ -157,7 +149,7 @@ def listar_pedidos_producao(
                 for item in p.itens
             ]
         ))
-    return resposta
+    return resposta_modelo(List[PedidoProducaoResponse], resposta)
 
 @router.get(
     "/{pedido_id}",
@@ -166,24 +158,22 @@ def listar_pedidos_producao(
 )
 def exibir_pedido(
     pedido_id: int,
+    escopo: EscopoPedidos = Depends(get_escopo_pedidos),
     db: Session = Depends(get_db),
 ):
     """
     Obtém os detalhes de um pedido por ID.
     """
-    repo = RepositorioPedido(db)
+    repo = RepositorioPedido(db, escopo.restaurante_id)
     pedido = repo.buscar_por_id(pedido_id)
-    if not pedido:
+    if not pedido or (escopo.mesa_id is not None and pedido.mesa_id != escopo.mesa_id):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Pedido {pedido_id} não encontrado"
         )
 
-    db.refresh(pedido)
-    for item in pedido.itens:
-        _ = item.produto.nome
-
-    return PedidoResponse(
+    # itens e produtos já vêm carregados (selectinload no buscar_por_id)
+    return resposta_modelo(PedidoResponse, PedidoResponse(
         pedidoId=pedido.id,
         timestamp=pedido.timestamp,
         status=pedido.status,
@@ -201,7 +191,7 @@ def exibir_pedido(
         ],
         valorTotal=pedido.valor_total,
         estimativaEntrega=pedido.estimativa_entrega
-    )
+    ))
 
 @router.delete(
     "/{pedido_id}",
@@ -210,9 +200,9 @@ def exibir_pedido(
 def remover_pedido(
     pedido_id: int,
     db: Session = Depends(get_db),
-    _: Restaurante = Depends(get_current_admin),
+    admin: Restaurante = Depends(get_current_admin),
 ):
-    repo = RepositorioPedido(db)
+    repo = RepositorioPedido(db, admin.id)
     ok = repo.remover(pedido_id)
     if not ok:
         raise HTTPException(
@@ -224,10 +214,10 @@ def remover_pedido(
 def atualizar_status_pedido(
     pedido_id: int = Path(...),
     req: PedidoStatusPatchRequest = Body(...),
-    _: Restaurante = Depends(get_current_admin),
-    db: Session = Depends(get_db),
+    admin: Restaurante = Depends(get_current_admin),
+    db: Session = Depends(get_uow),
 ):
-    repo = RepositorioPedido(db)
+    repo = RepositorioPedido(db, admin.id)
     p = repo.atualizar_status_id(pedido_id, req.status_id)
     return {"status": p.status, "status_id": p.status_id}
 
@@ -235,8 +225,8 @@ def atualizar_status_pedido(
 @router.delete("", status_code=status.HTTP_200_OK)
 def limpar_todos_pedidos(
     db: Session = Depends(get_db),
-    _: Restaurante = Depends(get_current_admin),
+    admin: Restaurante = Depends(get_current_admin),
 ):
-    repo = RepositorioPedido(db)
+    repo = RepositorioPedido(db, admin.id)
     total = repo.limpar_todos()
     return {"mensagem": f"{total} pedidos removidos com sucesso"}
\ No newline at end of file
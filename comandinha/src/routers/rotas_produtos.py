@@ -1,22 +1,41 @@
 # src/routers/rotas_produtos.py
 
-from fastapi import APIRouter, HTTPException, status, Depends, Query
+from fastapi import APIRouter, HTTPException, status, Depends, Query, Request
 from sqlalchemy.orm import Session
 from typing import List, Optional
 
 from src.infra.sqlalchemy.config.database import get_db
+from src.infra.sqlalchemy.config.replicas import get_db_leitura
+from src.infra.sqlalchemy.config.unidade_trabalho import get_uow
 from src.infra.sqlalchemy.repositorios.repositorio_produto import RepositorioProduto
-from src.schemas.produto import ProdutoCreate, ProdutoSimples, ProdutoDetalhado, ProdutoUpdate
+from src.infra.sqlalchemy.repositorios.repositorio_categoria import CategoriaRepositorio
+from src.schemas.produto import (
+    ProdutoCreate, ProdutoSimples, ProdutoDetalhado, ProdutoUpdate,
+    ProdutoBulkPatch, ProdutoBulkResultado,
+)
+from src.common.respostas import resposta_modelo, serializar
+from src.common.cache_cardapio import responder
+from src.common.busca import busca_produtos
+from src.common.restricoes import indice_restricoes, separar_restricoes
+from src.common.recomendacoes import motor_recomendacoes, produtos_recomendados
 
 # proteção admin
-from src.dependencies import get_current_admin
+from src.dependencies import get_current_admin, get_restaurante_publico
 from src.infra.sqlalchemy.models.restaurante import Restaurante
+from src.common.rastreamento import RotaRastreada
 
 router = APIRouter(
     prefix="/produtos",
-    tags=["produtos"]
+    tags=["produtos"],
+    route_class=RotaRastreada,
 )
 
+
+def _exigir_categoria(db: Session, restaurante_id: int, categoria_id: Optional[int]) -> None:
+    # produto só entra em categoria do próprio restaurante
+    if categoria_id is not None and not CategoriaRepositorio(db, restaurante_id).existe(categoria_id):
+        raise HTTPException(status.HTTP_404_NOT_FOUND, f"Categoria {categoria_id} não encontrada")
+
 # --------- ESCRITA (PROTEGIDA) ---------
 
 @router.post(
@@ -27,13 +46,50 @@ router = APIRouter(
 def criar_produto(
     produto: ProdutoCreate,
     db: Session = Depends(get_db),
-    _: Restaurante = Depends(get_current_admin),  # requer admin
+    admin: Restaurante = Depends(get_current_admin),  # requer admin
 ):
-    repo = RepositorioProduto(db)
+    _exigir_categoria(db, admin.id, produto.categoria_id)
+    repo = RepositorioProduto(db, admin.id)
     obj = repo.criar(produto)
-    return ProdutoSimples \
-        .model_validate(obj, from_attributes=True, by_name=True) \
-        .model_dump(by_alias=True)
+    return resposta_modelo(ProdutoSimples, obj, status_code=status.HTTP_201_CREATED)
+
+
+# declarada antes de "/{id}": senão "bulk" casaria com o path e falharia no int
+@router.patch(
+    "/bulk",
+    response_model=List[ProdutoBulkResultado]
+)
+def atualizar_produtos_em_massa(
+    patch: ProdutoBulkPatch,
+    db: Session = Depends(get_uow),
+    admin: Restaurante = Depends(get_current_admin),  # requer admin
+):
+    """
+    Disponibilidade, ajuste percentual de preço e troca de categoria para vários
+    produtos num único UPDATE/transação (o cache do cardápio muda de versão uma
+    vez só). Devolve o resultado por id; ids inexistentes (ou de outro
+    restaurante) vêm com ok=false.
+    """
+    _exigir_categoria(db, admin.id, patch.categoria_id)
+
+    ids = list(dict.fromkeys(patch.ids))   # sem repetidos, mantendo a ordem
+    linhas = RepositorioProduto(db, admin.id).editar_em_massa(
+        ids,
+        disponivel=patch.disponivel,
+        ajuste_preco_percentual=patch.ajuste_preco_percentual,
+        categoria_id=patch.categoria_id,
+    )
+    resultado = []
+    for id in ids:
+        linha = linhas.get(id)
+        if linha is None:
+            resultado.append({"id": id, "ok": False, "erro": f"Produto {id} não encontrado"})
+        else:
+            resultado.append({
+                "id": id, "ok": True, "preco": linha.preco,
+                "disponivel": linha.disponivel, "categoria_id": linha.categoria_id,
+            })
+    return resposta_modelo(List[ProdutoBulkResultado], resultado)
 
 
 @router.put(
@@ -44,15 +100,14 @@ def atualizar_produto(
     id: int,
     produto: ProdutoCreate,
     db: Session = Depends(get_db),
-    _: Restaurante = Depends(get_current_admin),  # requer admin
+    admin: Restaurante = Depends(get_current_admin),  # requer admin
 ):
-    repo = RepositorioProduto(db)
-    if not repo.editar(id, produto):
+    _exigir_categoria(db, admin.id, produto.categoria_id)
+    repo = RepositorioProduto(db, admin.id)
+    obj = repo.editar(id, produto)   # a linha atualizada volta no UPDATE
+    if not obj:
         raise HTTPException(status.HTTP_404_NOT_FOUND, f"Produto {id} não encontrado")
-    obj = repo.buscar_por_id(id)
-    return ProdutoSimples \
-        .model_validate(obj, from_attributes=True, by_name=True) \
-        .model_dump(by_alias=True)
+    return resposta_modelo(ProdutoSimples, obj)
 
 @router.patch(
     "/{id}",
@@ -62,22 +117,17 @@ def atualizar_produto_parcial(
     id: int,
     patch: ProdutoUpdate,
     db: Session = Depends(get_db),
-    _: Restaurante = Depends(get_current_admin),  # requer admin
+    admin: Restaurante = Depends(get_current_admin),  # requer admin
 ):
-    repo = RepositorioProduto(db)
-    obj = repo.buscar_por_id(id)
-    if not obj:
-        raise HTTPException(status.HTTP_404_NOT_FOUND, f"Produto {id} não encontrado")
+    repo = RepositorioProduto(db, admin.id)
 
     # chaves no formato do ORM (sem alias) para bater com as colunas do modelo
     data = patch.model_dump(exclude_unset=True, by_alias=False)
-    if not repo.editar_parcial(id, data):
+    _exigir_categoria(db, admin.id, data.get("categoria_id"))
+    obj = repo.editar_parcial(id, data)   # UPDATE ... RETURNING, sem SELECT antes
+    if not obj:
         raise HTTPException(status.HTTP_404_NOT_FOUND, f"Produto {id} não encontrado")
-    obj = repo.buscar_por_id(id)
-
-    db.commit()
-    db.refresh(obj)
-    return ProdutoSimples.model_validate(obj, from_attributes=True, by_name=True).model_dump(by_alias=True)
+    return resposta_modelo(ProdutoSimples, obj)
 
 
 @router.delete(
@@ -87,9 +137,9 @@ def atualizar_produto_parcial(
 def remover_produto(
     id: int,
     db: Session = Depends(get_db),
-    _: Restaurante = Depends(get_current_admin),  # requer admin
+    admin: Restaurante = Depends(get_current_admin),  # requer admin
 ):
-    repo = RepositorioProduto(db)
+    repo = RepositorioProduto(db, admin.id)
     if not repo.remover(id):
         raise HTTPException(status.HTTP_404_NOT_FOUND, f"Produto {id} não encontrado")
 
@@ -101,20 +151,46 @@ def remover_produto(
     response_model=List[ProdutoDetalhado]
 )
 def listar_produtos(
+    request: Request,
     categoria_id: Optional[int] = Query(None, alias="categoriaId"),
-    db: Session = Depends(get_db)
+    somente_disponiveis: bool = Query(False, alias="somenteDisponiveis"),
+    restricoes: Optional[List[str]] = Query(
+        None, description='Todas precisam estar no produto. Ex.: "vegano,sem gluten" (sem diferenciar acentos)'
+    ),
+    restaurante_id: int = Depends(get_restaurante_publico),
+    db: Session = Depends(get_db_leitura)
+):
+    filtro = separar_restricoes(restricoes)
+
+    def gerar():
+        repo = RepositorioProduto(db, restaurante_id)
+        if filtro:
+            # AND de bitsets no índice em memória; só os produtos aprovados saem do banco
+            objs = repo.listar_por_ids(indice_restricoes(db, restaurante_id).filtrar(filtro), categoria_id)
+        elif categoria_id is not None:
+            objs = repo.listar_por_categoria(categoria_id)
+        else:
+            objs = repo.listar_com_categorias()
+        if somente_disponiveis:
+            objs = [o for o in objs if getattr(o, "disponivel", True)]
+        return serializar(List[ProdutoDetalhado], objs)
+
+    # payload cacheado por versão do cardápio do restaurante (ver src.common.cache_cardapio)
+    chave_filtro = indice_restricoes(db, restaurante_id).chave(filtro) if filtro else ""
+    chave = f"produtos:{categoria_id}:{int(somente_disponiveis)}:{chave_filtro}"
+    return responder(request, chave, gerar, restaurante_id=restaurante_id)
+
+
+@router.get(
+    "/restricoes",
+    response_model=List[str]
+)
+def listar_restricoes(
+    restaurante_id: int = Depends(get_restaurante_publico),
+    db: Session = Depends(get_db_leitura),
 ):
-    repo = RepositorioProduto(db)
-    if categoria_id is not None:
-        objs = repo.listar_por_categoria(categoria_id)
-    else:
-        objs = repo.listar_com_categorias()
-    return [
-        ProdutoDetalhado
-            .model_validate(o, from_attributes=True, by_name=True)
-            .model_dump(by_alias=True)
-        for o in objs
-    ]
+    """Restrições conhecidas no cardápio (normalizadas), para montar os filtros no app."""
+    return indice_restricoes(db, restaurante_id).conhecidas()
 
 @router.get(
     "/recomendados",
@@ -122,17 +198,49 @@ def listar_produtos(
     status_code=status.HTTP_200_OK
 )
 def listar_recomendados(
+    request: Request,
     limite: int = Query(5, ge=1, le=50, description="Máximo de itens a retornar"),
-    db: Session = Depends(get_db)
+    carrinho: Optional[List[str]] = Query(
+        None, description="Ids dos produtos no carrinho (ex.: 3,7) — prioriza o que costuma ser pedido junto"
+    ),
+    restaurante_id: int = Depends(get_restaurante_publico),
+    db: Session = Depends(get_db_leitura)
 ):
-    repo = RepositorioProduto(db)
-    recomendados = repo.listar_recomendados(limite)
-    return [
-        ProdutoSimples
-            .model_validate(p, from_attributes=True, by_name=True)
-            .model_dump(by_alias=True)
-        for p in recomendados
-    ]
+    # ranking em memória (src.common.recomendacoes); o banco só é lido quando o
+    # cardápio muda de versão
+    try:
+        ids_carrinho = [int(p) for valor in carrinho or () for p in valor.split(",") if p.strip()]
+    except ValueError:
+        raise HTTPException(status.HTTP_422_UNPROCESSABLE_ENTITY, "carrinho deve conter ids numéricos")
+
+    if ids_carrinho:
+        return resposta_modelo(
+            List[ProdutoSimples], produtos_recomendados(db, limite, ids_carrinho, restaurante_id)
+        )
+
+    def gerar():
+        return serializar(List[ProdutoSimples], produtos_recomendados(db, limite, restaurante_id=restaurante_id))
+
+    chave = f"recomendados:{limite}:{motor_recomendacoes.versao_de(restaurante_id)}"
+    return responder(request, chave, gerar, restaurante_id=restaurante_id)
+
+
+@router.get(
+    "/busca",
+    response_model=List[ProdutoDetalhado]
+)
+def buscar_produtos(
+    q: str = Query(..., min_length=1, max_length=100, description='Ex.: "frango", "sem lactose"'),
+    limite: int = Query(20, ge=1, le=100),
+    somente_disponiveis: bool = Query(False, alias="somenteDisponiveis"),
+    restaurante_id: int = Depends(get_restaurante_publico),
+    db: Session = Depends(get_db_leitura)
+):
+    """Busca sem acento, por prefixo e aproximada (erros de digitação) — ver src.common.busca."""
+    objs = busca_produtos.buscar(
+        db, q, limite=limite, somente_disponiveis=somente_disponiveis, restaurante_id=restaurante_id
+    )
+    return resposta_modelo(List[ProdutoDetalhado], objs)
 
 
 @router.get(
@@ -141,26 +249,11 @@ def listar_recomendados(
 )
 def exibir_produto(
     id: int,
-    db: Session = Depends(get_db)
+    restaurante_id: int = Depends(get_restaurante_publico),
+    db: Session = Depends(get_db_leitura)
 ):
-    repo = RepositorioProduto(db)
+    repo = RepositorioProduto(db, restaurante_id)
     obj = repo.buscar_por_id(id)
     if not obj:
         raise HTTPException(status.HTTP_404_NOT_FOUND, f"Produto {id} não encontrado")
-    return ProdutoDetalhado \
-        .model_validate(obj, from_attributes=True, by_name=True) \
-        .model_dump(by_alias=True)
-
-
-@router.get("", response_model=List[ProdutoDetalhado])
-def listar_produtos(
-    categoria_id: int | None = Query(None, alias="categoriaId"),
-    somente_disponiveis: bool = Query(False, alias="somenteDisponiveis"),
-    db: Session = Depends(get_db),
-):
-    repo = RepositorioProduto(db)
-    objs = repo.listar_por_categoria(categoria_id) if categoria_id else repo.listar_com_categorias()
-    if somente_disponiveis:
-        objs = [o for o in objs if getattr(o, "disponivel", True)]
-    return [ProdutoDetalhado.model_validate(o, from_attributes=True, by_name=True).model_dump(by_alias=True) for o in objs]
-
+    return resposta_modelo(ProdutoDetalhado, obj)
@@ -1,5 +1,5 @@
-from pydantic import BaseModel, ConfigDict, Field
-from typing import Optional
+from pydantic import BaseModel, ConfigDict, Field, model_validator
+from typing import Optional, List
 from datetime import datetime
 
 class MesaCriacaoRequest(BaseModel):
@@ -15,6 +15,24 @@ class MesaCriacaoResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class MesaBulkRequest(BaseModel):
+    """Informe `nomes` OU `quantidade` (nomes gerados como "<prefixo> <n>")."""
+    nomes: Optional[List[str]] = Field(default=None, max_length=500)
+    quantidade: Optional[int] = Field(default=None, ge=1, le=500)
+    prefixo: str = "Mesa"
+    inicio: int = Field(default=1, ge=0)
+
+    @model_validator(mode="after")
+    def _nomes_ou_quantidade(self):
+        if not self.nomes and not self.quantidade:
+            raise ValueError("Informe 'nomes' ou 'quantidade'")
+        return self
+
+    def lista_nomes(self) -> List[str]:
+        if self.nomes:
+            return [n.strip() for n in self.nomes]
+        return [f"{self.prefixo} {self.inicio + i}" for i in range(self.quantidade)]
+
 class MesaAtivacaoRequest(BaseModel):
     mesaId: str
     codigoConfirmacao: Optional[str] = None
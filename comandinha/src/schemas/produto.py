@@ -63,4 +63,29 @@ class ProdutoUpdate(BaseModel):
 
     class Config:
         from_attributes = True
-        allow_population_by_field_name = True
\ No newline at end of file
+        allow_population_by_field_name = True
+
+class ProdutoBulkPatch(BaseModel):
+    """
+    Edição em massa (PATCH /produtos/bulk). Todos os campos informados valem
+    para todos os `ids`; ajustePrecoPercentual=10 sobe 10%, -15 desconta 15%.
+    """
+    ids: List[int] = Field(..., min_length=1, max_length=1000)
+    disponivel: Optional[bool] = None
+    ajuste_preco_percentual: Optional[float] = Field(None, alias="ajustePrecoPercentual", gt=-100, le=1000)
+    categoria_id: Optional[int] = Field(None, alias="categoriaId")
+
+    class Config:
+        allow_population_by_field_name = True
+
+class ProdutoBulkResultado(BaseModel):
+    id: int
+    ok: bool
+    preco: Optional[float] = None
+    disponivel: Optional[bool] = None
+    categoria_id: Optional[int] = Field(None, alias="categoriaId")
+    erro: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+        allow_population_by_field_name = True
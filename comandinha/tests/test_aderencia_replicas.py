@@ -0,0 +1,83 @@
+"""
+Ler o que escreveu com réplicas (src.infra.sqlalchemy.config.replicas), do
+jeito que o front em produção chama a API: de outro site, com credenciais.
+
+    python -m pytest tests
+"""
+import os
+import sqlite3
+import tempfile
+
+_DIR = tempfile.mkdtemp(prefix="comandinha-aderencia-")
+_PRIMARIO = os.path.join(_DIR, "primario.db")
+_REPLICA = os.path.join(_DIR, "replica.db")
+os.environ.update(
+    DATABASE_URL=f"sqlite:///{_PRIMARIO}",
+    REPLICA_URLS=f"sqlite:///{_REPLICA}",
+    RUN_DDL_ON_STARTUP="1",
+    LIMITE_TAXA="0",
+)
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+import server  # noqa: E402
+from src.infra.sqlalchemy.config.replicas import COOKIE_ADERENCIA, roteador_leituras  # noqa: E402
+
+FRONT = "https://barao-comandinha.vercel.app"
+
+
+def _copiar_para_replica():
+    origem, destino = sqlite3.connect(_PRIMARIO), sqlite3.connect(_REPLICA)
+    try:
+        origem.backup(destino)
+    finally:
+        destino.close()
+        origem.close()
+
+
+@pytest.fixture()
+def cliente():
+    # https: o cliente HTTP, como o navegador, só devolve cookie Secure em https
+    with TestClient(server.app, base_url="https://api.comandinha.test") as c:
+        _copiar_para_replica()
+        yield c
+
+
+def _outro_worker():
+    """Esquece as marcas em memória: só o que o cliente manda decide."""
+    roteador_leituras._escritas.clear()
+    for destino in roteador_leituras.contadores:
+        roteador_leituras.contadores[destino] = 0
+
+
+def test_cookie_de_aderencia_vale_em_requisicao_de_outro_site(cliente):
+    r = cliente.post(
+        "/auth/register",
+        json={"nome": "Adm", "email": "adm@comandinha.com.br", "senha": "123456"},
+        headers={"Origin": FRONT},
+    )
+    assert r.status_code == 201, r.text
+    assert r.headers["access-control-allow-origin"] == FRONT
+    assert r.headers["access-control-allow-credentials"] == "true"
+
+    cookie = r.headers["set-cookie"]
+    atributos = {a.strip().split("=")[0].lower() for a in cookie.split(";")}
+    assert cookie.startswith(f"{COOKIE_ADERENCIA}=1")
+    # fetch de outro site só leva cookie SameSite=None, que só vale com Secure
+    assert "samesite=none" in cookie.lower().replace(" ", "")
+    assert "secure" in atributos
+
+    _outro_worker()
+    r = cliente.get("/mesas", headers={"Origin": FRONT})
+    assert r.status_code == 200
+    assert roteador_leituras.contadores["primario_aderencia"] == 1
+    assert roteador_leituras.contadores["replica"] == 0
+
+
+def test_sem_cookie_a_leitura_vai_para_a_replica(cliente):
+    _outro_worker()
+    cliente.cookies.clear()
+    r = cliente.get("/mesas", headers={"Origin": FRONT})
+    assert r.status_code == 200
+    assert roteador_leituras.contadores["replica"] == 1
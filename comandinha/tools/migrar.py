@@ -0,0 +1,85 @@
+"""
+Aplica as migrações Alembic antes do boot do servidor.
+
+    python tools/migrar.py            # roda a partir da pasta comandinha/
+
+Com FAST_BOOT=1 faz primeiro uma checagem barata: lê a(s) revisão(ões) head
+direto dos arquivos em alembic/versions (sem importar o Alembic nem o env.py)
+e compara com `SELECT version_num FROM alembic_version`. Se bater, sai sem
+rodar o upgrade — o caso comum em cada cold start de container.
+Sem FAST_BOOT (ou se a checagem não for conclusiva) roda `alembic upgrade head`.
+"""
+import os
+import re
+import sys
+import time
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+
+VERSIONS_DIR = RAIZ / "alembic" / "versions"
+
+_RE_REVISION = re.compile(r"^revision\s*(?::[^=]+)?=\s*['\"]([0-9a-zA-Z_]+)['\"]", re.M)
+_RE_DOWN = re.compile(r"^down_revision\s*(?::[^=]+)?=\s*(.+)$", re.M)
+_RE_ID = re.compile(r"['\"]([0-9a-zA-Z_]+)['\"]")
+
+
+def log(msg: str):
+    print(f"[migrar] {msg}", flush=True)
+
+
+def heads_dos_arquivos(diretorio: Path = VERSIONS_DIR) -> set:
+    """Revisões que nenhuma outra revisão aponta como down_revision."""
+    revisoes, apontadas = set(), set()
+    for arq in diretorio.glob("*.py"):
+        texto = arq.read_text(encoding="utf-8")
+        m = _RE_REVISION.search(texto)
+        if not m:
+            continue
+        revisoes.add(m.group(1))
+        down = _RE_DOWN.search(texto)
+        if down:
+            apontadas.update(_RE_ID.findall(down.group(1)))
+    return revisoes - apontadas
+
+
+def revisao_do_banco(engine) -> set:
+    from sqlalchemy import text
+    from sqlalchemy.exc import DBAPIError
+    try:
+        with engine.connect() as conn:
+            return {r[0] for r in conn.execute(text("SELECT version_num FROM alembic_version"))}
+    except DBAPIError:
+        # tabela alembic_version ainda não existe (banco novo)
+        return set()
+
+
+def upgrade_head():
+    from alembic import command
+    from alembic.config import Config
+    cfg = Config(str(RAIZ / "alembic.ini"))
+    cfg.set_main_option("script_location", str(RAIZ / "alembic"))
+    command.upgrade(cfg, "head")
+
+
+def main():
+    t0 = time.perf_counter()
+    if os.getenv("FAST_BOOT") == "1":
+        from src.infra.sqlalchemy.config.database import engine
+
+        heads = heads_dos_arquivos()
+        atual = revisao_do_banco(engine)
+        engine.dispose()
+        if heads and atual == heads:
+            log(f"schema já em {', '.join(sorted(heads))}; upgrade pulado "
+                f"({(time.perf_counter() - t0) * 1000:.0f} ms)")
+            return
+        log(f"banco em {sorted(atual) or '-'}, head {sorted(heads) or '?'}: aplicando upgrade")
+
+    upgrade_head()
+    log(f"upgrade concluído ({(time.perf_counter() - t0) * 1000:.0f} ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Perfil de inicialização do app: quebra do tempo de import por módulo/pacote
+(via `python -X importtime`) e tempo do startup do FastAPI.
+
+    python tools/perfil_inicializacao.py            # roda a partir da pasta comandinha/
+    python tools/perfil_inicializacao.py --top 40 --modulo server
+
+Sem DATABASE_URL definido usa SQLite em memória (o import não abre conexão).
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+
+_LINHA = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)$")
+
+_SCRIPT = """
+import asyncio, time
+t0 = time.perf_counter()
+import {modulo} as _m
+t1 = time.perf_counter()
+asyncio.run(_m.app.router.startup())
+t2 = time.perf_counter()
+print("TEMPOS %.3f %.3f" % ((t1 - t0) * 1000, (t2 - t1) * 1000))
+"""
+
+
+def coletar(modulo: str):
+    env = {**os.environ}
+    env.setdefault("DATABASE_URL", "sqlite://")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _SCRIPT.format(modulo=modulo)],
+        cwd=RAIZ, env=env, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        sys.stderr.write(proc.stderr)
+        raise SystemExit(proc.returncode)
+
+    registros = []  # (self_us, cumulativo_us, profundidade, nome)
+    for linha in proc.stderr.splitlines():
+        m = _LINHA.match(linha)
+        if m:
+            profundidade = len(m.group(3)) // 2
+            registros.append((int(m.group(1)), int(m.group(2)), profundidade, m.group(4)))
+
+    tempos = re.search(r"TEMPOS ([\d.]+) ([\d.]+)", proc.stdout)
+    import_ms, startup_ms = (float(tempos.group(1)), float(tempos.group(2))) if tempos else (0.0, 0.0)
+    return registros, import_ms, startup_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Perfil de import/startup do app")
+    parser.add_argument("--modulo", default="server", help="módulo que expõe `app` (padrão: server)")
+    parser.add_argument("--top", type=int, default=25)
+    args = parser.parse_args()
+
+    registros, import_ms, startup_ms = coletar(args.modulo)
+
+    print(f"import de '{args.modulo}': {import_ms:.1f} ms | startup (on_event): {startup_ms:.1f} ms\n")
+
+    # Tempo próprio agregado por pacote raiz (fastapi, sqlalchemy, src, ...)
+    por_pacote = defaultdict(int)
+    for self_us, _, _, nome in registros:
+        por_pacote[nome.split(".")[0]] += self_us
+    print(f"{'pacote':<32}{'self (ms)':>12}")
+    for nome, us in sorted(por_pacote.items(), key=lambda kv: -kv[1])[:args.top]:
+        print(f"{nome:<32}{us / 1000:>12.1f}")
+
+    # Módulos do próprio projeto, pelo tempo cumulativo (inclui o que cada um puxa)
+    print(f"\n{'módulo do projeto':<56}{'cumulativo (ms)':>16}")
+    proprios = [r for r in registros if r[3] == args.modulo or r[3].startswith("src.")]
+    for _, cum_us, _, nome in sorted(proprios, key=lambda r: -r[1])[:args.top]:
+        print(f"{nome:<56}{cum_us / 1000:>16.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Cascata (waterfall) dos rastros gravados por src.common.rastreamento
+(RASTREAMENTO_EXPORTADOR=arquivo).
+
+    python tools/rastros.py rastros.jsonl                      # o rastro mais lento
+    python tools/rastros.py rastros.jsonl --rota encerrar --top 3
+    python tools/rastros.py rastros.jsonl --trace 4bf92f3577b34da6a3ce929d0e0e4736
+    python tools/rastros.py rastros.jsonl --resumo             # p50/p95 por rota
+
+Cada linha mostra início relativo, duração, uma barra proporcional à
+requisição e o nome do span, indentado pela árvore; SQL com o statement.
+"""
+import argparse
+import json
+import sys
+from collections import defaultdict
+
+
+def carregar(caminho: str):
+    with open(caminho, encoding="utf-8") as f:
+        for linha in f:
+            linha = linha.strip()
+            if linha:
+                yield json.loads(linha)
+
+
+def _percentil(valores, p):
+    valores = sorted(valores)
+    if not valores:
+        return 0.0
+    return valores[min(len(valores) - 1, int(round(p / 100.0 * (len(valores) - 1))))]
+
+
+def resumo(rastros) -> None:
+    por_rota = defaultdict(list)
+    for r in rastros:
+        por_rota[r["nome"]].append(r["duracao_ms"])
+    print(f"{'rota':55} {'n':>5} {'p50 ms':>9} {'p95 ms':>9} {'máx ms':>9}")
+    for nome, duracoes in sorted(por_rota.items(), key=lambda kv: -_percentil(kv[1], 95)):
+        print(f"{nome[:55]:55} {len(duracoes):5d} {_percentil(duracoes, 50):9.2f} "
+              f"{_percentil(duracoes, 95):9.2f} {max(duracoes):9.2f}")
+
+
+def cascata(rastro: dict, largura: int = 40, sql_max: int = 90) -> None:
+    spans = rastro["spans"]
+    inicio = min(s["inicio_ns"] for s in spans)
+    total = max(rastro["duracao_ms"], 1e-6)
+    filhos = defaultdict(list)
+    ids = {s["span_id"] for s in spans}
+    raizes = []
+    for s in spans:
+        if s["pai_id"] in ids:
+            filhos[s["pai_id"]].append(s)
+        else:
+            raizes.append(s)
+
+    print(f"trace {rastro['trace_id']}  {rastro['nome']}  {rastro['duracao_ms']:.2f} ms  ({len(spans)} spans)")
+    n_sql = sum(1 for s in spans if s["tipo"] == "sql")
+    ms_sql = sum(s["duracao_ms"] for s in spans if s["tipo"] == "sql")
+    print(f"SQL: {n_sql} statement(s), {ms_sql:.2f} ms")
+
+    def _imprimir(s, nivel):
+        offset = (s["inicio_ns"] - inicio) / 1e6
+        a = int(offset / total * largura)
+        b = max(1, int(s["duracao_ms"] / total * largura))
+        barra = (" " * a + "█" * b)[:largura].ljust(largura)
+        nome = s["nome"]
+        if s["tipo"] == "sql":
+            nome += "  " + " ".join(s["atributos"].get("statement", "").split())[:sql_max]
+        erro = f"  !{s['erro']}" if s.get("erro") else ""
+        print(f"{offset:9.2f} {s['duracao_ms']:9.2f} |{barra}| {'  ' * nivel}{nome}{erro}")
+        for f in sorted(filhos[s["span_id"]], key=lambda x: x["inicio_ns"]):
+            _imprimir(f, nivel + 1)
+
+    print(f"{'início ms':>9} {'dur ms':>9}")
+    for s in sorted(raizes, key=lambda x: x["inicio_ns"]):
+        _imprimir(s, 0)
+    print()
+
+
+def main() -> int:
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("arquivo")
+    p.add_argument("--rota", help="trecho do nome da rota (ex.: encerrar)")
+    p.add_argument("--trace", help="trace_id")
+    p.add_argument("--top", type=int, default=1, help="quantos rastros, do mais lento")
+    p.add_argument("--resumo", action="store_true")
+    args = p.parse_args()
+
+    rastros = list(carregar(args.arquivo))
+    if args.rota:
+        rastros = [r for r in rastros if args.rota in r["nome"]]
+    if args.trace:
+        rastros = [r for r in rastros if r["trace_id"] == args.trace]
+    if not rastros:
+        print("nenhum rastro encontrado", file=sys.stderr)
+        return 1
+    if args.resumo:
+        resumo(rastros)
+        return 0
+    for r in sorted(rastros, key=lambda r: -r["duracao_ms"])[: args.top]:
+        cascata(r)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,77 @@
+"""
+Reinício gradual (rolling) dos workers do Gunicorn: um worker por vez.
+
+    python tools/reinicio_gradual.py --pidfile /tmp/gunicorn.pid
+
+Para cada worker: envia SIGTERM (o worker termina as requisições em andamento
+dentro do graceful_timeout e sai), espera o mestre subir o substituto e só
+então passa ao próximo. A capacidade cai no máximo 1 worker durante a troca.
+
+Obs.: com preload_app os substitutos herdam o código já carregado no mestre.
+Para publicar código novo, use o upgrade do binário do Gunicorn
+(SIGUSR2 no mestre, depois SIGWINCH/SIGQUIT no mestre antigo).
+"""
+import argparse
+import os
+import signal
+import sys
+import time
+from pathlib import Path
+
+
+def log(msg: str):
+    print(f"[reinicio] {msg}", flush=True)
+
+
+def workers_do_mestre(mestre: int) -> set:
+    filhos = set()
+    for task in Path(f"/proc/{mestre}/task").iterdir():
+        arq = task / "children"
+        if arq.exists():
+            filhos.update(int(p) for p in arq.read_text().split())
+    return filhos
+
+
+def esperar(condicao, timeout: float, intervalo: float = 0.2) -> bool:
+    limite = time.monotonic() + timeout
+    while time.monotonic() < limite:
+        if condicao():
+            return True
+        time.sleep(intervalo)
+    return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reinicia os workers do Gunicorn um a um")
+    parser.add_argument("--pidfile", default=os.getenv("GUNICORN_PIDFILE", "/tmp/gunicorn.pid"))
+    parser.add_argument("--timeout", type=float, default=60.0, help="espera máxima por worker (s)")
+    parser.add_argument("--pausa", type=float, default=1.0, help="pausa após o substituto subir (s)")
+    args = parser.parse_args()
+
+    mestre = int(Path(args.pidfile).read_text().strip())
+    originais = sorted(workers_do_mestre(mestre))
+    if not originais:
+        sys.exit("nenhum worker encontrado para o mestre %d" % mestre)
+    log(f"mestre {mestre}: {len(originais)} workers")
+
+    for pid in originais:
+        antes = workers_do_mestre(mestre)
+        log(f"encerrando worker {pid}")
+        os.kill(pid, signal.SIGTERM)
+
+        # o substituto aparece como um filho novo e o total volta ao original
+        ok = esperar(
+            lambda: pid not in workers_do_mestre(mestre)
+            and len(workers_do_mestre(mestre) - antes) >= 1
+            and len(workers_do_mestre(mestre)) >= len(antes),
+            args.timeout,
+        )
+        if not ok:
+            sys.exit(f"worker {pid} não foi substituído em {args.timeout:.0f}s; abortando")
+        time.sleep(args.pausa)
+
+    log("todos os workers substituídos")
+
+
+if __name__ == "__main__":
+    main()
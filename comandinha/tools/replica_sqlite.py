@@ -0,0 +1,62 @@
+"""
+Réplica de leitura local com dois SQLite: copia o primário para a réplica a
+cada --intervalo segundos (o intervalo é o atraso de replicação simulado).
+
+    python tools/replica_sqlite.py --primario app_comandinha.db --replica replica.db --intervalo 2
+
+    # em outro terminal
+    REPLICA_URLS=sqlite:///./replica.db DATABASE_URL=sqlite:///./app_comandinha.db \\
+        uvicorn server:app
+
+Usa a API de backup do sqlite3: a cópia é consistente mesmo com o app
+escrevendo no primário, e quem já tem conexão aberta na réplica passa a ver o
+conteúdo novo (sem trocar o arquivo por baixo do pool). --uma-vez copia e sai.
+Com um intervalo longo dá para ver o roteamento: o cardápio lido da réplica
+fica atrasado, mas quem acabou de escrever lê do primário (GET /admin/replicas).
+"""
+import argparse
+import sqlite3
+import sys
+import time
+
+
+def log(msg: str):
+    print(f"[replica] {msg}", flush=True)
+
+
+def copiar(primario: str, replica: str) -> float:
+    inicio = time.perf_counter()
+    origem = sqlite3.connect(f"file:{primario}?mode=ro", uri=True)
+    destino = sqlite3.connect(replica)
+    try:
+        origem.backup(destino)
+    finally:
+        destino.close()
+        origem.close()
+    return (time.perf_counter() - inicio) * 1000.0
+
+
+def main() -> int:
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--primario", required=True, help="arquivo SQLite do primário")
+    p.add_argument("--replica", required=True, help="arquivo SQLite da réplica (criado se não existir)")
+    p.add_argument("--intervalo", type=float, default=2.0, help="segundos entre cópias")
+    p.add_argument("--uma-vez", action="store_true")
+    args = p.parse_args()
+
+    try:
+        while True:
+            ms = copiar(args.primario, args.replica)
+            log(f"{args.primario} -> {args.replica} em {ms:.1f} ms")
+            if args.uma_vez:
+                return 0
+            time.sleep(args.intervalo)
+    except KeyboardInterrupt:
+        return 0
+    except sqlite3.Error as e:
+        log(f"falhou: {e}")
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())